@@ -0,0 +1,430 @@
+"""
+CryptoSwap v2 invariant math of Curve cryptoswap pools in integer arithmetic.
+Reproduces get_dy, get_dx, calc_token_amount and calc_withdraw_one_coin of the 2-coin crypto factory
+template and of the tricrypto math contract to the wei, so quotes can be made locally
+from a pool state fetched once per block.
+tricrypto-ng and twocrypto-ng pools are rejected: their math contracts start newton_D from the previous K0
+and solve y with another method, which are not reproduced here.
+"""
+
+from dataclasses import dataclass
+
+# precision of prices and normalized balances
+PRECISION = 10**18
+# denominator of the pool fees
+FEE_DENOMINATOR = 10**10
+# precision of A, the pools A() is A * N**N * A_MULTIPLIER
+A_MULTIPLIER = 10000
+# fee added to the deposit and withdrawal fees to charge for rounding
+NOISE_FEE = 10**5
+# max number of Newton iterations, same as the pools
+MAX_ITERATIONS = 255
+# rounds of get_dx estimating the fee on dy, same as the pools
+DX_FEE_ROUNDS = 5
+# bits of each price packed in the price_scale of 3-coin pools
+PRICE_SIZE = 128
+PRICE_MASK = 2**PRICE_SIZE - 1
+# bits of each value packed in the fee params and precisions of tricrypto-ng pools
+PACKED_SIZE = 64
+PACKED_MASK = 2**PACKED_SIZE - 1
+
+
+@dataclass(frozen=True)
+class CryptoSwapState:
+    """
+    State of a cryptoswap pool at a block.
+    balances: pool balances(i) of each coin
+    precisions: 10**(18 - decimals) of each coin, see precisions_from_decimals and unpack
+    price_scale: pool price_scale of each coin after the first, see unpack_prices
+    D: pool D()
+    A: pool A(), already multiplied by N**N * A_MULTIPLIER
+    gamma: pool gamma()
+    mid_fee: pool mid_fee()
+    out_fee: pool out_fee()
+    fee_gamma: pool fee_gamma()
+    total_supply: lp token totalSupply()
+    future_A_gamma_time: pool future_A_gamma_time(), D is recomputed while A and gamma are ramping
+    is_ng: whether the pool is a tricrypto-ng or twocrypto-ng pool, whose MATH() contract differs.
+        Quotes of states of such pools raise ValueError
+    """
+
+    balances: tuple[int, ...]
+    precisions: tuple[int, ...]
+    price_scale: tuple[int, ...]
+    D: int
+    A: int
+    gamma: int
+    mid_fee: int
+    out_fee: int
+    fee_gamma: int
+    total_supply: int
+    future_A_gamma_time: int = 0
+    is_ng: bool = False
+
+
+def precisions_from_decimals(decimals: list[int]) -> tuple[int, ...]:
+    """
+    Precision multipliers of coins with the given decimals.
+    """
+    return tuple(10 ** (18 - d) for d in decimals)
+
+
+def unpack_prices(packed_prices: int, n_coins: int) -> tuple[int, ...]:
+    """
+    Prices packed by 3-coin pools in 128 bits each, first price in the lowest bits.
+    """
+    return tuple(
+        (packed_prices >> (PRICE_SIZE * k)) & PRICE_MASK for k in range(n_coins - 1)
+    )
+
+
+def unpack(packed: int) -> tuple[int, int, int]:
+    """
+    Three values packed by tricrypto-ng pools in 64 bits each, first value in the highest bits.
+    Unpacks packed_fee_params() to (mid_fee, out_fee, fee_gamma) and precisions().
+    """
+    return (
+        (packed >> (2 * PACKED_SIZE)) & PACKED_MASK,
+        (packed >> PACKED_SIZE) & PACKED_MASK,
+        packed & PACKED_MASK,
+    )
+
+
+def get_dy(state: CryptoSwapState, i: int, j: int, dx: int) -> int:
+    """
+    Amount of coin j received for dx of coin i, same as pool get_dy(i, j, dx).
+    """
+    _check_supported(state)
+    if i == j:
+        raise ValueError("cryptoswap_math: same input and output coin")
+
+    D = _get_D(state)
+    balances = list(state.balances)
+    balances[i] += dx
+    xp = _xp(state, balances)
+
+    y = newton_y(state.A, state.gamma, xp, D, j)
+    dy = _sub(xp[j] - y, 1)
+    xp[j] = y
+    dy = dy * PRECISION // _price_scale_i(state, j)
+
+    return dy - fee(state, xp) * dy // FEE_DENOMINATOR
+
+
+def get_dx(state: CryptoSwapState, i: int, j: int, dy: int) -> int:
+    """
+    Amount of coin i to send for dy of coin j, with the fee rounds of get_dx(i, j, dy) of tricrypto-ng views
+    over the newton_y of this engine. Like them, it is an approximation: the fee on dy is estimated
+    over DX_FEE_ROUNDS rounds.
+    """
+    _check_supported(state)
+    if i == j:
+        raise ValueError("cryptoswap_math: same input and output coin")
+    if dy == 0:
+        raise ValueError("cryptoswap_math: do not exchange out 0 coins")
+
+    D = _get_D(state)
+    dx = 0
+    _dy = dy
+    for _ in range(DX_FEE_ROUNDS):
+        balances = list(state.balances)
+        balances[j] = _sub(balances[j], _dy)
+        xp = _xp(state, balances)
+
+        x = newton_y(state.A, state.gamma, xp, D, i)
+        dx = _sub(x, xp[i]) * PRECISION // _price_scale_i(state, i)
+        xp[i] = x
+        _dy = dy + fee(state, xp) * _dy // FEE_DENOMINATOR + 1
+
+    return dx
+
+
+def calc_token_amount(
+    state: CryptoSwapState, amounts: list[int], deposit: bool = True
+) -> int:
+    """
+    Amount of lp tokens minted or burned for amounts, same as pool calc_token_amount(amounts, deposit).
+    2-coin pools only quote deposits, calc_token_amount(amounts).
+    Like the pools, it charges the imbalance fee.
+    """
+    _check_supported(state)
+    D0 = _get_D(state)
+    amountsp = _xp(state, amounts)
+    if len(amounts) == 2:
+        if not deposit:
+            raise ValueError("cryptoswap_math: 2-coin pools only quote deposits")
+        # 2-coin pools add normalized amounts to normalized balances
+        xp = [x + a for x, a in zip(_xp(state, state.balances), amountsp)]
+    elif deposit:
+        xp = _xp(state, [b + a for b, a in zip(state.balances, amounts)])
+    else:
+        xp = _xp(state, [_sub(b, a) for b, a in zip(state.balances, amounts)])
+
+    D = newton_D(state.A, state.gamma, xp)
+    total_supply = state.total_supply
+    if deposit:
+        d_token = _sub(total_supply * D // D0, total_supply)
+    else:
+        d_token = _sub(total_supply, total_supply * D // D0)
+
+    return _sub(d_token, _calc_token_fee(state, amountsp, xp) * d_token // FEE_DENOMINATOR + 1)
+
+
+def calc_withdraw_one_coin(state: CryptoSwapState, token_amount: int, i: int) -> int:
+    """
+    Amount of coin i received for burning token_amount lp tokens, same as pool calc_withdraw_one_coin(token_amount, i).
+    """
+    _check_supported(state)
+    total_supply = state.total_supply
+    if token_amount > total_supply:
+        raise ValueError("cryptoswap_math: token amount more than supply")
+
+    xp = _xp(state, state.balances)
+    D = newton_D(state.A, state.gamma, xp)
+
+    # the fee is charged on D, reducing the invariant less than charging the user
+    dD = token_amount * D // total_supply
+    D = _sub(D, _sub(dD, fee(state, xp) * dD // (2 * FEE_DENOMINATOR) + 1))
+    y = newton_y(state.A, state.gamma, xp, D, i)
+
+    return _sub(xp[i], y) * PRECISION // _price_scale_i(state, i)
+
+
+def fee(state: CryptoSwapState, xp: list[int]) -> int:
+    """
+    Dynamic fee of normalized balances xp, from mid_fee when balanced to out_fee when imbalanced:
+    f = fee_gamma / (fee_gamma + (1 - K)) with K = prod(x) / (sum(x) / N)**N
+    """
+    n_coins = len(xp)
+    fee_gamma = state.fee_gamma
+    S = sum(xp)
+
+    if n_coins == 2:
+        f = fee_gamma * 10**18 // _sub(
+            fee_gamma + 10**18, (10**18 * n_coins**n_coins) * xp[0] // S * xp[1] // S
+        )
+    else:
+        f = 10**18
+        for x in xp:
+            f = f * n_coins * x // S
+        if fee_gamma > 0:
+            f = fee_gamma * 10**18 // _sub(fee_gamma + 10**18, f)
+
+    return (state.mid_fee * f + state.out_fee * (10**18 - f)) // 10**18
+
+
+def geometric_mean(unsorted_x: list[int], sort: bool = True) -> int:
+    """
+    Geometric mean of x, by Newton iterations.
+    """
+    n_coins = len(unsorted_x)
+    x = sorted(unsorted_x, reverse=True) if sort else unsorted_x
+
+    D = x[0]
+    for _ in range(MAX_ITERATIONS):
+        D_prev = D
+        if n_coins == 2:
+            D = (D + x[0] * x[1] // D) // n_coins
+        else:
+            tmp = 10**18
+            for _x in x:
+                tmp = tmp * _x // D
+            D = D * ((n_coins - 1) * 10**18 + tmp) // (n_coins * 10**18)
+        diff = abs(D - D_prev)
+        if diff <= 1 or diff * 10**18 < D:
+            return D
+
+    raise ArithmeticError("cryptoswap_math: geometric mean did not converge")
+
+
+def newton_D(ANN: int, gamma: int, x_unsorted: list[int]) -> int:
+    """
+    CryptoSwap invariant D of normalized balances, by Newton iterations.
+    ANN is the pool A(), already multiplied by N**N * A_MULTIPLIER.
+    """
+    n_coins = len(x_unsorted)
+    x = sorted(x_unsorted, reverse=True)
+
+    if not 10**9 <= x[0] <= 10**15 * 10**18:
+        raise ArithmeticError("cryptoswap_math: unsafe values x[0]")
+    min_frac = 10**14 if n_coins == 2 else 10**11
+    for _x in x[1:]:
+        if _x * 10**18 // x[0] < min_frac:
+            raise ArithmeticError("cryptoswap_math: unsafe values x[i]")
+
+    D = n_coins * geometric_mean(x, False)
+    S = sum(x)
+
+    for _ in range(MAX_ITERATIONS):
+        D_prev = D
+
+        if n_coins == 2:
+            K0 = (10**18 * n_coins**2) * x[0] // D * x[1] // D
+        else:
+            K0 = 10**18
+            for _x in x:
+                K0 = K0 * _x * n_coins // D
+
+        _g1k0 = abs(gamma + 10**18 - K0) + 1
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1 = 10**18 * D // gamma * _g1k0 // gamma * _g1k0 * A_MULTIPLIER // ANN
+        # 2*N*K0 / _g1k0
+        mul2 = (2 * 10**18) * n_coins * K0 // _g1k0
+
+        neg_fprime = _sub(
+            (S + S * mul2 // 10**18) + mul1 * n_coins // K0, mul2 * D // 10**18
+        )
+
+        # D -= f / fprime
+        D_plus = D * (neg_fprime + S) // neg_fprime
+        D_minus = D * D // neg_fprime
+        if 10**18 > K0:
+            D_minus += D * (mul1 // neg_fprime) // 10**18 * (10**18 - K0) // K0
+        else:
+            D_minus = _sub(D_minus, D * (mul1 // neg_fprime) // 10**18 * (K0 - 10**18) // K0)
+
+        if D_plus > D_minus:
+            D = D_plus - D_minus
+        else:
+            D = (D_minus - D_plus) // 2
+
+        if abs(D - D_prev) * 10**14 < max(10**16, D):
+            # the next newton_y must be safe
+            for _x in x:
+                if not 10**16 <= _x * 10**18 // D <= 10**20:
+                    raise ArithmeticError("cryptoswap_math: unsafe values x[i]")
+            return D
+
+    raise ArithmeticError("cryptoswap_math: D did not converge")
+
+
+def newton_y(ANN: int, gamma: int, x: list[int], D: int, i: int) -> int:
+    """
+    Normalized balance of coin i that gives invariant D with the other balances of x,
+    by Newton iterations.
+    """
+    n_coins = len(x)
+    if not 10**17 <= D <= 10**15 * 10**18:
+        raise ArithmeticError("cryptoswap_math: unsafe values D")
+
+    if n_coins == 2:
+        x_j = x[1 - i]
+        y = D**2 // (x_j * n_coins**2)
+        K0_i = (10**18 * n_coins) * x_j // D
+        if not 10**16 * n_coins <= K0_i <= 10**20 * n_coins:
+            raise ArithmeticError("cryptoswap_math: unsafe values x[i]")
+        S_i = x_j
+        convergence_limit = max(max(x_j // 10**14, D // 10**14), 100)
+    else:
+        for k in range(n_coins):
+            if k != i and not 10**16 <= x[k] * 10**18 // D <= 10**20:
+                raise ArithmeticError("cryptoswap_math: unsafe values x[i]")
+
+        x_sorted = list(x)
+        x_sorted[i] = 0
+        x_sorted.sort(reverse=True)
+        convergence_limit = max(max(x_sorted[0] // 10**14, D // 10**14), 100)
+
+        y = D // n_coins
+        S_i = 0
+        for _x in reversed(x_sorted[: n_coins - 1]):
+            # small _x first
+            y = y * D // (_x * n_coins)
+            S_i += _x
+        K0_i = 10**18
+        for _x in x_sorted[: n_coins - 1]:
+            # large _x first
+            K0_i = K0_i * _x * n_coins // D
+
+    for _ in range(MAX_ITERATIONS):
+        y_prev = y
+
+        K0 = K0_i * y * n_coins // D
+        S = S_i + y
+
+        _g1k0 = abs(gamma + 10**18 - K0) + 1
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1 = 10**18 * D // gamma * _g1k0 // gamma * _g1k0 * A_MULTIPLIER // ANN
+        # 2*K0 / _g1k0
+        mul2 = 10**18 + (2 * 10**18) * K0 // _g1k0
+
+        yfprime = 10**18 * y + S * mul2 + mul1
+        _dyfprime = D * mul2
+        if yfprime < _dyfprime:
+            y = y_prev // 2
+            continue
+        yfprime -= _dyfprime
+        fprime = yfprime // y
+
+        # y -= f / f_prime;  y = (y * fprime - f) / fprime
+        y_minus = mul1 // fprime
+        y_plus = (yfprime + 10**18 * D) // fprime + y_minus * 10**18 // K0
+        y_minus += 10**18 * S // fprime
+
+        if y_plus < y_minus:
+            y = y_prev // 2
+        else:
+            y = y_plus - y_minus
+
+        if abs(y - y_prev) < max(convergence_limit, y // 10**14):
+            if not 10**16 <= y * 10**18 // D <= 10**20:
+                raise ArithmeticError("cryptoswap_math: unsafe value for y")
+            return y
+
+    raise ArithmeticError("cryptoswap_math: y did not converge")
+
+
+def _check_supported(state: CryptoSwapState) -> None:
+    if state.is_ng:
+        raise ValueError("cryptoswap_math: tricrypto-ng and twocrypto-ng math is not supported")
+
+
+def _get_D(state: CryptoSwapState) -> int:
+    """
+    Invariant the pools quote with, recomputed from the balances while A and gamma are ramping.
+    """
+    if state.future_A_gamma_time > 0:
+        return newton_D(state.A, state.gamma, _xp(state, state.balances))
+    return state.D
+
+
+def _xp(state: CryptoSwapState, amounts: tuple[int, ...] | list[int]) -> list[int]:
+    """
+    Amounts normalized to 18 decimals and valued in the first coin at price_scale.
+    """
+    xp = [amounts[0] * state.precisions[0]]
+    for k in range(1, len(amounts)):
+        xp.append(amounts[k] * state.price_scale[k - 1] * state.precisions[k] // PRECISION)
+    return xp
+
+
+def _price_scale_i(state: CryptoSwapState, i: int) -> int:
+    """
+    Price of coin i in normalized units of the first coin, the divisor that converts xp back to coin units.
+    """
+    if i == 0:
+        return PRECISION * state.precisions[0]
+    return state.price_scale[i - 1] * state.precisions[i]
+
+
+def _calc_token_fee(state: CryptoSwapState, amountsp: list[int], xp: list[int]) -> int:
+    """
+    Imbalance fee of a deposit or withdrawal: sum(|amounts_i - avg(amounts)|) * fee' / sum(amounts).
+    """
+    n_coins = len(amountsp)
+    _fee = fee(state, xp) * n_coins // (4 * (n_coins - 1))
+    S = sum(amountsp)
+    avg = S // n_coins
+    Sdiff = sum(abs(x - avg) for x in amountsp)
+    return _fee * Sdiff // S + NOISE_FEE
+
+
+def _sub(a: int, b: int) -> int:
+    """
+    Subtraction that fails where the pools revert on uint256 underflow.
+    """
+    if b > a:
+        raise ArithmeticError("cryptoswap_math: subtraction underflow")
+    return a - b
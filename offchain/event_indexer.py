@@ -0,0 +1,446 @@
+"""
+Incremental indexer of adapter events into SQLite.
+Streams eth_getLogs of the adapters in block ranges that shrink when the endpoint refuses a range and grow back after,
+decodes each log with a decoder built once per event and appends it to the table of its event.
+Backfills final blocks in parallel chunks that resume where they stopped, then follows the head
+and rolls back the rows of blocks a reorg dropped.
+"""
+
+import itertools
+import json
+import re
+import sqlite3
+import threading
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from eth_abi.decoding import ContextFramesBytesIO
+from eth_abi.registry import registry
+from eth_utils import collapse_if_tuple, event_signature_to_log_topic, to_checksum_address
+
+from offchain import multicall
+from offchain.multicall import Transport
+
+# blocks of the first eth_getLogs request, and max blocks of any
+RANGE = 2_000
+MAX_RANGE = 10_000
+# blocks of a backfill chunk, each fetched and written as a whole
+CHUNK = 50_000
+# chunks fetched at once
+WORKERS = 8
+# blocks under the head that can still be reorged, backfill stops above them
+REORG_DEPTH = 64
+
+# columns of every event table, ahead of the event arguments
+LOG_COLUMNS = (
+    ("block_number", "index"),
+    ("log_index", "index"),
+    ("transaction_hash", "hash"),
+    ("address", "address"),
+)
+
+
+class IndexerError(Exception):
+    """
+    Raised when the endpoint fails a request, e.g. refuses the logs of a single block.
+    """
+
+
+@dataclass(frozen=True)
+class Event:
+    """
+    Event of an ABI with its log decoder, built once.
+    columns: argument names and kinds, see _kind. Integers are stored as text, see _to_column,
+        uint256 does not fit the 64-bit integers of SQLite
+    """
+
+    name: str
+    topic: str
+    table: str
+    columns: tuple[tuple[str, str], ...]
+    _topic_decoders: tuple = field(repr=False, compare=False)
+    _data_decoder: Callable = field(repr=False, compare=False)
+    _indexed: tuple[bool, ...] = field(repr=False, compare=False)
+    _shapers: tuple = field(repr=False, compare=False)
+
+    @classmethod
+    def from_abi(cls, entry: Mapping) -> "Event":
+        inputs = entry["inputs"]
+        types = [collapse_if_tuple(param) for param in inputs]
+        indexed = tuple(param.get("indexed", False) for param in inputs)
+        kinds = [_kind(param, is_indexed) for param, is_indexed in zip(inputs, indexed)]
+        return cls(
+            name=entry["name"],
+            topic="0x" + event_signature_to_log_topic(f"{entry['name']}({','.join(types)})").hex(),
+            table=_snake_case(entry["name"]),
+            columns=tuple((param["name"], kind) for param, kind in zip(inputs, kinds)),
+            # indexed dynamic values are logged as their hash, kept as is
+            _topic_decoders=tuple(
+                None if kind == "hash" else registry.get_decoder(abi_type)
+                for abi_type, kind, is_indexed in zip(types, kinds, indexed)
+                if is_indexed
+            ),
+            _data_decoder=multicall._tuple_decoder([t for t, is_indexed in zip(types, indexed) if not is_indexed]),
+            _indexed=indexed,
+            _shapers=tuple(multicall._shaper(param) for param in inputs),
+        )
+
+    def decode(self, log: Mapping) -> dict[str, Any]:
+        """
+        Row of a JSON-RPC log, its arguments by name after the log columns.
+        """
+        topics = iter(log["topics"][1:])
+        data = iter(self._data_decoder(ContextFramesBytesIO(bytes.fromhex(log["data"][2:]))))
+        decoders = iter(self._topic_decoders)
+        row = {
+            "block_number": int(log["blockNumber"], 16),
+            "log_index": int(log["logIndex"], 16),
+            "transaction_hash": log["transactionHash"],
+            "address": to_checksum_address(log["address"]),
+        }
+        for (name, kind), is_indexed, shape in zip(self.columns, self._indexed, self._shapers):
+            if is_indexed:
+                topic = next(topics)
+                decoder = next(decoders)
+                if decoder is None:
+                    row[name] = topic
+                    continue
+                value = decoder(ContextFramesBytesIO(bytes.fromhex(topic[2:])))
+            else:
+                value = next(data)
+            row[name] = _to_column(kind, shape(value) if shape else value)
+        return row
+
+
+def events(abi: Sequence[Mapping]) -> dict[str, Event]:
+    """
+    Events of an ABI by topic.
+    """
+    return {event.topic: event for event in (Event.from_abi(entry) for entry in abi if entry.get("type") == "event")}
+
+
+class EventIndexer:
+    """
+    Indexes the events of contracts into the SQLite database at path, one table per event name.
+    contracts: ABI of each indexed contract by address. Events of the same name share a table
+        with the columns of all of them, e.g. PoolRegistered of both adapters
+    cursor: next block to index, persisted with the rows
+    requests: number of JSON-RPC requests sent, a batch counts as one
+    """
+
+    def __init__(
+        self,
+        transport: str | Transport,
+        path: str | Path,
+        contracts: Mapping[str, Sequence[Mapping]],
+        start_block: int = 0,
+        max_range: int = MAX_RANGE,
+        workers: int = WORKERS,
+        reorg_depth: int = REORG_DEPTH,
+    ):
+        self.transport = multicall.http_transport(transport) if isinstance(transport, str) else transport
+        self.addresses = [to_checksum_address(address) for address in contracts]
+        self.max_range = max_range
+        self.workers = workers
+        self.reorg_depth = reorg_depth
+        self.requests = 0
+        self._range = min(RANGE, max_range)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        self.events: dict[str, Event] = {}
+        for abi in contracts.values():
+            for topic, event in events(abi).items():
+                self.events.setdefault(topic, event)
+        self.tables: dict[str, dict[str, str]] = {}
+        for event in self.events.values():
+            columns = self.tables.setdefault(event.table, dict(LOG_COLUMNS))
+            for name, kind in event.columns:
+                columns.setdefault(name, kind)
+
+        # rows of the main thread only, backfill workers only fetch logs
+        self.db = sqlite3.connect(path)
+        self._create_tables(start_block)
+
+    @property
+    def cursor(self) -> int:
+        return self.db.execute("SELECT next_block FROM cursor").fetchone()[0]
+
+    def close(self) -> None:
+        self.db.close()
+
+    def backfill(self, to_block: int | None = None, chunk: int = CHUNK) -> int:
+        """
+        Index the blocks from the cursor to to_block, by default the last block out of reorg reach.
+        Chunks are fetched by the workers in parallel and each written with its done range in one transaction,
+        so an interrupted backfill resumes without fetching the chunks it wrote again.
+        Returns the cursor.
+        """
+        if to_block is None:
+            to_block = self._block_number() - self.reorg_depth
+        done = self.db.execute("SELECT start_block, end_block FROM backfill ORDER BY start_block").fetchall()
+
+        # chunks of the blocks between the cursor and to_block not done yet
+        chunks = []
+        start = self.cursor
+        for done_start, done_end in done + [(to_block + 1, to_block + 1)]:
+            end = min(done_start - 1, to_block)
+            chunks += [(first, min(first + chunk - 1, end)) for first in range(start, end + 1, chunk)]
+            start = max(start, done_end + 1)
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            fetches = {pool.submit(self._logs, start, end): (start, end) for start, end in chunks}
+            try:
+                for fetch in as_completed(fetches):
+                    start, end = fetches[fetch]
+                    with self.db:
+                        self._insert(fetch.result())
+                        self.db.execute("INSERT INTO backfill VALUES (?, ?)", (start, end))
+                        self._advance()
+            finally:
+                for fetch in fetches:
+                    fetch.cancel()
+        return self.cursor
+
+    def sync(self) -> int:
+        """
+        Index up to the head: roll back the blocks a reorg dropped, backfill the final blocks if behind,
+        then fetch the rest up to the head in one pass. Returns the cursor.
+        """
+        self._rollback()
+        head = self._block_number()
+        if self.cursor <= head - self.reorg_depth:
+            self.backfill(head - self.reorg_depth)
+        start = self.cursor
+        if start > head:
+            return start
+
+        logs = self._logs(start, head)
+        # hashes of the head and of the blocks of the logs, to check the logs are of one chain and spot later reorgs
+        numbers = sorted({head} | {int(log["blockNumber"], 16) for log in logs})
+        hashes = dict(zip(numbers, self._block_hashes(numbers)))
+        if any(hashes[int(log["blockNumber"], 16)] != log["blockHash"] for log in logs):
+            # reorged between the requests, fetched again next sync
+            return start
+
+        with self.db:
+            self._insert(logs)
+            self.db.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?)", hashes.items())
+            self.db.execute("DELETE FROM blocks WHERE number < ?", (head - self.reorg_depth,))
+            self.db.execute("UPDATE cursor SET next_block = ?", (head + 1,))
+        return head + 1
+
+    def rows(self, name: str, **where) -> list[dict[str, Any]]:
+        """
+        Rows of the event table of name, e.g. "Exchange", in chain order, with values of the equal arguments in where.
+        """
+        table = _snake_case(name)
+        kinds = self.tables[table]
+        query = f"SELECT * FROM {table}"
+        if where:
+            query += " WHERE " + " AND ".join(f"{column} = ?" for column in where)
+        query += " ORDER BY block_number, log_index"
+        cursor = self.db.execute(query, [_to_column(kinds[column], value) for column, value in where.items()])
+        columns = [description[0] for description in cursor.description]
+        return [
+            {column: _from_column(kinds[column], value) for column, value in zip(columns, row)}
+            for row in cursor.fetchall()
+        ]
+
+    def _create_tables(self, start_block: int) -> None:
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS cursor (next_block INTEGER NOT NULL)")
+            if self.db.execute("SELECT COUNT(*) FROM cursor").fetchone()[0] == 0:
+                self.db.execute("INSERT INTO cursor VALUES (?)", (start_block,))
+            # chunks written by a backfill beyond the cursor
+            self.db.execute("CREATE TABLE IF NOT EXISTS backfill (start_block INTEGER PRIMARY KEY, end_block INTEGER)")
+            # hashes of indexed blocks within reorg reach
+            self.db.execute("CREATE TABLE IF NOT EXISTS blocks (number INTEGER PRIMARY KEY, hash TEXT)")
+            for table, columns in self.tables.items():
+                definitions = ", ".join(f"{name} {_COLUMN_TYPES[kind]}" for name, kind in columns.items())
+                self.db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ({definitions}, PRIMARY KEY (block_number, log_index))"
+                )
+                for name, kind in columns.items():
+                    if kind == "address" and name != "address":
+                        self.db.execute(f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} ({name})")
+
+    def _insert(self, logs: Sequence[Mapping]) -> None:
+        for log in logs:
+            if log.get("removed"):
+                continue
+            event = self.events.get(log["topics"][0] if log["topics"] else None)
+            if event is None:
+                continue
+            row = event.decode(log)
+            self.db.execute(
+                f"INSERT OR REPLACE INTO {event.table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                tuple(row.values()),
+            )
+
+    def _advance(self) -> None:
+        """
+        Move the cursor over the backfill chunks written right after it.
+        """
+        cursor = self.cursor
+        for start, end in self.db.execute("SELECT start_block, end_block FROM backfill ORDER BY start_block").fetchall():
+            if start != cursor:
+                break
+            cursor = end + 1
+            self.db.execute("DELETE FROM backfill WHERE start_block = ?", (start,))
+        self.db.execute("UPDATE cursor SET next_block = ?", (cursor,))
+
+    def _rollback(self) -> None:
+        """
+        Delete the rows of the blocks after the last indexed block still on the chain.
+        """
+        stored = self.db.execute("SELECT number, hash FROM blocks ORDER BY number DESC").fetchall()
+        if not stored:
+            return
+        hashes = self._block_hashes([number for number, _ in stored])
+        if stored[0][1] == hashes[0]:
+            return
+
+        # blocks under the oldest stored one are out of reorg reach
+        ancestor = stored[-1][0] - 1
+        for (number, block_hash), chain_hash in zip(stored, hashes):
+            if block_hash == chain_hash:
+                ancestor = number
+                break
+        with self.db:
+            for table in self.tables:
+                self.db.execute(f"DELETE FROM {table} WHERE block_number > ?", (ancestor,))
+            self.db.execute("DELETE FROM blocks WHERE number > ?", (ancestor,))
+            self.db.execute("UPDATE cursor SET next_block = ?", (ancestor + 1,))
+
+    def _logs(self, start: int, end: int) -> list[dict]:
+        """
+        Logs of the contracts from start to end, in ranges halved while the endpoint refuses them and doubled after.
+        """
+        logs = []
+        while start <= end:
+            # the range is shared by the backfill workers
+            with self._lock:
+                size = self._range
+            stop = min(end, start + size - 1)
+            try:
+                logs += self._request(
+                    "eth_getLogs", [{"address": self.addresses, "fromBlock": hex(start), "toBlock": hex(stop)}]
+                )
+            except IndexerError:
+                # too many logs or too many blocks, the limits and messages differ between endpoints
+                if stop == start:
+                    raise
+                with self._lock:
+                    self._range = max(1, (stop - start + 1) // 2)
+                continue
+            start = stop + 1
+            with self._lock:
+                self._range = min(self.max_range, max(self._range, size * 2))
+        return logs
+
+    def _block_number(self) -> int:
+        return int(self._request("eth_blockNumber", []), 16)
+
+    def _block_hashes(self, numbers: Sequence[int]) -> list[str | None]:
+        """
+        Hashes of blocks in one batch request, None for blocks past the head.
+        """
+        blocks = self._batch([("eth_getBlockByNumber", [hex(number), False]) for number in numbers])
+        return [block["hash"] if block else None for block in blocks]
+
+    def _request(self, method: str, params: list) -> Any:
+        (result,) = self._batch([(method, params)])
+        return result
+
+    def _batch(self, requests: Sequence[tuple[str, list]]) -> list:
+        with self._lock:
+            ids = [next(self._ids) for _ in requests]
+            self.requests += 1
+        payloads = [
+            {"jsonrpc": "2.0", "id": id_, "method": method, "params": params}
+            for id_, (method, params) in zip(ids, requests)
+        ]
+        responses = {response.get("id"): response for response in self.transport(payloads)}
+        results = []
+        for id_ in ids:
+            response = responses.get(id_)
+            if response is None or "error" in response:
+                error = response["error"].get("message", "") if response else "no response"
+                raise IndexerError(f"event_indexer: {error}")
+            results.append(response["result"])
+        return results
+
+
+# offset of stored integers, so that int256 values are not negative
+INT_OFFSET = 2**255
+# hex digits of stored integers, enough for uint256 values after the offset
+INT_DIGITS = 65
+
+# SQLite type of each column kind
+_COLUMN_TYPES = {
+    "index": "INTEGER",
+    "int": "TEXT",
+    "bool": "INTEGER",
+    "address": "TEXT",
+    "json": "TEXT",
+    "bytes": "TEXT",
+    "text": "TEXT",
+    "hash": "TEXT",
+}
+
+
+def _kind(param: Mapping, is_indexed: bool) -> str:
+    """
+    Column kind of an event argument.
+    """
+    abi_type = param["type"]
+    dynamic = abi_type in ("string", "bytes") or abi_type.endswith("]") or abi_type == "tuple"
+    if is_indexed and dynamic:
+        return "hash"
+    if abi_type.endswith("]") or abi_type == "tuple":
+        return "json"
+    if abi_type.startswith(("uint", "int")):
+        return "int"
+    if abi_type.startswith("bytes"):
+        return "bytes"
+    if abi_type == "string":
+        return "text"
+    return abi_type
+
+
+def _to_column(kind: str, value: Any) -> Any:
+    """
+    Column value of an argument value. Integers are stored as fixed width hex of value + INT_OFFSET,
+    zero padded, so that text comparisons and ORDER BY sort them as numbers, signed ones included.
+    """
+    if kind == "int":
+        return f"{value + INT_OFFSET:0{INT_DIGITS}x}"
+    if kind == "bool":
+        return int(value)
+    if kind == "json":
+        return json.dumps(value)
+    if kind == "bytes":
+        return "0x" + value.hex()
+    if kind == "address":
+        return to_checksum_address(value)
+    return value
+
+
+def _from_column(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind == "int":
+        return int(value, 16) - INT_OFFSET
+    if kind == "bool":
+        return bool(value)
+    if kind == "json":
+        return json.loads(value)
+    return value
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
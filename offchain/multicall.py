@@ -0,0 +1,371 @@
+"""
+Multicall3 reader of contract views over JSON-RPC.
+Packs view calls of adapters, pools, gauges and tokens into aggregate3 eth_calls sized by calldata and gas,
+sends all of them in one JSON-RPC batch request and decodes the results with decoders built once per function.
+Calls that revert or return undecodable data fail alone.
+"""
+
+import json
+import urllib.request
+from collections import namedtuple
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import boa
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
+from eth_abi.encoding import TupleEncoder
+from eth_abi.exceptions import DecodingError
+from eth_abi.registry import registry
+from eth_utils import collapse_if_tuple, function_signature_to_4byte_selector, to_checksum_address
+
+# Multicall3 address, the same on every chain it is deployed on
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# limits of one aggregate3 eth_call, under the eth_call gas cap of geth (50M) and anvil (block gas limit)
+MAX_BATCH_GAS = 25_000_000
+MAX_BATCH_CALLDATA = 128 * 1024
+# gas budget of a call that does not set one
+CALL_GAS = 100_000
+# gas aggregate3 spends around each call
+CALL_GAS_OVERHEAD = 5_000
+# bytes of each call in the aggregate3 calldata besides its padded calldata:
+# offset, target, allowFailure, calldata offset and length
+CALL_CALLDATA_OVERHEAD = 5 * 32
+# seconds to wait for the JSON-RPC endpoint
+TIMEOUT = 30
+
+# max pools of one lens get_pools and get_pool_states call
+POOLS_PAGE_CAP = 100
+POOL_STATES_CAP = 32
+# gas budgets of the adapter registry views
+POOLS_PAGE_GAS = 4_000_000
+POOL_STATE_GAS = 250_000
+
+# sends a JSON-RPC batch request and returns its responses
+Transport = Callable[[list[dict]], list[dict]]
+
+
+class MulticallError(Exception):
+    """
+    Raised when the endpoint fails a request or a call the reader needs fails.
+    """
+
+
+@dataclass(frozen=True)
+class Function:
+    """
+    Function of an ABI with its encoder and decoder, built once.
+    Struct outputs are decoded to namedtuples, arrays to lists and addresses checksummed, like boa does.
+    """
+
+    name: str
+    selector: bytes
+    input_types: tuple[str, ...]
+    output_types: tuple[str, ...]
+    _encoder: Callable = field(repr=False, compare=False)
+    _decoder: Callable = field(repr=False, compare=False)
+    _shapers: tuple = field(repr=False, compare=False)
+
+    @classmethod
+    def from_abi(cls, entry: Mapping) -> "Function":
+        input_types = tuple(collapse_if_tuple(param) for param in entry["inputs"])
+        output_types = tuple(collapse_if_tuple(param) for param in entry["outputs"])
+        return cls(
+            name=entry["name"],
+            selector=function_signature_to_4byte_selector(f"{entry['name']}({','.join(input_types)})"),
+            input_types=input_types,
+            output_types=output_types,
+            _encoder=TupleEncoder(encoders=tuple(registry.get_encoder(t) for t in input_types)),
+            _decoder=_tuple_decoder(output_types),
+            _shapers=tuple(_shaper(param) for param in entry["outputs"]),
+        )
+
+    def encode(self, args: Sequence) -> bytes:
+        """
+        Calldata of a call with args.
+        """
+        return self.selector + self._encoder(tuple(args))
+
+    def decode(self, data: bytes) -> Any:
+        """
+        Outputs of a call from its return data, the output itself for functions with one output.
+        """
+        values = self._decoder(ContextFramesBytesIO(data))
+        values = tuple(shape(value) if shape else value for shape, value in zip(self._shapers, values))
+        return values[0] if len(values) == 1 else values
+
+
+@dataclass(frozen=True)
+class Call:
+    """
+    View call of a batch.
+    gas: gas budget of the call, used to size the batches
+    """
+
+    target: str
+    function: Function
+    args: tuple = ()
+    gas: int = CALL_GAS
+
+
+@dataclass(frozen=True)
+class Result:
+    """
+    Result of a call.
+    value: decoded outputs, None if the call failed
+    data: return data, revert data if the call reverted
+    """
+
+    success: bool
+    value: Any = None
+    data: bytes = b""
+
+
+def _shaper(param: Mapping) -> Callable | None:
+    """
+    Converts a decoded output to the namedtuples, lists and checksummed addresses of its ABI type,
+    None if it is kept as decoded.
+    """
+    abi_type = param["type"]
+    if abi_type.endswith("]"):
+        inner = _shaper({**param, "type": abi_type[: abi_type.rindex("[")]})
+        if inner is None:
+            return list
+        return lambda values: [inner(value) for value in values]
+
+    if abi_type == "tuple":
+        name = param.get("internalType", "").removeprefix("struct ").split(".")[-1] or "Struct"
+        struct = namedtuple(name, [component["name"] for component in param["components"]])
+        shapers = [_shaper(component) for component in param["components"]]
+        return lambda values: struct(*(shape(value) if shape else value for shape, value in zip(shapers, values)))
+
+    # eth_abi decodes addresses lowercase
+    if abi_type == "address":
+        return to_checksum_address
+
+    return None
+
+
+def _tuple_decoder(types: Sequence[str]) -> TupleDecoder:
+    """
+    Decoder of the values of types, as a tuple.
+    """
+    return TupleDecoder(decoders=tuple(registry.get_decoder(abi_type) for abi_type in types))
+
+
+def functions(abi: Sequence[Mapping]) -> dict[str, Function]:
+    """
+    Functions of an ABI by signature, and by name for the overload with the fewest inputs.
+    """
+    functions: dict[str, Function] = {}
+    entries = [entry for entry in abi if entry.get("type") == "function"]
+    entries.sort(key=lambda entry: len(entry["inputs"]))
+    for entry in entries:
+        function = Function.from_abi(entry)
+        functions[f"{function.name}({','.join(function.input_types)})"] = function
+        functions.setdefault(function.name, function)
+    return functions
+
+
+def load_abi(path: str | Path) -> dict[str, Function]:
+    """
+    Functions of an ABI file, e.g. abis/three_pool_contract.json.
+    """
+    return functions(json.loads(Path(path).read_text()))
+
+
+AGGREGATE3 = Function.from_abi(
+    {
+        "name": "aggregate3",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [{"name": "success", "type": "bool"}, {"name": "returnData", "type": "bytes"}],
+            }
+        ],
+    }
+)
+GET_BLOCK_NUMBER = Function.from_abi(
+    {"name": "getBlockNumber", "inputs": [], "outputs": [{"name": "blockNumber", "type": "uint256"}]}
+)
+
+
+def http_transport(url: str, timeout: float = TIMEOUT) -> Transport:
+    """
+    Transport posting JSON-RPC batch requests to an HTTP endpoint, e.g. a local anvil.
+    """
+
+    def send(payloads: list[dict]) -> list[dict]:
+        request = urllib.request.Request(
+            url, data=json.dumps(payloads).encode(), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+
+    return send
+
+
+def boa_transport(payloads: list[dict]) -> list[dict]:
+    """
+    Transport running eth_calls on the boa env, at its current block whatever the block tag.
+    """
+    responses = []
+    for payload in payloads:
+        call, _ = payload["params"]
+        with boa.env.anchor():
+            computation = boa.env.execute_code(to_address=call["to"], data=bytes.fromhex(call["data"][2:]))
+        if computation.is_error:
+            error = {"code": 3, "message": "execution reverted"}
+            responses.append({"jsonrpc": "2.0", "id": payload["id"], "error": error})
+        else:
+            responses.append({"jsonrpc": "2.0", "id": payload["id"], "result": "0x" + computation.output.hex()})
+    return responses
+
+
+class MulticallReader:
+    """
+    Reads view calls through a Multicall3 contract.
+    transport: JSON-RPC endpoint URL or transport, see http_transport and boa_transport
+    requests: number of JSON-RPC requests sent, each with all the batches of one read
+    """
+
+    def __init__(
+        self,
+        transport: str | Transport,
+        multicall: str = MULTICALL3,
+        max_gas: int = MAX_BATCH_GAS,
+        max_calldata: int = MAX_BATCH_CALLDATA,
+    ):
+        self.transport = http_transport(transport) if isinstance(transport, str) else transport
+        self.multicall = multicall
+        self.max_gas = max_gas
+        self.max_calldata = max_calldata
+        self.requests = 0
+
+    def read(self, calls: Sequence[Call], block: int | str = "latest") -> list[Result]:
+        """
+        Results of calls at block, in the same order.
+        Raises MulticallError if the endpoint fails a batch.
+        """
+        batches = self.batches(calls)
+        if not batches:
+            return []
+
+        tag = hex(block) if isinstance(block, int) else block
+        payloads = [
+            {
+                "jsonrpc": "2.0",
+                "id": k,
+                "method": "eth_call",
+                "params": [{"to": self.multicall, "data": "0x" + self._aggregate3(batch).hex()}, tag],
+            }
+            for k, batch in enumerate(batches)
+        ]
+        self.requests += 1
+        # endpoints may answer a batch request in any order
+        responses = {response.get("id"): response for response in self.transport(payloads)}
+
+        results = []
+        for k, batch in enumerate(batches):
+            response = responses.get(k, {"error": {"message": "no response"}})
+            if "error" in response:
+                raise MulticallError(f"multicall: batch {k} failed: {response['error'].get('message')}")
+            returned = AGGREGATE3.decode(bytes.fromhex(response["result"][2:]))
+            results += [_result(call, success, data) for (call, _), (success, data) in zip(batch, returned)]
+        return results
+
+    def batches(self, calls: Sequence[Call]) -> list[list[tuple[Call, bytes]]]:
+        """
+        Calls with their calldata, split in batches within max_gas and max_calldata.
+        A call over the limits alone is a batch of its own.
+        """
+        batches: list[list[tuple[Call, bytes]]] = []
+        batch: list[tuple[Call, bytes]] = []
+        gas = size = 0
+        for call in calls:
+            calldata = call.function.encode(call.args)
+            call_gas = call.gas + CALL_GAS_OVERHEAD
+            call_size = CALL_CALLDATA_OVERHEAD + -(-len(calldata) // 32) * 32
+            if batch and (gas + call_gas > self.max_gas or size + call_size > self.max_calldata):
+                batches.append(batch)
+                batch, gas, size = [], 0, 0
+            batch.append((call, calldata))
+            gas += call_gas
+            size += call_size
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _aggregate3(self, batch: list[tuple[Call, bytes]]) -> bytes:
+        return AGGREGATE3.encode([[(call.target, True, calldata) for call, calldata in batch]])
+
+
+def read_registry(
+    reader: MulticallReader, lens: str, lens_functions: Mapping[str, Function]
+) -> tuple[int, list, list]:
+    """
+    Block number, pools and get_pool_states snapshots of all the pools registered in a stableswap or cryptoswap adapter,
+    read through its lens at the same block in two requests, three if the registry has more than POOLS_PAGE_CAP pools.
+    lens_functions are the functions of the lens ABI, see functions.
+    """
+    get_pools = lens_functions["get_pools"]
+    results = reader.read(
+        [
+            Call(reader.multicall, GET_BLOCK_NUMBER),
+            Call(lens, lens_functions["get_pools_count"]),
+            Call(lens, get_pools, (0, POOLS_PAGE_CAP), gas=POOLS_PAGE_GAS),
+        ]
+    )
+    block, count, (pools, _) = [_value(result) for result in results]
+
+    if count > len(pools):
+        pages = [
+            Call(lens, get_pools, (offset, POOLS_PAGE_CAP), gas=POOLS_PAGE_GAS)
+            for offset in range(len(pools), count, POOLS_PAGE_CAP)
+        ]
+        for result in reader.read(pages, block):
+            pools += _value(result)[0]
+
+    get_pool_states = lens_functions["get_pool_states"]
+    chunks = [
+        Call(
+            lens,
+            get_pool_states,
+            ([pool.contract for pool in pools[start : start + POOL_STATES_CAP]],),
+            gas=POOL_STATE_GAS * POOL_STATES_CAP,
+        )
+        for start in range(0, len(pools), POOL_STATES_CAP)
+    ]
+    states = [state for result in reader.read(chunks, block) for state in _value(result)]
+    return block, pools, states
+
+
+def _result(call: Call, success: bool, data: bytes) -> Result:
+    if not success:
+        return Result(success=False, data=data)
+    try:
+        return Result(success=True, value=call.function.decode(data), data=data)
+    except DecodingError:
+        # e.g. no return data from a target without code
+        return Result(success=False, data=data)
+
+
+def _value(result: Result) -> Any:
+    if not result.success:
+        raise MulticallError("multicall: registry call failed")
+    return result.value
+
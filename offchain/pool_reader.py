@@ -0,0 +1,202 @@
+"""
+Reads the states of the pools registered in an adapter with boa, as a fetch of state_mirror.
+Snapshots come from the get_pool_states of the adapter lens in batches, the few parameters the lens
+does not return are read from the pools themselves.
+"""
+
+import json
+from collections.abc import Sequence
+
+import boa
+from boa import BoaError
+
+from offchain import cryptoswap_math, stableswap_math
+from offchain.cryptoswap_math import CryptoSwapState
+from offchain.state_mirror import Block, MirroredPool
+from offchain.stableswap_math import StableSwapState
+
+# max pools of one lens get_pool_states and get_pools call
+POOL_STATES_CAP = 32
+POOLS_PAGE_CAP = 100
+# pool_type of stableswap metapools
+META_TYPE = 2
+# A_PRECISION of the pools with A_precise()
+A_PRECISION = 100
+# coin address the pools use for native ether
+ETH = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
+ETH_DECIMALS = 18
+
+
+def _view(name: str, inputs: Sequence[str] = (), output: str = "uint256") -> dict:
+    return {
+        "name": name,
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": f"arg{k}", "type": t} for k, t in enumerate(inputs)],
+        "outputs": [{"name": "", "type": output}],
+    }
+
+
+ERC20_ABI = json.dumps([_view("decimals")])
+STABLESWAP_POOL_ABI = json.dumps(
+    [
+        _view("admin_fee"),
+        _view("A_precise"),
+        _view("future_A_time"),
+        _view("base_pool", output="address"),
+        _view("base_virtual_price"),
+        _view("base_cache_updated"),
+        _view("get_virtual_price"),
+        _view("offpeg_fee_multiplier"),
+        _view("stored_rates", output="uint256[]"),
+    ]
+)
+# lending pools take the coin index of underlying_coins as uint256 or int128 depending on the template
+LENDING_POOL_ABIS = [json.dumps([_view("underlying_coins", [index], "address")]) for index in ("uint256", "int128")]
+CRYPTOSWAP_POOL_ABI = json.dumps(
+    [
+        _view("mid_fee"),
+        _view("out_fee"),
+        _view("fee_gamma"),
+        _view("future_A_gamma_time"),
+        _view("MATH", output="address"),
+    ]
+)
+
+
+class PoolReader:
+    """
+    Fetch of the states of pools registered in a stableswap or cryptoswap adapter, read through its lens.
+    boa reads the state of its current block, the block given is only used for its timestamp.
+    """
+
+    def __init__(self, lens, cryptoswap: bool = False):
+        self.lens = lens
+        self.cryptoswap = cryptoswap
+        self._erc20 = boa.loads_abi(ERC20_ABI, name="ERC20")
+        self._pool = boa.loads_abi(CRYPTOSWAP_POOL_ABI if cryptoswap else STABLESWAP_POOL_ABI, name="Pool")
+        self._lending_pools = [boa.loads_abi(abi, name="LendingPool") for abi in LENDING_POOL_ABIS]
+        # coin decimals never change
+        self._decimals: dict[str, int] = {}
+
+    def registered_pools(self) -> list[str]:
+        """
+        Addresses of all the pools registered in the adapter, page by page.
+        """
+        pools: list[str] = []
+        while len(pools) < self.lens.get_pools_count():
+            page, _ = self.lens.get_pools(len(pools), POOLS_PAGE_CAP)
+            pools += [str(pool.contract) for pool in page]
+        return pools
+
+    def __call__(self, pools: Sequence[str], block: Block) -> dict[str, MirroredPool]:
+        """
+        States of pools, registered in the adapter.
+        """
+        states = {}
+        for start in range(0, len(pools), POOL_STATES_CAP):
+            for state in self.lens.get_pool_states(list(pools[start : start + POOL_STATES_CAP])):
+                read = self._cryptoswap_pool if self.cryptoswap else self._stableswap_pool
+                states[str(state.pool)] = read(state, block)
+        return states
+
+    def _stableswap_pool(self, state, block: Block) -> MirroredPool:
+        pool = self._pool.at(state.pool)
+        n_coins = state.n_coins
+        plain_rates = [10 ** (36 - self._coin_decimals(coin)) for coin in state.coins[:n_coins]]
+        base_pool = str(pool.base_pool()) if state.pool_type == META_TYPE else None
+        # coins of the pool itself, the last coin of a metapool is the base pool lp coin
+        pool_coins = n_coins - (base_pool is not None)
+
+        # stableswap-ng pools store the rates of their oracle, ERC4626 and base pool lp coins
+        try:
+            rates = list(pool.stored_rates())
+            dynamic_rates = rates[:pool_coins] != plain_rates[:pool_coins]
+        except BoaError:
+            rates = plain_rates
+            if base_pool is not None:
+                rates[-1] = stableswap_math.metapool_vp_rate(
+                    pool.base_virtual_price(),
+                    pool.base_cache_updated(),
+                    self._pool.at(base_pool).get_virtual_price(),
+                    block.timestamp,
+                )
+            dynamic_rates = base_pool is None and self._is_lending_pool(state.pool, state.coins[0])
+
+        # the 3pool template has no A_precise and charges the get_dy fee after rates
+        try:
+            amp, a_precision, fee_after_rates = pool.A_precise(), A_PRECISION, False
+        except BoaError:
+            amp, a_precision, fee_after_rates = state.A, 1, True
+
+        # the fees of stableswap-ng and aave pools grow with the imbalance of the pool
+        try:
+            offpeg_fee_multiplier = pool.offpeg_fee_multiplier()
+        except BoaError:
+            offpeg_fee_multiplier = 0
+
+        return MirroredPool(
+            state=StableSwapState(
+                balances=tuple(state.balances[:n_coins]),
+                rates=tuple(rates),
+                amp=amp,
+                fee=state.fee,
+                total_supply=state.lp_total_supply,
+                a_precision=a_precision,
+                fee_after_rates=fee_after_rates,
+                offpeg_fee_multiplier=offpeg_fee_multiplier,
+            ),
+            admin_fee=pool.admin_fee(),
+            exact=base_pool is None and not dynamic_rates and offpeg_fee_multiplier == 0,
+            base_pool=base_pool,
+            ramp_end=pool.future_A_time(),
+            dynamic_rates=dynamic_rates,
+        )
+
+    def _cryptoswap_pool(self, state, block: Block) -> MirroredPool:
+        pool = self._pool.at(state.pool)
+        n_coins = state.n_coins
+        future_A_gamma_time = pool.future_A_gamma_time()
+        # tricrypto-ng and twocrypto-ng pools do their math in a MATH contract
+        try:
+            pool.MATH()
+            is_ng = True
+        except BoaError:
+            is_ng = False
+
+        return MirroredPool(
+            state=CryptoSwapState(
+                balances=tuple(state.balances[:n_coins]),
+                precisions=cryptoswap_math.precisions_from_decimals(
+                    [self._coin_decimals(coin) for coin in state.coins[:n_coins]]
+                ),
+                price_scale=tuple(state.price_scale[: n_coins - 1]),
+                D=state.D,
+                A=state.A,
+                gamma=state.gamma,
+                mid_fee=pool.mid_fee(),
+                out_fee=pool.out_fee(),
+                fee_gamma=pool.fee_gamma(),
+                total_supply=state.lp_total_supply,
+                future_A_gamma_time=future_A_gamma_time,
+                is_ng=is_ng,
+            ),
+            ramp_end=future_A_gamma_time,
+        )
+
+    def _is_lending_pool(self, pool: str, coin: str) -> bool:
+        """
+        Whether the pool holds interest bearing coins of underlying coins, whose rates grow every block.
+        """
+        for lending_pool in self._lending_pools:
+            try:
+                return str(lending_pool.at(pool).underlying_coins(0)) != str(coin)
+            except BoaError:
+                continue
+        return False
+
+    def _coin_decimals(self, coin: str) -> int:
+        coin = str(coin)
+        if coin not in self._decimals:
+            self._decimals[coin] = ETH_DECIMALS if coin == ETH else self._erc20.at(coin).decimals()
+        return self._decimals[coin]
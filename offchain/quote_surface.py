@@ -0,0 +1,314 @@
+"""
+Vectorized float64 quotes of stableswap and cryptoswap pools for scenario analysis.
+Solves the pool invariants across NumPy arrays of pools and sizes at once, and decides points
+closer to a decision than the float error with the exact integer engines.
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+
+from offchain import cryptoswap_math, stableswap_math
+from offchain.cryptoswap_math import CryptoSwapState
+from offchain.stableswap_math import StableSwapState
+
+PoolState = StableSwapState | CryptoSwapState
+
+# precision of rates and prices
+PRECISION = 10**18
+# denominator of the pool fees
+FEE_DENOMINATOR = 10**10
+# normalized balances are solved in coins instead of 10**18 units
+UNIT = 1e18
+# max error of float quotes relative to the balance of the coin out.
+# Points closer than error_bound to a decision are decided with the exact integer engines
+FLOAT_ERROR = 1e-11
+# max number of float Newton iterations
+MAX_ITERATIONS = 64
+# float Newton iterations stop when their step is this small relative to y,
+# a few float64 roundings
+CONVERGENCE = 1e-14
+
+
+def get_dy(
+    states: Sequence[PoolState],
+    i: int | Sequence[int],
+    j: int | Sequence[int],
+    dx: np.ndarray,
+) -> np.ndarray:
+    """
+    Float quotes of coin j for dx of coin i in each pool, in coin units.
+    i and j are one index for all pools or one per pool, dx is one row of sizes for all pools
+    or one row per pool. Returns an array of shape (pools, sizes), 0 where the quote fails.
+    """
+    i, j, dx = _broadcast(states, i, j, dx)
+    dy = np.zeros(dx.shape)
+
+    groups: dict[tuple[type, int], list[int]] = {}
+    for k, state in enumerate(states):
+        groups.setdefault((type(state), len(state.balances)), []).append(k)
+    for (kind, _), rows in groups.items():
+        solve = _stableswap_get_dy if kind is StableSwapState else _cryptoswap_get_dy
+        dy[rows] = solve([states[k] for k in rows], i[rows], j[rows], dx[rows])
+
+    return dy
+
+
+def exact_get_dy(state: PoolState, i: int, j: int, dx: int) -> int:
+    """
+    Exact integer quote of coin j for dx of coin i, 0 where the pool reverts.
+    """
+    engine = stableswap_math if isinstance(state, StableSwapState) else cryptoswap_math
+    try:
+        return max(engine.get_dy(state, i, j, dx), 0)
+    except (ArithmeticError, ValueError):
+        return 0
+
+
+def error_bound(states: Sequence[PoolState], j: int | Sequence[int]) -> np.ndarray:
+    """
+    Max error of the float quotes of coin j of each pool in coin units, of shape (pools, 1).
+    """
+    j = np.broadcast_to(np.asarray(j), (len(states),))
+    balances = np.array([float(state.balances[k]) for state, k in zip(states, j)])
+    # cryptoswap pools truncate their dynamic fee to a whole fee unit
+    fee_rounding = np.array([float(isinstance(state, CryptoSwapState)) for state in states]) / FEE_DENOMINATOR
+    # integer quotes round down by up to one unit
+    return ((FLOAT_ERROR + fee_rounding) * balances + 2)[:, None]
+
+
+def best_pool(
+    states: Sequence[PoolState],
+    i: int | Sequence[int],
+    j: int | Sequence[int],
+    dx: np.ndarray,
+) -> np.ndarray:
+    """
+    Index of the pool quoting the most coin j for each size, the first one on ties.
+    Sizes where another pool quotes within the float error of the best one are decided exactly.
+    """
+    i, j, dx = _broadcast(states, i, j, dx)
+    dy = get_dy(states, i, j, dx)
+    bound = error_bound(states, j)
+
+    sizes = np.arange(dx.shape[1])
+    best = np.argmax(dy, axis=0)
+    contenders = dy + bound >= (dy - bound)[best, sizes]
+    for s in np.flatnonzero(contenders.sum(axis=0) > 1):
+        rows = np.flatnonzero(contenders[:, s])
+        exact = [exact_get_dy(states[k], i[k], j[k], int(dx[k, s])) for k in rows]
+        best[s] = rows[exact.index(max(exact))]
+
+    return best
+
+
+def meets_min_dy(
+    states: Sequence[PoolState],
+    i: int | Sequence[int],
+    j: int | Sequence[int],
+    dx: np.ndarray,
+    min_dy: int | float | np.ndarray,
+) -> np.ndarray:
+    """
+    Whether each pool quotes at least min_dy of coin j for each size, of shape (pools, sizes).
+    Points quoted within the float error of min_dy are decided exactly,
+    against integer min_dy when given as Python ints.
+    """
+    i, j, dx = _broadcast(states, i, j, dx)
+    dy = get_dy(states, i, j, dx)
+    # integer min_dy are kept for the exact decisions
+    min_dy = np.broadcast_to(np.asarray(min_dy), dy.shape)
+    float_min_dy = min_dy.astype(np.float64)
+
+    meets = dy >= float_min_dy
+    for k, s in zip(*np.nonzero(np.abs(dy - float_min_dy) <= error_bound(states, j))):
+        meets[k, s] = exact_get_dy(states[k], i[k], j[k], int(dx[k, s])) >= min_dy[k, s]
+
+    return meets
+
+
+def max_error(
+    adapter,
+    pools: Sequence[str],
+    states: Sequence[PoolState],
+    i: int | Sequence[int],
+    j: int | Sequence[int],
+    dx: np.ndarray,
+) -> float:
+    """
+    Max observed error of the float quotes against adapter get_exchange_amount_out,
+    relative to error_bound: quotes are within the bound while it is at most 1.
+    adapter is a stableswap or cryptoswap adapter the pools are registered in, with states fetched
+    at the same block.
+    """
+    i, j, dx = _broadcast(states, i, j, dx)
+    dy = get_dy(states, i, j, dx)
+    bound = error_bound(states, j)
+
+    error = 0.0
+    for k, pool in enumerate(pools):
+        for s in range(dx.shape[1]):
+            amount_out = adapter.get_exchange_amount_out(pool, int(i[k]), int(j[k]), int(dx[k, s]))
+            error = max(error, abs(dy[k, s] - amount_out) / bound[k, 0])
+
+    return error
+
+
+def _broadcast(
+    states: Sequence[PoolState],
+    i: int | Sequence[int],
+    j: int | Sequence[int],
+    dx: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Indexes as one per pool and sizes as one row per pool.
+    """
+    n_pools = len(states)
+    dx = np.asarray(dx, dtype=np.float64)
+    return (
+        np.broadcast_to(np.asarray(i), (n_pools,)),
+        np.broadcast_to(np.asarray(j), (n_pools,)),
+        np.broadcast_to(dx, (n_pools, dx.shape[-1])),
+    )
+
+
+def _stableswap_get_dy(
+    states: list[StableSwapState], i: np.ndarray, j: np.ndarray, dx: np.ndarray
+) -> np.ndarray:
+    """
+    get_dy of stableswap pools with the same number of coins, see stableswap_math.get_dy.
+    """
+    n_coins = len(states[0].balances)
+    rows = np.arange(len(states))
+    rates = np.array([[float(r) for r in state.rates] for state in states])
+    xp = np.array([[float(b) for b in state.balances] for state in states]) * rates / PRECISION / UNIT
+    amp = np.array([float(state.amp) for state in states])[:, None]
+    a_precision = np.array([float(state.a_precision) for state in states])[:, None]
+    fee = np.array([float(state.fee) for state in states])[:, None]
+    # D does not depend on the sizes, it is solved exactly once per pool
+    D = np.array(
+        [
+            float(stableswap_math.get_D(stableswap_math._xp(state.balances, state.rates), state.amp, state.a_precision))
+            for state in states
+        ]
+    )[:, None] / UNIT
+    Ann = amp * n_coins
+
+    # only the balance of coin i depends on the size, the other coins but j fold into constants
+    rest = (np.arange(n_coins) != i[:, None]) & (np.arange(n_coins) != j[:, None])
+    x_i = xp[rows, i][:, None] + dx * (rates[rows, i][:, None] / PRECISION / UNIT)
+    with np.errstate(all="ignore"):
+        c_rest = D * np.prod(np.where(rest, D / (xp * n_coins), 1.0), axis=-1, keepdims=True)
+        c = c_rest * D / (x_i * n_coins) * D * a_precision / (Ann * n_coins)
+    b_minus_D = np.sum(np.where(rest, xp, 0.0), axis=-1, keepdims=True) + x_i + D * a_precision / Ann - D
+
+    y = np.broadcast_to(D, dx.shape)
+    with np.errstate(all="ignore"):
+        for _ in range(MAX_ITERATIONS):
+            y_prev = y
+            y = (y * y + c) / (2 * y + b_minus_D)
+            if np.all(np.abs(y - y_prev) <= CONVERGENCE * y):
+                break
+
+        dy = (xp[rows, j][:, None] - y) * UNIT * PRECISION / rates[rows, j][:, None]
+        dy = dy - fee * dy / FEE_DENOMINATOR
+
+    return np.where(np.isfinite(dy) & (dy > 0), dy, 0.0)
+
+
+def _cryptoswap_get_dy(
+    states: list[CryptoSwapState], i: np.ndarray, j: np.ndarray, dx: np.ndarray
+) -> np.ndarray:
+    """
+    get_dy of cryptoswap pools with the same number of coins, see cryptoswap_math.get_dy.
+    """
+    n_coins = len(states[0].balances)
+    rows = np.arange(len(states))
+    # price of each coin in normalized units of the first coin, like cryptoswap_math._price_scale_i
+    prices = np.array(
+        [
+            [float(cryptoswap_math._price_scale_i(state, k)) for k in range(n_coins)]
+            for state in states
+        ]
+    )
+    xp = np.array([[float(b) for b in state.balances] for state in states]) * prices / PRECISION / UNIT
+    D = np.array([float(cryptoswap_math._get_D(state)) for state in states])[:, None] / UNIT
+    # A() is A * N**N * A_MULTIPLIER
+    A = np.array([float(state.A) for state in states])[:, None] / cryptoswap_math.A_MULTIPLIER
+    gamma = np.array([float(state.gamma) for state in states])[:, None] / UNIT
+    mid_fee = np.array([float(state.mid_fee) for state in states])[:, None]
+    out_fee = np.array([float(state.out_fee) for state in states])[:, None]
+    fee_gamma = np.array([float(state.fee_gamma) for state in states])[:, None] / UNIT
+
+    # only the balance of coin i depends on the size, the other coins but j fold into constants
+    rest = (np.arange(n_coins) != i[:, None]) & (np.arange(n_coins) != j[:, None])
+    x_i = xp[rows, i][:, None] + dx * (prices[rows, i][:, None] / PRECISION / UNIT)
+    S_rest = np.sum(np.where(rest, xp, 0.0), axis=-1, keepdims=True)
+    X_rest = np.prod(np.where(rest, xp * n_coins, 1.0), axis=-1, keepdims=True)
+
+    # initial values of newton_y
+    S_i = S_rest + x_i
+    K0_i = X_rest / D ** (n_coins - 2) * x_i * n_coins / D
+    # at small gamma the invariant has a near triple root, and Newton from the constant product
+    # y = D / N / K0_i converges linearly. In t = K0 - 1 it is a cubic whose real root above -1
+    # starts Newton next to y instead
+    y_product = D / n_coins / K0_i
+    with np.errstate(all="ignore"):
+        scale = gamma * gamma * A / D
+        q2 = y_product * scale
+        q1 = (S_i - D) * scale
+        t = _cubic_root(q2 - 2 * gamma, gamma * gamma + 2 * q2 + q1, q2 + q1)
+        y = (1 + t) * y_product
+    y = np.where(np.isfinite(y) & (y > 0), y, y_product)
+
+    with np.errstate(all="ignore"):
+        for _ in range(MAX_ITERATIONS):
+            y_prev = y
+            K0 = K0_i * y * n_coins / D
+            S = S_i + y
+            _g1k0 = np.abs(gamma + 1 - K0)
+            # D / (A * N**N) * _g1k0**2 / gamma**2
+            mul1 = D * (_g1k0 / gamma) ** 2 / A
+            # 2*K0 / _g1k0
+            mul2 = 1 + 2 * K0 / _g1k0
+
+            yfprime = y + S * mul2 + mul1 - D * mul2
+            fprime = yfprime / y
+            y_minus = mul1 / fprime
+            y_plus = (yfprime + D) / fprime + y_minus / K0
+            y_minus = y_minus + S / fprime
+            y = np.where((yfprime < 0) | (y_plus < y_minus), y_prev / 2, y_plus - y_minus)
+            if np.all(np.abs(y - y_prev) <= CONVERGENCE * y):
+                break
+
+        # dynamic fee of the balances after the swap
+        S = S_i + y
+        K = X_rest / S ** (n_coins - 2) * (x_i * n_coins / S) * (y * n_coins / S)
+        f = fee_gamma / (fee_gamma + 1 - K)
+        fee = mid_fee * f + out_fee * (1 - f)
+
+        dy = (xp[rows, j][:, None] - y) * UNIT * PRECISION / prices[rows, j][:, None]
+        dy = dy - fee * dy / FEE_DENOMINATOR
+        # the pools revert when y leaves the safe range of newton_y
+        safe = (y / D >= 1e-2) & (y / D <= 1e2)
+
+    return np.where(np.isfinite(dy) & (dy > 0) & safe, dy, 0.0)
+
+
+def _cubic_root(b: np.ndarray, c: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """
+    Largest real root of t**3 + b*t**2 + c*t + e by Cardano's formula.
+    """
+    p = c - b * b / 3
+    q = 2 * b * b * b / 27 - b * c / 3 + e
+    delta = q * q / 4 + p * p * p / 27
+
+    # one real root
+    w = -q / 2
+    u = np.cbrt(w + np.copysign(np.sqrt(np.maximum(delta, 0.0)), w))
+    one = u - p / (3 * u)
+    # three real roots
+    r = 2 * np.sqrt(np.maximum(-p / 3, 0.0))
+    three = r * np.cos(np.arccos(np.clip(3 * q / (p * r), -1.0, 1.0)) / 3)
+
+    return np.where(delta > 0, one, three) - b / 3
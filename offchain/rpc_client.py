@@ -0,0 +1,455 @@
+"""
+asyncio JSON-RPC client for the adapter views.
+Keeps a pool of keep-alive HTTP connections or one WebSocket to the endpoint, caps the requests in flight,
+coalesces identical requests in flight for the same block tag and sends JSON-RPC batches,
+so quotes fanned out across many pools overlap their round trips instead of waiting on each other.
+Uses only the standard library.
+"""
+
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import os
+import ssl
+from collections.abc import Mapping, Sequence
+from typing import Any
+from urllib.parse import urlsplit
+
+from offchain import multicall
+from offchain.multicall import Function
+
+# max open HTTP connections of a transport
+POOL_SIZE = 8
+# max requests in flight of a client, a batch counts as one
+CONCURRENCY = 32
+# seconds to wait for a response
+TIMEOUT = 30
+
+# GUID of the WebSocket handshake, RFC 6455
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# WebSocket opcodes
+WS_CONTINUATION = 0x0
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+
+class RpcError(Exception):
+    """
+    Raised when the endpoint answers a request with an error, e.g. a reverted eth_call.
+    """
+
+    def __init__(self, message: str, code: int | None = None):
+        super().__init__(f"rpc_client: {message}")
+        self.code = code
+
+
+class HttpTransport:
+    """
+    Pool of keep-alive HTTP/1.1 connections to a JSON-RPC endpoint.
+    pool_size: max open connections, requests beyond it wait for a free one
+    connections: number of connections opened, reused ones are not counted again
+    """
+
+    def __init__(self, url: str, pool_size: int = POOL_SIZE, timeout: float = TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.timeout = timeout
+        self.connections = 0
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def send(self, payload: dict | list) -> Any:
+        """
+        Post a JSON-RPC request or batch and return the decoded response.
+        """
+        body = json.dumps(payload).encode()
+        async with self._slots:
+            # idle connections may have been closed by the server, then the request is retried
+            while True:
+                reused = bool(self._idle)
+                connection = self._idle.pop() if reused else await self._connect()
+                try:
+                    response, keep_alive = await asyncio.wait_for(self._post(*connection, body), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    connection[1].close()
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    connection[1].close()
+                    raise
+                if keep_alive:
+                    self._idle.append(connection)
+                else:
+                    connection[1].close()
+                return response
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        self.connections += 1
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+
+    async def _post(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, body: bytes) -> tuple[Any, bool]:
+        writer.write(
+            f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+        status, headers = await read_head(reader)
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            content = b""
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                content += await reader.readexactly(size)
+                await reader.readline()
+            await reader.readline()
+        elif "content-length" in headers:
+            content = await reader.readexactly(int(headers["content-length"]))
+        else:
+            # the body is delimited by the server closing the connection, which cannot be reused
+            content = await reader.read()
+            headers["connection"] = "close"
+
+        if not status.startswith("2"):
+            raise RpcError(f"HTTP {status}")
+        return json.loads(content), headers.get("connection", "").lower() != "close"
+
+
+class WebSocketTransport:
+    """
+    One WebSocket connection to a JSON-RPC endpoint, with responses matched to requests by id.
+    Requests are sent as soon as they come and answered in any order.
+    """
+
+    def __init__(self, url: str, timeout: float = TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "wss" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "wss" else None
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.timeout = timeout
+        self._connection: tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+        self._connecting = asyncio.Lock()
+        self._receiver: asyncio.Task | None = None
+        # future of the pending request or batch by request id
+        self._pending: dict[Any, asyncio.Future] = {}
+
+    async def send(self, payload: dict | list) -> Any:
+        """
+        Send a JSON-RPC request or batch and return the decoded response.
+        """
+        _, writer = await self._connect()
+        ids = [request["id"] for request in payload] if isinstance(payload, list) else [payload["id"]]
+        future = asyncio.get_running_loop().create_future()
+        for request_id in ids:
+            self._pending[request_id] = future
+
+        try:
+            write_frame(writer, WS_TEXT, json.dumps(payload).encode(), mask=True)
+            await writer.drain()
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        finally:
+            for request_id in ids:
+                self._pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        if self._connection is None:
+            return
+        _, writer = self._connection
+        self._connection = None
+        write_frame(writer, WS_CLOSE, b"", mask=True)
+        writer.close()
+        if self._receiver is not None:
+            self._receiver.cancel()
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        async with self._connecting:
+            if self._connection is not None:
+                return self._connection
+
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+            key = base64.b64encode(os.urandom(16))
+            writer.write(
+                f"GET {self.path} HTTP/1.1\r\nHost: {self.host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key.decode()}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+            )
+            await writer.drain()
+
+            status, headers = await read_head(reader)
+            if status != "101" or headers.get("sec-websocket-accept") != websocket_accept(key):
+                writer.close()
+                raise RpcError(f"WebSocket handshake failed with HTTP {status}")
+
+            self._connection = (reader, writer)
+            self._receiver = asyncio.ensure_future(self._receive(reader, writer))
+            return self._connection
+
+    async def _receive(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                opcode, message = await read_message(reader, writer)
+                if opcode == WS_CLOSE:
+                    raise ConnectionError("closed by the endpoint")
+                response = json.loads(message)
+                request_id = response[0].get("id") if isinstance(response, list) and response else response.get("id")
+                future = self._pending.get(request_id)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except BaseException as error:
+            # fail the requests waiting on the connection, the next request reconnects,
+            # also on a malformed response, after which the connection cannot be trusted
+            writer.close()
+            if self._connection is not None and self._connection[1] is writer:
+                self._connection = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(RpcError(f"WebSocket connection lost: {error!r}"))
+            if not isinstance(error, Exception):
+                raise
+
+
+class RpcClient:
+    """
+    JSON-RPC client over an HTTP or WebSocket transport.
+    concurrency: max transport requests in flight, a batch counts as one
+    requests: number of transport requests sent
+    coalesced: number of requests answered by an identical request already in flight
+    """
+
+    def __init__(self, transport: HttpTransport | WebSocketTransport, concurrency: int = CONCURRENCY):
+        self.transport = transport
+        self.requests = 0
+        self.coalesced = 0
+        self._limit = asyncio.Semaphore(concurrency)
+        self._ids = itertools.count(1)
+        # futures of the requests in flight by method and params, block tag included
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._senders: set[asyncio.Task] = set()
+
+    async def request(self, method: str, params: list) -> Any:
+        """
+        Result of a request. Raises RpcError if the endpoint answers with an error.
+        """
+        (result,) = await self.batch([(method, params)])
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def batch(self, requests: Sequence[tuple[str, list]]) -> list:
+        """
+        Results of requests sent as one JSON-RPC batch, in the same order.
+        Requests that fail have their RpcError as result instead of raising.
+        """
+        futures = []
+        new = []
+        for method, params in requests:
+            key = json.dumps([method, params], sort_keys=True)
+            future = self._in_flight.get(key)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._in_flight[key] = future
+                new.append((key, method, params, future))
+            else:
+                self.coalesced += 1
+            futures.append(future)
+
+        if new:
+            # sent apart from the caller, cancelling it must not fail the requests coalesced into it
+            sender = asyncio.ensure_future(self._send(new))
+            self._senders.add(sender)
+            sender.add_done_callback(self._senders.discard)
+
+        return await asyncio.gather(*(asyncio.shield(future) for future in futures), return_exceptions=True)
+
+    async def eth_call(self, to: str, data: bytes, block: int | str = "latest") -> bytes:
+        """
+        Return data of an eth_call at block.
+        """
+        result = await self.request("eth_call", [{"to": to, "data": "0x" + data.hex()}, _block_tag(block)])
+        return bytes.fromhex(result[2:])
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+    async def _send(self, new: list[tuple[str, str, list, asyncio.Future]]) -> None:
+        payloads = [
+            {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+            for _, method, params, _ in new
+        ]
+        try:
+            async with self._limit:
+                self.requests += 1
+                response = await self.transport.send(payloads if len(payloads) > 1 else payloads[0])
+            responses = {item.get("id"): item for item in (response if isinstance(response, list) else [response])}
+
+            for payload, (_, _, _, future) in zip(payloads, new):
+                item = responses.get(payload["id"])
+                if item is None:
+                    future.set_exception(RpcError("no response"))
+                elif "error" in item:
+                    future.set_exception(RpcError(item["error"].get("message", ""), item["error"].get("code")))
+                else:
+                    future.set_result(item["result"])
+        except Exception as error:
+            for _, _, _, future in new:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            for key, _, _, future in new:
+                self._in_flight.pop(key, None)
+                if not future.done():
+                    future.cancel()
+
+
+class AdapterClient:
+    """
+    Async views of a stableswap or cryptoswap adapter and of its pools.
+    abi: adapter ABI, e.g. the abi of the deployed adapter contract,
+    or the lens ABI with the lens address as adapter for the batched views
+    pool_abi: ABI of the pools for pool_view, e.g. abis/three_pool_contract.json
+    """
+
+    def __init__(self, rpc: RpcClient, adapter: str, abi: Sequence[Mapping], pool_abi: Sequence[Mapping] = ()):
+        self.rpc = rpc
+        self.adapter = adapter
+        self.functions = multicall.functions(abi)
+        self.pool_functions = multicall.functions(pool_abi)
+
+    async def view(self, name: str, *args, block: int | str = "latest") -> Any:
+        """
+        Outputs of an adapter view. Raises RpcError if it reverts.
+        """
+        function = self.functions[name]
+        return function.decode(await self.rpc.eth_call(self.adapter, function.encode(args), block))
+
+    async def views(self, calls: Sequence[tuple[str, tuple]], block: int | str = "latest") -> list:
+        """
+        Outputs of adapter views sent as one JSON-RPC batch, RpcError for the ones that revert.
+        """
+        tag = _block_tag(block)
+        functions = [self.functions[name] for name, _ in calls]
+        requests = [
+            ("eth_call", [{"to": self.adapter, "data": "0x" + function.encode(args).hex()}, tag])
+            for function, (_, args) in zip(functions, calls)
+        ]
+        results = await self.rpc.batch(requests)
+        return [
+            result if isinstance(result, Exception) else function.decode(bytes.fromhex(result[2:]))
+            for function, result in zip(functions, results)
+        ]
+
+    async def pool_view(self, pool: str, name: str, *args, block: int | str = "latest") -> Any:
+        """
+        Outputs of a pool view, from pool_abi.
+        """
+        function: Function = self.pool_functions[name]
+        return function.decode(await self.rpc.eth_call(pool, function.encode(args), block))
+
+    async def get_exchange_amount_out(
+        self, pool: str, index_in: int, index_out: int, amount_in: int, block: int | str = "latest"
+    ) -> int:
+        return await self.view("get_exchange_amount_out", pool, index_in, index_out, amount_in, block=block)
+
+    async def get_lp_amount_after_deposit(self, pool: str, amounts: Sequence[int], block: int | str = "latest") -> int:
+        return await self.view("get_lp_amount_after_deposit", pool, list(amounts), block=block)
+
+    async def get_lp_amount_after_remove_one_coin(
+        self, pool: str, coin_index: int, lp_amount: int, block: int | str = "latest"
+    ) -> int:
+        return await self.view("get_lp_amount_after_remove_one_coin", pool, coin_index, lp_amount, block=block)
+
+    async def get_pool_info(self, pool: str, block: int | str = "latest") -> Any:
+        return await self.view("get_pool_info", pool, block=block)
+
+
+def websocket_accept(key: bytes) -> str:
+    """
+    Sec-WebSocket-Accept of a Sec-WebSocket-Key.
+    """
+    return base64.b64encode(hashlib.sha1(key + WS_GUID).digest()).decode()
+
+
+async def read_head(reader: asyncio.StreamReader) -> tuple[str, dict[str, str]]:
+    """
+    Status code, or path of a request, and headers by lowercase name of an HTTP message head.
+    """
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    status = line.decode().split(" ")[1]
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+async def read_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> tuple[int, bytes]:
+    """
+    Opcode and payload of the next data or close message, answering pings on the way.
+    """
+    opcode, message = WS_CONTINUATION, b""
+    while True:
+        head = await reader.readexactly(2)
+        fin, frame_opcode = head[0] & 0x80, head[0] & 0x0F
+        length = head[1] & 0x7F
+        if length == 126:
+            length = int.from_bytes(await reader.readexactly(2), "big")
+        elif length == 127:
+            length = int.from_bytes(await reader.readexactly(8), "big")
+        mask = await reader.readexactly(4) if head[1] & 0x80 else b""
+        payload = _masked(await reader.readexactly(length), mask) if mask else await reader.readexactly(length)
+
+        if frame_opcode == WS_PING:
+            write_frame(writer, WS_PONG, payload, mask=not mask)
+            continue
+        if frame_opcode == WS_PONG:
+            continue
+        if frame_opcode == WS_CLOSE:
+            return WS_CLOSE, payload
+
+        opcode = frame_opcode or opcode
+        message += payload
+        if fin:
+            return opcode, message
+
+
+def write_frame(writer: asyncio.StreamWriter, opcode: int, payload: bytes, mask: bool) -> None:
+    """
+    Write payload as one frame, masked as clients must and servers must not.
+    """
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        head = bytes([0x80 | opcode, mask_bit | length])
+    elif length < 2**16:
+        head = bytes([0x80 | opcode, mask_bit | 126]) + length.to_bytes(2, "big")
+    else:
+        head = bytes([0x80 | opcode, mask_bit | 127]) + length.to_bytes(8, "big")
+
+    if mask:
+        key = os.urandom(4)
+        writer.write(head + key + _masked(payload, key))
+    else:
+        writer.write(head + payload)
+
+
+def _block_tag(block: int | str) -> str:
+    return hex(block) if isinstance(block, int) else block
+
+
+def _masked(payload: bytes, key: bytes) -> bytes:
+    # xor with the key repeated over the payload, as one big integer instead of byte by byte
+    repeated = (key * (len(payload) // 4 + 1))[: len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(payload), "big")
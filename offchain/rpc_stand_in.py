@@ -0,0 +1,220 @@
+"""
+Local stand-ins for an anvil JSON-RPC endpoint, for tests and benchmarks on networks without a node.
+StandIn serves eth_call from the boa env over keep-alive HTTP and WebSocket after a simulated network latency.
+Calls run one at a time on the event loop, like a node runs its EVM.
+Chain serves eth_getLogs of blocks mined from the logs of boa transactions, and can reorg them.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any
+
+import boa
+from eth_utils import keccak, to_checksum_address
+
+from offchain import multicall
+from offchain.rpc_client import WS_CLOSE, WS_TEXT, read_head, read_message, websocket_accept, write_frame
+
+# simulated round trip between the client and the node, in seconds
+LATENCY = 0.02
+# max logs of an eth_getLogs request, like the 10000 of hosted endpoints
+MAX_LOGS = 10_000
+
+
+class StandIn:
+    """
+    JSON-RPC server on a local port, see http_url and ws_url.
+    requests: number of HTTP requests and WebSocket messages served, a batch counts as one
+    connections: number of connections accepted
+    """
+
+    def __init__(self, latency: float = LATENCY):
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+        self._handlers: set[asyncio.Task] = set()
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def http_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+
+    async def close(self) -> None:
+        self._server.close()
+        for handler in self._handlers:
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                _, headers = await read_head(reader)
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_websocket(reader, writer, headers["sec-websocket-key"])
+                    return
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                response = json.dumps(await self._answer(json.loads(body))).encode()
+                writer.write(
+                    f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {len(response)}\r\n\r\n".encode()
+                    + response
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def _serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, key: str) -> None:
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(key.encode())}\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        async def reply(message: bytes) -> None:
+            write_frame(writer, WS_TEXT, json.dumps(await self._answer(json.loads(message))).encode(), mask=False)
+            await writer.drain()
+
+        # messages are answered concurrently, in the order their latency ends
+        replies: set[asyncio.Task] = set()
+        try:
+            while True:
+                opcode, message = await read_message(reader, writer)
+                if opcode == WS_CLOSE:
+                    return
+                task = asyncio.ensure_future(reply(message))
+                replies.add(task)
+                task.add_done_callback(replies.discard)
+        finally:
+            for task in replies:
+                task.cancel()
+
+    async def _answer(self, payload: dict | list) -> Any:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if isinstance(payload, list):
+            return [self._answer_one(request) for request in payload]
+        return self._answer_one(payload)
+
+    def _answer_one(self, request: dict) -> dict:
+        if request["method"] == "eth_call":
+            return multicall.boa_transport([request])[0]
+        if request["method"] == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "id": request["id"], "result": hex(boa.env.evm.patch.block_number)}
+        error = {"code": -32601, "message": f"method {request['method']} not found"}
+        return {"jsonrpc": "2.0", "id": request["id"], "error": error}
+
+
+class Chain:
+    """
+    Chain of blocks holding the logs of boa transactions, served as a JSON-RPC batch transport,
+    see multicall.Transport. Block numbers and hashes are its own, the boa env stays at its block.
+    max_logs: max logs of an eth_getLogs request, more fail like on hosted endpoints
+    requests: number of JSON-RPC requests served, a batch counts as one
+    """
+
+    def __init__(self, max_logs: int = MAX_LOGS):
+        self.max_logs = max_logs
+        self.requests = 0
+        self.blocks: list[dict] = []
+        # logs of the transactions recorded for the next block
+        self._pending: list[list[tuple[bytes, tuple[int, ...], bytes]]] = []
+        self._transactions = 0
+        self._forks = 0
+        # backfill workers request from threads
+        self._lock = threading.Lock()
+        self.mine()
+
+    @property
+    def head(self) -> int:
+        return len(self.blocks) - 1
+
+    def record(self, computation) -> None:
+        """
+        Add the logs of a transaction to the next block, e.g. of the computation of the last call of a contract.
+        """
+        self._pending.append([(address, topics, data) for _, address, topics, data in computation.get_raw_log_entries()])
+
+    def mine(self, blocks: int = 1) -> int:
+        """
+        Mine blocks, the first with the logs recorded since the last one. Returns the head.
+        """
+        with self._lock:
+            for _ in range(blocks):
+                number = len(self.blocks)
+                parent_hash = self.blocks[-1]["hash"] if self.blocks else "0x" + "00" * 32
+                block_hash = "0x" + keccak(f"{parent_hash}{number}{self._forks}".encode()).hex()
+                logs = []
+                for transaction in self._pending:
+                    self._transactions += 1
+                    transaction_hash = "0x" + keccak(f"{self._forks}{self._transactions}".encode()).hex()
+                    for address, topics, data in transaction:
+                        logs.append(
+                            {
+                                "address": to_checksum_address(address),
+                                "topics": ["0x" + topic.to_bytes(32, "big").hex() for topic in topics],
+                                "data": "0x" + data.hex(),
+                                "blockNumber": hex(number),
+                                "blockHash": block_hash,
+                                "transactionHash": transaction_hash,
+                                "logIndex": hex(len(logs)),
+                                "removed": False,
+                            }
+                        )
+                self.blocks.append({"number": hex(number), "hash": block_hash, "parentHash": parent_hash, "logs": logs})
+                self._pending = []
+        return self.head
+
+    def reorg(self, depth: int) -> None:
+        """
+        Drop the last depth blocks, blocks mined after get new hashes.
+        """
+        with self._lock:
+            del self.blocks[len(self.blocks) - depth :]
+            self._forks += 1
+
+    def __call__(self, payloads: list[dict]) -> list[dict]:
+        with self._lock:
+            self.requests += 1
+            return [self._answer(payload) for payload in payloads]
+
+    def _answer(self, payload: dict) -> dict:
+        method, params = payload["method"], payload["params"]
+        if method == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "id": payload["id"], "result": hex(self.head)}
+        if method == "eth_getBlockByNumber":
+            number = int(params[0], 16)
+            block = None
+            if number <= self.head:
+                block = {key: value for key, value in self.blocks[number].items() if key != "logs"}
+            return {"jsonrpc": "2.0", "id": payload["id"], "result": block}
+        if method == "eth_getLogs":
+            (query,) = params
+            addresses = {to_checksum_address(address) for address in query["address"]}
+            logs = [
+                log
+                for block in self.blocks[int(query["fromBlock"], 16) : int(query["toBlock"], 16) + 1]
+                for log in block["logs"]
+                if log["address"] in addresses
+            ]
+            if len(logs) > self.max_logs:
+                error = {"code": -32005, "message": f"query returned more than {self.max_logs} results"}
+                return {"jsonrpc": "2.0", "id": payload["id"], "error": error}
+            return {"jsonrpc": "2.0", "id": payload["id"], "result": logs}
+        error = {"code": -32601, "message": f"method {method} not found"}
+        return {"jsonrpc": "2.0", "id": payload["id"], "error": error}
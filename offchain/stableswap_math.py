@@ -0,0 +1,296 @@
+"""
+StableSwap invariant math of Curve stableswap pools in integer arithmetic.
+Reproduces get_dy, calc_token_amount and calc_withdraw_one_coin of the 3pool and metapool
+templates to the wei, so quotes can be made locally from a pool state fetched once per block.
+stableswap-ng pools are rejected: their fee grows off peg with offpeg_fee_multiplier
+and their calc_token_amount charges it, neither of which is reproduced here.
+"""
+
+from dataclasses import dataclass
+
+# precision of rates
+PRECISION = 10**18
+# denominator of the pool fee
+FEE_DENOMINATOR = 10**10
+# max number of Newton iterations, same as the pools
+MAX_ITERATIONS = 255
+# seconds a metapool keeps the base pool virtual price cached
+BASE_CACHE_EXPIRES = 10 * 60
+
+
+@dataclass(frozen=True)
+class StableSwapState:
+    """
+    State of a stableswap pool at a block.
+    balances: pool balances(i) of each coin
+    rates: rate multiplier of each coin, 10**(36 - decimals) for plain coins.
+        The last rate of a metapool is the base pool virtual price, see metapool_vp_rate.
+    amp: amplification coefficient multiplied by a_precision, A_precise() when the pool has it
+    fee: pool fee()
+    total_supply: lp token totalSupply()
+    a_precision: A_PRECISION of the pool, 1 for pools without A_precise() such as the 3pool
+    fee_after_rates: whether get_dy charges the fee after converting dy to coin units, as the 3pool does
+    offpeg_fee_multiplier: offpeg_fee_multiplier() of stableswap-ng pools, 0 for the older templates.
+        Quotes of states with one raise ValueError
+    """
+
+    balances: tuple[int, ...]
+    rates: tuple[int, ...]
+    amp: int
+    fee: int
+    total_supply: int
+    a_precision: int = 1
+    fee_after_rates: bool = False
+    offpeg_fee_multiplier: int = 0
+
+
+def metapool_vp_rate(
+    base_virtual_price: int,
+    base_cache_updated: int,
+    base_pool_virtual_price: int,
+    timestamp: int,
+) -> int:
+    """
+    Rate of the base pool lp coin as a metapool reads it at timestamp.
+    Metapools use their cached base_virtual_price() until it is BASE_CACHE_EXPIRES old,
+    then the live get_virtual_price() of the base pool.
+    """
+    if timestamp > base_cache_updated + BASE_CACHE_EXPIRES:
+        return base_pool_virtual_price
+    return base_virtual_price
+
+
+def get_dy(state: StableSwapState, i: int, j: int, dx: int) -> int:
+    """
+    Amount of coin j received for dx of coin i, same as pool get_dy(i, j, dx).
+    """
+    _check_supported(state)
+    rates = state.rates
+    xp = _xp(state.balances, rates)
+
+    x = xp[i] + dx * rates[i] // PRECISION
+    y = get_y(i, j, x, xp, state.amp, state.a_precision)
+
+    if state.fee_after_rates:
+        dy = _sub(xp[j] - y, 1) * PRECISION // rates[j]
+        return dy - state.fee * dy // FEE_DENOMINATOR
+
+    dy = _sub(xp[j] - y, 1)
+    return (dy - state.fee * dy // FEE_DENOMINATOR) * PRECISION // rates[j]
+
+
+def exchange(
+    state: StableSwapState, i: int, j: int, dx: int, admin_fee: int
+) -> tuple[int, tuple[int, ...]]:
+    """
+    Amount of coin j received for dx of coin i and the pool balances after, same as pool exchange(i, j, dx, 0).
+    Unlike 3pool get_dy, exchange charges the fee before converting dy to coin units,
+    and the admin_fee share of the fee leaves the pool balances.
+    """
+    _check_supported(state)
+    rates = state.rates
+    xp = _xp(state.balances, rates)
+
+    x = xp[i] + dx * rates[i] // PRECISION
+    y = get_y(i, j, x, xp, state.amp, state.a_precision)
+
+    dy = _sub(xp[j] - y, 1)
+    dy_fee = state.fee * dy // FEE_DENOMINATOR
+    dy_admin_fee = dy_fee * admin_fee // FEE_DENOMINATOR * PRECISION // rates[j]
+    dy = (dy - dy_fee) * PRECISION // rates[j]
+
+    balances = list(state.balances)
+    balances[i] += dx
+    balances[j] = _sub(balances[j], dy + dy_admin_fee)
+    return dy, tuple(balances)
+
+
+def calc_token_amount(
+    state: StableSwapState, amounts: list[int], deposit: bool
+) -> int:
+    """
+    Amount of lp tokens minted or burned for amounts, same as pool calc_token_amount(amounts, deposit).
+    Like the pools, it does not account for fees.
+    """
+    _check_supported(state)
+    rates = state.rates
+    balances = state.balances
+
+    D0 = get_D(_xp(balances, rates), state.amp, state.a_precision)
+    if deposit:
+        new_balances = [b + a for b, a in zip(balances, amounts)]
+    else:
+        new_balances = [_sub(b, a) for b, a in zip(balances, amounts)]
+    D1 = get_D(_xp(new_balances, rates), state.amp, state.a_precision)
+
+    diff = _sub(D1, D0) if deposit else _sub(D0, D1)
+    return diff * state.total_supply // D0
+
+
+def calc_withdraw_one_coin(state: StableSwapState, token_amount: int, i: int) -> int:
+    """
+    Amount of coin i received for burning token_amount lp tokens, same as pool calc_withdraw_one_coin(token_amount, i).
+    """
+    return _calc_withdraw_one_coin(state, token_amount, i)[0]
+
+
+def remove_liquidity_one_coin(
+    state: StableSwapState, token_amount: int, i: int, admin_fee: int
+) -> tuple[int, tuple[int, ...]]:
+    """
+    Amount of coin i received for burning token_amount lp tokens and the pool balances after,
+    same as pool remove_liquidity_one_coin(token_amount, i, 0).
+    """
+    dy, dy_fee = _calc_withdraw_one_coin(state, token_amount, i)
+
+    balances = list(state.balances)
+    balances[i] = _sub(balances[i], dy + dy_fee * admin_fee // FEE_DENOMINATOR)
+    return dy, tuple(balances)
+
+
+def _calc_withdraw_one_coin(
+    state: StableSwapState, token_amount: int, i: int
+) -> tuple[int, int]:
+    """
+    Amount of coin i received for burning token_amount lp tokens and the fee charged on it.
+    """
+    _check_supported(state)
+    rates = state.rates
+    amp = state.amp
+    a_precision = state.a_precision
+    n_coins = len(rates)
+
+    xp = _xp(state.balances, rates)
+    D0 = get_D(xp, amp, a_precision)
+    D1 = _sub(D0, token_amount * D0 // state.total_supply)
+    new_y = get_y_D(amp, i, xp, D1, a_precision)
+
+    base_fee = state.fee * n_coins // (4 * (n_coins - 1))
+    xp_reduced = list(xp)
+    for j in range(n_coins):
+        if j == i:
+            dx_expected = _sub(xp[j] * D1 // D0, new_y)
+        else:
+            dx_expected = xp[j] - xp[j] * D1 // D0
+        xp_reduced[j] = _sub(xp_reduced[j], base_fee * dx_expected // FEE_DENOMINATOR)
+
+    dy = _sub(xp_reduced[i], get_y_D(amp, i, xp_reduced, D1, a_precision))
+    dy = _sub(dy, 1) * PRECISION // rates[i]
+    # amount without fees
+    dy_0 = _sub(xp[i], new_y) * PRECISION // rates[i]
+    return dy, _sub(dy_0, dy)
+
+
+def get_virtual_price(state: StableSwapState) -> int:
+    """
+    Virtual price of the lp token, same as pool get_virtual_price().
+    """
+    D = get_D(_xp(state.balances, state.rates), state.amp, state.a_precision)
+    return D * PRECISION // state.total_supply
+
+
+def get_D(xp: list[int], amp: int, a_precision: int = 1) -> int:
+    """
+    StableSwap invariant D of normalized balances xp, by Newton iterations.
+    """
+    n_coins = len(xp)
+    S = sum(xp)
+    if S == 0:
+        return 0
+
+    D = S
+    Ann = amp * n_coins
+    for _ in range(MAX_ITERATIONS):
+        D_P = D
+        for x in xp:
+            D_P = D_P * D // (x * n_coins)
+        D_prev = D
+        D = (
+            (Ann * S // a_precision + D_P * n_coins)
+            * D
+            // ((Ann - a_precision) * D // a_precision + (n_coins + 1) * D_P)
+        )
+        if abs(D - D_prev) <= 1:
+            return D
+
+    raise ArithmeticError("stableswap_math: D did not converge")
+
+
+def get_y(
+    i: int, j: int, x: int, xp: list[int], amp: int, a_precision: int = 1
+) -> int:
+    """
+    Normalized balance of coin j that keeps D when the balance of coin i is set to x.
+    """
+    n_coins = len(xp)
+    D = get_D(xp, amp, a_precision)
+    Ann = amp * n_coins
+
+    c = D
+    S = 0
+    for k in range(n_coins):
+        if k == i:
+            _x = x
+        elif k != j:
+            _x = xp[k]
+        else:
+            continue
+        S += _x
+        c = c * D // (_x * n_coins)
+    c = c * D * a_precision // (Ann * n_coins)
+
+    return _solve_y(S + D * a_precision // Ann, c, D)
+
+
+def get_y_D(amp: int, i: int, xp: list[int], D: int, a_precision: int = 1) -> int:
+    """
+    Normalized balance of coin i that gives invariant D with the other balances of xp.
+    """
+    n_coins = len(xp)
+    Ann = amp * n_coins
+
+    c = D
+    S = 0
+    for k in range(n_coins):
+        if k == i:
+            continue
+        S += xp[k]
+        c = c * D // (xp[k] * n_coins)
+    c = c * D * a_precision // (Ann * n_coins)
+
+    return _solve_y(S + D * a_precision // Ann, c, D)
+
+
+def _solve_y(b: int, c: int, D: int) -> int:
+    """
+    Newton iterations for y in y**2 + (b - D) * y = c.
+    """
+    y = D
+    for _ in range(MAX_ITERATIONS):
+        y_prev = y
+        y = (y * y + c) // _sub(2 * y + b, D)
+        if abs(y - y_prev) <= 1:
+            return y
+
+    raise ArithmeticError("stableswap_math: y did not converge")
+
+
+def _check_supported(state: StableSwapState) -> None:
+    if state.offpeg_fee_multiplier:
+        raise ValueError("stableswap_math: stableswap-ng fees are not supported")
+
+
+def _xp(balances: tuple[int, ...] | list[int], rates: tuple[int, ...]) -> list[int]:
+    """
+    Balances normalized to 18 decimals and rates.
+    """
+    return [rate * balance // PRECISION for rate, balance in zip(rates, balances)]
+
+
+def _sub(a: int, b: int) -> int:
+    """
+    Subtraction that fails where the pools revert on uint256 underflow.
+    """
+    if b > a:
+        raise ArithmeticError("stableswap_math: subtraction underflow")
+    return a - b
@@ -0,0 +1,272 @@
+"""
+Event-driven mirror of the states of the pools registered in an adapter.
+Bootstraps every pool once, then applies pool events block by block and re-fetches only the pools
+whose events cannot be applied exactly. Keeps a checkpoint per block to roll back reorgs.
+"""
+
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, replace
+from typing import Any
+
+from offchain import stableswap_math
+from offchain.cryptoswap_math import CryptoSwapState
+from offchain.stableswap_math import StableSwapState
+
+# denominator of the pool fees
+FEE_DENOMINATOR = 10**10
+# number of blocks kept to roll back reorgs
+CHECKPOINTS = 64
+
+# pool event logged by the pool for each adapter event, in the same transaction
+POOL_EVENTS = {
+    "Exchange": "TokenExchange",
+    "ExchangeUnderlying": "TokenExchangeUnderlying",
+    "LiquidityAdded": "AddLiquidity",
+    "LiquidityAddedUnderlying": "AddLiquidity",
+    "LiquidityRemoved": "RemoveLiquidity",
+    "LiquidityRemovedImbalanced": "RemoveLiquidityImbalance",
+    "LiquidityRemovedOneCoin": "RemoveLiquidityOne",
+    "LiquidityRemovedOneCoinUnderlying": "RemoveLiquidityOne",
+}
+
+
+class ReorgError(Exception):
+    """
+    Raised when a block does not extend the mirrored chain, see StateMirror.rollback.
+    """
+
+
+@dataclass(frozen=True)
+class Block:
+    """
+    Block of the mirrored chain.
+    """
+
+    number: int
+    hash: str
+    parent_hash: str
+    timestamp: int
+
+
+@dataclass(frozen=True)
+class PoolEvent:
+    """
+    Decoded log of a pool or an adapter.
+    address: checksummed address of the contract that logged it
+    name: event name
+    args: event arguments by name
+    """
+
+    address: str
+    name: str
+    args: Mapping[str, Any]
+
+    @classmethod
+    def from_log(cls, log) -> "PoolEvent":
+        """
+        Event of a log decoded by boa, a namedtuple named after the event with the logger address first.
+        """
+        args = log._asdict()
+        address = args.pop("address")
+        return cls(address=str(address), name=type(log).__name__, args=args)
+
+
+@dataclass(frozen=True)
+class MirroredPool:
+    """
+    Mirrored state of a pool.
+    state: quote state of the pool, see stableswap_math and cryptoswap_math
+    admin_fee: share of the fees that stableswap pools take out of their balances
+    exact: whether the pool events can be applied to the state exactly. Only plain stableswap pools:
+        cryptoswap pools move D and price_scale on every trade, metapool rates follow
+        the virtual price of the base pool, and the rates or the offpeg fees of lending and
+        stableswap-ng pools move without events
+    base_pool: base pool of a metapool, whose events change the metapool rates
+    ramp_end: timestamp of the end of an A or gamma ramp, until which the state changes every block
+    dynamic_rates: whether the coin rates change every block, as those of lending pools and
+        stableswap-ng pools with oracle or ERC4626 coins
+    """
+
+    state: StableSwapState | CryptoSwapState
+    admin_fee: int = 0
+    exact: bool = False
+    base_pool: str | None = None
+    ramp_end: int = 0
+    dynamic_rates: bool = False
+
+
+# reads the states of pools at a block, see pool_reader
+Fetch = Callable[[Sequence[str], Block], dict[str, MirroredPool]]
+
+
+class StateMirror:
+    """
+    States of pools mirrored from their events.
+    fetch reads pool states from the chain, at the block it is given.
+    adapters are the adapters the pools are registered in. Their PoolRegistered and PoolDeregistered
+    events add and drop pools, and their trade events must come with the matching pool events
+    in the same block, or the pool is re-fetched.
+    """
+
+    def __init__(self, fetch: Fetch, adapters: Sequence[str] = (), checkpoints: int = CHECKPOINTS):
+        self.fetch = fetch
+        self.adapters = set(adapters)
+        self.checkpoints = checkpoints
+        self.pools: dict[str, MirroredPool] = {}
+        self.head: Block | None = None
+        self._checkpoints: list[tuple[Block, dict[str, MirroredPool]]] = []
+
+    def bootstrap(self, pools: Sequence[str], block: Block) -> None:
+        """
+        Fetch the states of pools at block, the only time all of them are read.
+        """
+        self.pools = self.fetch(pools, block)
+        self.head = block
+        self._checkpoints = [(block, self.pools)]
+
+    def apply_block(self, block: Block, events: Sequence[PoolEvent]) -> set[str]:
+        """
+        Apply the events of the block after the head, in log order.
+        events are the logs of the pools, the base pools of metapools and the adapters.
+        Returns the pools re-fetched at the block.
+        Raises ReorgError if the block does not extend the head.
+        """
+        if self.head is None:
+            raise ValueError("state_mirror: bootstrap first")
+        if block.parent_hash != self.head.hash:
+            raise ReorgError(f"state_mirror: block {block.number} does not extend block {self.head.number}")
+
+        pools = dict(self.pools)
+        refetch: set[str] = set()
+        # names of the events of each pool in the block
+        pool_events: dict[str, list[str]] = {}
+
+        for event in events:
+            if event.address not in pools:
+                continue
+            pool_events.setdefault(event.address, []).append(event.name)
+            if event.address in refetch:
+                continue
+            pool = _apply(pools[event.address], event)
+            if pool is None:
+                refetch.add(event.address)
+            else:
+                pools[event.address] = pool
+
+        for event in events:
+            if event.address not in self.adapters:
+                continue
+            pool_address = str(event.args.get("pool"))
+            if event.name == "PoolRegistered":
+                refetch.add(pool_address)
+            elif event.name == "PoolDeregistered":
+                pools.pop(pool_address, None)
+                refetch.discard(pool_address)
+            elif event.name in POOL_EVENTS and pool_address in pools:
+                # each adapter trade is also logged by the pool, missing logs leave the state unknown
+                names = pool_events.get(pool_address, [])
+                if POOL_EVENTS[event.name] in names:
+                    names.remove(POOL_EVENTS[event.name])
+                else:
+                    refetch.add(pool_address)
+
+        loggers = {event.address for event in events}
+        for address, pool in pools.items():
+            # metapool rates follow the base pool, ramps change A and gamma every block
+            # and dynamic rates change every block
+            if pool.base_pool in loggers or pool.ramp_end > self.head.timestamp or pool.dynamic_rates:
+                refetch.add(address)
+
+        if refetch:
+            pools.update(self.fetch(sorted(refetch), block))
+
+        self.pools = pools
+        self.head = block
+        self._checkpoints.append((block, pools))
+        del self._checkpoints[: -self.checkpoints]
+        return refetch
+
+    def rollback(self, is_canonical: Callable[[Block], bool]) -> Block:
+        """
+        Roll back to the newest checkpoint on the canonical chain and return its block.
+        The canonical blocks after it are applied again next.
+        is_canonical tells whether a block is on the canonical chain, e.g. by its hash.
+        Raises ReorgError if no checkpoint is, the mirror must be bootstrapped again.
+        """
+        while self._checkpoints:
+            block, pools = self._checkpoints[-1]
+            if is_canonical(block):
+                self.head = block
+                self.pools = pools
+                return block
+            self._checkpoints.pop()
+
+        raise ReorgError("state_mirror: reorg deeper than the checkpoints, bootstrap again")
+
+
+def _apply(pool: MirroredPool, event: PoolEvent) -> MirroredPool | None:
+    """
+    Pool after one of its events, None if the event cannot be applied exactly.
+    """
+    if not pool.exact:
+        return None
+
+    state = pool.state
+    args = event.args
+    admin_fees = [fee * pool.admin_fee // FEE_DENOMINATOR for fee in args.get("fees", [])]
+    try:
+        if event.name == "TokenExchange":
+            dy, balances = stableswap_math.exchange(
+                state, args["sold_id"], args["bought_id"], args["tokens_sold"], pool.admin_fee
+            )
+            # the mirrored state is wrong if the pool paid out another amount
+            if dy != args["tokens_bought"]:
+                return None
+            total_supply = state.total_supply
+        elif event.name == "AddLiquidity":
+            balances = tuple(
+                balance + amount - admin_fee
+                for balance, amount, admin_fee in zip(state.balances, args["token_amounts"], admin_fees)
+            )
+            total_supply = args["token_supply"]
+        elif event.name == "RemoveLiquidity":
+            balances = tuple(balance - amount for balance, amount in zip(state.balances, args["token_amounts"]))
+            total_supply = args["token_supply"]
+        elif event.name == "RemoveLiquidityImbalance":
+            balances = tuple(
+                balance - amount - admin_fee
+                for balance, amount, admin_fee in zip(state.balances, args["token_amounts"], admin_fees)
+            )
+            total_supply = args["token_supply"]
+        elif event.name == "RemoveLiquidityOne":
+            balances = _remove_liquidity_one_coin(pool, args["token_amount"], args["coin_amount"])
+            if balances is None:
+                return None
+            total_supply = args.get("token_supply", state.total_supply - args["token_amount"])
+        else:
+            # parameter changes and events of other pool templates
+            return None
+    except ArithmeticError:
+        return None
+
+    # the mirrored state is wrong if the pool would have reverted
+    if min(balances) < 0:
+        return None
+    return replace(pool, state=replace(state, balances=balances, total_supply=total_supply))
+
+
+def _remove_liquidity_one_coin(pool: MirroredPool, token_amount: int, coin_amount: int) -> tuple[int, ...] | None:
+    """
+    Pool balances after a RemoveLiquidityOne event, None if they cannot be told exactly.
+    The 3pool event has no coin index, it is the only coin that pays out coin_amount.
+    """
+    candidates = []
+    for i in range(len(pool.state.balances)):
+        try:
+            dy, balances = stableswap_math.remove_liquidity_one_coin(pool.state, token_amount, i, pool.admin_fee)
+        except ArithmeticError:
+            continue
+        if dy == coin_amount:
+            candidates.append(balances)
+
+    return candidates[0] if len(candidates) == 1 else None
@@ -0,0 +1,20 @@
+from moccasin.boa_tools import VyperContract
+from moccasin.config import get_active_network
+
+from src import cryptoswap_lens
+
+
+def deploy_cryptoswap_lens() -> VyperContract:
+    active_network = get_active_network()
+    adapter = active_network.manifest_named("cryptoswap_adapter")
+
+    cryptoswap_lens_contract = cryptoswap_lens.deploy(adapter)
+
+    print(f"Deployed CryptoswapLens contract at {cryptoswap_lens_contract.address}")
+    return cryptoswap_lens_contract
+
+def moccasin_main() -> VyperContract:
+    return deploy_cryptoswap_lens()
+
+if __name__ == "__main__":
+    moccasin_main()
\ No newline at end of file
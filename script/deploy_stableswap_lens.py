@@ -0,0 +1,20 @@
+from moccasin.boa_tools import VyperContract
+from moccasin.config import get_active_network
+
+from src import stableswap_lens
+
+
+def deploy_stableswap_lens() -> VyperContract:
+    active_network = get_active_network()
+    adapter = active_network.manifest_named("stableswap_adapter")
+
+    stableswap_lens_contract = stableswap_lens.deploy(adapter)
+
+    print(f"Deployed StableswapLens contract at {stableswap_lens_contract.address}")
+    return stableswap_lens_contract
+
+def moccasin_main() -> VyperContract:
+    return deploy_stableswap_lens()
+
+if __name__ == "__main__":
+    moccasin_main()
\ No newline at end of file
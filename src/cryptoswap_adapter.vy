@@ -9,11 +9,13 @@ Can be used for adding/removing liquidity, exchanging tokens.
 Has gauge contract to stake lp tokens and earn CRV tokens.
 CRV tokens can be claimed from minter (CRV emission rewards) and gauge (permissionless rewards).
 In this contract we allow claiming CRV rewards from minter only.
+Batched quotes, pool snapshots and registry pages are served by cryptoswap_lens, which reads this adapter.
 """
 
 from snekmate.auth import ownable
 from interfaces import i_meta_registry
 from interfaces import i_minter
+from interfaces import i_permit2
 from interfaces import i_gauge_cryptoswap
 from interfaces import i_twocrypto
 from interfaces import i_tricrypto
@@ -40,16 +42,67 @@ struct Pool:
     n_coins: uint256
 
 
+# Stores a single hop of an exchange route
+struct RouteHop:
+    # address of the pool contract
+    pool: address
+    # index of the coin to exchange
+    index_in: uint256
+    # index of the coin to receive
+    index_out: uint256
+
+
+# Stores a single exchange quote request
+struct QuoteRequest:
+    # address of the pool contract
+    pool: address
+    # index of the coin to exchange
+    index_in: uint256
+    # index of the coin to receive
+    index_out: uint256
+    # amount of coin to exchange
+    amount_in: uint256
+
+
+# Indicates the outcome of a pool registration
+flag RegisterStatus:
+    # pool was registered
+    REGISTERED
+    # pool is already registered in the adapter
+    ALREADY_REGISTERED
+    # pool is not registered in meta registry
+    NOT_IN_META_REGISTRY
+    # pool has more coins than the adapter supports
+    TOO_MANY_COINS
+
+
 # ------------------------------------------------------------------
 #                              STATE
 # ------------------------------------------------------------------
 
 # max number of coins in a pool
 MAX_COINS: constant(uint256) = 3
+# max number of hops in an exchange route
+MAX_ROUTE_HOPS: constant(uint256) = 4
 # max number of coins in a pool in meta registry
 META_REGISTRY_COINS_CAP: constant(uint256) = 8
-# max number of pools that can be registered
-POOLS_CAP: constant(uint256) = 1000
+# max number of pools that can be registered in one transaction
+POOLS_BATCH_CAP: constant(uint256) = 100
+# amount returned for a quote that failed
+QUOTE_FAILED: public(constant(uint256)) = max_value(uint256)
+# max number of pools returned for a coin pair
+PAIR_POOLS_CAP: constant(uint256) = 32
+# max number of pools to claim CRV rewards from in one transaction
+CLAIM_BATCH_CAP: constant(uint256) = 32
+# max number of calls in a multicall
+MULTICALL_CAP: constant(uint256) = 8
+# max size of the calldata of a single call in a multicall
+MULTICALL_CALL_SIZE: constant(uint256) = 1024
+# max size of the return data of a single call in a multicall, results that fill it revert
+# as they may have been truncated, it holds every fixed size return of this contract
+MULTICALL_RESULT_SIZE: constant(uint256) = 256
+# canonical Permit2 contract, deployed at the same address on every chain
+PERMIT2: constant(address) = 0x000000000022D473030F116dDEE9F6B43aC78BA3
 # meta registry address used to validate pools and their types
 meta_registry: public(immutable(i_meta_registry))
 # minter address used to claim CRV rewards
@@ -59,8 +112,22 @@ WETH20: immutable(address)
 
 # registry of pools
 pool_registry: public(HashMap[address, Pool])
-# set of pool addresses
-pool_registry_set: public(DynArray[address, POOLS_CAP])
+# set of pool addresses, indexed by pool id
+pool_registry_set: public(HashMap[uint256, address])
+# pool id + 1 of each registered pool, 0 if the pool is not registered
+pool_registry_index: HashMap[address, uint256]
+# number of registered pools
+pools_count: uint256
+# coins of each registered pool, cached at registration
+pool_coins: public(HashMap[address, address[MAX_COINS]])
+# set of pools exchanging each unordered coin pair, indexed by pair key and pool id in the pair
+pair_pools: public(HashMap[bytes32, HashMap[uint256, address]])
+# pool id in the pair + 1 of each pool exchanging a coin pair, 0 if the pool does not exchange the pair
+pair_pools_index: HashMap[bytes32, HashMap[address, uint256]]
+# number of pools exchanging each coin pair
+pair_pools_count: HashMap[bytes32, uint256]
+# coins that charge a fee on transfers, declared by the owner
+fee_on_transfer_coins: public(HashMap[address, bool])
 
 # ------------------------------------------------------------------
 #                              EVENTS
@@ -74,6 +141,23 @@ event PoolRegistered:
     n_coins: uint256
 
 
+# Emitted when a pool in a batch registration is skipped
+event PoolRegistrationSkipped:
+    pool: indexed(address)
+    status: RegisterStatus
+
+
+# Emitted when a pool is deregistered
+event PoolDeregistered:
+    pool: indexed(address)
+
+
+# Emitted when a coin is declared as charging or not charging a fee on transfers
+event FeeOnTransferCoinSet:
+    coin: indexed(address)
+    is_fee_on_transfer: bool
+
+
 event Exchange:
     pool: indexed(address)
     index_in: uint256
@@ -150,50 +234,103 @@ def register_pool(pool_address: address):
 
     ownable._check_owner()
 
+    status: RegisterStatus = self._register_pool(pool_address)
+
     assert (
-        pool_address not in self.pool_registry_set
+        status != RegisterStatus.ALREADY_REGISTERED
     ), "cryptoswap_adapter: pool already registered"
-
-    # check if pool is registered in meta registry (native curve registry)
-    # make raw_call for custom error handling
-    # second optional argument must be set in raw_call
-    success: bool = False
-    response: Bytes[32] = b""
-    success, response = raw_call(
-        meta_registry.address,
-        concat(
-            method_id("is_registered(address,uint256)"),
-            convert(pool_address, bytes32),
-            convert(0, bytes32),
-        ),
-        max_outsize=32,
-        revert_on_failure=False,
-    )
     assert (
-        success
+        status != RegisterStatus.NOT_IN_META_REGISTRY
     ), "cryptoswap_adapter: pool is not registered in meta registry"
+    assert (
+        status != RegisterStatus.TOO_MANY_COINS
+    ), "cryptoswap_adapter: pool has more than 3 coins"
 
-    pool_gauge: address = staticcall meta_registry.get_gauge(pool_address)
-    lp_token: address = staticcall meta_registry.get_lp_token(pool_address)
-    n_coins: uint256 = staticcall meta_registry.get_n_coins(pool_address)
 
-    if n_coins > MAX_COINS:
-        raise "cryptoswap_adapter: pool has more than 3 coins"
+@external
+def register_pools(
+    pool_addresses: DynArray[address, POOLS_BATCH_CAP]
+) -> DynArray[RegisterStatus, POOLS_BATCH_CAP]:
+    """
+    @notice Register many pools in the adapter in one transaction.
+    @param pool_addresses addresses of the pool contracts
+    @return statuses registration status of each pool
+    @dev This function is only callable by the owner of the contract.
+    @dev Pools that cannot be registered are skipped and reported with PoolRegistrationSkipped
+    instead of reverting the whole batch.
+    """
 
-    self.pool_registry_set.append(pool_address)
-    self.pool_registry[pool_address] = Pool(
-        contract=pool_address,
-        gauge=pool_gauge,
-        lp_token=lp_token,
-        n_coins=n_coins,
-    )
+    ownable._check_owner()
 
-    log PoolRegistered(
-        pool=pool_address,
-        gauge=pool_gauge,
-        lp_token=lp_token,
-        n_coins=n_coins,
-    )
+    statuses: DynArray[RegisterStatus, POOLS_BATCH_CAP] = []
+    for pool_address: address in pool_addresses:
+        status: RegisterStatus = self._register_pool(pool_address)
+
+        if status != RegisterStatus.REGISTERED:
+            log PoolRegistrationSkipped(pool=pool_address, status=status)
+        statuses.append(status)
+
+    return statuses
+
+
+@external
+def deregister_pool(pool_address: address):
+    """
+    @notice Remove a pool from the adapter.
+    @param pool_address address of the pool contract
+    @dev This function is only callable by the owner of the contract.
+    @dev The last pool in the set is moved into the freed id,
+    so pool ids are not stable across deregistrations.
+    """
+
+    ownable._check_owner()
+
+    index: uint256 = self.pool_registry_index[pool_address]
+    assert index != 0, "cryptoswap_adapter: pool not registered"
+
+    last_id: uint256 = self.pools_count - 1
+    if index - 1 != last_id:
+        last_pool: address = self.pool_registry_set[last_id]
+        self.pool_registry_set[index - 1] = last_pool
+        self.pool_registry_index[last_pool] = index
+
+    self.pool_registry_set[last_id] = empty(address)
+    self.pool_registry_index[pool_address] = 0
+    self.pools_count = last_id
+
+    n_coins: uint256 = self.pool_registry[pool_address].n_coins
+    for i: uint256 in range(n_coins, bound=MAX_COINS):
+        for j: uint256 in range(i + 1, n_coins, bound=MAX_COINS):
+            self._remove_pair_pool(
+                self._pair_key(
+                    self.pool_coins[pool_address][i],
+                    self.pool_coins[pool_address][j],
+                ),
+                pool_address,
+            )
+
+    for i: uint256 in range(n_coins, bound=MAX_COINS):
+        self.pool_coins[pool_address][i] = empty(address)
+    self.pool_registry[pool_address] = empty(Pool)
+
+    log PoolDeregistered(pool=pool_address)
+
+
+@external
+def set_fee_on_transfer_coin(coin: address, is_fee_on_transfer: bool):
+    """
+    @notice Declare whether a coin charges a fee on transfers
+    @param coin address of the coin
+    @param is_fee_on_transfer whether the coin charges a fee on transfers
+    @dev This function is only callable by the owner of the contract.
+    @dev Amounts of fee on transfer coins are measured with balanceOf before and after each transfer.
+    Other coins are trusted to move exactly the amount requested, an undeclared fee makes operations revert.
+    """
+    ownable._check_owner()
+
+    self.fee_on_transfer_coins[coin] = is_fee_on_transfer
+
+    log FeeOnTransferCoinSet(coin=coin, is_fee_on_transfer=is_fee_on_transfer)
 
 
 @external
@@ -221,118 +358,179 @@ def exchange(
 
     pool_info: Pool = self.pool_registry[pool_address]
 
-    assert (
-        index_in >= 0 and index_in < pool_info.n_coins
-    ), "cryptoswap_adapter: index in out of bounds"
-    assert (
-        index_out >= 0 and index_out < pool_info.n_coins
-    ), "cryptoswap_adapter: index out out of bounds"
-    assert (
-        index_in != index_out
-    ), "cryptoswap_adapter: index in and index out cannot be the same"
+    self._check_are_indexes_valid(pool_info, index_in, index_out)
 
-    coins: address[
-        META_REGISTRY_COINS_CAP
-    ] = staticcall meta_registry.get_coins(pool_address)
+    in_coin: address = self.pool_coins[pool_address][index_in]
+    out_coin: address = self.pool_coins[pool_address][index_out]
 
-    is_token_in_is_eth: bool = use_eth and coins[index_in] == WETH20
-    is_token_out_is_eth: bool = use_eth and coins[index_out] == WETH20
+    is_token_in_is_eth: bool = use_eth and in_coin == WETH20
+    is_token_out_is_eth: bool = use_eth and out_coin == WETH20
 
+    # fee on transfer coins exchange the amount received, ETH is sent with the call
+    amount_received: uint256 = amount_in
     if not is_token_in_is_eth:
-        response_tf: Bytes[32] = raw_call(
-            coins[index_in],
-            abi_encode(
-                msg.sender,
-                self,
-                amount_in,
-                method_id=method_id("transferFrom(address,address,uint256)"),
-            ),
-            max_outsize=32,
-        )
-        if len(response_tf) > 0:
-            assert convert(
-                response_tf, bool
-            ), "cryptoswap_adapter: failed to transfer coins"
-
-        response_t: Bytes[32] = raw_call(
-            coins[index_in],
-            abi_encode(
-                pool_info.contract,
-                amount_in,
-                method_id=method_id("approve(address,uint256)"),
-            ),
-            max_outsize=32,
-        )
+        amount_received = self._transfer_in_received(in_coin, amount_in)
 
-        if len(response_t) > 0:
-            assert convert(
-                response_t, bool
-            ), "cryptoswap_adapter: failed to transfer coins"
-    out_token_balance_before: uint256 = 0
+    out_amount: uint256 = self._exchange(
+        pool_info, index_in, index_out, amount_received, min_amount_out, use_eth
+    )
 
-    if not is_token_out_is_eth:
-        out_token_balance_before = staticcall IERC20(
-            coins[index_out]
-        ).balanceOf(self)
-    else:
-        out_token_balance_before = self.balance
+    if out_amount > 0:
+        if not is_token_out_is_eth:
+            self._transfer_out(out_coin, msg.sender, out_amount)
+        else:
+            raw_call(msg.sender, b"", value=out_amount)
 
-    if pool_info.n_coins == MAX_COINS:
-        extcall i_tricrypto(pool_info.contract).exchange(
-            index_in,
-            index_out,
-            amount_in,
-            min_amount_out,
-            use_eth,
-            value=msg.value,
+    log Exchange(
+        pool=pool_address,
+        index_in=index_in,
+        index_out=index_out,
+        amount_in=amount_in,
+        min_amount_out=min_amount_out,
+        out_amount=out_amount,
+    )
+
+
+@external
+@nonreentrant
+def exchange_route(
+    route: DynArray[RouteHop, MAX_ROUTE_HOPS],
+    amount_in: uint256,
+    min_amount_out: uint256,
+) -> uint256:
+    """
+    @notice Exchange coins through several registered pools in one transaction
+    @param route ordered hops, the coin received in each hop is exchanged in the next one
+    @param amount_in amount of the first coin to exchange
+    @param min_amount_out minimum amount of the last coin to receive
+    @return out_amount amount of the last coin received
+    @dev Coins are pulled from msg.sender before the first hop and paid out after the last one.
+    Intermediate amounts stay in this contract, slippage is checked once for the whole route.
+    @dev Only ERC20 coins are routed, WETH is used instead of ETH.
+    """
+    assert len(route) > 0, "cryptoswap_adapter: empty route"
+
+    hop_amount: uint256 = amount_in
+    hop_out_coin: address = empty(address)
+    counter: uint256 = 0
+    for hop: RouteHop in route:
+        self._check_is_pool_valid(hop.pool)
+
+        pool_info: Pool = self.pool_registry[hop.pool]
+
+        self._check_are_indexes_valid(pool_info, hop.index_in, hop.index_out)
+
+        hop_in_coin: address = self.pool_coins[hop.pool][hop.index_in]
+        if counter == 0:
+            # fee on transfer coins exchange the amount received
+            hop_amount = self._transfer_in_received(hop_in_coin, amount_in)
+        else:
+            assert (
+                hop_in_coin == hop_out_coin
+            ), "cryptoswap_adapter: route is not continuous"
+        counter += 1
+
+        hop_min_amount_out: uint256 = 0
+        if counter == len(route):
+            hop_min_amount_out = min_amount_out
+
+        out_amount: uint256 = self._exchange(
+            pool_info,
+            hop.index_in,
+            hop.index_out,
+            hop_amount,
+            hop_min_amount_out,
+            False,
         )
-    else:
-        extcall i_twocrypto(pool_info.contract).exchange(
-            index_in,
-            index_out,
-            amount_in,
-            min_amount_out,
-            use_eth,
-            value=msg.value,
+
+        log Exchange(
+            pool=hop.pool,
+            index_in=hop.index_in,
+            index_out=hop.index_out,
+            amount_in=hop_amount,
+            min_amount_out=hop_min_amount_out,
+            out_amount=out_amount,
         )
 
-    out_token_balance_after: uint256 = 0
+        hop_amount = out_amount
+        hop_out_coin = self.pool_coins[hop.pool][hop.index_out]
 
-    if not is_token_out_is_eth:
-        out_token_balance_after = staticcall IERC20(coins[index_out]).balanceOf(
-            self
-        )
-    else:
-        out_token_balance_after = self.balance
+    assert (
+        hop_amount >= min_amount_out
+    ), "cryptoswap_adapter: insufficient output amount"
 
-    out_amount: uint256 = out_token_balance_after - out_token_balance_before
+    if hop_amount > 0:
+        self._transfer_out(hop_out_coin, msg.sender, hop_amount)
 
-    if out_amount > 0:
-        if not is_token_out_is_eth:
-            response_t_out: Bytes[32] = raw_call(
-                coins[index_out],
-                abi_encode(
-                    msg.sender,
-                    out_amount,
-                    method_id=method_id("transfer(address,uint256)"),
-                ),
-                max_outsize=32,
+    return hop_amount
+
+
+@external
+@nonreentrant
+def exchange_best(
+    token_in: address,
+    token_out: address,
+    amount_in: uint256,
+    min_amount_out: uint256,
+) -> uint256:
+    """
+    @notice Exchange coins in the registered pool that gives the most coins out
+    @param token_in address of the coin to exchange
+    @param token_out address of the coin to receive
+    @param amount_in amount of coin to exchange
+    @param min_amount_out minimum amount of coin to receive
+    @return out_amount amount of coin received
+    @dev Pools are quoted with get_dy in the same transaction as the exchange.
+    Only the first PAIR_POOLS_CAP pools of the pair are considered.
+    @dev Only ERC20 coins are exchanged, WETH is used instead of ETH.
+    """
+    pools: DynArray[RouteHop, PAIR_POOLS_CAP] = self._find_pools_for_pair(
+        token_in, token_out
+    )
+
+    best_hop: RouteHop = empty(RouteHop)
+    best_amount_out: uint256 = 0
+    for hop: RouteHop in pools:
+        amount_out: uint256 = self._get_exchange_amount_out_or_failed(
+            QuoteRequest(
+                pool=hop.pool,
+                index_in=hop.index_in,
+                index_out=hop.index_out,
+                amount_in=amount_in,
             )
-            if len(response_t_out) > 0:
-                assert convert(
-                    response_t_out, bool
-                ), "cryptoswap_adapter: failed to transfer coins"
-        else:
-            raw_call(msg.sender, b"", value=out_amount)
+        )
+        if amount_out != QUOTE_FAILED and amount_out > best_amount_out:
+            best_hop = hop
+            best_amount_out = amount_out
+
+    assert best_hop.pool != empty(address), "cryptoswap_adapter: no pool for pair"
+
+    # fee on transfer coins exchange the amount received
+    amount_received: uint256 = self._transfer_in_received(token_in, amount_in)
+
+    out_amount: uint256 = self._exchange(
+        self.pool_registry[best_hop.pool],
+        best_hop.index_in,
+        best_hop.index_out,
+        amount_received,
+        min_amount_out,
+        False,
+    )
+
+    if out_amount > 0:
+        self._transfer_out(token_out, msg.sender, out_amount)
+
     log Exchange(
-        pool=pool_address,
-        index_in=index_in,
-        index_out=index_out,
+        pool=best_hop.pool,
+        index_in=best_hop.index_in,
+        index_out=best_hop.index_out,
         amount_in=amount_in,
         min_amount_out=min_amount_out,
         out_amount=out_amount,
     )
 
+    return out_amount
+
 
 @external
 @payable
@@ -351,105 +549,43 @@ def add_liquidity(
     @param use_eth whether to use ETH for the exchange
     @return mint_amount amount of lp tokens minted
     """
+    mint_amount: uint256 = self._mint_lp(
+        pool_address, amounts, min_mint_amount, use_eth
+    )
 
-    pool_info: Pool = self.pool_registry[pool_address]
-
-    self._check_are_amounts_valid(pool_address, amounts)
-    self._check_is_pool_valid(pool_address)
-
-    coins: address[
-        META_REGISTRY_COINS_CAP
-    ] = staticcall meta_registry.get_coins(pool_address)
-
-    # because some tokens can have fees on transfer, we need to approve and send to curve pool actual amounts after fees charged
-    amounts_after_fees: DynArray[uint256, MAX_COINS] = []
-
-    counter: uint256 = 0
-    for amount: uint256 in amounts:
-        in_coin: address = coins[counter]
-        counter += 1
-        if amount > 0:
-            if not (use_eth and in_coin == WETH20):
-                balance_before_fees: uint256 = staticcall IERC20(
-                    in_coin
-                ).balanceOf(self)
-
-                responseTransfer: Bytes[32] = raw_call(
-                    in_coin,
-                    abi_encode(
-                        msg.sender,
-                        self,
-                        amount,
-                        method_id=method_id(
-                            "transferFrom(address,address,uint256)"
-                        ),
-                    ),
-                    max_outsize=32,
-                )
-                if len(responseTransfer) > 0:
-                    assert convert(
-                        responseTransfer, bool
-                    ), "cryptoswap_adapter: failed to transfer coins"
-
-                balance_after_fees: uint256 = staticcall IERC20(
-                    in_coin
-                ).balanceOf(self)
-                amount_after_fees: uint256 = (
-                    balance_after_fees - balance_before_fees
-                )
-
-                amounts_after_fees.append(amount_after_fees)
-
-                responseApprove: Bytes[32] = raw_call(
-                    in_coin,
-                    abi_encode(
-                        pool_info.contract,
-                        amount_after_fees,
-                        method_id=method_id("approve(address,uint256)"),
-                    ),
-                    max_outsize=32,
-                )
-                if len(responseApprove) > 0:
-                    assert convert(
-                        responseApprove, bool
-                    ), "cryptoswap_adapter: failed to approve coins"
-            else:
-                amounts_after_fees.append(msg.value)
-    mint_amount: uint256 = 0
+    if mint_amount > 0:
+        self._transfer_out(
+            self.pool_registry[pool_address].lp_token, msg.sender, mint_amount
+        )
 
-    lp_balance_before: uint256 = staticcall IERC20(
-        pool_info.lp_token
-    ).balanceOf(self)
+    return mint_amount
 
-    cryptoswap_liquidity._add_liquidity(
-        pool_info.contract, amounts_after_fees, min_mint_amount, use_eth
-    )
 
-    lp_balance_after: uint256 = staticcall IERC20(pool_info.lp_token).balanceOf(
-        self
+@external
+@payable
+@nonreentrant
+def add_liquidity_and_stake(
+    pool_address: address,
+    amounts: DynArray[uint256, MAX_COINS],
+    min_mint_amount: uint256,
+    use_eth: bool,
+) -> uint256:
+    """
+    @notice Add liquidity to a pool and deposit the minted lp tokens to its gauge for msg.sender
+    @param pool_address address of the pool contract
+    @param amounts array of amounts of coins to add
+    @param min_mint_amount minimum amount of lp tokens to mint
+    @param use_eth whether to use ETH for the exchange
+    @return mint_amount amount of lp tokens minted and deposited
+    @dev The lp tokens go from this contract to the gauge without being transferred to msg.sender.
+    msg.sender should call 'def set_approve_deposit(addr: address, can_deposit: bool)' from gauge contract
+    to allow this contract to deposit lp tokens to gauge
+    """
+    mint_amount: uint256 = self._mint_lp(
+        pool_address, amounts, min_mint_amount, use_eth
     )
-    mint_amount = lp_balance_after - lp_balance_before
 
-    if mint_amount > 0:
-        response: Bytes[32] = raw_call(
-            pool_info.lp_token,
-            abi_encode(
-                msg.sender,
-                mint_amount,
-                method_id=method_id("transfer(address,uint256)"),
-            ),
-            max_outsize=32,
-        )
-        if len(response) > 0:
-            assert convert(
-                response, bool
-            ), "cryptoswap_adapter: failed to transfer coins"
-    log LiquidityAdded(
-        pool=pool_address,
-        amounts=amounts,
-        min_mint_amount=min_mint_amount,
-        mint_amount=mint_amount,
-    )
+    self._stake_lp(pool_address, mint_amount)
 
     return mint_amount
 
@@ -473,73 +609,47 @@ def remove_liquidity(
 
     pool_info: Pool = self.pool_registry[pool_address]
 
-    response_tf: Bytes[32] = raw_call(
-        pool_info.lp_token,
-        abi_encode(
-            msg.sender,
-            self,
-            amount,
-            method_id=method_id("transferFrom(address,address,uint256)"),
-        ),
-        max_outsize=32,
-    )
-    if len(response_tf) > 0:
-        assert convert(
-            response_tf, bool
-        ), "cryptoswap_adapter: failed to transfer coins"
+    self._transfer_in(pool_info.lp_token, amount)
 
-    coins: address[
-        META_REGISTRY_COINS_CAP
-    ] = staticcall meta_registry.get_coins(pool_address)
+    is_returned: bool = self._returns_amounts(pool_info)
 
     balances_before: DynArray[uint256, MAX_COINS] = []
-    counter_before: uint256 = 0
-    for i: uint256 in min_amounts:
-        if not (use_eth and coins[counter_before] == WETH20):
-            balances_before.append(
-                staticcall IERC20(coins[counter_before]).balanceOf(self)
+    for i: uint256 in range(len(min_amounts), bound=MAX_COINS):
+        balances_before.append(
+            self._get_removed_coin_balance(
+                self.pool_coins[pool_address][i], use_eth, is_returned
             )
-        else:
-            balances_before.append(self.balance)
-        counter_before += 1
+        )
 
-    cryptoswap_liquidity._remove_liquidity(
+    response: Bytes[32 * MAX_COINS] = cryptoswap_liquidity._remove_liquidity(
         pool_info.contract, amount, min_amounts, use_eth
     )
 
-    balances_after: DynArray[uint256, MAX_COINS] = []
-    counter_after: uint256 = 0
-    for i: uint256 in min_amounts:
-        if not (use_eth and coins[counter_after] == WETH20):
-            balances_after.append(
-                staticcall IERC20(coins[counter_after]).balanceOf(self)
+    # short responses are measured, this contract holds no coins between calls so their balances were 0
+    is_returned = is_returned and len(response) == 32 * len(min_amounts)
+
+    for i: uint256 in range(len(min_amounts), bound=MAX_COINS):
+        out_coin: address = self.pool_coins[pool_address][i]
+        out_amount: uint256 = 0
+        if (
+            is_returned
+            and (
+                (use_eth and out_coin == WETH20)
+                or not self.fee_on_transfer_coins[out_coin]
             )
+        ):
+            out_amount = extract32(response, i * 32, output_type=uint256)
         else:
-            balances_after.append(self.balance)
-        counter_after += 1
-
-    counter: uint256 = 0
-    for i: uint256 in min_amounts:
-        out_amount: uint256 = balances_after[counter] - balances_before[counter]
+            out_amount = (
+                self._get_removed_coin_balance(out_coin, use_eth, False)
+                - balances_before[i]
+            )
 
         if out_amount > 0:
-            if not (use_eth and coins[counter] == WETH20):
-                response_t: Bytes[32] = raw_call(
-                    coins[counter],
-                    concat(
-                        method_id("transfer(address,uint256)"),
-                        convert(msg.sender, bytes32),
-                        convert(out_amount, bytes32),
-                    ),
-                    max_outsize=32,
-                )
-                if len(response_t) > 0:
-                    assert convert(
-                        response_t, bool
-                    ), "cryptoswap_adapter: failed to transfer coins"
+            if not (use_eth and out_coin == WETH20):
+                self._transfer_out(out_coin, msg.sender, out_amount)
             else:
                 raw_call(msg.sender, b"", value=out_amount)
-        counter += 1
 
     log LiquidityRemoved(
         pool=pool_address,
@@ -569,69 +679,38 @@ def remove_liquidity_one_coin(
 
     pool_info: Pool = self.pool_registry[pool_address]
 
-    response_tf: Bytes[32] = raw_call(
-        pool_info.lp_token,
-        abi_encode(
-            msg.sender,
-            self,
-            lp_amount,
-            method_id=method_id("transferFrom(address,address,uint256)"),
-        ),
-        max_outsize=32,
+    self._transfer_in(pool_info.lp_token, lp_amount)
+
+    out_coin: address = self.pool_coins[pool_address][coin_index]
+    is_token_out_is_eth: bool = use_eth and out_coin == WETH20
+
+    is_returned: bool = self._returns_amounts(pool_info)
+
+    coin_indexed_balance_before: uint256 = self._get_removed_coin_balance(
+        out_coin, use_eth, is_returned
     )
-    if len(response_tf) > 0:
-        assert convert(
-            response_tf, bool
-        ), "stableswap_adapter: failed to transfer coins"
 
-    coins: address[
-        META_REGISTRY_COINS_CAP
-    ] = staticcall meta_registry.get_coins(pool_address)
+    response: Bytes[32] = cryptoswap_liquidity._remove_liquidity_one_coin(
+        pool_info.contract, lp_amount, coin_index, min_amount, use_eth
+    )
 
-    coin_indexed_balance_before: uint256 = 0
-    if not (use_eth and coins[coin_index] == WETH20):
-        coin_indexed_balance_before = staticcall IERC20(
-            coins[coin_index]
-        ).balanceOf(self)
-    else:
-        coin_indexed_balance_before = self.balance
+    # short responses are measured, this contract holds no coins between calls so the balance was 0
+    is_returned = is_returned and len(response) == 32
 
-    if pool_info.n_coins == MAX_COINS:
-        extcall i_tricrypto(pool_info.contract).remove_liquidity_one_coin(
-            lp_amount, coin_index, min_amount, use_eth
-        )
+    out_amount: uint256 = 0
+    if is_returned and (
+        is_token_out_is_eth or not self.fee_on_transfer_coins[out_coin]
+    ):
+        out_amount = convert(response, uint256)
     else:
-        extcall i_twocrypto(pool_info.contract).remove_liquidity_one_coin(
-            lp_amount, coin_index, min_amount, use_eth
+        out_amount = (
+            self._get_removed_coin_balance(out_coin, use_eth, False)
+            - coin_indexed_balance_before
         )
 
-    coin_indexed_balance_after: uint256 = 0
-    if not (use_eth and coins[coin_index] == WETH20):
-        coin_indexed_balance_after = staticcall IERC20(
-            coins[coin_index]
-        ).balanceOf(self)
-    else:
-        coin_indexed_balance_after = self.balance
-
-    out_amount: uint256 = (
-        coin_indexed_balance_after - coin_indexed_balance_before
-    )
-
     if out_amount > 0:
-        if not (use_eth and coins[coin_index] == WETH20):
-            response_t: Bytes[32] = raw_call(
-                coins[coin_index],
-                abi_encode(
-                    msg.sender,
-                    out_amount,
-                    method_id=method_id("transfer(address,uint256)"),
-                ),
-                max_outsize=32,
-            )
-            if len(response_t) > 0:
-                assert convert(
-                    response_t, bool
-                ), "cryptoswap_adapter: failed to transfer coins"
+        if not is_token_out_is_eth:
+            self._transfer_out(out_coin, msg.sender, out_amount)
         else:
             raw_call(msg.sender, b"", value=out_amount)
     log LiquidityRemovedOneCoin(
@@ -655,41 +734,9 @@ def deposit_lp_for_crv(pool_address: address, lp_amount: uint256):
 
     pool_info: Pool = self.pool_registry[pool_address]
 
-    response_tf: Bytes[32] = raw_call(
-        pool_info.lp_token,
-        abi_encode(
-            msg.sender,
-            self,
-            lp_amount,
-            method_id=method_id("transferFrom(address,address,uint256)"),
-        ),
-        max_outsize=32,
-    )
-    if len(response_tf) > 0:
-        assert convert(
-            response_tf, bool
-        ), "cryptoswap_adapter: failed to transfer coins"
-
-    response_a: Bytes[32] = raw_call(
-        pool_info.lp_token,
-        abi_encode(
-            pool_info.gauge,
-            lp_amount,
-            method_id=method_id("approve(address,uint256)"),
-        ),
-        max_outsize=32,
-    )
-    if len(response_a) > 0:
-        assert convert(
-            response_a, bool
-        ), "cryptoswap_adapter: failed to transfer coins"
+    self._transfer_in(pool_info.lp_token, lp_amount)
 
-    extcall i_gauge_cryptoswap(pool_info.gauge).deposit(lp_amount, msg.sender)
-
-    log LiquidityDepositedForCrv(
-        pool=pool_address,
-        lp_amount=lp_amount,
-    )
+    self._stake_lp(pool_address, lp_amount)
 
 
 @external
@@ -700,17 +747,108 @@ def claim_crv_rewards(pool_address: address):
     Required msg.sender to have approved this contract to claim CRV rewards from minter
     msg.sender should call 'def toggle_approve_mint(minting_user: address)' from minter contract
     """
-    self._check_is_pool_valid(pool_address)
+    self._claim_crv_rewards(pool_address)
 
-    pool_info: Pool = self.pool_registry[pool_address]
 
-    extcall minter.mint_for(pool_info.gauge, msg.sender)
+@external
+def claim_crv_rewards_many(
+    pool_addresses: DynArray[address, CLAIM_BATCH_CAP],
+):
+    """
+    @notice Claim CRV rewards from minter for several pools in one transaction
+    @param pool_addresses addresses of the pool contracts
+    Required msg.sender to have approved this contract to claim CRV rewards from minter
+    msg.sender should call 'def toggle_approve_mint(minting_user: address)' from minter contract
+    @dev minter.mint_many mints for its caller, which is this contract, so mint_for is called for each gauge instead.
+    """
+    for pool_address: address in pool_addresses:
+        self._claim_crv_rewards(pool_address)
+
 
-    log CrvRewardsClaimed(
-        pool=pool_address,
+@external
+def permit(
+    coin: address,
+    amount: uint256,
+    deadline: uint256,
+    v: uint8,
+    r: bytes32,
+    s: bytes32,
+):
+    """
+    @notice Approve this contract to spend coins of msg.sender with an EIP-2612 signature
+    @param coin address of the coin or lp token supporting EIP-2612
+    @param amount amount of coins to approve
+    @param deadline timestamp at which the signature expires
+    @param v v component of the signature
+    @param r r component of the signature
+    @param s s component of the signature
+    @dev Meant to be batched with the operation spending the coins through multicall.
+    @dev A failed permit is ignored if the allowance is already granted,
+    so a front-run signature cannot block the operation.
+    """
+    success: bool = raw_call(
+        coin,
+        abi_encode(
+            msg.sender,
+            self,
+            amount,
+            deadline,
+            v,
+            r,
+            s,
+            method_id=method_id(
+                "permit(address,address,uint256,uint256,uint8,bytes32,bytes32)"
+            ),
+        ),
+        revert_on_failure=False,
+    )
+    if not success:
+        assert (
+            staticcall IERC20(coin).allowance(msg.sender, self) >= amount
+        ), "cryptoswap_adapter: permit failed"
+
+
+@external
+def permit2(permit_single: i_permit2.PermitSingle, signature: Bytes[65]):
+    """
+    @notice Approve this contract to spend coins of msg.sender through Permit2
+    @param permit_single allowance signed by msg.sender, the spender must be this contract
+    @param signature signature of the allowance
+    @dev Coins are pulled through Permit2 when msg.sender has not approved this contract directly.
+    @dev Meant to be batched with the operation spending the coins through multicall.
+    """
+    extcall i_permit2(PERMIT2).permit(
+        msg.sender, permit_single, signature
     )
 
 
+@external
+def multicall(
+    calls: DynArray[Bytes[MULTICALL_CALL_SIZE], MULTICALL_CAP],
+) -> DynArray[Bytes[MULTICALL_RESULT_SIZE], MULTICALL_CAP]:
+    """
+    @notice Execute several calls to this contract in one transaction
+    @param calls abi encoded calls to this contract
+    @return results return data of each call
+    @dev Calls are delegated to this contract, so msg.sender is kept.
+    @dev Not payable, so msg.value cannot be reused across calls.
+    @dev Reverts when a result fills MULTICALL_RESULT_SIZE, since raw_call truncates longer return data.
+    """
+    results: DynArray[Bytes[MULTICALL_RESULT_SIZE], MULTICALL_CAP] = []
+    for call_data: Bytes[MULTICALL_CALL_SIZE] in calls:
+        result: Bytes[MULTICALL_RESULT_SIZE] = raw_call(
+            self,
+            call_data,
+            max_outsize=MULTICALL_RESULT_SIZE,
+            is_delegate_call=True,
+        )
+        assert (
+            len(result) < MULTICALL_RESULT_SIZE
+        ), "cryptoswap_adapter: multicall result too large"
+        results.append(result)
+    return results
+
+
 # ------------------------------------------------------------------
 #                               VIEW
 # ------------------------------------------------------------------
@@ -735,15 +873,7 @@ def get_exchange_amount_out(
 
     pool_info: Pool = self.pool_registry[pool_address]
 
-    assert (
-        index_in >= 0 and index_in < pool_info.n_coins
-    ), "cryptoswap_adapter: index in out of bounds"
-    assert (
-        index_out >= 0 and index_out < pool_info.n_coins
-    ), "cryptoswap_adapter: index out out of bounds"
-    assert (
-        index_in != index_out
-    ), "cryptoswap_adapter: index in and index out cannot be the same"
+    self._check_are_indexes_valid(pool_info, index_in, index_out)
 
     out_amount: uint256 = 0
     if pool_info.n_coins == MAX_COINS:
@@ -844,7 +974,19 @@ def get_pools_count() -> uint256:
     @notice Get the number of pools registered in the adapter
     @return pools_count number of pools registered
     """
-    return len(self.pool_registry_set)
+    return self.pools_count
+
+
+@external
+@view
+def get_pair_pools_count(token_a: address, token_b: address) -> uint256:
+    """
+    @notice Get the number of registered pools that exchange a pair of coins
+    @param token_a address of one coin of the pair
+    @param token_b address of the other coin of the pair
+    @return pools_count number of pools exchanging the pair
+    """
+    return self.pair_pools_count[self._pair_key(token_a, token_b)]
 
 
 # ------------------------------------------------------------------
@@ -882,3 +1024,545 @@ def _check_are_amounts_valid(
     assert (
         len(amounts) == pool_info.n_coins
     ), "cryptoswap_adapter: invalid number of amounts"
+
+
+@internal
+@pure
+def _check_are_indexes_valid(
+    pool_info: Pool, index_in: uint256, index_out: uint256
+):
+    """
+    @notice Check if the coin indexes are valid for an exchange
+    @param pool_info pool to exchange in
+    @param index_in index of the coin to exchange
+    @param index_out index of the coin to receive
+    """
+    assert (
+        index_in >= 0 and index_in < pool_info.n_coins
+    ), "cryptoswap_adapter: index in out of bounds"
+    assert (
+        index_out >= 0 and index_out < pool_info.n_coins
+    ), "cryptoswap_adapter: index out out of bounds"
+    assert (
+        index_in != index_out
+    ), "cryptoswap_adapter: index in and index out cannot be the same"
+
+
+@payable
+@internal
+def _exchange(
+    pool_info: Pool,
+    index_in: uint256,
+    index_out: uint256,
+    amount_in: uint256,
+    min_amount_out: uint256,
+    use_eth: bool,
+) -> uint256:
+    """
+    @notice Exchange coins held by this contract in a pool
+    @param pool_info pool to exchange in
+    @param index_in index of the coin to exchange
+    @param index_out index of the coin to receive
+    @param amount_in amount of coin to exchange
+    @param min_amount_out minimum amount of coin to receive
+    @param use_eth whether to use ETH for the exchange
+    @return out_amount amount of coin received by this contract
+    """
+    in_coin: address = self.pool_coins[pool_info.contract][index_in]
+    out_coin: address = self.pool_coins[pool_info.contract][index_out]
+
+    is_token_in_is_eth: bool = use_eth and in_coin == WETH20
+    is_token_out_is_eth: bool = use_eth and out_coin == WETH20
+
+    if not is_token_in_is_eth:
+        self._approve(in_coin, pool_info.contract, amount_in)
+
+    is_returned: bool = self._returns_amounts(pool_info)
+
+    out_token_balance_before: uint256 = self._get_removed_coin_balance(
+        out_coin, use_eth, is_returned
+    )
+
+    # twocrypto and tricrypto pools share the exchange signature
+    response: Bytes[32] = raw_call(
+        pool_info.contract,
+        abi_encode(
+            index_in,
+            index_out,
+            amount_in,
+            min_amount_out,
+            use_eth,
+            method_id=method_id("exchange(uint256,uint256,uint256,uint256,bool)"),
+        ),
+        max_outsize=32,
+        value=msg.value,
+    )
+
+    # short responses are measured, this contract holds no coins between calls so the balance was 0
+    if is_returned and len(response) == 32 and (
+        is_token_out_is_eth or not self.fee_on_transfer_coins[out_coin]
+    ):
+        return convert(response, uint256)
+
+    return (
+        self._get_removed_coin_balance(out_coin, use_eth, False)
+        - out_token_balance_before
+    )
+
+
+@internal
+@pure
+def _returns_amounts(pool_info: Pool) -> bool:
+    """
+    @notice Check if a pool returns the amounts of its liquidity functions
+    @param pool_info pool to check
+    @return is_returned whether the pool returns the amounts minted and sent
+    @dev ng pools are their own lp token and return the amounts,
+    legacy pools with a separate lp token (e.g. tricrypto2) may return nothing and are measured
+    """
+    return pool_info.lp_token == pool_info.contract
+
+
+@internal
+@view
+def _get_removed_coin_balance(
+    coin: address, use_eth: bool, is_returned: bool
+) -> uint256:
+    """
+    @notice Get the balance of a coin removed from a pool
+    @param coin address of the coin
+    @param use_eth whether the coin is received as ETH
+    @param is_returned whether the pool returns the amount sent
+    @return balance balance of the coin, 0 if it does not need to be measured
+    """
+    is_eth: bool = use_eth and coin == WETH20
+    if is_returned and (is_eth or not self.fee_on_transfer_coins[coin]):
+        return 0
+
+    if is_eth:
+        return self.balance
+
+    return staticcall IERC20(coin).balanceOf(self)
+
+
+@internal
+@view
+def _get_exchange_amount_out_or_failed(request: QuoteRequest) -> uint256:
+    """
+    @notice Get the amount of coins out after exchanging without reverting
+    @param request exchange to quote
+    @return amount_out amount of coin to receive, QUOTE_FAILED if the quote failed
+    """
+    pool_info: Pool = self.pool_registry[request.pool]
+
+    if request.pool != pool_info.contract:
+        return QUOTE_FAILED
+
+    if (
+        request.index_in >= pool_info.n_coins
+        or request.index_out >= pool_info.n_coins
+        or request.index_in == request.index_out
+    ):
+        return QUOTE_FAILED
+
+    success: bool = False
+    response: Bytes[32] = b""
+    success, response = raw_call(
+        pool_info.contract,
+        abi_encode(
+            request.index_in,
+            request.index_out,
+            request.amount_in,
+            method_id=method_id("get_dy(uint256,uint256,uint256)"),
+        ),
+        max_outsize=32,
+        is_static_call=True,
+        revert_on_failure=False,
+    )
+
+    if not success or len(response) != 32:
+        return QUOTE_FAILED
+
+    return convert(response, uint256)
+
+
+@internal
+@pure
+def _pair_key(token_a: address, token_b: address) -> bytes32:
+    """
+    @notice Get the key of an unordered coin pair
+    @param token_a address of one coin of the pair
+    @param token_b address of the other coin of the pair
+    @return pair_key same key for (token_a, token_b) and (token_b, token_a)
+    """
+    if convert(token_a, uint256) < convert(token_b, uint256):
+        return keccak256(abi_encode(token_a, token_b))
+    return keccak256(abi_encode(token_b, token_a))
+
+
+@internal
+@view
+def _find_pools_for_pair(
+    token_a: address, token_b: address
+) -> DynArray[RouteHop, PAIR_POOLS_CAP]:
+    """
+    @notice Find registered pools that exchange a pair of coins
+    @param token_a address of the coin to exchange
+    @param token_b address of the coin to receive
+    @return pools pools with the indexes of token_a and token_b in each one
+    """
+    pair_key: bytes32 = self._pair_key(token_a, token_b)
+
+    pools: DynArray[RouteHop, PAIR_POOLS_CAP] = []
+    for i: uint256 in range(
+        min(self.pair_pools_count[pair_key], PAIR_POOLS_CAP),
+        bound=PAIR_POOLS_CAP,
+    ):
+        pool_address: address = self.pair_pools[pair_key][i]
+        hop: RouteHop = RouteHop(pool=pool_address, index_in=0, index_out=0)
+        for j: uint256 in range(
+            self.pool_registry[pool_address].n_coins, bound=MAX_COINS
+        ):
+            coin: address = self.pool_coins[pool_address][j]
+            if coin == token_a:
+                hop.index_in = j
+            elif coin == token_b:
+                hop.index_out = j
+        pools.append(hop)
+
+    return pools
+
+
+@internal
+def _add_pair_pool(pair_key: bytes32, pool_address: address):
+    """
+    @notice Add a pool to the set of pools exchanging a coin pair
+    @param pair_key key of the coin pair
+    @param pool_address address of the pool contract
+    """
+    pair_pool_id: uint256 = self.pair_pools_count[pair_key]
+    self.pair_pools[pair_key][pair_pool_id] = pool_address
+    self.pair_pools_index[pair_key][pool_address] = pair_pool_id + 1
+    self.pair_pools_count[pair_key] = pair_pool_id + 1
+
+
+@internal
+def _remove_pair_pool(pair_key: bytes32, pool_address: address):
+    """
+    @notice Remove a pool from the set of pools exchanging a coin pair
+    @param pair_key key of the coin pair
+    @param pool_address address of the pool contract
+    @dev The last pool of the pair is moved into the freed id.
+    """
+    index: uint256 = self.pair_pools_index[pair_key][pool_address]
+
+    last_id: uint256 = self.pair_pools_count[pair_key] - 1
+    if index - 1 != last_id:
+        last_pool: address = self.pair_pools[pair_key][last_id]
+        self.pair_pools[pair_key][index - 1] = last_pool
+        self.pair_pools_index[pair_key][last_pool] = index
+
+    self.pair_pools[pair_key][last_id] = empty(address)
+    self.pair_pools_index[pair_key][pool_address] = 0
+    self.pair_pools_count[pair_key] = last_id
+
+
+@internal
+@payable
+def _mint_lp(
+    pool_address: address,
+    amounts: DynArray[uint256, MAX_COINS],
+    min_mint_amount: uint256,
+    use_eth: bool,
+) -> uint256:
+    """
+    @notice Add liquidity to a pool, keeping the minted lp tokens in this contract
+    @param pool_address address of the pool contract
+    @param amounts array of amounts of coins to add
+    @param min_mint_amount minimum amount of lp tokens to mint
+    @param use_eth whether to use ETH for the exchange
+    @return mint_amount amount of lp tokens minted
+    """
+    pool_info: Pool = self.pool_registry[pool_address]
+
+    self._check_are_amounts_valid(pool_address, amounts)
+    self._check_is_pool_valid(pool_address)
+
+    # because some tokens can have fees on transfer, we need to approve and send to curve pool actual amounts after fees charged
+    amounts_after_fees: DynArray[uint256, MAX_COINS] = []
+
+    counter: uint256 = 0
+    for amount: uint256 in amounts:
+        in_coin: address = self.pool_coins[pool_address][counter]
+        counter += 1
+        if amount > 0:
+            if not (use_eth and in_coin == WETH20):
+                amount_after_fees: uint256 = self._transfer_in_received(
+                    in_coin, amount
+                )
+
+                amounts_after_fees.append(amount_after_fees)
+
+                self._approve(in_coin, pool_info.contract, amount_after_fees)
+            else:
+                amounts_after_fees.append(msg.value)
+
+    is_returned: bool = self._returns_amounts(pool_info)
+
+    lp_balance_before: uint256 = 0
+    if not is_returned:
+        lp_balance_before = staticcall IERC20(pool_info.lp_token).balanceOf(
+            self
+        )
+
+    response: Bytes[32] = cryptoswap_liquidity._add_liquidity(
+        pool_info.contract, amounts_after_fees, min_mint_amount, use_eth
+    )
+
+    mint_amount: uint256 = 0
+    # short responses are measured, this contract holds no lp tokens between calls so the balance was 0
+    if is_returned and len(response) == 32:
+        mint_amount = convert(response, uint256)
+    else:
+        mint_amount = (
+            staticcall IERC20(pool_info.lp_token).balanceOf(self)
+            - lp_balance_before
+        )
+
+    log LiquidityAdded(
+        pool=pool_address,
+        amounts=amounts,
+        min_mint_amount=min_mint_amount,
+        mint_amount=mint_amount,
+    )
+
+    return mint_amount
+
+
+@internal
+def _stake_lp(pool_address: address, lp_amount: uint256):
+    """
+    @notice Deposit lp tokens held by this contract to the pool gauge for msg.sender
+    @param pool_address address of the pool contract
+    @param lp_amount amount of lp tokens to deposit
+    """
+    pool_info: Pool = self.pool_registry[pool_address]
+
+    self._approve(pool_info.lp_token, pool_info.gauge, lp_amount)
+
+    extcall i_gauge_cryptoswap(pool_info.gauge).deposit(lp_amount, msg.sender)
+
+    log LiquidityDepositedForCrv(
+        pool=pool_address,
+        lp_amount=lp_amount,
+    )
+
+
+@internal
+def _claim_crv_rewards(pool_address: address):
+    """
+    @notice Claim CRV rewards of msg.sender from minter for a pool
+    @param pool_address address of the pool contract
+    """
+    self._check_is_pool_valid(pool_address)
+
+    extcall minter.mint_for(self.pool_registry[pool_address].gauge, msg.sender)
+
+    log CrvRewardsClaimed(
+        pool=pool_address,
+    )
+
+
+@internal
+def _register_pool(pool_address: address) -> RegisterStatus:
+    """
+    @notice Register a new pool in the adapter.
+    @param pool_address address of the pool contract
+    @return status REGISTERED on success, otherwise the reason the pool was not registered
+    @dev It will fetch pool info from meta registry and register it in the adapter.
+    @dev Does not revert on invalid pools, callers decide how to handle the status.
+    """
+    if self.pool_registry_index[pool_address] != 0:
+        return RegisterStatus.ALREADY_REGISTERED
+
+    # check if pool is registered in meta registry (native curve registry)
+    # make raw_call for custom error handling
+    # second optional argument must be set in raw_call
+    success: bool = False
+    response: Bytes[32] = b""
+    success, response = raw_call(
+        meta_registry.address,
+        concat(
+            method_id("is_registered(address,uint256)"),
+            convert(pool_address, bytes32),
+            convert(0, bytes32),
+        ),
+        max_outsize=32,
+        revert_on_failure=False,
+    )
+    if not success:
+        return RegisterStatus.NOT_IN_META_REGISTRY
+
+    n_coins: uint256 = staticcall meta_registry.get_n_coins(pool_address)
+
+    if n_coins > MAX_COINS:
+        return RegisterStatus.TOO_MANY_COINS
+
+    pool_gauge: address = staticcall meta_registry.get_gauge(pool_address)
+    lp_token: address = staticcall meta_registry.get_lp_token(pool_address)
+    coins: address[
+        META_REGISTRY_COINS_CAP
+    ] = staticcall meta_registry.get_coins(pool_address)
+
+    pool_id: uint256 = self.pools_count
+    self.pool_registry_set[pool_id] = pool_address
+    self.pool_registry_index[pool_address] = pool_id + 1
+    self.pools_count = pool_id + 1
+    self.pool_registry[pool_address] = Pool(
+        contract=pool_address,
+        gauge=pool_gauge,
+        lp_token=lp_token,
+        n_coins=n_coins,
+    )
+
+    # coins never change after pool deployment, so they are stored once here
+    # instead of being fetched from meta registry on every operation
+    for i: uint256 in range(n_coins, bound=MAX_COINS):
+        self.pool_coins[pool_address][i] = coins[i]
+
+    for i: uint256 in range(n_coins, bound=MAX_COINS):
+        for j: uint256 in range(i + 1, n_coins, bound=MAX_COINS):
+            self._add_pair_pool(
+                self._pair_key(coins[i], coins[j]), pool_address
+            )
+
+    log PoolRegistered(
+        pool=pool_address,
+        gauge=pool_gauge,
+        lp_token=lp_token,
+        n_coins=n_coins,
+    )
+
+    return RegisterStatus.REGISTERED
+
+
+@internal
+def _transfer_in(coin: address, amount: uint256):
+    """
+    @notice Transfer coins from msg.sender to this contract
+    @param coin address of the coin
+    @param amount amount of coins to transfer
+    @dev Supports coins that do not return a bool (e.g. USDT)
+    @dev Coins not approved to this contract are pulled through a Permit2 allowance
+    """
+    if staticcall IERC20(coin).allowance(msg.sender, self) < amount:
+        extcall i_permit2(PERMIT2).transferFrom(
+            msg.sender, self, convert(amount, uint160), coin
+        )
+        return
+
+    response: Bytes[32] = raw_call(
+        coin,
+        abi_encode(
+            msg.sender,
+            self,
+            amount,
+            method_id=method_id("transferFrom(address,address,uint256)"),
+        ),
+        max_outsize=32,
+    )
+    if len(response) > 0:
+        assert convert(
+            response, bool
+        ), "cryptoswap_adapter: failed to transfer coins"
+
+
+@internal
+def _transfer_in_received(coin: address, amount: uint256) -> uint256:
+    """
+    @notice Transfer coins from msg.sender to this contract
+    @param coin address of the coin
+    @param amount amount of coins to transfer
+    @return received amount of coins received by this contract
+    @dev Balance is only measured for coins declared as fee on transfer.
+    """
+    if not self.fee_on_transfer_coins[coin]:
+        self._transfer_in(coin, amount)
+        return amount
+
+    balance_before: uint256 = staticcall IERC20(coin).balanceOf(self)
+
+    self._transfer_in(coin, amount)
+
+    return staticcall IERC20(coin).balanceOf(self) - balance_before
+
+
+@internal
+def _transfer_out(coin: address, receiver: address, amount: uint256):
+    """
+    @notice Transfer coins from this contract to receiver
+    @param coin address of the coin
+    @param receiver address of the receiver
+    @param amount amount of coins to transfer
+    @dev Supports coins that do not return a bool (e.g. USDT)
+    """
+    response: Bytes[32] = raw_call(
+        coin,
+        abi_encode(
+            receiver,
+            amount,
+            method_id=method_id("transfer(address,uint256)"),
+        ),
+        max_outsize=32,
+    )
+    if len(response) > 0:
+        assert convert(
+            response, bool
+        ), "cryptoswap_adapter: failed to transfer coins"
+
+
+@internal
+def _approve(coin: address, spender: address, amount: uint256):
+    """
+    @notice Make sure spender can spend coins of this contract
+    @param coin address of the coin
+    @param spender address of the spender
+    @param amount amount of coins spender must be able to spend
+    @dev A max allowance is granted once and reused by later calls,
+    approve is only sent again when the remaining allowance is too low.
+    The allowance stored by the coin is the record of what was granted.
+    This contract holds no coins between calls, so standing allowances expose nothing.
+    @dev Coins like USDT refuse to change a non-zero allowance, so it is reset to zero first.
+    """
+    allowance: uint256 = staticcall IERC20(coin).allowance(self, spender)
+    if allowance >= amount:
+        return
+
+    if allowance > 0:
+        self._set_allowance(coin, spender, 0)
+
+    self._set_allowance(coin, spender, max_value(uint256))
+
+
+@internal
+def _set_allowance(coin: address, spender: address, amount: uint256):
+    """
+    @notice Set the allowance of spender over coins of this contract
+    @param coin address of the coin
+    @param spender address of the spender
+    @param amount amount of coins to approve
+    @dev Supports coins that do not return a bool (e.g. USDT)
+    """
+    response: Bytes[32] = raw_call(
+        coin,
+        abi_encode(
+            spender,
+            amount,
+            method_id=method_id("approve(address,uint256)"),
+        ),
+        max_outsize=32,
+    )
+    if len(response) > 0:
+        assert convert(
+            response, bool
+        ), "cryptoswap_adapter: failed to approve coins"
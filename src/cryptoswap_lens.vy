@@ -0,0 +1,423 @@
+# pragma version 0.4.1
+# @license MIT
+
+"""
+@title CryptoSwap Adapter Lens
+@notice Read only views over the pools registered in a cryptoswap adapter
+Batched quotes, price impact ladders, pool snapshots, registry pages and coin pair lookups live here
+instead of in the adapter, which keeps the adapter under the EIP-170 contract size limit in its gas optimized build
+@dev Everything is read through the public getters of the adapter, so one lens serves one adapter
+"""
+
+import cryptoswap_adapter
+from interfaces import i_gauge_cryptoswap
+from interfaces import i_twocrypto
+from interfaces import i_tricrypto
+from ethereum.ercs import IERC20
+
+# ------------------------------------------------------------------
+#                              TYPES
+# ------------------------------------------------------------------
+
+# Stores a snapshot of a pool state
+struct PoolState:
+    # address of the pool contract
+    pool: address
+    # address of the gauge contract
+    gauge: address
+    # address of the lp token
+    lp_token: address
+    # number of coins in the pool
+    n_coins: uint256
+    # coins of the pool, empty after n_coins
+    coins: address[MAX_COINS]
+    # balances of the pool coins, in the same order as coins
+    balances: uint256[MAX_COINS]
+    # amplification coefficient
+    A: uint256
+    # gamma parameter of the pool curve
+    gamma: uint256
+    # invariant of the pool
+    D: uint256
+    # current swap fee
+    fee: uint256
+    # virtual price of the lp token
+    virtual_price: uint256
+    # price scale of each coin after the first against the first coin, empty after n_coins - 1
+    price_scale: uint256[MAX_COINS - 1]
+    # price oracle of each coin after the first against the first coin, empty after n_coins - 1
+    price_oracle: uint256[MAX_COINS - 1]
+    # total supply of the lp token
+    lp_total_supply: uint256
+    # total supply of lp tokens deposited to the gauge, 0 if there is no gauge
+    gauge_total_supply: uint256
+    # CRV inflation rate of the gauge, 0 if there is no gauge
+    gauge_inflation_rate: uint256
+    # block number of the snapshot
+    block_number: uint256
+
+
+# ------------------------------------------------------------------
+#                              STATE
+# ------------------------------------------------------------------
+
+# max number of coins in a pool
+MAX_COINS: constant(uint256) = cryptoswap_adapter.MAX_COINS
+# max number of quotes that can be requested in one call
+QUOTES_BATCH_CAP: constant(uint256) = 128
+# amount returned for a quote that failed
+QUOTE_FAILED: public(constant(uint256)) = cryptoswap_adapter.QUOTE_FAILED
+# max number of trade sizes in a price impact ladder
+LADDER_POINTS_CAP: constant(uint256) = 64
+# precision of effective prices in a price impact ladder
+PRICE_PRECISION: constant(uint256) = 10**18
+# max number of pools returned for a coin pair
+PAIR_POOLS_CAP: constant(uint256) = cryptoswap_adapter.PAIR_POOLS_CAP
+# max number of pool states that can be requested in one call
+POOL_STATES_CAP: constant(uint256) = 32
+# max number of pools returned in one page of the registry
+POOLS_PAGE_CAP: constant(uint256) = 100
+
+# adapter whose registered pools are read
+adapter: public(immutable(cryptoswap_adapter.__interface__))
+
+# ------------------------------------------------------------------
+#                            CONSTRUCTOR
+# ------------------------------------------------------------------
+
+@deploy
+def __init__(_adapter: address):
+    """
+    @param _adapter address of the cryptoswap adapter
+    """
+    adapter = cryptoswap_adapter.__interface__(_adapter)
+
+# ------------------------------------------------------------------
+#                               VIEW
+# ------------------------------------------------------------------
+
+@external
+@view
+def get_exchange_amounts_out(
+    requests: DynArray[cryptoswap_adapter.QuoteRequest, QUOTES_BATCH_CAP],
+) -> DynArray[uint256, QUOTES_BATCH_CAP]:
+    """
+    @notice Get the amounts of coins out for several exchanges in one call
+    @param requests exchanges to quote
+    @return amounts_out amount of coin to receive for each request, in the same order
+    @dev A request for an unregistered pool, with invalid indexes or for which the pool reverts
+    returns QUOTE_FAILED instead of reverting the whole batch.
+    """
+    amounts_out: DynArray[uint256, QUOTES_BATCH_CAP] = []
+    for request: cryptoswap_adapter.QuoteRequest in requests:
+        amounts_out.append(self._get_exchange_amount_out_or_failed(request))
+
+    return amounts_out
+
+
+@external
+@view
+def get_exchange_ladder(
+    pool_address: address,
+    index_in: uint256,
+    index_out: uint256,
+    amounts_in: DynArray[uint256, LADDER_POINTS_CAP],
+) -> (
+    DynArray[uint256, LADDER_POINTS_CAP],
+    DynArray[uint256, LADDER_POINTS_CAP],
+):
+    """
+    @notice Get the amounts of coins out and effective prices for several trade sizes
+    @param pool_address address of the pool contract
+    @param index_in index of the coin to exchange
+    @param index_out index of the coin to receive
+    @param amounts_in trade sizes to quote
+    @return amounts_out amount of coin to receive for each trade size
+    @return prices amount out per amount in scaled by PRICE_PRECISION, in raw coin units
+    @dev Trade sizes are quoted by the adapter, an unregistered pool or invalid indexes revert the whole ladder.
+    """
+    amounts_out: DynArray[uint256, LADDER_POINTS_CAP] = []
+    for amount_in: uint256 in amounts_in:
+        amounts_out.append(
+            staticcall adapter.get_exchange_amount_out(
+                pool_address, index_in, index_out, amount_in
+            )
+        )
+
+    prices: DynArray[uint256, LADDER_POINTS_CAP] = []
+    for i: uint256 in range(len(amounts_in), bound=LADDER_POINTS_CAP):
+        if amounts_in[i] == 0:
+            prices.append(0)
+        else:
+            prices.append(amounts_out[i] * PRICE_PRECISION // amounts_in[i])
+
+    return amounts_out, prices
+
+
+@external
+@view
+def get_pool_state(pool_address: address) -> PoolState:
+    """
+    @notice Get a snapshot of the pool, its lp token and gauge state in one call
+    @param pool_address address of the pool contract
+    @return pool_state PoolState struct containing the pool state
+    """
+    return self._get_pool_state(self._get_valid_pool_info(pool_address))
+
+
+@external
+@view
+def get_pool_states(
+    pool_addresses: DynArray[address, POOL_STATES_CAP],
+) -> DynArray[PoolState, POOL_STATES_CAP]:
+    """
+    @notice Get snapshots of several pools in one call
+    @param pool_addresses addresses of the pool contracts
+    @return pool_states PoolState struct for each pool, in the same order
+    @dev Reverts if any of the pools is not registered.
+    """
+    pool_states: DynArray[PoolState, POOL_STATES_CAP] = []
+    for pool_address: address in pool_addresses:
+        pool_states.append(
+            self._get_pool_state(self._get_valid_pool_info(pool_address))
+        )
+
+    return pool_states
+
+
+@external
+@view
+def get_pools(
+    offset: uint256, limit: uint256
+) -> (
+    DynArray[cryptoswap_adapter.Pool, POOLS_PAGE_CAP],
+    DynArray[address[MAX_COINS], POOLS_PAGE_CAP],
+):
+    """
+    @notice Get a page of registered pools with their coins
+    @param offset pool id of the first pool to return
+    @param limit max number of pools to return
+    @return pools Pool struct of each pool in the page, in pool id order
+    @return coins coins of each pool in the page, in the same order
+    @dev At most POOLS_PAGE_CAP pools are returned, fewer at the end of the registry.
+    @dev Pool ids are not stable across deregistrations, see the deregister_pool function of the adapter.
+    """
+    pools_count: uint256 = staticcall adapter.get_pools_count()
+
+    page_size: uint256 = 0
+    if offset < pools_count:
+        page_size = min(min(limit, POOLS_PAGE_CAP), pools_count - offset)
+
+    pools: DynArray[cryptoswap_adapter.Pool, POOLS_PAGE_CAP] = []
+    coins: DynArray[address[MAX_COINS], POOLS_PAGE_CAP] = []
+    for i: uint256 in range(page_size, bound=POOLS_PAGE_CAP):
+        pool_info: cryptoswap_adapter.Pool = staticcall adapter.get_pool_info(
+            staticcall adapter.pool_registry_set(offset + i)
+        )
+        pools.append(pool_info)
+        coins.append(self._get_pool_coins(pool_info))
+
+    return pools, coins
+
+
+@external
+@view
+def get_pools_count() -> uint256:
+    """
+    @notice Get the number of pools registered in the adapter
+    @return pools_count number of pools registered
+    """
+    return staticcall adapter.get_pools_count()
+
+
+@external
+@view
+def find_pools_for_pair(
+    token_a: address, token_b: address
+) -> DynArray[cryptoswap_adapter.RouteHop, PAIR_POOLS_CAP]:
+    """
+    @notice Find registered pools that exchange a pair of coins
+    @param token_a address of the coin to exchange
+    @param token_b address of the coin to receive
+    @return pools pools with the indexes of token_a and token_b in each one
+    @dev Returned items can be used as exchange_route hops of the adapter as is.
+    @dev At most PAIR_POOLS_CAP pools are returned, get_pair_pools_count of the adapter returns the total.
+    """
+    pair_key: bytes32 = self._pair_key(token_a, token_b)
+
+    pools: DynArray[cryptoswap_adapter.RouteHop, PAIR_POOLS_CAP] = []
+    for i: uint256 in range(
+        min(
+            staticcall adapter.get_pair_pools_count(token_a, token_b),
+            PAIR_POOLS_CAP,
+        ),
+        bound=PAIR_POOLS_CAP,
+    ):
+        pool_address: address = staticcall adapter.pair_pools(pair_key, i)
+        hop: cryptoswap_adapter.RouteHop = cryptoswap_adapter.RouteHop(
+            pool=pool_address, index_in=0, index_out=0
+        )
+        for j: uint256 in range(
+            (staticcall adapter.get_pool_info(pool_address)).n_coins,
+            bound=MAX_COINS,
+        ):
+            coin: address = staticcall adapter.pool_coins(pool_address, j)
+            if coin == token_a:
+                hop.index_in = j
+            elif coin == token_b:
+                hop.index_out = j
+        pools.append(hop)
+
+    return pools
+
+
+# ------------------------------------------------------------------
+#                             INTERNAL
+# ------------------------------------------------------------------
+
+@internal
+@view
+def _get_valid_pool_info(pool_address: address) -> cryptoswap_adapter.Pool:
+    """
+    @notice Get the info of a pool registered in the adapter
+    @param pool_address address of the pool contract
+    @return pool_info Pool struct containing pool information
+    @dev Reverts like the adapter if the pool is not registered.
+    """
+    pool_info: cryptoswap_adapter.Pool = staticcall adapter.get_pool_info(
+        pool_address
+    )
+    assert (
+        pool_address == pool_info.contract
+    ), "cryptoswap_lens: pool address mismatch"
+
+    return pool_info
+
+
+@internal
+@view
+def _get_pool_coins(
+    pool_info: cryptoswap_adapter.Pool,
+) -> address[MAX_COINS]:
+    """
+    @notice Get the coins of a registered pool cached by the adapter
+    @param pool_info pool to get the coins of
+    @return coins coins of the pool, empty after n_coins
+    """
+    coins: address[MAX_COINS] = empty(address[MAX_COINS])
+    for i: uint256 in range(pool_info.n_coins, bound=MAX_COINS):
+        coins[i] = staticcall adapter.pool_coins(pool_info.contract, i)
+
+    return coins
+
+
+@internal
+@view
+def _get_exchange_amount_out_or_failed(
+    request: cryptoswap_adapter.QuoteRequest,
+) -> uint256:
+    """
+    @notice Get the amount of coins out after exchanging without reverting
+    @param request exchange to quote
+    @return amount_out amount of coin to receive, QUOTE_FAILED if the quote failed
+    """
+    success: bool = False
+    response: Bytes[32] = b""
+    success, response = raw_call(
+        adapter.address,
+        abi_encode(
+            request.pool,
+            request.index_in,
+            request.index_out,
+            request.amount_in,
+            method_id=method_id(
+                "get_exchange_amount_out(address,uint256,uint256,uint256)"
+            ),
+        ),
+        max_outsize=32,
+        is_static_call=True,
+        revert_on_failure=False,
+    )
+
+    if not success or len(response) != 32:
+        return QUOTE_FAILED
+
+    return convert(response, uint256)
+
+
+@internal
+@view
+def _get_pool_state(pool_info: cryptoswap_adapter.Pool) -> PoolState:
+    """
+    @notice Read the state of a registered pool, its lp token and gauge
+    @param pool_info pool to read the state of
+    @return pool_state PoolState struct containing the pool state
+    """
+    # twocrypto and tricrypto pools share the state getters except for prices
+    balances: uint256[MAX_COINS] = empty(uint256[MAX_COINS])
+    for i: uint256 in range(pool_info.n_coins, bound=MAX_COINS):
+        balances[i] = staticcall i_tricrypto(pool_info.contract).balances(i)
+
+    price_scale: uint256[MAX_COINS - 1] = empty(uint256[MAX_COINS - 1])
+    price_oracle: uint256[MAX_COINS - 1] = empty(uint256[MAX_COINS - 1])
+    if pool_info.n_coins == 3:
+        for k: uint256 in range(MAX_COINS - 1):
+            price_scale[k] = staticcall i_tricrypto(
+                pool_info.contract
+            ).price_scale(k)
+            price_oracle[k] = staticcall i_tricrypto(
+                pool_info.contract
+            ).price_oracle(k)
+    else:
+        price_scale[0] = staticcall i_twocrypto(
+            pool_info.contract
+        ).price_scale()
+        price_oracle[0] = staticcall i_twocrypto(
+            pool_info.contract
+        ).price_oracle()
+
+    gauge_total_supply: uint256 = 0
+    gauge_inflation_rate: uint256 = 0
+    if pool_info.gauge != empty(address):
+        gauge_total_supply = staticcall i_gauge_cryptoswap(
+            pool_info.gauge
+        ).totalSupply()
+        gauge_inflation_rate = staticcall i_gauge_cryptoswap(
+            pool_info.gauge
+        ).inflation_rate()
+
+    return PoolState(
+        pool=pool_info.contract,
+        gauge=pool_info.gauge,
+        lp_token=pool_info.lp_token,
+        n_coins=pool_info.n_coins,
+        coins=self._get_pool_coins(pool_info),
+        balances=balances,
+        A=staticcall i_tricrypto(pool_info.contract).A(),
+        gamma=staticcall i_tricrypto(pool_info.contract).gamma(),
+        D=staticcall i_tricrypto(pool_info.contract).D(),
+        fee=staticcall i_tricrypto(pool_info.contract).fee(),
+        virtual_price=staticcall i_tricrypto(
+            pool_info.contract
+        ).get_virtual_price(),
+        price_scale=price_scale,
+        price_oracle=price_oracle,
+        lp_total_supply=staticcall IERC20(pool_info.lp_token).totalSupply(),
+        gauge_total_supply=gauge_total_supply,
+        gauge_inflation_rate=gauge_inflation_rate,
+        block_number=block.number,
+    )
+
+
+@internal
+@pure
+def _pair_key(token_a: address, token_b: address) -> bytes32:
+    """
+    @notice Get the key of an unordered coin pair, the same as the adapter
+    @param token_a address of one coin of the pair
+    @param token_b address of the other coin of the pair
+    @return pair_key same key for (token_a, token_b) and (token_b, token_a)
+    """
+    if convert(token_a, uint256) < convert(token_b, uint256):
+        return keccak256(abi_encode(token_a, token_b))
+    return keccak256(abi_encode(token_b, token_a))
@@ -6,12 +6,32 @@
 @author denissosnowsky
 @dev This library is used to add, remove and get liquidity from cryptoswap pools
 Vyper cannot convert dynamic arrays to fixed size arrays, so we need to use a fixed size array for pool's liquidity functions
-For this, we create a separate function for each number of coins in a pool
+Instead, calldata is built from the dynamic array with the selector for the number of coins
 @dev This library is used in stableswap_adapter.vy
 """
 
 # max number of coins in a pool
 MAX_COINS: constant(uint256) = 3
+# add_liquidity selectors, indexed by number of coins - 2
+ADD_LIQUIDITY_SELECTORS: constant(bytes4[2]) = [
+    method_id("add_liquidity(uint256[2],uint256,bool)", output_type=bytes4),
+    method_id("add_liquidity(uint256[3],uint256,bool)", output_type=bytes4),
+]
+# calc_token_amount selectors, indexed by number of coins - 2
+CALC_TOKEN_AMOUNT_SELECTORS: constant(bytes4[2]) = [
+    method_id("calc_token_amount(uint256[2])", output_type=bytes4),
+    method_id("calc_token_amount(uint256[3],bool)", output_type=bytes4),
+]
+# remove_liquidity selectors, indexed by number of coins - 2
+REMOVE_LIQUIDITY_SELECTORS: constant(bytes4[2]) = [
+    method_id("remove_liquidity(uint256,uint256[2],bool)", output_type=bytes4),
+    method_id("remove_liquidity(uint256,uint256[3],bool)", output_type=bytes4),
+]
+# remove_liquidity_one_coin selector, the same for twocrypto and tricrypto pools
+REMOVE_LIQUIDITY_ONE_COIN_SELECTOR: constant(bytes4) = method_id(
+    "remove_liquidity_one_coin(uint256,uint256,uint256,bool)",
+    output_type=bytes4,
+)
 
 
 # ------------------------------------------------------------------
@@ -33,58 +53,15 @@ def _add_liquidity(
     @param min_mint_amount minimum amount of lp tokens to mint
     @param use_eth whether to use ETH for the exchange
     """
-    if len(amounts) == 2:
-        amounts_2: uint256[2] = [0, 0]
-        for i: uint256 in range(min(len(amounts), 2), bound=2):
-            amounts_2[i] = amounts[i]
-        return self._add_liquidity_2(pool, amounts_2, min_mint_amount, use_eth)
+    assert len(amounts) >= 2, "cryptoswap_adapter: invalid number of amounts"
 
-    elif len(amounts) == 3:
-        amounts_3: uint256[3] = [0, 0, 0]
-        for i: uint256 in range(min(len(amounts), 3), bound=3):
-            amounts_3[i] = amounts[i]
-        return self._add_liquidity_3(pool, amounts_3, min_mint_amount, use_eth)
-    else:
-        raise "cryptoswap_adapter: invalid number of amounts"
-
-
-@payable
-@internal
-def _add_liquidity_2(
-    pool: address, amounts: uint256[2], min_mint_amount: uint256, use_eth: bool
-) -> Bytes[32]:
-    """
-    @notice Add liquidity to a pool with 2 coin
-    """
-    response: Bytes[32] = raw_call(
-        pool,
-        abi_encode(
-            amounts,
-            min_mint_amount,
-            use_eth,
-            method_id=method_id("add_liquidity(uint256[2],uint256,bool)"),
-        ),
-        value=msg.value,
-        max_outsize=32,
-    )
-    return response
-
-
-@payable
-@internal
-def _add_liquidity_3(
-    pool: address, amounts: uint256[3], min_mint_amount: uint256, use_eth: bool
-) -> Bytes[32]:
-    """
-    @notice Add liquidity to a pool with 3 coins
-    """
     response: Bytes[32] = raw_call(
         pool,
-        abi_encode(
-            amounts,
-            min_mint_amount,
-            use_eth,
-            method_id=method_id("add_liquidity(uint256[3],uint256,bool)"),
+        concat(
+            ADD_LIQUIDITY_SELECTORS[len(amounts) - 2],
+            self._encode_amounts(amounts),
+            convert(min_mint_amount, bytes32),
+            convert(use_eth, bytes32),
         ),
         value=msg.value,
         max_outsize=32,
@@ -106,56 +83,20 @@ def _get_lp_amount_after_deposit(
     @param pool address of the pool contract
     @param amounts array of amounts of coins to add
     @return lp_amount amount of lp tokens after depositing amounts
+    @dev twocrypto pools take no deposit flag, tricrypto pools do
     """
-    if len(amounts) == 2:
-        amounts_2: uint256[2] = [0, 0]
-        for i: uint256 in range(min(len(amounts), 2), bound=2):
-            amounts_2[i] = amounts[i]
-        return self._get_lp_amount_after_deposit_2(pool, amounts_2)
-
-    elif len(amounts) == 3:
-        amounts_3: uint256[3] = [0, 0, 0]
-        for i: uint256 in range(min(len(amounts), 3), bound=3):
-            amounts_3[i] = amounts[i]
-        return self._get_lp_amount_after_deposit_3(pool, amounts_3, deposit)
-    else:
-        raise "cryptoswap_adapter: invalid number of amounts"
-
-
-@internal
-@view
-def _get_lp_amount_after_deposit_2(
-    pool: address, amounts: uint256[2]
-) -> uint256:
-    """
-    @notice Get the amount of lp tokens after depositing 2 coins
-    """
-    response: Bytes[32] = raw_call(
-        pool,
-        abi_encode(
-            amounts,
-            method_id=method_id("calc_token_amount(uint256[2])"),
-        ),
-        max_outsize=32,
-        is_static_call=True,
-    )
-    return convert(response, uint256)
+    assert len(amounts) >= 2, "cryptoswap_adapter: invalid number of amounts"
 
+    deposit_flag: Bytes[32] = b""
+    if len(amounts) == 3:
+        deposit_flag = abi_encode(deposit)
 
-@internal
-@view
-def _get_lp_amount_after_deposit_3(
-    pool: address, amounts: uint256[3], deposit: bool
-) -> uint256:
-    """
-    @notice Get the amount of lp tokens after depositing 3 coins
-    """
     response: Bytes[32] = raw_call(
         pool,
-        abi_encode(
-            amounts,
-            deposit,
-            method_id=method_id("calc_token_amount(uint256[3],bool)"),
+        concat(
+            CALC_TOKEN_AMOUNT_SELECTORS[len(amounts) - 2],
+            self._encode_amounts(amounts),
+            deposit_flag,
         ),
         max_outsize=32,
         is_static_call=True,
@@ -173,56 +114,62 @@ def _remove_liquidity(
     lp_amount: uint256,
     min_amounts: DynArray[uint256, MAX_COINS],
     use_eth: bool,
-):
+) -> Bytes[32 * MAX_COINS]:
     """
     @notice Remove liquidity from a pool
+    @dev Pools that are their own lp token return the amounts sent, older pools may return nothing
     """
-    if len(min_amounts) == 2:
-        amounts_2: uint256[2] = [0, 0]
-        for i: uint256 in range(min(len(min_amounts), 2), bound=2):
-            amounts_2[i] = min_amounts[i]
-        self._remove_balanced_liquidity_2(pool, lp_amount, amounts_2, use_eth)
+    assert (
+        len(min_amounts) >= 2
+    ), "cryptoswap_adapter: invalid number of amounts"
 
-    elif len(min_amounts) == 3:
-        amounts_3: uint256[3] = [0, 0, 0]
-        for i: uint256 in range(min(len(min_amounts), 3), bound=3):
-            amounts_3[i] = min_amounts[i]
-        self._remove_balanced_liquidity_3(pool, lp_amount, amounts_3, use_eth)
-    else:
-        raise "cryptoswap_adapter: invalid number of amounts"
+    response: Bytes[32 * MAX_COINS] = raw_call(
+        pool,
+        concat(
+            REMOVE_LIQUIDITY_SELECTORS[len(min_amounts) - 2],
+            convert(lp_amount, bytes32),
+            self._encode_amounts(min_amounts),
+            convert(use_eth, bytes32),
+        ),
+        max_outsize=32 * MAX_COINS,
+    )
+    return response
 
 
 @internal
-def _remove_balanced_liquidity_2(
-    pool: address, lp_amount: uint256, min_amounts: uint256[2], use_eth: bool
-):
+def _remove_liquidity_one_coin(
+    pool: address,
+    lp_amount: uint256,
+    coin_index: uint256,
+    min_amount: uint256,
+    use_eth: bool,
+) -> Bytes[32]:
     """
-    @notice Remove balanced liquidity from a pool with 2 coins
+    @notice Remove liquidity from a pool in one coin
+    @dev Pools that are their own lp token return the amount sent, older pools may return nothing
     """
-    raw_call(
+    response: Bytes[32] = raw_call(
         pool,
-        abi_encode(
-            lp_amount,
-            min_amounts,
-            use_eth,
-            method_id=method_id("remove_liquidity(uint256,uint256[2],bool)"),
+        concat(
+            REMOVE_LIQUIDITY_ONE_COIN_SELECTOR,
+            convert(lp_amount, bytes32),
+            convert(coin_index, bytes32),
+            convert(min_amount, bytes32),
+            convert(use_eth, bytes32),
         ),
+        max_outsize=32,
     )
+    return response
 
 
 @internal
-def _remove_balanced_liquidity_3(
-    pool: address, lp_amount: uint256, min_amounts: uint256[3], use_eth: bool
-):
+@pure
+def _encode_amounts(
+    amounts: DynArray[uint256, MAX_COINS],
+) -> Bytes[32 * (MAX_COINS + 2)]:
     """
-    @notice Remove balanced liquidity from a pool with 3 coins
+    @notice ABI encode amounts as a fixed size uint256[N] array
     """
-    raw_call(
-        pool,
-        abi_encode(
-            lp_amount,
-            min_amounts,
-            use_eth,
-            method_id=method_id("remove_liquidity(uint256,uint256[3],bool)"),
-        ),
-    )
+    encoded: Bytes[32 * (MAX_COINS + 2)] = abi_encode(amounts)
+    # skip the offset and length words of the dynamic array encoding
+    return slice(encoded, 64, 32 * len(amounts))
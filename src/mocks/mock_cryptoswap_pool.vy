@@ -0,0 +1,478 @@
+# pragma version 0.4.1
+# @license MIT
+
+"""
+@title Mock CryptoSwap Pool
+@notice CryptoSwap v2 invariant math of Curve cryptoswap pools on state set by the caller
+Ports newton_D, newton_y, the dynamic fee and the quote functions of the 2-coin crypto
+factory template and of the tricrypto math contract, and get_dx of tricrypto-ng views
+Used to check the off-chain math engine against the on-chain arithmetic
+@dev D is computed from the balances when the state is set, like after a deposit
+"""
+
+# ------------------------------------------------------------------
+#                              STATE
+# ------------------------------------------------------------------
+
+# max number of coins in a pool
+MAX_COINS: constant(uint256) = 3
+# precision of prices and normalized balances
+PRECISION: constant(uint256) = 10**18
+# denominator of the pool fees
+FEE_DENOMINATOR: constant(uint256) = 10**10
+# precision of A
+A_MULTIPLIER: constant(uint256) = 10000
+# fee added to the deposit and withdrawal fees to charge for rounding
+NOISE_FEE: constant(uint256) = 10**5
+# max number of Newton iterations
+MAX_ITERATIONS: constant(uint256) = 255
+# rounds of get_dx estimating the fee on dy
+DX_FEE_ROUNDS: constant(uint256) = 5
+
+# balances of the pool coins
+balances: public(DynArray[uint256, MAX_COINS])
+# 10**(18 - decimals) of each coin
+precisions: public(DynArray[uint256, MAX_COINS])
+# price of each coin after the first in the first coin
+price_scale: public(DynArray[uint256, MAX_COINS - 1])
+# invariant
+D: public(uint256)
+# A * N**N * A_MULTIPLIER
+A: public(uint256)
+gamma: public(uint256)
+# fee of a balanced pool
+mid_fee: public(uint256)
+# fee of an imbalanced pool
+out_fee: public(uint256)
+# speed of the fee change from mid_fee to out_fee
+fee_gamma: public(uint256)
+# total supply of the lp token
+totalSupply: public(uint256)
+# end of the A and gamma ramp, D is recomputed while ramping
+future_A_gamma_time: public(uint256)
+
+# ------------------------------------------------------------------
+#                             EXTERNAL
+# ------------------------------------------------------------------
+
+@external
+def set_state(
+    _balances: DynArray[uint256, MAX_COINS],
+    _precisions: DynArray[uint256, MAX_COINS],
+    _price_scale: DynArray[uint256, MAX_COINS - 1],
+    _A: uint256,
+    _gamma: uint256,
+    _mid_fee: uint256,
+    _out_fee: uint256,
+    _fee_gamma: uint256,
+    _total_supply: uint256,
+    _future_A_gamma_time: uint256,
+):
+    """
+    @notice Set the pool state the quote functions read and compute its D
+    """
+    assert len(_balances) == len(_precisions), "mock_cryptoswap_pool: length mismatch"
+    assert len(_price_scale) + 1 == len(_balances), "mock_cryptoswap_pool: length mismatch"
+    self.balances = _balances
+    self.precisions = _precisions
+    self.price_scale = _price_scale
+    self.A = _A
+    self.gamma = _gamma
+    self.mid_fee = _mid_fee
+    self.out_fee = _out_fee
+    self.fee_gamma = _fee_gamma
+    self.totalSupply = _total_supply
+    self.future_A_gamma_time = _future_A_gamma_time
+    self.D = self._newton_D(_A, _gamma, self._xp(_balances))
+
+
+# ------------------------------------------------------------------
+#                               VIEW
+# ------------------------------------------------------------------
+
+@external
+@view
+def get_dy(i: uint256, j: uint256, dx: uint256) -> uint256:
+    assert i != j, "mock_cryptoswap_pool: same input and output coin"
+    D: uint256 = self._get_D()
+    balances: DynArray[uint256, MAX_COINS] = self.balances
+    balances[i] += dx
+    xp: DynArray[uint256, MAX_COINS] = self._xp(balances)
+
+    y: uint256 = self._newton_y(self.A, self.gamma, xp, D, j)
+    dy: uint256 = xp[j] - y - 1
+    xp[j] = y
+    dy = dy * PRECISION // self._price_scale_i(j)
+
+    return dy - self._fee(xp) * dy // FEE_DENOMINATOR
+
+
+@external
+@view
+def get_dx(i: uint256, j: uint256, dy: uint256) -> uint256:
+    assert i != j, "mock_cryptoswap_pool: same input and output coin"
+    assert dy > 0, "mock_cryptoswap_pool: do not exchange out 0 coins"
+    D: uint256 = self._get_D()
+    dx: uint256 = 0
+    _dy: uint256 = dy
+
+    # the fee on dy is estimated over a few rounds
+    for _: uint256 in range(DX_FEE_ROUNDS):
+        balances: DynArray[uint256, MAX_COINS] = self.balances
+        balances[j] -= _dy
+        xp: DynArray[uint256, MAX_COINS] = self._xp(balances)
+
+        x: uint256 = self._newton_y(self.A, self.gamma, xp, D, i)
+        dx = (x - xp[i]) * PRECISION // self._price_scale_i(i)
+        xp[i] = x
+        _dy = dy + self._fee(xp) * _dy // FEE_DENOMINATOR + 1
+
+    return dx
+
+
+@external
+@view
+def calc_token_amount(
+    amounts: DynArray[uint256, MAX_COINS], deposit: bool
+) -> uint256:
+    D0: uint256 = self._get_D()
+    amountsp: DynArray[uint256, MAX_COINS] = self._xp(amounts)
+    balances: DynArray[uint256, MAX_COINS] = self.balances
+    n_coins: uint256 = len(balances)
+    xp: DynArray[uint256, MAX_COINS] = []
+
+    if n_coins == 2:
+        # 2-coin pools add normalized amounts to normalized balances
+        assert deposit, "mock_cryptoswap_pool: 2-coin pools only quote deposits"
+        xp = self._xp(balances)
+        for k: uint256 in range(n_coins, bound=MAX_COINS):
+            xp[k] += amountsp[k]
+    else:
+        for k: uint256 in range(n_coins, bound=MAX_COINS):
+            if deposit:
+                balances[k] += amounts[k]
+            else:
+                balances[k] -= amounts[k]
+        xp = self._xp(balances)
+
+    D: uint256 = self._newton_D(self.A, self.gamma, xp)
+    total_supply: uint256 = self.totalSupply
+    d_token: uint256 = 0
+    if deposit:
+        d_token = total_supply * D // D0 - total_supply
+    else:
+        d_token = total_supply - total_supply * D // D0
+
+    d_token -= (
+        self._calc_token_fee(amountsp, xp) * d_token // FEE_DENOMINATOR + 1
+    )
+    return d_token
+
+
+@external
+@view
+def calc_withdraw_one_coin(token_amount: uint256, i: uint256) -> uint256:
+    total_supply: uint256 = self.totalSupply
+    assert token_amount <= total_supply, "mock_cryptoswap_pool: token amount more than supply"
+
+    xp: DynArray[uint256, MAX_COINS] = self._xp(self.balances)
+    D: uint256 = self._newton_D(self.A, self.gamma, xp)
+
+    dD: uint256 = token_amount * D // total_supply
+    D -= dD - (self._fee(xp) * dD // (2 * FEE_DENOMINATOR) + 1)
+    y: uint256 = self._newton_y(self.A, self.gamma, xp, D, i)
+
+    return (xp[i] - y) * PRECISION // self._price_scale_i(i)
+
+
+# ------------------------------------------------------------------
+#                             INTERNAL
+# ------------------------------------------------------------------
+
+@internal
+@view
+def _get_D() -> uint256:
+    if self.future_A_gamma_time > 0:
+        return self._newton_D(self.A, self.gamma, self._xp(self.balances))
+    return self.D
+
+
+@internal
+@view
+def _xp(
+    amounts: DynArray[uint256, MAX_COINS]
+) -> DynArray[uint256, MAX_COINS]:
+    precisions: DynArray[uint256, MAX_COINS] = self.precisions
+    price_scale: DynArray[uint256, MAX_COINS - 1] = self.price_scale
+    xp: DynArray[uint256, MAX_COINS] = [amounts[0] * precisions[0]]
+    for k: uint256 in range(1, len(amounts), bound=MAX_COINS):
+        xp.append(amounts[k] * price_scale[k - 1] * precisions[k] // PRECISION)
+    return xp
+
+
+@internal
+@view
+def _price_scale_i(i: uint256) -> uint256:
+    if i == 0:
+        return PRECISION * self.precisions[0]
+    return self.price_scale[i - 1] * self.precisions[i]
+
+
+@internal
+@view
+def _fee(xp: DynArray[uint256, MAX_COINS]) -> uint256:
+    n_coins: uint256 = len(xp)
+    fee_gamma: uint256 = self.fee_gamma
+    S: uint256 = 0
+    for x: uint256 in xp:
+        S += x
+
+    f: uint256 = 0
+    if n_coins == 2:
+        f = fee_gamma * 10**18 // (
+            fee_gamma + 10**18 - (10**18 * 4) * xp[0] // S * xp[1] // S
+        )
+    else:
+        f = 10**18
+        for x: uint256 in xp:
+            f = f * n_coins * x // S
+        if fee_gamma > 0:
+            f = fee_gamma * 10**18 // (fee_gamma + 10**18 - f)
+
+    return (self.mid_fee * f + self.out_fee * (10**18 - f)) // 10**18
+
+
+@internal
+@view
+def _calc_token_fee(
+    amountsp: DynArray[uint256, MAX_COINS], xp: DynArray[uint256, MAX_COINS]
+) -> uint256:
+    n_coins: uint256 = len(amountsp)
+    fee: uint256 = self._fee(xp) * n_coins // (4 * (n_coins - 1))
+    S: uint256 = 0
+    for x: uint256 in amountsp:
+        S += x
+    avg: uint256 = S // n_coins
+    Sdiff: uint256 = 0
+    for x: uint256 in amountsp:
+        if x > avg:
+            Sdiff += x - avg
+        else:
+            Sdiff += avg - x
+    return fee * Sdiff // S + NOISE_FEE
+
+
+@internal
+@pure
+def _sort(x: DynArray[uint256, MAX_COINS]) -> DynArray[uint256, MAX_COINS]:
+    # insertion sort, from high to low
+    A: DynArray[uint256, MAX_COINS] = x
+    for i: uint256 in range(1, len(x), bound=MAX_COINS):
+        _x: uint256 = A[i]
+        cur: uint256 = i
+        for j: uint256 in range(MAX_COINS):
+            y: uint256 = A[cur - 1]
+            if y > _x:
+                break
+            A[cur] = y
+            cur -= 1
+            if cur == 0:
+                break
+        A[cur] = _x
+    return A
+
+
+@internal
+@pure
+def _geometric_mean(x: DynArray[uint256, MAX_COINS]) -> uint256:
+    n_coins: uint256 = len(x)
+    D: uint256 = x[0]
+    diff: uint256 = 0
+    for _: uint256 in range(MAX_ITERATIONS):
+        D_prev: uint256 = D
+        if n_coins == 2:
+            D = (D + x[0] * x[1] // D) // n_coins
+        else:
+            tmp: uint256 = 10**18
+            for _x: uint256 in x:
+                tmp = tmp * _x // D
+            D = D * ((n_coins - 1) * 10**18 + tmp) // (n_coins * 10**18)
+        if D > D_prev:
+            diff = D - D_prev
+        else:
+            diff = D_prev - D
+        if diff <= 1 or diff * 10**18 < D:
+            return D
+
+    raise "mock_cryptoswap_pool: geometric mean did not converge"
+
+
+@internal
+@pure
+def _newton_D(
+    ANN: uint256, gamma: uint256, x_unsorted: DynArray[uint256, MAX_COINS]
+) -> uint256:
+    n_coins: uint256 = len(x_unsorted)
+    x: DynArray[uint256, MAX_COINS] = self._sort(x_unsorted)
+
+    assert x[0] > 10**9 - 1 and x[0] < 10**15 * 10**18 + 1, "mock_cryptoswap_pool: unsafe values x[0]"
+    min_frac: uint256 = 10**11
+    if n_coins == 2:
+        min_frac = 10**14
+    for k: uint256 in range(1, n_coins, bound=MAX_COINS):
+        assert x[k] * 10**18 // x[0] > min_frac - 1, "mock_cryptoswap_pool: unsafe values x[i]"
+
+    D: uint256 = n_coins * self._geometric_mean(x)
+    S: uint256 = 0
+    for _x: uint256 in x:
+        S += _x
+
+    for _: uint256 in range(MAX_ITERATIONS):
+        D_prev: uint256 = D
+
+        K0: uint256 = 10**18
+        if n_coins == 2:
+            K0 = (10**18 * 4) * x[0] // D * x[1] // D
+        else:
+            for _x: uint256 in x:
+                K0 = K0 * _x * n_coins // D
+
+        _g1k0: uint256 = gamma + 10**18
+        if _g1k0 > K0:
+            _g1k0 = _g1k0 - K0 + 1
+        else:
+            _g1k0 = K0 - _g1k0 + 1
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1: uint256 = (
+            10**18 * D // gamma * _g1k0 // gamma * _g1k0 * A_MULTIPLIER // ANN
+        )
+        # 2*N*K0 / _g1k0
+        mul2: uint256 = (2 * 10**18) * n_coins * K0 // _g1k0
+
+        neg_fprime: uint256 = (
+            (S + S * mul2 // 10**18)
+            + mul1 * n_coins // K0
+            - mul2 * D // 10**18
+        )
+
+        # D -= f / fprime
+        D_plus: uint256 = D * (neg_fprime + S) // neg_fprime
+        D_minus: uint256 = D * D // neg_fprime
+        if 10**18 > K0:
+            D_minus += D * (mul1 // neg_fprime) // 10**18 * (10**18 - K0) // K0
+        else:
+            D_minus -= D * (mul1 // neg_fprime) // 10**18 * (K0 - 10**18) // K0
+
+        if D_plus > D_minus:
+            D = D_plus - D_minus
+        else:
+            D = (D_minus - D_plus) // 2
+
+        diff: uint256 = 0
+        if D > D_prev:
+            diff = D - D_prev
+        else:
+            diff = D_prev - D
+        if diff * 10**14 < max(10**16, D):
+            for _x: uint256 in x:
+                frac: uint256 = _x * 10**18 // D
+                assert frac > 10**16 - 1 and frac < 10**20 + 1, "mock_cryptoswap_pool: unsafe values x[i]"
+            return D
+
+    raise "mock_cryptoswap_pool: D did not converge"
+
+
+@internal
+@pure
+def _newton_y(
+    ANN: uint256,
+    gamma: uint256,
+    x: DynArray[uint256, MAX_COINS],
+    D: uint256,
+    i: uint256,
+) -> uint256:
+    n_coins: uint256 = len(x)
+    assert D > 10**17 - 1 and D < 10**15 * 10**18 + 1, "mock_cryptoswap_pool: unsafe values D"
+
+    y: uint256 = 0
+    K0_i: uint256 = 10**18
+    S_i: uint256 = 0
+    convergence_limit: uint256 = 0
+
+    if n_coins == 2:
+        x_j: uint256 = x[1 - i]
+        y = D**2 // (x_j * 4)
+        K0_i = (10**18 * 2) * x_j // D
+        assert K0_i > 10**16 * 2 - 1 and K0_i < 10**20 * 2 + 1, "mock_cryptoswap_pool: unsafe values x[i]"
+        S_i = x_j
+        convergence_limit = max(max(x_j // 10**14, D // 10**14), 100)
+    else:
+        for k: uint256 in range(n_coins, bound=MAX_COINS):
+            if k != i:
+                frac: uint256 = x[k] * 10**18 // D
+                assert frac > 10**16 - 1 and frac < 10**20 + 1, "mock_cryptoswap_pool: unsafe values x[i]"
+
+        x_sorted: DynArray[uint256, MAX_COINS] = x
+        x_sorted[i] = 0
+        x_sorted = self._sort(x_sorted)
+        convergence_limit = max(max(x_sorted[0] // 10**14, D // 10**14), 100)
+
+        y = D // n_coins
+        for j: uint256 in range(2, n_coins + 1, bound=MAX_COINS + 1):
+            # small _x first
+            _x: uint256 = x_sorted[n_coins - j]
+            y = y * D // (_x * n_coins)
+            S_i += _x
+        for j: uint256 in range(n_coins - 1, bound=MAX_COINS):
+            # large _x first
+            K0_i = K0_i * x_sorted[j] * n_coins // D
+
+    for _: uint256 in range(MAX_ITERATIONS):
+        y_prev: uint256 = y
+
+        K0: uint256 = K0_i * y * n_coins // D
+        S: uint256 = S_i + y
+
+        _g1k0: uint256 = gamma + 10**18
+        if _g1k0 > K0:
+            _g1k0 = _g1k0 - K0 + 1
+        else:
+            _g1k0 = K0 - _g1k0 + 1
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1: uint256 = (
+            10**18 * D // gamma * _g1k0 // gamma * _g1k0 * A_MULTIPLIER // ANN
+        )
+        # 2*K0 / _g1k0
+        mul2: uint256 = 10**18 + (2 * 10**18) * K0 // _g1k0
+
+        yfprime: uint256 = 10**18 * y + S * mul2 + mul1
+        _dyfprime: uint256 = D * mul2
+        if yfprime < _dyfprime:
+            y = y_prev // 2
+            continue
+        yfprime -= _dyfprime
+        fprime: uint256 = yfprime // y
+
+        # y -= f / f_prime;  y = (y * fprime - f) / fprime
+        y_minus: uint256 = mul1 // fprime
+        y_plus: uint256 = (yfprime + 10**18 * D) // fprime + y_minus * 10**18 // K0
+        y_minus += 10**18 * S // fprime
+
+        if y_plus < y_minus:
+            y = y_prev // 2
+        else:
+            y = y_plus - y_minus
+
+        diff: uint256 = 0
+        if y > y_prev:
+            diff = y - y_prev
+        else:
+            diff = y_prev - y
+        if diff < max(convergence_limit, y // 10**14):
+            frac: uint256 = y * 10**18 // D
+            assert frac > 10**16 - 1 and frac < 10**20 + 1, "mock_cryptoswap_pool: unsafe value for y"
+            return y
+
+    raise "mock_cryptoswap_pool: y did not converge"
@@ -0,0 +1,78 @@
+# pragma version 0.4.1
+# @license MIT
+
+"""
+@title Mock ERC20
+@notice Minimal ERC20 token with an open mint and burn, used by tests that move coins
+and as the lp token of mock pools
+"""
+
+from ethereum.ercs import IERC20
+
+implements: IERC20
+
+# ------------------------------------------------------------------
+#                              STATE
+# ------------------------------------------------------------------
+
+balanceOf: public(HashMap[address, uint256])
+allowance: public(HashMap[address, HashMap[address, uint256]])
+totalSupply: public(uint256)
+
+# ------------------------------------------------------------------
+#                             EXTERNAL
+# ------------------------------------------------------------------
+
+@external
+def transfer(_to: address, _value: uint256) -> bool:
+    self._transfer(msg.sender, _to, _value)
+    return True
+
+
+@external
+def transferFrom(_from: address, _to: address, _value: uint256) -> bool:
+    allowance: uint256 = self.allowance[_from][msg.sender]
+    assert allowance >= _value, "mock_erc20: insufficient allowance"
+    if allowance != max_value(uint256):
+        self.allowance[_from][msg.sender] = allowance - _value
+    self._transfer(_from, _to, _value)
+    return True
+
+
+@external
+def approve(_spender: address, _value: uint256) -> bool:
+    self.allowance[msg.sender][_spender] = _value
+    log IERC20.Approval(owner=msg.sender, spender=_spender, value=_value)
+    return True
+
+
+@external
+def mint(_to: address, _value: uint256):
+    """
+    @notice Mint tokens to an address, open to anyone
+    """
+    self.balanceOf[_to] += _value
+    self.totalSupply += _value
+    log IERC20.Transfer(sender=empty(address), receiver=_to, value=_value)
+
+
+@external
+def burn(_from: address, _value: uint256):
+    """
+    @notice Burn tokens of an address, open to anyone
+    """
+    self.balanceOf[_from] -= _value
+    self.totalSupply -= _value
+    log IERC20.Transfer(sender=_from, receiver=empty(address), value=_value)
+
+
+# ------------------------------------------------------------------
+#                             INTERNAL
+# ------------------------------------------------------------------
+
+@internal
+def _transfer(_from: address, _to: address, _value: uint256):
+    assert self.balanceOf[_from] >= _value, "mock_erc20: insufficient balance"
+    self.balanceOf[_from] -= _value
+    self.balanceOf[_to] += _value
+    log IERC20.Transfer(sender=_from, receiver=_to, value=_value)
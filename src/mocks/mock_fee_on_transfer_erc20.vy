@@ -0,0 +1,64 @@
+# pragma version 0.4.1
+# @license MIT
+
+"""
+@title Mock Fee On Transfer ERC20
+@notice Mock ERC20 token that burns a fee from every transfer, so the receiver gets less than the amount sent
+"""
+
+from ethereum.ercs import IERC20
+from . import mock_erc20
+
+implements: IERC20
+
+initializes: mock_erc20
+
+exports: (
+    mock_erc20.approve,
+    mock_erc20.mint,
+    mock_erc20.burn,
+    mock_erc20.balanceOf,
+    mock_erc20.allowance,
+    mock_erc20.totalSupply,
+)
+
+# ------------------------------------------------------------------
+#                              STATE
+# ------------------------------------------------------------------
+
+# fee burnt from every transfer, in basis points of the amount sent
+FEE_BPS: public(constant(uint256)) = 100
+
+# ------------------------------------------------------------------
+#                             EXTERNAL
+# ------------------------------------------------------------------
+
+@external
+def transfer(_to: address, _value: uint256) -> bool:
+    self._transfer_with_fee(msg.sender, _to, _value)
+    return True
+
+
+@external
+def transferFrom(_from: address, _to: address, _value: uint256) -> bool:
+    allowance: uint256 = mock_erc20.allowance[_from][msg.sender]
+    assert allowance >= _value, "mock_fee_on_transfer_erc20: insufficient allowance"
+    if allowance != max_value(uint256):
+        mock_erc20.allowance[_from][msg.sender] = allowance - _value
+    self._transfer_with_fee(_from, _to, _value)
+    return True
+
+# ------------------------------------------------------------------
+#                             INTERNAL
+# ------------------------------------------------------------------
+
+@internal
+def _transfer_with_fee(_from: address, _to: address, _value: uint256):
+    """
+    @notice Transfer the amount sent minus the fee, which is burnt
+    """
+    fee: uint256 = _value * FEE_BPS // 10000
+    mock_erc20._transfer(_from, _to, _value - fee)
+    mock_erc20.balanceOf[_from] -= fee
+    mock_erc20.totalSupply -= fee
+    log IERC20.Transfer(sender=_from, receiver=empty(address), value=fee)
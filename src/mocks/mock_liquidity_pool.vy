@@ -0,0 +1,159 @@
+# pragma version 0.4.1
+# @license MIT
+
+"""
+@title Mock Liquidity Pool
+@notice Stand-in for the exchange and liquidity functions of legacy Curve pools, which return nothing,
+like the 3pool, tricrypto2 and the first twocrypto factory pools
+Answers exchange, add_liquidity, remove_liquidity and remove_liquidity_one_coin of stableswap and
+cryptoswap pools by selector, for 2 and 3 coins, holding and sending mock coins for real
+Coins are exchanged 1:1, lp tokens are minted 1:1 with the coins added and burnt for a share of every coin
+@dev The lp token is a separate mock ERC20 token, minted and burnt by this pool,
+or this pool itself like ng pools, which still return nothing here to check that short responses are measured
+"""
+
+from . import mock_erc20
+
+initializes: mock_erc20
+
+exports: mock_erc20.__interface__
+
+# ------------------------------------------------------------------
+#                             INTERFACES
+# ------------------------------------------------------------------
+
+interface IMockERC20:
+    def transfer(_to: address, _value: uint256) -> bool: nonpayable
+    def transferFrom(_from: address, _to: address, _value: uint256) -> bool: nonpayable
+    def mint(_to: address, _value: uint256): nonpayable
+    def burn(_from: address, _value: uint256): nonpayable
+    def balanceOf(_owner: address) -> uint256: view
+    def totalSupply() -> uint256: view
+
+# ------------------------------------------------------------------
+#                              STATE
+# ------------------------------------------------------------------
+
+# max number of coins in a pool
+MAX_COINS: constant(uint256) = 3
+# selectors indexed by 2 * is_cryptoswap + number of coins - 2
+ADD_LIQUIDITY_SELECTORS: constant(bytes4[4]) = [
+    method_id("add_liquidity(uint256[2],uint256)", output_type=bytes4),
+    method_id("add_liquidity(uint256[3],uint256)", output_type=bytes4),
+    method_id("add_liquidity(uint256[2],uint256,bool)", output_type=bytes4),
+    method_id("add_liquidity(uint256[3],uint256,bool)", output_type=bytes4),
+]
+REMOVE_LIQUIDITY_SELECTORS: constant(bytes4[4]) = [
+    method_id("remove_liquidity(uint256,uint256[2])", output_type=bytes4),
+    method_id("remove_liquidity(uint256,uint256[3])", output_type=bytes4),
+    method_id("remove_liquidity(uint256,uint256[2],bool)", output_type=bytes4),
+    method_id("remove_liquidity(uint256,uint256[3],bool)", output_type=bytes4),
+]
+# selectors indexed by is_cryptoswap
+EXCHANGE_SELECTORS: constant(bytes4[2]) = [
+    method_id("exchange(int128,int128,uint256,uint256)", output_type=bytes4),
+    method_id("exchange(uint256,uint256,uint256,uint256,bool)", output_type=bytes4),
+]
+REMOVE_LIQUIDITY_ONE_COIN_SELECTORS: constant(bytes4[2]) = [
+    method_id("remove_liquidity_one_coin(uint256,int128,uint256)", output_type=bytes4),
+    method_id(
+        "remove_liquidity_one_coin(uint256,uint256,uint256,bool)", output_type=bytes4
+    ),
+]
+
+coins: public(DynArray[address, MAX_COINS])
+lp_token: public(address)
+# whether the liquidity functions take the use_eth argument of cryptoswap pools
+is_cryptoswap: public(bool)
+
+# ------------------------------------------------------------------
+#                            CONSTRUCTOR
+# ------------------------------------------------------------------
+
+@deploy
+def __init__(
+    _coins: DynArray[address, MAX_COINS], _lp_token: address, _is_cryptoswap: bool
+):
+    """
+    @param _coins coins of the pool, mock ERC20 tokens
+    @param _lp_token lp token of the pool, a mock ERC20 token, empty to be its own lp token
+    @param _is_cryptoswap whether to answer the cryptoswap signatures instead of the stableswap ones
+    """
+    assert len(_coins) >= 2, "mock_liquidity_pool: invalid number of coins"
+    self.coins = _coins
+    self.lp_token = _lp_token if _lp_token != empty(address) else self
+    self.is_cryptoswap = _is_cryptoswap
+
+# ------------------------------------------------------------------
+#                             EXTERNAL
+# ------------------------------------------------------------------
+
+@external
+def __default__():
+    """
+    @notice Dispatch the pool functions, returning nothing like legacy pools
+    @dev Calldata arguments are all one word, so they are read by position
+    """
+    n_coins: uint256 = len(self.coins)
+    index: uint256 = n_coins - 2
+    if self.is_cryptoswap:
+        index += 2
+    selector: bytes4 = convert(slice(msg.data, 0, 4), bytes4)
+    lp_token: IMockERC20 = IMockERC20(self.lp_token)
+
+    if selector == EXCHANGE_SELECTORS[index // 2]:
+        i: uint256 = convert(slice(msg.data, 4, 32), uint256)
+        j: uint256 = convert(slice(msg.data, 36, 32), uint256)
+        amount: uint256 = convert(slice(msg.data, 68, 32), uint256)
+        assert extcall IMockERC20(self.coins[i]).transferFrom(
+            msg.sender, self, amount
+        )
+        assert extcall IMockERC20(self.coins[j]).transfer(msg.sender, amount)
+
+    elif selector == ADD_LIQUIDITY_SELECTORS[index]:
+        mint_amount: uint256 = 0
+        for i: uint256 in range(n_coins, bound=MAX_COINS):
+            amount: uint256 = convert(slice(msg.data, 4 + 32 * i, 32), uint256)
+            if amount > 0:
+                assert extcall IMockERC20(self.coins[i]).transferFrom(
+                    msg.sender, self, amount
+                )
+            mint_amount += amount
+        extcall lp_token.mint(msg.sender, mint_amount)
+
+    elif selector == REMOVE_LIQUIDITY_SELECTORS[index]:
+        lp_amount: uint256 = convert(slice(msg.data, 4, 32), uint256)
+        amounts: DynArray[uint256, MAX_COINS] = []
+        for i: uint256 in range(n_coins, bound=MAX_COINS):
+            amounts.append(self._share(i, lp_amount))
+        extcall lp_token.burn(msg.sender, lp_amount)
+        for i: uint256 in range(n_coins, bound=MAX_COINS):
+            assert extcall IMockERC20(self.coins[i]).transfer(
+                msg.sender, amounts[i]
+            )
+
+    elif selector == REMOVE_LIQUIDITY_ONE_COIN_SELECTORS[index // 2]:
+        lp_amount: uint256 = convert(slice(msg.data, 4, 32), uint256)
+        i: uint256 = convert(slice(msg.data, 36, 32), uint256)
+        amount: uint256 = self._share(i, lp_amount)
+        extcall lp_token.burn(msg.sender, lp_amount)
+        assert extcall IMockERC20(self.coins[i]).transfer(msg.sender, amount)
+
+    else:
+        raise "mock_liquidity_pool: unknown selector"
+
+# ------------------------------------------------------------------
+#                             INTERNAL
+# ------------------------------------------------------------------
+
+@internal
+@view
+def _share(i: uint256, lp_amount: uint256) -> uint256:
+    """
+    @notice Amount of a coin owed for burning lp tokens
+    """
+    return (
+        staticcall IMockERC20(self.coins[i]).balanceOf(self)
+        * lp_amount
+        // staticcall IMockERC20(self.lp_token).totalSupply()
+    )
@@ -0,0 +1,104 @@
+# pragma version 0.4.1
+# @license MIT
+
+"""
+@title Mock Meta Registry
+@notice Minimal stand-in for Curve's meta registry used by tests and benchmarks
+Serves pool data set by the caller instead of resolving it through registry handlers
+"""
+
+# ------------------------------------------------------------------
+#                              TYPES
+# ------------------------------------------------------------------
+
+# Stores pool information
+struct PoolData:
+    # whether the pool is a metapool
+    is_meta: bool
+    # address of the gauge contract
+    gauge: address
+    # address of the lp token
+    lp_token: address
+    # number of coins in the pool
+    n_coins: uint256
+    # coins of the pool
+    coins: address[8]
+
+
+# ------------------------------------------------------------------
+#                              STATE
+# ------------------------------------------------------------------
+
+# pool data by pool address
+pools: HashMap[address, PoolData]
+# whether the pool has been set
+registered: HashMap[address, bool]
+
+# ------------------------------------------------------------------
+#                             EXTERNAL
+# ------------------------------------------------------------------
+
+@external
+def set_pool(
+    _pool: address,
+    _is_meta: bool,
+    _gauge: address,
+    _lp_token: address,
+    _n_coins: uint256,
+    _coins: address[8],
+):
+    """
+    @notice Set pool data returned by the registry getters
+    """
+    self.pools[_pool] = PoolData(
+        is_meta=_is_meta,
+        gauge=_gauge,
+        lp_token=_lp_token,
+        n_coins=_n_coins,
+        coins=_coins,
+    )
+    self.registered[_pool] = True
+
+
+# ------------------------------------------------------------------
+#                               VIEW
+# ------------------------------------------------------------------
+
+@external
+@view
+def is_registered(_pool: address, _handler_id: uint256 = 0) -> bool:
+    """
+    @dev Reverts for unknown pools, same as the meta registry does
+    """
+    assert self.registered[_pool], "mock_meta_registry: pool not registered"
+    return True
+
+
+@external
+@view
+def is_meta(_pool: address) -> bool:
+    return self.pools[_pool].is_meta
+
+
+@external
+@view
+def get_gauge(_pool: address) -> address:
+    return self.pools[_pool].gauge
+
+
+@external
+@view
+def get_lp_token(_pool: address, _handler_id: uint256 = 0) -> address:
+    return self.pools[_pool].lp_token
+
+
+@external
+@view
+def get_n_coins(_pool: address, _handler_id: uint256 = 0) -> uint256:
+    return self.pools[_pool].n_coins
+
+
+@external
+@view
+def get_coins(_pool: address, _handler_id: uint256 = 0) -> address[8]:
+    return self.pools[_pool].coins
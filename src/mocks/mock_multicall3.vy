@@ -0,0 +1,70 @@
+# pragma version 0.4.1
+# @license MIT
+
+"""
+@title Mock Multicall3
+@notice Minimal stand-in for Multicall3 used by tests on networks without it
+Ports aggregate3 and getBlockNumber, with bounded calldata and return data
+"""
+
+# ------------------------------------------------------------------
+#                              TYPES
+# ------------------------------------------------------------------
+
+# max number of calls in an aggregate3 call
+MAX_CALLS: constant(uint256) = 32
+# max calldata of a call
+MAX_CALLDATA: constant(uint256) = 1024
+# max return data kept of a call
+MAX_RETURNDATA: constant(uint256) = 4096
+
+
+# Call of an aggregate3 batch
+struct Call3:
+    # address of the called contract
+    target: address
+    # whether the batch goes on if the call reverts
+    allowFailure: bool
+    # calldata of the call
+    callData: Bytes[MAX_CALLDATA]
+
+
+# Result of a call of an aggregate3 batch
+struct Result:
+    # whether the call succeeded
+    success: bool
+    # return data of the call, revert data if it reverted
+    returnData: Bytes[MAX_RETURNDATA]
+
+
+# ------------------------------------------------------------------
+#                         EXTERNAL FUNCTIONS
+# ------------------------------------------------------------------
+
+@external
+@payable
+def aggregate3(calls: DynArray[Call3, MAX_CALLS]) -> DynArray[Result, MAX_CALLS]:
+    """
+    @notice Call each target in order and return the results
+    @dev Reverts if a call that does not allow failure reverts, same as Multicall3
+    """
+    results: DynArray[Result, MAX_CALLS] = []
+    for call: Call3 in calls:
+        success: bool = False
+        return_data: Bytes[MAX_RETURNDATA] = b""
+        success, return_data = raw_call(
+            call.target,
+            call.callData,
+            max_outsize=MAX_RETURNDATA,
+            revert_on_failure=False,
+        )
+        assert success or call.allowFailure, "Multicall3: call failed"
+        results.append(Result(success=success, returnData=return_data))
+
+    return results
+
+
+@external
+@view
+def getBlockNumber() -> uint256:
+    return block.number
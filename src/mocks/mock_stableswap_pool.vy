@@ -0,0 +1,279 @@
+# pragma version 0.4.1
+# @license MIT
+
+"""
+@title Mock StableSwap Pool
+@notice StableSwap invariant math of Curve stableswap pools on state set by the caller
+Ports get_D, get_y, get_y_D and the quote functions of the 3pool and metapool templates
+Used to check the off-chain math engine against the on-chain arithmetic
+@dev Pools without A_PRECISION are set with a_precision = 1, metapools with the base pool
+virtual price as the rate of their last coin
+"""
+
+# ------------------------------------------------------------------
+#                              STATE
+# ------------------------------------------------------------------
+
+# max number of coins in a pool
+MAX_COINS: constant(uint256) = 4
+# precision of rates
+PRECISION: constant(uint256) = 10**18
+# denominator of the pool fee
+FEE_DENOMINATOR: constant(uint256) = 10**10
+# max number of Newton iterations
+MAX_ITERATIONS: constant(uint256) = 255
+
+# balances of the pool coins
+balances: public(DynArray[uint256, MAX_COINS])
+# rate multiplier of each coin, the base pool virtual price for the base lp coin of a metapool
+rates: public(DynArray[uint256, MAX_COINS])
+# amplification coefficient multiplied by a_precision
+amp: public(uint256)
+# precision of amp, 1 for pools without A_PRECISION
+a_precision: public(uint256)
+# swap fee
+fee: public(uint256)
+# total supply of the lp token
+totalSupply: public(uint256)
+# whether the swap fee is charged after converting dy to coin units, as the 3pool does
+fee_after_rates: public(bool)
+
+# ------------------------------------------------------------------
+#                             EXTERNAL
+# ------------------------------------------------------------------
+
+@external
+def set_state(
+    _balances: DynArray[uint256, MAX_COINS],
+    _rates: DynArray[uint256, MAX_COINS],
+    _amp: uint256,
+    _a_precision: uint256,
+    _fee: uint256,
+    _total_supply: uint256,
+    _fee_after_rates: bool,
+):
+    """
+    @notice Set the pool state the quote functions read
+    """
+    assert len(_balances) == len(_rates), "mock_stableswap_pool: length mismatch"
+    self.balances = _balances
+    self.rates = _rates
+    self.amp = _amp
+    self.a_precision = _a_precision
+    self.fee = _fee
+    self.totalSupply = _total_supply
+    self.fee_after_rates = _fee_after_rates
+
+
+# ------------------------------------------------------------------
+#                               VIEW
+# ------------------------------------------------------------------
+
+@external
+@view
+def get_dy(i: int128, j: int128, dx: uint256) -> uint256:
+    rates: DynArray[uint256, MAX_COINS] = self.rates
+    xp: DynArray[uint256, MAX_COINS] = self._xp(self.balances, rates)
+    _i: uint256 = convert(i, uint256)
+    _j: uint256 = convert(j, uint256)
+
+    x: uint256 = xp[_i] + (dx * rates[_i] // PRECISION)
+    y: uint256 = self._get_y(_i, _j, x, xp, self.amp, self.a_precision)
+
+    if self.fee_after_rates:
+        dy: uint256 = (xp[_j] - y - 1) * PRECISION // rates[_j]
+        return dy - self.fee * dy // FEE_DENOMINATOR
+
+    dy: uint256 = xp[_j] - y - 1
+    return (dy - self.fee * dy // FEE_DENOMINATOR) * PRECISION // rates[_j]
+
+
+@external
+@view
+def calc_token_amount(
+    amounts: DynArray[uint256, MAX_COINS], deposit: bool
+) -> uint256:
+    rates: DynArray[uint256, MAX_COINS] = self.rates
+    balances: DynArray[uint256, MAX_COINS] = self.balances
+    amp: uint256 = self.amp
+    a_precision: uint256 = self.a_precision
+
+    D0: uint256 = self._get_D(self._xp(balances, rates), amp, a_precision)
+    for i: uint256 in range(len(balances), bound=MAX_COINS):
+        if deposit:
+            balances[i] += amounts[i]
+        else:
+            balances[i] -= amounts[i]
+    D1: uint256 = self._get_D(self._xp(balances, rates), amp, a_precision)
+
+    diff: uint256 = 0
+    if deposit:
+        diff = D1 - D0
+    else:
+        diff = D0 - D1
+    return diff * self.totalSupply // D0
+
+
+@external
+@view
+def calc_withdraw_one_coin(_token_amount: uint256, i: int128) -> uint256:
+    rates: DynArray[uint256, MAX_COINS] = self.rates
+    amp: uint256 = self.amp
+    a_precision: uint256 = self.a_precision
+    n_coins: uint256 = len(rates)
+    _i: uint256 = convert(i, uint256)
+
+    xp: DynArray[uint256, MAX_COINS] = self._xp(self.balances, rates)
+    D0: uint256 = self._get_D(xp, amp, a_precision)
+    D1: uint256 = D0 - _token_amount * D0 // self.totalSupply
+    new_y: uint256 = self._get_y_D(amp, _i, xp, D1, a_precision)
+
+    base_fee: uint256 = self.fee * n_coins // (4 * (n_coins - 1))
+    xp_reduced: DynArray[uint256, MAX_COINS] = xp
+    for j: uint256 in range(n_coins, bound=MAX_COINS):
+        dx_expected: uint256 = 0
+        if j == _i:
+            dx_expected = xp[j] * D1 // D0 - new_y
+        else:
+            dx_expected = xp[j] - xp[j] * D1 // D0
+        xp_reduced[j] -= base_fee * dx_expected // FEE_DENOMINATOR
+
+    dy: uint256 = xp_reduced[_i] - self._get_y_D(
+        amp, _i, xp_reduced, D1, a_precision
+    )
+    dy = (dy - 1) * PRECISION // rates[_i]
+    # pools also return the fee as the amount without fees minus dy
+    dy_0: uint256 = (xp[_i] - new_y) * PRECISION // rates[_i]
+    dy_fee: uint256 = dy_0 - dy
+    return dy
+
+
+@external
+@view
+def get_virtual_price() -> uint256:
+    D: uint256 = self._get_D(
+        self._xp(self.balances, self.rates), self.amp, self.a_precision
+    )
+    return D * PRECISION // self.totalSupply
+
+
+# ------------------------------------------------------------------
+#                             INTERNAL
+# ------------------------------------------------------------------
+
+@internal
+@pure
+def _xp(
+    balances: DynArray[uint256, MAX_COINS], rates: DynArray[uint256, MAX_COINS]
+) -> DynArray[uint256, MAX_COINS]:
+    xp: DynArray[uint256, MAX_COINS] = []
+    for i: uint256 in range(len(balances), bound=MAX_COINS):
+        xp.append(rates[i] * balances[i] // PRECISION)
+    return xp
+
+
+@internal
+@pure
+def _get_D(
+    xp: DynArray[uint256, MAX_COINS], amp: uint256, a_precision: uint256
+) -> uint256:
+    n_coins: uint256 = len(xp)
+    S: uint256 = 0
+    for x: uint256 in xp:
+        S += x
+    if S == 0:
+        return 0
+
+    D: uint256 = S
+    Ann: uint256 = amp * n_coins
+    for _: uint256 in range(MAX_ITERATIONS):
+        D_P: uint256 = D
+        for x: uint256 in xp:
+            D_P = D_P * D // (x * n_coins)
+        Dprev: uint256 = D
+        D = (
+            (Ann * S // a_precision + D_P * n_coins)
+            * D
+            // (
+                (Ann - a_precision) * D // a_precision
+                + (n_coins + 1) * D_P
+            )
+        )
+        if D > Dprev:
+            if D - Dprev <= 1:
+                return D
+        elif Dprev - D <= 1:
+            return D
+
+    raise "mock_stableswap_pool: D did not converge"
+
+
+@internal
+@pure
+def _get_y(
+    i: uint256,
+    j: uint256,
+    x: uint256,
+    xp: DynArray[uint256, MAX_COINS],
+    amp: uint256,
+    a_precision: uint256,
+) -> uint256:
+    n_coins: uint256 = len(xp)
+    D: uint256 = self._get_D(xp, amp, a_precision)
+    Ann: uint256 = amp * n_coins
+
+    c: uint256 = D
+    S: uint256 = 0
+    for k: uint256 in range(n_coins, bound=MAX_COINS):
+        _x: uint256 = 0
+        if k == i:
+            _x = x
+        elif k != j:
+            _x = xp[k]
+        else:
+            continue
+        S += _x
+        c = c * D // (_x * n_coins)
+    c = c * D * a_precision // (Ann * n_coins)
+
+    return self._solve_y(S + D * a_precision // Ann, c, D)
+
+
+@internal
+@pure
+def _get_y_D(
+    amp: uint256,
+    i: uint256,
+    xp: DynArray[uint256, MAX_COINS],
+    D: uint256,
+    a_precision: uint256,
+) -> uint256:
+    n_coins: uint256 = len(xp)
+    Ann: uint256 = amp * n_coins
+
+    c: uint256 = D
+    S: uint256 = 0
+    for k: uint256 in range(n_coins, bound=MAX_COINS):
+        if k == i:
+            continue
+        S += xp[k]
+        c = c * D // (xp[k] * n_coins)
+    c = c * D * a_precision // (Ann * n_coins)
+
+    return self._solve_y(S + D * a_precision // Ann, c, D)
+
+
+@internal
+@pure
+def _solve_y(b: uint256, c: uint256, D: uint256) -> uint256:
+    y: uint256 = D
+    for _: uint256 in range(MAX_ITERATIONS):
+        y_prev: uint256 = y
+        y = (y * y + c) // (2 * y + b - D)
+        if y > y_prev:
+            if y - y_prev <= 1:
+                return y
+        elif y_prev - y <= 1:
+            return y
+
+    raise "mock_stableswap_pool: y did not converge"
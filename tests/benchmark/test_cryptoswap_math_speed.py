@@ -0,0 +1,93 @@
+"""
+Throughput benchmark for the off-chain CryptoSwap math engine.
+Quotes a 2-coin and a tricrypto-like state locally and through the mock cryptoswap pool,
+which stands in for the eth_call every quote costs without the engine.
+Pools are mocked, so it can be run on any network.
+"""
+
+import dataclasses
+import time
+
+from offchain import cryptoswap_math
+from offchain.cryptoswap_math import CryptoSwapState
+from src.mocks import mock_cryptoswap_pool
+
+QUOTES = 2000
+POOL_QUOTES = 200
+# sub-millisecond local quotes
+MAX_QUOTE_SECONDS = 0.001
+
+TWO_COIN_POOL = CryptoSwapState(
+    balances=(4_000_000 * 10**18, 2_000_000 * 10**6),
+    precisions=(1, 10**12),
+    price_scale=(2 * 10**18,),
+    D=0,
+    A=400000,
+    gamma=145_000_000_000_000,
+    mid_fee=26_000_000,
+    out_fee=45_000_000,
+    fee_gamma=230_000_000_000_000,
+    total_supply=2_800_000 * 10**18,
+)
+TRICRYPTO_POOL = CryptoSwapState(
+    balances=(30_000_000 * 10**6, 1000 * 10**8, 16000 * 10**18),
+    precisions=(10**12, 10**10, 1),
+    price_scale=(30000 * 10**18, 1875 * 10**18),
+    D=0,
+    A=1707629,
+    gamma=11_809_167_828_997,
+    mid_fee=3_000_000,
+    out_fee=30_000_000,
+    fee_gamma=500_000_000_000_000,
+    total_supply=45_000 * 10**18,
+)
+
+
+def quotes_per_second(quote, n: int) -> float:
+    start = time.perf_counter()
+    for k in range(n):
+        quote(k)
+    return n / (time.perf_counter() - start)
+
+
+def test_cryptoswap_math_quotes_per_second():
+    pool = mock_cryptoswap_pool.deploy()
+
+    print("\nstate       function                engine q/s  pool q/s")
+    for name, state in (("2-coin", TWO_COIN_POOL), ("tricrypto", TRICRYPTO_POOL)):
+        pool.set_state(list(state.balances), list(state.precisions), list(state.price_scale), state.A, state.gamma, state.mid_fee, state.out_fee, state.fee_gamma, state.total_supply, 0)
+        state = dataclasses.replace(state, D=pool.D())
+        n_coins = len(state.balances)
+        dx = state.balances[0] // 1000
+        dy = state.balances[1] // 1000
+        amounts = [balance // 1000 for balance in state.balances]
+        lp_amount = state.total_supply // 1000
+
+        cases = {
+            "get_dy": (
+                lambda k: cryptoswap_math.get_dy(state, 0, 1, dx + k),
+                lambda k: pool.get_dy(0, 1, dx + k),
+            ),
+            "get_dx": (
+                lambda k: cryptoswap_math.get_dx(state, 0, 1, dy + k),
+                lambda k: pool.get_dx(0, 1, dy + k),
+            ),
+            "calc_token_amount": (
+                lambda k: cryptoswap_math.calc_token_amount(state, [amounts[0] + k] + amounts[1:], True),
+                lambda k: pool.calc_token_amount([amounts[0] + k] + amounts[1:], True),
+            ),
+            "calc_withdraw_one_coin": (
+                lambda k: cryptoswap_math.calc_withdraw_one_coin(state, lp_amount + k, n_coins - 1),
+                lambda k: pool.calc_withdraw_one_coin(lp_amount + k, n_coins - 1),
+            ),
+        }
+        for function, (engine_quote, pool_quote) in cases.items():
+            # engine and pool must agree before their speed is compared
+            assert engine_quote(7) == pool_quote(7)
+
+            engine_qps = quotes_per_second(engine_quote, QUOTES)
+            pool_qps = quotes_per_second(pool_quote, POOL_QUOTES)
+            print(f"{name:10s}  {function:22s}  {engine_qps:10.0f}  {pool_qps:8.0f}")
+
+            assert 1 / engine_qps < MAX_QUOTE_SECONDS
+            assert engine_qps > pool_qps
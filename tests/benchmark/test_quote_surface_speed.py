@@ -0,0 +1,85 @@
+"""
+Throughput benchmark for the vectorized quote surface.
+Quotes a grid of stableswap and cryptoswap pools and sizes at once and one point at a time
+with the exact integer engines it replaces for scenario analysis.
+Pools are built from fixed states, so it can be run on any network.
+"""
+
+import dataclasses
+import time
+
+import numpy as np
+
+from offchain import cryptoswap_math, quote_surface
+from offchain.cryptoswap_math import CryptoSwapState
+from offchain.stableswap_math import StableSwapState
+
+# pools of each kind, each a copy of its base state with rescaled balances
+POOLS = 32
+SIZES = 2000
+VECTOR_RUNS = 5
+SCALAR_QUOTES = 500
+MIN_SPEEDUP = 100
+
+THREE_POOL = StableSwapState(
+    balances=(60_000_000 * 10**18, 70_000_000 * 10**6, 40_000_000 * 10**6),
+    rates=(10**18, 10**30, 10**30),
+    amp=2000,
+    fee=1_000_000,
+    total_supply=165_000_000 * 10**18,
+    fee_after_rates=True,
+)
+TRICRYPTO_POOL = CryptoSwapState(
+    balances=(30_000_000 * 10**6, 1000 * 10**8, 16000 * 10**18),
+    precisions=(10**12, 10**10, 1),
+    price_scale=(30000 * 10**18, 1875 * 10**18),
+    D=0,
+    A=1707629,
+    gamma=11_809_167_828_997,
+    mid_fee=3_000_000,
+    out_fee=30_000_000,
+    fee_gamma=500_000_000_000_000,
+    total_supply=45_000 * 10**18,
+)
+
+
+def pools(state, n: int) -> list:
+    """
+    n copies of state with balances from 1x to 2x, with their D for cryptoswap states.
+    """
+    copies = []
+    for k in range(n):
+        copy = dataclasses.replace(state, balances=tuple(balance * (n + k) // n for balance in state.balances))
+        if isinstance(copy, CryptoSwapState):
+            copy = dataclasses.replace(copy, D=cryptoswap_math.newton_D(copy.A, copy.gamma, cryptoswap_math._xp(copy, copy.balances)))
+        copies.append(copy)
+    return copies
+
+
+def test_quote_surface_quotes_per_second():
+    print("\nstate       points  vector q/s  scalar q/s  speedup")
+    for name, state in (("3pool", THREE_POOL), ("tricrypto", TRICRYPTO_POOL)):
+        states = pools(state, POOLS)
+        dx = np.geomspace(1e-6, 0.1, SIZES) * state.balances[0]
+
+        # best of a few runs, one call is too short to time once
+        seconds = []
+        for _ in range(VECTOR_RUNS):
+            start = time.perf_counter()
+            dy = quote_surface.get_dy(states, 0, 1, dx)
+            seconds.append(time.perf_counter() - start)
+        vector_qps = dy.size / min(seconds)
+
+        points = [(k % POOLS, k * SIZES // SCALAR_QUOTES) for k in range(SCALAR_QUOTES)]
+        start = time.perf_counter()
+        exact = [quote_surface.exact_get_dy(states[p], 0, 1, int(dx[s])) for p, s in points]
+        scalar_qps = SCALAR_QUOTES / (time.perf_counter() - start)
+
+        # the surface must be accurate before its speed is compared
+        bound = quote_surface.error_bound(states, 1)
+        assert all(abs(dy[p, s] - amount) <= bound[p, 0] for (p, s), amount in zip(points, exact))
+
+        speedup = vector_qps / scalar_qps
+        print(f"{name:10s}  {dy.size:6d}  {vector_qps:10.0f}  {scalar_qps:10.0f}  {speedup:7.0f}")
+
+        assert speedup >= MIN_SPEEDUP
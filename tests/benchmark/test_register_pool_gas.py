@@ -0,0 +1,52 @@
+"""
+Gas benchmark for pool registration.
+Registration cost must stay flat no matter how many pools are already registered.
+Pools are served by a mock meta registry, so it can be run on any network.
+"""
+
+import boa
+
+from src import cryptoswap_adapter, stableswap_adapter
+from src.mocks import mock_meta_registry
+
+ZERO = "0x0000000000000000000000000000000000000000"
+POOLS = 5000
+CHECKPOINTS = [1, 2, 10, 100, 1000, 2500, 5000]
+# allowed spread of registration gas between checkpoints (first pool excluded)
+TOLERANCE = 100
+
+
+def test_register_pool_gas_is_flat():
+    registry = mock_meta_registry.deploy()
+    minter = boa.env.generate_address("minter")
+    coins = [boa.env.generate_address(f"coin_{i}") for i in range(3)] + [ZERO] * 5
+
+    stableswap = stableswap_adapter.deploy(registry, minter)
+    cryptoswap = cryptoswap_adapter.deploy(registry, minter, coins[2])
+
+    stableswap_gas: dict = {}
+    cryptoswap_gas: dict = {}
+
+    for i in range(1, POOLS + 1):
+        pool = boa.env.generate_address(f"pool_{i}")
+        registry.set_pool(pool, False, ZERO, pool, 3, coins)
+
+        stableswap.register_pool(pool, ZERO)
+        if i in CHECKPOINTS:
+            stableswap_gas[i] = stableswap._computation.get_gas_used()
+
+        cryptoswap.register_pool(pool)
+        if i in CHECKPOINTS:
+            cryptoswap_gas[i] = cryptoswap._computation.get_gas_used()
+
+    assert stableswap.get_pools_count() == POOLS
+    assert cryptoswap.get_pools_count() == POOLS
+
+    print("\npools  stableswap  cryptoswap")
+    for i in CHECKPOINTS:
+        print(f"{i:5d}  {stableswap_gas[i]:10d}  {cryptoswap_gas[i]:10d}")
+
+    # first registration pays for initializing the pools counter
+    for gas in (stableswap_gas, cryptoswap_gas):
+        steady = [gas[i] for i in CHECKPOINTS[1:]]
+        assert max(steady) - min(steady) <= TOLERANCE
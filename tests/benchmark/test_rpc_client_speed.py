@@ -0,0 +1,88 @@
+"""
+Throughput benchmark for the asyncio JSON-RPC client.
+Fans adapter quotes out to a local JSON-RPC stand-in with a simulated network latency,
+one request at a time over one connection, concurrently over pooled HTTP and WebSocket, and as one batch.
+The stand-in runs the EVM one call at a time in py-evm, which bounds the speedup well below a node's.
+Pools are mocked, so it can be run on any network.
+"""
+
+import asyncio
+import time
+
+import boa
+
+from offchain.rpc_client import AdapterClient, HttpTransport, RpcClient, WebSocketTransport
+from offchain.rpc_stand_in import StandIn
+from src import stableswap_adapter
+from src.mocks import mock_meta_registry, mock_stableswap_pool
+
+ZERO = "0x0000000000000000000000000000000000000000"
+POOLS = 8
+QUOTES = 40
+# round trip to a hosted endpoint, in seconds
+LATENCY = 0.1
+# each quote asked by this many callers at once, the duplicates coalesce
+CALLERS = 4
+MIN_SPEEDUP = 3
+
+
+def deploy_pools():
+    registry = mock_meta_registry.deploy()
+    adapter = stableswap_adapter.deploy(registry, boa.env.generate_address("minter"))
+    pools = []
+    for k in range(POOLS):
+        pool = mock_stableswap_pool.deploy()
+        pool.set_state([10**24 + k * 10**22, 2 * 10**12, 3 * 10**12], [10**18, 10**30, 10**30], 2000, 1, 10**6, 6 * 10**24, True)
+        coins = [boa.env.generate_address(f"coin_{i}") for i in range(3)] + [ZERO] * 5
+        registry.set_pool(pool, False, ZERO, pool, 3, coins)
+        adapter.register_pool(pool, ZERO)
+        pools.append(pool.address)
+    return adapter, pools
+
+
+def test_rpc_client_quotes_per_second():
+    adapter, pools = deploy_pools()
+    quotes = [(pools[k % POOLS], 0, 1 + k % 2, 10**21 + k) for k in range(QUOTES)]
+    expected = [adapter.get_exchange_amount_out(*quote) for quote in quotes]
+
+    async def sequential(client):
+        return [await client.get_exchange_amount_out(*quote) for quote in quotes]
+
+    async def concurrent(client):
+        amounts = await asyncio.gather(*(client.get_exchange_amount_out(*quote) for quote in quotes for _ in range(CALLERS)))
+        return amounts[::CALLERS]
+
+    async def batched(client):
+        return await client.views([("get_exchange_amount_out", quote) for quote in quotes])
+
+    async def measure(transport, concurrency, fan_out):
+        stand_in = StandIn(latency=LATENCY)
+        await stand_in.start()
+        rpc = RpcClient(transport(stand_in), concurrency=concurrency)
+        try:
+            start = time.perf_counter()
+            amounts = await fan_out(AdapterClient(rpc, adapter.address, adapter.abi))
+            seconds = time.perf_counter() - start
+        finally:
+            await rpc.close()
+            await stand_in.close()
+        # quotes must match direct calls before their speed is compared
+        assert amounts == expected
+        return QUOTES / seconds, stand_in.requests, stand_in.connections
+
+    cases = {
+        "sequential": (lambda stand_in: HttpTransport(stand_in.http_url, pool_size=1), 1, sequential),
+        "http pool": (lambda stand_in: HttpTransport(stand_in.http_url), 32, concurrent),
+        "websocket": (lambda stand_in: WebSocketTransport(stand_in.ws_url), 32, concurrent),
+        "http batch": (lambda stand_in: HttpTransport(stand_in.http_url), 32, batched),
+    }
+    print("\nclient      q/s  requests  connections  speedup")
+    qps = {}
+    for name, (transport, concurrency, fan_out) in cases.items():
+        qps[name], requests, connections = asyncio.run(measure(transport, concurrency, fan_out))
+        print(f"{name:10s}  {qps[name]:5.0f}  {requests:8d}  {connections:11d}  {qps[name] / qps['sequential']:7.1f}")
+
+        # duplicates of in-flight quotes never reach the node
+        assert requests <= QUOTES
+        if name != "sequential":
+            assert qps[name] > MIN_SPEEDUP * qps["sequential"]
@@ -0,0 +1,74 @@
+"""
+Throughput benchmark for the off-chain StableSwap math engine.
+Quotes a 3pool-like and a metapool-like state locally and through the mock stableswap pool,
+which stands in for the eth_call every quote costs without the engine.
+Pools are mocked, so it can be run on any network.
+"""
+
+import time
+
+from offchain import stableswap_math
+from offchain.stableswap_math import StableSwapState
+from src.mocks import mock_stableswap_pool
+
+QUOTES = 2000
+POOL_QUOTES = 200
+
+THREE_POOL = StableSwapState(
+    balances=(160_000_000 * 10**18, 70_000_000 * 10**6, 120_000_000 * 10**6),
+    rates=(10**18, 10**30, 10**30),
+    amp=4000,
+    fee=1_000_000,
+    total_supply=340_000_000 * 10**18,
+    fee_after_rates=True,
+)
+META_POOL = StableSwapState(
+    balances=(2_000_000 * 10**18, 1_800_000 * 10**18),
+    rates=(10**18, 1_035_000_000_000_000_000),
+    amp=20000,
+    fee=4_000_000,
+    total_supply=3_800_000 * 10**18,
+    a_precision=100,
+)
+
+
+def quotes_per_second(quote, n: int) -> float:
+    start = time.perf_counter()
+    for k in range(n):
+        quote(k)
+    return n / (time.perf_counter() - start)
+
+
+def test_stableswap_math_quotes_per_second():
+    pool = mock_stableswap_pool.deploy()
+
+    print("\nstate       function                engine q/s  pool q/s")
+    for name, state in (("3pool", THREE_POOL), ("metapool", META_POOL)):
+        pool.set_state(list(state.balances), list(state.rates), state.amp, state.a_precision, state.fee, state.total_supply, state.fee_after_rates)
+        dx = state.balances[0] // 1000
+        amounts = [balance // 1000 for balance in state.balances]
+        lp_amount = state.total_supply // 1000
+
+        cases = {
+            "get_dy": (
+                lambda k: stableswap_math.get_dy(state, 0, 1, dx + k),
+                lambda k: pool.get_dy(0, 1, dx + k),
+            ),
+            "calc_token_amount": (
+                lambda k: stableswap_math.calc_token_amount(state, [amounts[0] + k] + amounts[1:], True),
+                lambda k: pool.calc_token_amount([amounts[0] + k] + amounts[1:], True),
+            ),
+            "calc_withdraw_one_coin": (
+                lambda k: stableswap_math.calc_withdraw_one_coin(state, lp_amount + k, 1),
+                lambda k: pool.calc_withdraw_one_coin(lp_amount + k, 1),
+            ),
+        }
+        for function, (engine_quote, pool_quote) in cases.items():
+            # engine and pool must agree before their speed is compared
+            assert engine_quote(7) == pool_quote(7)
+
+            engine_qps = quotes_per_second(engine_quote, QUOTES)
+            pool_qps = quotes_per_second(pool_quote, POOL_QUOTES)
+            print(f"{name:10s}  {function:22s}  {engine_qps:10.0f}  {pool_qps:8.0f}")
+
+            assert engine_qps > pool_qps
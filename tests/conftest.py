@@ -5,6 +5,9 @@ from eth_utils import to_wei
 from moccasin.boa_tools import VyperContract
 from moccasin.config import get_active_network
 
+from src import cryptoswap_lens as cryptoswap_lens_contract
+from src import stableswap_lens as stableswap_lens_contract
+
 BALANCE = to_wei(1000, "ether")
 ZERO = "0x0000000000000000000000000000000000000000"
 
@@ -131,4 +134,14 @@ def stableswap_adapter(active_network, alice) -> VyperContract:
 @pytest.fixture(scope="function")
 def cryptoswap_adapter(active_network, alice) -> VyperContract:
     with boa.env.prank(alice):
-        return active_network.manifest_named("cryptoswap_adapter")
\ No newline at end of file
+        return active_network.manifest_named("cryptoswap_adapter")
+
+@pytest.fixture(scope="function")
+def stableswap_lens(stableswap_adapter, alice) -> VyperContract:
+    with boa.env.prank(alice):
+        return stableswap_lens_contract.deploy(stableswap_adapter)
+
+@pytest.fixture(scope="function")
+def cryptoswap_lens(cryptoswap_adapter, alice) -> VyperContract:
+    with boa.env.prank(alice):
+        return cryptoswap_lens_contract.deploy(cryptoswap_adapter)
\ No newline at end of file
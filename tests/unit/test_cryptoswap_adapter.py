@@ -5,14 +5,25 @@ Should be run with eth-forked network only
 
 import boa
 from eth_abi import encode
-from eth_utils import from_wei, function_signature_to_4byte_selector, to_wei
+from eth_account import Account
+from eth_utils import from_wei, function_signature_to_4byte_selector, keccak, to_wei
 
 ZERO = "0x0000000000000000000000000000000000000000"
+REGISTERED = 1
+ALREADY_REGISTERED = 2
+NOT_IN_META_REGISTRY = 4
+TOO_MANY_COINS = 8
 RANDOM_ADDRESS = boa.env.generate_address("random")
 BALANCE = to_wei(1000, "ether")
 WBTC_BALANCE = int(1000e8)
 WBTC_WHALE = "0x5Ee5bf7ae06D1Be5997A1A72006FE6C607eC6DE8"
 STG_WHALE = "0x65bb797c2B9830d891D87288F029ed8dACc19705"
+PERMIT2 = "0x000000000022D473030F116dDEE9F6B43aC78BA3"
+PERMIT2_ABI = '[{"name": "DOMAIN_SEPARATOR", "type": "function", "stateMutability": "view", "inputs": [], "outputs": [{"name": "", "type": "bytes32"}]}]'
+PERMIT_TYPEHASH = keccak(text="Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)")
+PERMIT_DETAILS_TYPEHASH = keccak(text="PermitDetails(address token,uint160 amount,uint48 expiration,uint48 nonce)")
+PERMIT_SINGLE_TYPEHASH = keccak(text="PermitSingle(PermitDetails details,address spender,uint256 sigDeadline)PermitDetails(address token,uint160 amount,uint48 expiration,uint48 nonce)")
+DEADLINE = 2**48 - 1
 
 # ------------------------------------------------------------------
 #                      REGISTER_POOL FUNCTION TESTS
@@ -67,6 +78,18 @@ def test_set_pool_data_successfully(cryptoswap_adapter, alice, usdc_wbtc_eth_poo
         assert pool_info.lp_token == stg_usdc_pool_lp_token.address
         assert pool_info.n_coins == 2
 
+def test_stores_pool_coins_on_register(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract, usdc, wbtc, eth, stg):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    assert cryptoswap_adapter.pool_coins(usdc_wbtc_eth_pool_contract, 0) == usdc.address
+    assert cryptoswap_adapter.pool_coins(usdc_wbtc_eth_pool_contract, 1) == wbtc.address
+    assert cryptoswap_adapter.pool_coins(usdc_wbtc_eth_pool_contract, 2) == eth.address
+
+    assert cryptoswap_adapter.pool_coins(stg_usdc_pool_contract, 0) == stg.address
+    assert cryptoswap_adapter.pool_coins(stg_usdc_pool_contract, 1) == usdc.address
+    assert cryptoswap_adapter.pool_coins(stg_usdc_pool_contract, 2) == ZERO
+
 def test_emits_register_log(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, usdc_wbtc_eth_pool_gauge, usdc_wbtc_eth_pool_lp_token):
     register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
     logs = cryptoswap_adapter.get_logs()
@@ -75,6 +98,146 @@ def test_emits_register_log(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contra
     assert logs[0].lp_token == usdc_wbtc_eth_pool_lp_token.address
     assert logs[0].n_coins == 3
 
+# ------------------------------------------------------------------
+#                     REGISTER_POOLS FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_register_pools_not_owner(cryptoswap_adapter, usdc_wbtc_eth_pool_contract):
+    with boa.reverts("ownable: caller is not the owner"):
+        cryptoswap_adapter.register_pools([usdc_wbtc_eth_pool_contract])
+
+def test_register_pools_successfully(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract):
+    with boa.env.prank(alice):
+        statuses = cryptoswap_adapter.register_pools([usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract])
+
+    assert list(statuses) == [REGISTERED, REGISTERED]
+    assert cryptoswap_adapter.get_pools_count() == 2
+    assert cryptoswap_adapter.pool_registry_set(0) == usdc_wbtc_eth_pool_contract.address
+    assert cryptoswap_adapter.pool_registry_set(1) == stg_usdc_pool_contract.address
+
+def test_register_pools_skips_invalid_pools(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract):
+    four_token_pool: str = "0x79a8C46DeA5aDa233ABaFFD40F3A0A2B1e5A4F27"
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    with boa.env.prank(alice):
+        statuses = cryptoswap_adapter.register_pools(
+            [usdc_wbtc_eth_pool_contract, RANDOM_ADDRESS, four_token_pool, stg_usdc_pool_contract]
+        )
+
+    assert list(statuses) == [ALREADY_REGISTERED, NOT_IN_META_REGISTRY, TOO_MANY_COINS, REGISTERED]
+    assert cryptoswap_adapter.get_pools_count() == 2
+
+    logs = cryptoswap_adapter.get_logs()
+    assert logs[0].pool == usdc_wbtc_eth_pool_contract.address
+    assert logs[0].status == ALREADY_REGISTERED
+    assert logs[1].pool == RANDOM_ADDRESS
+    assert logs[1].status == NOT_IN_META_REGISTRY
+    assert logs[2].pool == four_token_pool
+    assert logs[2].status == TOO_MANY_COINS
+    assert logs[3].pool == stg_usdc_pool_contract.address
+
+
+# ------------------------------------------------------------------
+#                    DEREGISTER_POOL FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_deregister_pool_not_owner(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    with boa.reverts("ownable: caller is not the owner"):
+        cryptoswap_adapter.deregister_pool(usdc_wbtc_eth_pool_contract)
+
+def test_cannot_deregister_pool_not_registered(cryptoswap_adapter, alice):
+    with boa.env.prank(alice):
+        with boa.reverts("cryptoswap_adapter: pool not registered"):
+            cryptoswap_adapter.deregister_pool(RANDOM_ADDRESS)
+
+def test_deregister_pool_successfully(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    with boa.env.prank(alice):
+        cryptoswap_adapter.deregister_pool(usdc_wbtc_eth_pool_contract)
+
+    logs = cryptoswap_adapter.get_logs()
+    assert logs[len(logs) - 1].pool == usdc_wbtc_eth_pool_contract.address
+
+    # last pool is moved into the freed id
+    assert cryptoswap_adapter.get_pools_count() == 1
+    assert cryptoswap_adapter.pool_registry_set(0) == stg_usdc_pool_contract.address
+    assert cryptoswap_adapter.pool_registry_set(1) == ZERO
+
+    assert cryptoswap_adapter.get_pool_info(usdc_wbtc_eth_pool_contract).contract == ZERO
+    assert cryptoswap_adapter.pool_coins(usdc_wbtc_eth_pool_contract, 0) == ZERO
+
+    with boa.reverts("cryptoswap_adapter: pool address mismatch"):
+        cryptoswap_adapter.get_exchange_amount_out(usdc_wbtc_eth_pool_contract, 0, 1, int(1e6))
+
+    # pool can be registered again
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    assert cryptoswap_adapter.get_pools_count() == 2
+    assert cryptoswap_adapter.pool_registry_set(1) == usdc_wbtc_eth_pool_contract.address
+
+
+# ------------------------------------------------------------------
+#               SET_FEE_ON_TRANSFER_COIN FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_set_fee_on_transfer_coin_not_owner(cryptoswap_adapter, usdc):
+    with boa.reverts("ownable: caller is not the owner"):
+        cryptoswap_adapter.set_fee_on_transfer_coin(usdc, True)
+
+def test_set_fee_on_transfer_coin_successfully(cryptoswap_adapter, alice, usdc):
+    assert not cryptoswap_adapter.fee_on_transfer_coins(usdc)
+
+    with boa.env.prank(alice):
+        cryptoswap_adapter.set_fee_on_transfer_coin(usdc, True)
+
+    assert cryptoswap_adapter.fee_on_transfer_coins(usdc)
+
+    logs = cryptoswap_adapter.get_logs()
+    assert logs[len(logs) - 1].coin == usdc.address
+    assert logs[len(logs) - 1].is_fee_on_transfer
+
+    with boa.env.prank(alice):
+        cryptoswap_adapter.set_fee_on_transfer_coin(usdc, False)
+
+    assert not cryptoswap_adapter.fee_on_transfer_coins(usdc)
+
+
+# ------------------------------------------------------------------
+#                  FIND_POOLS_FOR_PAIR FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_find_pools_for_pair_successfully(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract, usdc, wbtc, eth, stg):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    pools = cryptoswap_lens.find_pools_for_pair(eth, usdc)
+    assert len(pools) == 1
+    assert pools[0].pool == usdc_wbtc_eth_pool_contract.address
+    assert pools[0].index_in == 2
+    assert pools[0].index_out == 0
+
+    pools = cryptoswap_lens.find_pools_for_pair(usdc, stg)
+    assert len(pools) == 1
+    assert pools[0].pool == stg_usdc_pool_contract.address
+    assert pools[0].index_in == 1
+    assert pools[0].index_out == 0
+
+    assert cryptoswap_adapter.get_pair_pools_count(wbtc, usdc) == 1
+    assert cryptoswap_lens.find_pools_for_pair(stg, wbtc) == []
+
+def test_find_pools_for_pair_after_deregister(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract, usdc, wbtc):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    with boa.env.prank(alice):
+        cryptoswap_adapter.deregister_pool(usdc_wbtc_eth_pool_contract)
+
+    assert cryptoswap_lens.find_pools_for_pair(usdc, wbtc) == []
+    assert cryptoswap_adapter.get_pair_pools_count(usdc, wbtc) == 0
+
+
 # ------------------------------------------------------------------
 #                      EXCHANGE FUNCTION TESTS
 # ------------------------------------------------------------------
@@ -205,6 +368,130 @@ def test_can_successfully_exchange_twocrypto_pool(cryptoswap_adapter, alice, stg
     assert log.out_amount == usdc_out_amount
 
 
+def test_exchange_keeps_standing_allowance_for_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract, stg, usdc):
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+    mint_stg_usdc_pool_tokens(alice, stg, usdc)
+
+    AMOUNT_IN: int = int(1e18) # STG
+
+    with boa.env.prank(alice):
+        stg.approve(cryptoswap_adapter, AMOUNT_IN * 2)
+        cryptoswap_adapter.exchange(stg_usdc_pool_contract, 0, 1, AMOUNT_IN, 0, False)
+
+        allowance: int = stg.allowance(cryptoswap_adapter, stg_usdc_pool_contract)
+        assert allowance >= 2**255
+
+        cryptoswap_adapter.exchange(stg_usdc_pool_contract, 0, 1, AMOUNT_IN, 0, False)
+
+    assert stg.allowance(cryptoswap_adapter, stg_usdc_pool_contract) <= allowance
+    assert stg.balanceOf(cryptoswap_adapter) == 0
+
+
+# ------------------------------------------------------------------
+#                   EXCHANGE_ROUTE FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_exchange_route_with_empty_route(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    with boa.env.prank(alice):
+        with boa.reverts("cryptoswap_adapter: empty route"):
+            cryptoswap_adapter.exchange_route([], int(1e18), 0)
+
+def test_cannot_exchange_route_with_not_continuous_route(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract, stg, usdc):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+    mint_stg_usdc_pool_tokens(alice, stg, usdc)
+
+    AMOUNT_IN: int = int(1e18) # STG
+
+    # STG -> USDC, then WBTC -> USDC
+    route = [(stg_usdc_pool_contract.address, 0, 1), (usdc_wbtc_eth_pool_contract.address, 1, 0)]
+
+    with boa.env.prank(alice):
+        stg.approve(cryptoswap_adapter, AMOUNT_IN)
+        with boa.reverts("cryptoswap_adapter: route is not continuous"):
+            cryptoswap_adapter.exchange_route(route, AMOUNT_IN, 0)
+
+def test_can_successfully_exchange_route(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract, stg, usdc, wbtc):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+    mint_stg_usdc_pool_tokens(alice, stg, usdc)
+
+    AMOUNT_IN: int = int(1000e18) # STG
+
+    # STG -> USDC -> WBTC
+    route = [(stg_usdc_pool_contract.address, 0, 1), (usdc_wbtc_eth_pool_contract.address, 0, 1)]
+
+    stg_balance_before: int = stg.balanceOf(alice)
+    usdc_balance_before: int = usdc.balanceOf(alice)
+    wbtc_balance_before: int = wbtc.balanceOf(alice)
+
+    with boa.env.prank(alice):
+        stg.approve(cryptoswap_adapter, AMOUNT_IN)
+        out_amount: int = cryptoswap_adapter.exchange_route(route, AMOUNT_IN, 0)
+
+    wbtc_out_amount: int = wbtc.balanceOf(alice) - wbtc_balance_before
+
+    print(f"wbtc_out_amount: {wbtc_out_amount}")
+    assert wbtc_out_amount > 0
+    assert out_amount == wbtc_out_amount
+
+    assert stg.balanceOf(alice) == stg_balance_before - AMOUNT_IN
+    assert usdc.balanceOf(alice) == usdc_balance_before
+
+    assert stg.balanceOf(cryptoswap_adapter) == 0
+    assert usdc.balanceOf(cryptoswap_adapter) == 0
+    assert wbtc.balanceOf(cryptoswap_adapter) == 0
+
+    logs = cryptoswap_adapter.get_logs()
+
+    assert len(logs) == 2
+    assert logs[0].pool == stg_usdc_pool_contract.address
+    assert logs[0].amount_in == AMOUNT_IN
+    assert logs[1].pool == usdc_wbtc_eth_pool_contract.address
+    assert logs[1].amount_in == logs[0].out_amount
+    assert logs[1].out_amount == wbtc_out_amount
+
+
+# ------------------------------------------------------------------
+#                   EXCHANGE_BEST FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_exchange_best_without_pool_for_pair(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg, wbtc):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    with boa.env.prank(alice):
+        with boa.reverts("cryptoswap_adapter: no pool for pair"):
+            cryptoswap_adapter.exchange_best(stg, wbtc, int(1e18), 0)
+
+def test_can_successfully_exchange_best(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract, usdc, wbtc):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+    mint_usdc_wbtc_eth_pool_tokens(alice, usdc, wbtc)
+
+    AMOUNT_IN: int = int(1e8) # WBTC
+
+    expected_out_amount: int = cryptoswap_adapter.get_exchange_amount_out(usdc_wbtc_eth_pool_contract, 1, 0, AMOUNT_IN)
+
+    usdc_balance_before: int = usdc.balanceOf(alice)
+
+    with boa.env.prank(alice):
+        wbtc.approve(cryptoswap_adapter, AMOUNT_IN)
+        out_amount: int = cryptoswap_adapter.exchange_best(wbtc, usdc, AMOUNT_IN, 0)
+
+    assert out_amount == expected_out_amount
+    assert usdc.balanceOf(alice) - usdc_balance_before == out_amount
+
+    logs = cryptoswap_adapter.get_logs()
+    log = logs[len(logs) - 1]
+
+    assert log.pool == usdc_wbtc_eth_pool_contract.address
+    assert log.index_in == 1
+    assert log.index_out == 0
+    assert log.out_amount == out_amount
+
+
 # ------------------------------------------------------------------
 #              GET_EXCHANGE_AMOUNT_OUT FUNCTION TESTS
 # ------------------------------------------------------------------
@@ -228,6 +515,65 @@ def test_get_exchange_amount_out_successfully_twocrypto_pool(cryptoswap_adapter,
 
     assert out_amount > 0
 
+def test_get_exchange_ladder_successfully(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    AMOUNTS_IN: list = [int(1e18) * 2**i for i in range(10)] # ETH
+
+    amounts_out, prices = cryptoswap_lens.get_exchange_ladder(usdc_wbtc_eth_pool_contract, 2, 0, AMOUNTS_IN)
+
+    assert len(amounts_out) == len(AMOUNTS_IN)
+    assert len(prices) == len(AMOUNTS_IN)
+    for amount_in, amount_out, price in zip(AMOUNTS_IN, amounts_out, prices):
+        assert amount_out == cryptoswap_adapter.get_exchange_amount_out(usdc_wbtc_eth_pool_contract, 2, 0, amount_in)
+        assert price == amount_out * 10**18 // amount_in
+
+    # price impact grows with trade size
+    assert prices[-1] < prices[0]
+
+def test_cannot_get_exchange_ladder_with_wrong_index_out(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    with boa.reverts("cryptoswap_adapter: index out out of bounds"):
+        cryptoswap_lens.get_exchange_ladder(usdc_wbtc_eth_pool_contract, 2, 3, [int(10e18)])
+
+def test_get_exchange_amounts_out_successfully(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    AMOUNT_IN: int = int(1e18)
+
+    requests = [
+        (usdc_wbtc_eth_pool_contract.address, 2, 0, AMOUNT_IN),
+        (stg_usdc_pool_contract.address, 0, 1, AMOUNT_IN),
+        (usdc_wbtc_eth_pool_contract.address, 0, 1, int(1000e6)),
+    ]
+
+    amounts_out: list = cryptoswap_lens.get_exchange_amounts_out(requests)
+
+    assert len(amounts_out) == len(requests)
+    for (pool, index_in, index_out, amount_in), amount_out in zip(requests, amounts_out):
+        assert amount_out == cryptoswap_adapter.get_exchange_amount_out(pool, index_in, index_out, amount_in)
+
+def test_get_exchange_amounts_out_returns_failed_for_invalid_requests(cryptoswap_adapter, cryptoswap_lens, alice, stg_usdc_pool_contract):
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    AMOUNT_IN: int = int(1e18)
+    QUOTE_FAILED: int = cryptoswap_adapter.QUOTE_FAILED()
+
+    requests = [
+        (RANDOM_ADDRESS, 0, 1, AMOUNT_IN),
+        (stg_usdc_pool_contract.address, 0, 2, AMOUNT_IN),
+        (stg_usdc_pool_contract.address, 1, 1, AMOUNT_IN),
+        (stg_usdc_pool_contract.address, 0, 1, AMOUNT_IN),
+    ]
+
+    amounts_out: list = cryptoswap_lens.get_exchange_amounts_out(requests)
+
+    assert QUOTE_FAILED == 2**256 - 1
+    assert amounts_out[:3] == [QUOTE_FAILED] * 3
+    assert amounts_out[3] == cryptoswap_adapter.get_exchange_amount_out(stg_usdc_pool_contract, 0, 1, AMOUNT_IN)
+
 
 # ------------------------------------------------------------------
 #                      ADD_LIQUIDITY FUNCTION TESTS
@@ -408,6 +754,30 @@ def test_can_remove_liquidity_balanced_successfully_tricrypto_pool(cryptoswap_ad
     assert log.amount == mint_amount
 
 
+def test_remove_liquidity_balanced_leaves_no_coins_in_adapter_tricrypto_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, usdc, wbtc, usdc_wbtc_eth_pool_lp_token):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    mint_usdc_wbtc_eth_pool_tokens(alice, usdc, wbtc)
+
+    AMOUNT_TO_ADD: int = int(100e18) # ETH
+    AMOUNT_TO_ADD_2: int = int(200e6) # USDC
+    AMOUNT_TO_ADD_3: int = int(300e8) # WBTC
+
+    with boa.env.prank(alice):
+        usdc.approve(cryptoswap_adapter, AMOUNT_TO_ADD_2)
+        wbtc.approve(cryptoswap_adapter, AMOUNT_TO_ADD_3)
+
+        mint_amount: int = cryptoswap_adapter.add_liquidity(usdc_wbtc_eth_pool_contract, [AMOUNT_TO_ADD_2, AMOUNT_TO_ADD_3, AMOUNT_TO_ADD], 0, True, value=AMOUNT_TO_ADD)
+
+        usdc_wbtc_eth_pool_lp_token.approve(cryptoswap_adapter, mint_amount)
+
+        cryptoswap_adapter.remove_liquidity(usdc_wbtc_eth_pool_contract, mint_amount, [0, 0, 0], True)
+
+    # amounts returned by the pool are forwarded as is
+    assert usdc.balanceOf(cryptoswap_adapter) == 0
+    assert wbtc.balanceOf(cryptoswap_adapter) == 0
+    assert boa.env.get_balance(cryptoswap_adapter.address) == 0
+
+
 def test_can_remove_liquidity_balanced_successfully_twocrypto_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract, stg, usdc, stg_usdc_pool_lp_token):
     register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
     mint_stg_usdc_pool_tokens(alice, stg, usdc)
@@ -663,6 +1033,50 @@ def test_can_successfully_deposit_lp_for_crv_twocrypto_pool(cryptoswap_adapter,
     assert log.lp_amount == mint_amount
 
 
+def test_can_add_liquidity_and_stake_tricrypto_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, usdc, wbtc, usdc_wbtc_eth_pool_lp_token, usdc_wbtc_eth_pool_gauge):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    mint_usdc_wbtc_eth_pool_tokens(alice, usdc, wbtc)
+
+    AMOUNT_TO_ADD: int = int(100e18) # ETH
+    AMOUNT_TO_ADD_2: int = int(200e6) # USDC
+    AMOUNT_TO_ADD_3: int = int(300e8) # WBTC
+
+    with boa.env.prank(alice):
+        usdc.approve(cryptoswap_adapter, AMOUNT_TO_ADD_2)
+        wbtc.approve(cryptoswap_adapter, AMOUNT_TO_ADD_3)
+
+        mint_amount: int = cryptoswap_adapter.add_liquidity_and_stake(usdc_wbtc_eth_pool_contract, [AMOUNT_TO_ADD_2, AMOUNT_TO_ADD_3, AMOUNT_TO_ADD], 0, True, value=AMOUNT_TO_ADD)
+
+    assert mint_amount > 0
+    assert usdc_wbtc_eth_pool_lp_token.balanceOf(alice) == 0
+    assert usdc_wbtc_eth_pool_lp_token.balanceOf(cryptoswap_adapter) == 0
+    assert usdc_wbtc_eth_pool_gauge.balanceOf(alice) == mint_amount
+
+    logs = cryptoswap_adapter.get_logs()
+    log = logs[len(logs) - 1]
+
+    assert log.pool == usdc_wbtc_eth_pool_contract.address
+    assert log.lp_amount == mint_amount
+
+
+def test_can_add_liquidity_and_stake_twocrypto_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract, stg, usdc, stg_usdc_pool_lp_token, stg_usdc_pool_gauge):
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+    mint_stg_usdc_pool_tokens(alice, stg, usdc)
+
+    AMOUNT_TO_ADD: int = int(100e18) # STG
+    AMOUNT_TO_ADD_2: int = int(200e6) # USDC
+
+    with boa.env.prank(alice):
+        usdc.approve(cryptoswap_adapter, AMOUNT_TO_ADD_2)
+        stg.approve(cryptoswap_adapter, AMOUNT_TO_ADD)
+
+        mint_amount: int = cryptoswap_adapter.add_liquidity_and_stake(stg_usdc_pool_contract, [AMOUNT_TO_ADD, AMOUNT_TO_ADD_2], 0, False)
+
+    assert mint_amount > 0
+    assert stg_usdc_pool_lp_token.balanceOf(alice) == 0
+    assert stg_usdc_pool_lp_token.balanceOf(cryptoswap_adapter) == 0
+    assert stg_usdc_pool_gauge.balanceOf(alice) == mint_amount
+
 # ------------------------------------------------------------------
 #                 CLAIM_CRV_REWARDS FUNCTION TESTS
 # ------------------------------------------------------------------
@@ -706,6 +1120,183 @@ def test_can_successfully_claim_crv_rewards_tricrypto_pool(cryptoswap_adapter, a
 
     assert log.pool == usdc_wbtc_eth_pool_contract.address
 
+
+def test_can_successfully_claim_crv_rewards_many(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract, minter):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    with boa.env.prank(alice):
+        minter.toggle_approve_mint(cryptoswap_adapter)
+
+        cryptoswap_adapter.claim_crv_rewards_many([usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract])
+
+    logs = cryptoswap_adapter.get_logs()
+
+    assert len(logs) == 2
+    assert logs[0].pool == usdc_wbtc_eth_pool_contract.address
+    assert logs[1].pool == stg_usdc_pool_contract.address
+
+
+def test_cannot_claim_crv_rewards_many_with_pool_not_registered(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    with boa.env.prank(alice):
+        with boa.reverts("cryptoswap_adapter: pool address mismatch"):
+            cryptoswap_adapter.claim_crv_rewards_many([usdc_wbtc_eth_pool_contract, RANDOM_ADDRESS])
+
+# ------------------------------------------------------------------
+#                   GET_POOL_STATE FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_get_pool_state_of_unregistered_pool(cryptoswap_adapter, cryptoswap_lens, usdc_wbtc_eth_pool_contract):
+    with boa.reverts("cryptoswap_lens: pool address mismatch"):
+        cryptoswap_lens.get_pool_state(usdc_wbtc_eth_pool_contract)
+
+def test_can_get_pool_state_tricrypto_pool(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract, usdc_wbtc_eth_pool_lp_token, usdc_wbtc_eth_pool_gauge):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    state = cryptoswap_lens.get_pool_state(usdc_wbtc_eth_pool_contract)
+
+    assert state.pool == usdc_wbtc_eth_pool_contract.address
+    assert state.gauge == usdc_wbtc_eth_pool_gauge.address
+    assert state.lp_token == usdc_wbtc_eth_pool_lp_token.address
+    assert state.n_coins == 3
+    assert state.coins == [usdc_wbtc_eth_pool_contract.coins(i) for i in range(3)]
+    assert state.balances == [usdc_wbtc_eth_pool_contract.balances(i) for i in range(3)]
+    assert state.A == usdc_wbtc_eth_pool_contract.A()
+    assert state.gamma == usdc_wbtc_eth_pool_contract.gamma()
+    assert state.D == usdc_wbtc_eth_pool_contract.D()
+    assert state.fee == usdc_wbtc_eth_pool_contract.fee()
+    assert state.virtual_price == usdc_wbtc_eth_pool_contract.get_virtual_price()
+    assert state.price_scale == [usdc_wbtc_eth_pool_contract.price_scale(k) for k in range(2)]
+    assert state.price_oracle == [usdc_wbtc_eth_pool_contract.price_oracle(k) for k in range(2)]
+    assert state.lp_total_supply == usdc_wbtc_eth_pool_lp_token.totalSupply()
+    assert state.gauge_total_supply == usdc_wbtc_eth_pool_gauge.totalSupply()
+    assert state.gauge_inflation_rate == usdc_wbtc_eth_pool_gauge.inflation_rate()
+
+def test_can_get_pool_state_twocrypto_pool(cryptoswap_adapter, cryptoswap_lens, alice, stg_usdc_pool_contract, stg_usdc_pool_lp_token, stg, usdc):
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    state = cryptoswap_lens.get_pool_state(stg_usdc_pool_contract)
+
+    assert state.n_coins == 2
+    assert state.coins == [stg.address, usdc.address, ZERO]
+    assert state.balances == [stg_usdc_pool_contract.balances(i) for i in range(2)] + [0]
+    assert state.price_scale == [stg_usdc_pool_contract.price_scale(), 0]
+    assert state.price_oracle == [stg_usdc_pool_contract.price_oracle(), 0]
+    assert state.lp_total_supply == stg_usdc_pool_lp_token.totalSupply()
+
+def test_can_get_pool_states_of_several_pools(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    states = cryptoswap_lens.get_pool_states([usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract])
+
+    assert len(states) == 2
+    assert states[0] == cryptoswap_lens.get_pool_state(usdc_wbtc_eth_pool_contract)
+    assert states[1] == cryptoswap_lens.get_pool_state(stg_usdc_pool_contract)
+
+# ------------------------------------------------------------------
+#                      GET_POOLS FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_get_pools_returns_empty_page_for_empty_registry(cryptoswap_adapter, cryptoswap_lens):
+    pools, coins = cryptoswap_lens.get_pools(0, 10)
+    assert pools == []
+    assert coins == []
+
+def test_can_get_pools_page(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract, stg_usdc_pool_contract, stg, usdc):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    register_stg_usdc_pool(cryptoswap_adapter, alice, stg_usdc_pool_contract)
+
+    pools, coins = cryptoswap_lens.get_pools(0, 10)
+
+    assert len(pools) == 2
+    assert pools[0] == cryptoswap_adapter.get_pool_info(usdc_wbtc_eth_pool_contract)
+    assert pools[1] == cryptoswap_adapter.get_pool_info(stg_usdc_pool_contract)
+    assert coins[1] == [stg.address, usdc.address, ZERO]
+
+    pools, coins = cryptoswap_lens.get_pools(1, 1)
+
+    assert len(pools) == 1
+    assert pools[0].contract == stg_usdc_pool_contract.address
+
+def test_get_pools_stops_at_end_of_registry(cryptoswap_adapter, cryptoswap_lens, alice, usdc_wbtc_eth_pool_contract):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+
+    assert len(cryptoswap_lens.get_pools(0, 2**256 - 1)[0]) == 1
+    assert len(cryptoswap_lens.get_pools(1, 10)[0]) == 0
+    assert len(cryptoswap_lens.get_pools(2**256 - 1, 2**256 - 1)[0]) == 0
+
+# ------------------------------------------------------------------
+#                 PERMIT / MULTICALL FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_permit_with_invalid_signature(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_lp_token):
+    with boa.env.prank(alice):
+        with boa.reverts("cryptoswap_adapter: permit failed"):
+            cryptoswap_adapter.permit(usdc_wbtc_eth_pool_lp_token, 1, DEADLINE, 27, b"\x01" * 32, b"\x02" * 32)
+
+
+def test_can_remove_liquidity_one_coin_with_permit_in_one_multicall(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, usdc, wbtc, usdc_wbtc_eth_pool_lp_token):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    signer = Account.create()
+    mint_usdc_wbtc_eth_pool_tokens(signer.address, usdc, wbtc)
+
+    AMOUNT_TO_ADD: int = int(200e6) # USDC
+
+    with boa.env.prank(signer.address):
+        usdc.approve(cryptoswap_adapter, AMOUNT_TO_ADD)
+        mint_amount: int = cryptoswap_adapter.add_liquidity(usdc_wbtc_eth_pool_contract, [AMOUNT_TO_ADD, 0, 0], 0, False)
+
+    v, r, s = sign_permit(signer, usdc_wbtc_eth_pool_lp_token, cryptoswap_adapter.address, mint_amount, DEADLINE)
+
+    with boa.env.prank(signer.address):
+        cryptoswap_adapter.multicall([
+            cryptoswap_adapter.permit.prepare_calldata(usdc_wbtc_eth_pool_lp_token.address, mint_amount, DEADLINE, v, r, s),
+            cryptoswap_adapter.remove_liquidity_one_coin.prepare_calldata(usdc_wbtc_eth_pool_contract.address, 0, mint_amount, 0, False),
+        ])
+
+    assert usdc_wbtc_eth_pool_lp_token.balanceOf(signer.address) == 0
+    assert usdc.balanceOf(signer.address) > BALANCE - AMOUNT_TO_ADD
+
+
+def test_can_exchange_with_permit2_in_one_multicall(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, usdc, wbtc):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    signer = Account.create()
+    mint_usdc_wbtc_eth_pool_tokens(signer.address, usdc, wbtc)
+
+    AMOUNT_TO_EXCHANGE: int = int(100e6) # USDC
+
+    with boa.env.prank(signer.address):
+        usdc.approve(PERMIT2, 2**256 - 1)
+
+    permit_single, signature = sign_permit2(signer, usdc, cryptoswap_adapter.address, AMOUNT_TO_EXCHANGE, DEADLINE)
+
+    with boa.env.prank(signer.address):
+        cryptoswap_adapter.multicall([
+            cryptoswap_adapter.permit2.prepare_calldata(permit_single, signature),
+            cryptoswap_adapter.exchange.prepare_calldata(usdc_wbtc_eth_pool_contract.address, 0, 1, AMOUNT_TO_EXCHANGE, 0, False),
+        ])
+
+    assert usdc.balanceOf(signer.address) == BALANCE - AMOUNT_TO_EXCHANGE
+    assert wbtc.balanceOf(signer.address) > WBTC_BALANCE
+
+
+def test_failed_transfer_of_approved_coins_does_not_fall_back_to_permit2(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract, usdc):
+    register_usdc_wbtc_eth_pool(cryptoswap_adapter, alice, usdc_wbtc_eth_pool_contract)
+    signer = Account.create()
+
+    AMOUNT_TO_EXCHANGE: int = int(100e6) # USDC
+
+    # approved to the adapter without holding the coins, the coin error is kept
+    with boa.env.prank(signer.address):
+        usdc.approve(cryptoswap_adapter, AMOUNT_TO_EXCHANGE)
+
+        with boa.reverts("ERC20: transfer amount exceeds balance"):
+            cryptoswap_adapter.exchange(usdc_wbtc_eth_pool_contract, 0, 1, AMOUNT_TO_EXCHANGE, 0, False)
+
+
 # ------------------------------------------------------------------
 #                      UTIL FUNCTIONS
 # ------------------------------------------------------------------
@@ -742,4 +1333,26 @@ def mint_stg_usdc_pool_tokens(alice, stg, usdc):
 
     # stg
     with boa.env.prank(STG_WHALE):
-        stg.transfer(alice, BALANCE)
\ No newline at end of file
+        stg.transfer(alice, BALANCE)
+
+def sign_permit(signer, token, spender, amount, deadline):
+    struct_hash = keccak(encode(
+        ["bytes32", "address", "address", "uint256", "uint256", "uint256"],
+        [PERMIT_TYPEHASH, signer.address, spender, amount, token.nonces(signer.address), deadline],
+    ))
+    signed = signer.unsafe_sign_hash(keccak(b"\x19\x01" + token.DOMAIN_SEPARATOR() + struct_hash))
+    return signed.v, signed.r.to_bytes(32, "big"), signed.s.to_bytes(32, "big")
+
+def sign_permit2(signer, token, spender, amount, deadline):
+    permit2 = boa.loads_abi(PERMIT2_ABI, name="Permit2").at(PERMIT2)
+    details_hash = keccak(encode(
+        ["bytes32", "address", "uint160", "uint48", "uint48"],
+        [PERMIT_DETAILS_TYPEHASH, token.address, amount, deadline, 0],
+    ))
+    struct_hash = keccak(encode(
+        ["bytes32", "bytes32", "address", "uint256"],
+        [PERMIT_SINGLE_TYPEHASH, details_hash, spender, deadline],
+    ))
+    signed = signer.unsafe_sign_hash(keccak(b"\x19\x01" + permit2.DOMAIN_SEPARATOR() + struct_hash))
+    permit_single = ((token.address, amount, deadline, 0), spender, deadline)
+    return permit_single, signed.signature
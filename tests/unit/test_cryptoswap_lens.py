@@ -0,0 +1,91 @@
+"""
+Unit tests for the cryptoswap adapter lens.
+The adapter serves mock 2-coin pools from a mock meta registry, so they can be run on any network.
+"""
+
+import boa
+import pytest
+
+from src import cryptoswap_adapter, cryptoswap_lens
+from src.mocks import mock_cryptoswap_pool, mock_meta_registry
+
+ZERO = "0x0000000000000000000000000000000000000000"
+AMOUNT_IN = 10**21
+COINS = [boa.env.generate_address(f"lens_coin_{i}") for i in range(3)]
+
+
+@pytest.fixture(autouse=True)
+def deployer():
+    # contracts are deployed from their own account, so that later tests do not reuse their addresses
+    with boa.env.prank(boa.env.generate_address("deployer")):
+        yield
+
+
+@pytest.fixture
+def adapter():
+    registry = mock_meta_registry.deploy()
+    adapter = cryptoswap_adapter.deploy(registry, boa.env.generate_address("minter"), boa.env.generate_address("weth"))
+
+    pools = []
+    for coins in (COINS[:2], [COINS[2], COINS[0]]):
+        pool = mock_cryptoswap_pool.deploy()
+        pool.set_state(
+            [4_000_000 * 10**18, 2_000_000 * 10**6], [1, 10**12], [2 * 10**18], 400000,
+            145_000_000_000_000, 26_000_000, 45_000_000, 230_000_000_000_000, 2_800_000 * 10**18, 0,
+        )
+        registry.set_pool(pool, False, ZERO, pool, 2, coins + [ZERO] * 6)
+        pools.append(pool.address)
+    adapter.register_pools(pools)
+    return adapter
+
+
+@pytest.fixture
+def lens(adapter):
+    return cryptoswap_lens.deploy(adapter)
+
+
+@pytest.fixture
+def pools(adapter):
+    return [adapter.pool_registry_set(i) for i in range(2)]
+
+
+def test_get_pools_pages_registry(adapter, lens, pools):
+    page, coins = lens.get_pools(0, 10)
+
+    assert lens.get_pools_count() == 2
+    assert page == [adapter.get_pool_info(pool) for pool in pools]
+    assert coins == [COINS[:2] + [ZERO], [COINS[2], COINS[0], ZERO]]
+    assert lens.get_pools(1, 10)[0] == page[1:]
+
+
+def test_find_pools_for_pair(lens, pools):
+    hops = lens.find_pools_for_pair(COINS[0], COINS[2])
+
+    assert [(hop.pool, hop.index_in, hop.index_out) for hop in hops] == [(pools[1], 1, 0)]
+    assert lens.find_pools_for_pair(COINS[1], COINS[2]) == []
+
+
+def test_get_exchange_amounts_out_fails_alone(adapter, lens, pools):
+    requests = [(pools[0], 0, 1, AMOUNT_IN), (pools[0], 0, 2, AMOUNT_IN), (pools[1], 0, 1, AMOUNT_IN)]
+
+    amounts_out = lens.get_exchange_amounts_out(requests)
+
+    assert amounts_out == [
+        adapter.get_exchange_amount_out(pools[0], 0, 1, AMOUNT_IN),
+        lens.QUOTE_FAILED(),
+        adapter.get_exchange_amount_out(pools[1], 0, 1, AMOUNT_IN),
+    ]
+
+
+def test_get_exchange_ladder_matches_adapter(adapter, lens, pools):
+    amounts_in = [AMOUNT_IN * 4**i for i in range(6)]
+
+    amounts_out, prices = lens.get_exchange_ladder(pools[0], 0, 1, amounts_in)
+
+    assert amounts_out == [adapter.get_exchange_amount_out(pools[0], 0, 1, amount) for amount in amounts_in]
+    assert prices == [out * 10**18 // amount for out, amount in zip(amounts_out, amounts_in)]
+
+
+def test_cannot_get_pool_state_of_unregistered_pool(lens):
+    with boa.reverts("cryptoswap_lens: pool address mismatch"):
+        lens.get_pool_states([boa.env.generate_address("unregistered")])
@@ -0,0 +1,340 @@
+"""
+Unit tests for the off-chain CryptoSwap math engine.
+Quotes are checked to the wei against the on-chain arithmetic of a mock cryptoswap pool,
+so they can be run on any network, and against tricrypto2 and its math contract
+at the pinned block of the forked network.
+"""
+
+import dataclasses
+import json
+
+import boa
+import pytest
+from boa import BoaError
+from eth_abi import decode
+from eth_utils import function_signature_to_4byte_selector
+from hypothesis import HealthCheck, given, settings
+from hypothesis import strategies as st
+
+from offchain import cryptoswap_math
+from offchain.cryptoswap_math import CryptoSwapState
+from src.mocks import mock_cryptoswap_pool
+
+PRECISION = 10**18
+A_MULTIPLIER = 10000
+# decimals of the pool coins, like USDC, WBTC and WETH
+DECIMALS = [6, 8, 18]
+EXAMPLES = 100
+
+
+@pytest.fixture(scope="module")
+def pool():
+    return mock_cryptoswap_pool.deploy()
+
+
+@st.composite
+def pool_states(draw):
+    n_coins = draw(st.integers(min_value=2, max_value=3))
+    precisions = cryptoswap_math.precisions_from_decimals(
+        [draw(st.sampled_from(DECIMALS)) for _ in range(n_coins)]
+    )
+    price_scale = tuple(draw(st.integers(min_value=10**15, max_value=10**23)) for _ in range(n_coins - 1))
+
+    # normalized balances within 10x of each other, from 10 to 10**11 coins
+    scale = draw(st.integers(min_value=0, max_value=9))
+    balances = [draw(st.integers(min_value=10**19, max_value=10**20)) * 10**scale // precisions[0]]
+    for k in range(1, n_coins):
+        xp = draw(st.integers(min_value=10**19, max_value=10**20)) * 10**scale
+        balances.append(xp * PRECISION // (price_scale[k - 1] * precisions[k]))
+
+    A = draw(st.integers(min_value=n_coins**n_coins * A_MULTIPLIER // 10, max_value=n_coins**n_coins * A_MULTIPLIER * 1000))
+    gamma = draw(st.integers(min_value=10**10, max_value=2 * 10**16))
+    mid_fee = draw(st.integers(min_value=5 * 10**5, max_value=10**8))
+    out_fee = draw(st.integers(min_value=mid_fee, max_value=10**9))
+    fee_gamma = draw(st.integers(min_value=10**10, max_value=10**18))
+    total_supply = draw(st.integers(min_value=10**18, max_value=10**30))
+
+    return CryptoSwapState(
+        balances=tuple(balances),
+        precisions=precisions,
+        price_scale=price_scale,
+        D=0,
+        A=A,
+        gamma=gamma,
+        mid_fee=mid_fee,
+        out_fee=out_fee,
+        fee_gamma=fee_gamma,
+        total_supply=total_supply,
+        future_A_gamma_time=draw(st.sampled_from([0, 1])),
+    )
+
+
+def set_state(pool, state: CryptoSwapState) -> CryptoSwapState:
+    """
+    Set the state on the mock pool and return it with the D the pool computed.
+    """
+    pool.set_state(
+        list(state.balances),
+        list(state.precisions),
+        list(state.price_scale),
+        state.A,
+        state.gamma,
+        state.mid_fee,
+        state.out_fee,
+        state.fee_gamma,
+        state.total_supply,
+        state.future_A_gamma_time,
+    )
+    return dataclasses.replace(state, D=pool.D())
+
+
+def assert_same_quote(engine_quote, pool_quote):
+    """
+    Engine and pool quote the same amount, or both fail.
+    """
+    try:
+        expected = pool_quote()
+    except BoaError:
+        with pytest.raises((ArithmeticError, ValueError)):
+            engine_quote()
+        return
+    assert engine_quote() == expected
+
+
+def test_unpack_prices_lowest_bits_first():
+    packed = (2000 * 10**18) << 128 | 30000 * 10**18
+    assert cryptoswap_math.unpack_prices(packed, 3) == (30000 * 10**18, 2000 * 10**18)
+
+
+def test_unpack_highest_bits_first():
+    packed = 3 * 10**6 << 128 | 3 * 10**7 << 64 | 5 * 10**14
+    assert cryptoswap_math.unpack(packed) == (3 * 10**6, 3 * 10**7, 5 * 10**14)
+
+
+def test_calc_token_amount_of_2_coin_pool_fails_for_withdrawals():
+    state = CryptoSwapState(
+        balances=(10**24, 2 * 10**12),
+        precisions=(1, 10**12),
+        price_scale=(5 * 10**17,),
+        D=2 * 10**24,
+        A=400000,
+        gamma=145 * 10**12,
+        mid_fee=26 * 10**6,
+        out_fee=45 * 10**6,
+        fee_gamma=230 * 10**12,
+        total_supply=10**24,
+    )
+    with pytest.raises(ValueError):
+        cryptoswap_math.calc_token_amount(state, [10**18, 0], False)
+
+
+def test_rejects_ng_states():
+    state = CryptoSwapState(
+        balances=(10**24, 2 * 10**12),
+        precisions=(1, 10**12),
+        price_scale=(5 * 10**17,),
+        D=2 * 10**24,
+        A=400000,
+        gamma=145 * 10**12,
+        mid_fee=26 * 10**6,
+        out_fee=45 * 10**6,
+        fee_gamma=230 * 10**12,
+        total_supply=10**24,
+        is_ng=True,
+    )
+    with pytest.raises(ValueError, match="ng math"):
+        cryptoswap_math.get_dy(state, 0, 1, 10**18)
+    with pytest.raises(ValueError, match="ng math"):
+        cryptoswap_math.get_dx(state, 0, 1, 10**6)
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states())
+def test_newton_D_matches_pool(pool, state):
+    state = set_state(pool, state)
+    xp = [state.balances[0] * state.precisions[0]]
+    for k in range(1, len(state.balances)):
+        xp.append(state.balances[k] * state.price_scale[k - 1] * state.precisions[k] // PRECISION)
+
+    assert cryptoswap_math.newton_D(state.A, state.gamma, xp) == state.D
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states(), data=st.data())
+def test_get_dy_matches_pool(pool, state, data):
+    state = set_state(pool, state)
+    n_coins = len(state.balances)
+    i = data.draw(st.integers(min_value=0, max_value=n_coins - 1))
+    j = data.draw(st.integers(min_value=0, max_value=n_coins - 1).filter(lambda j: j != i))
+    dx = data.draw(st.integers(min_value=1, max_value=state.balances[i]))
+
+    assert_same_quote(
+        lambda: cryptoswap_math.get_dy(state, i, j, dx),
+        lambda: pool.get_dy(i, j, dx),
+    )
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states(), data=st.data())
+def test_get_dx_matches_pool(pool, state, data):
+    state = set_state(pool, state)
+    n_coins = len(state.balances)
+    i = data.draw(st.integers(min_value=0, max_value=n_coins - 1))
+    j = data.draw(st.integers(min_value=0, max_value=n_coins - 1).filter(lambda j: j != i))
+    dy = data.draw(st.integers(min_value=1, max_value=state.balances[j] // 2))
+
+    assert_same_quote(
+        lambda: cryptoswap_math.get_dx(state, i, j, dy),
+        lambda: pool.get_dx(i, j, dy),
+    )
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states(), data=st.data())
+def test_calc_token_amount_matches_pool(pool, state, data):
+    state = set_state(pool, state)
+    # 2-coin pools only quote deposits
+    deposit = len(state.balances) == 2 or data.draw(st.booleans())
+    # withdrawals of up to half of each balance keep the pool solvent
+    amounts = [data.draw(st.integers(min_value=0, max_value=balance if deposit else balance // 2)) for balance in state.balances]
+
+    assert_same_quote(
+        lambda: cryptoswap_math.calc_token_amount(state, amounts, deposit),
+        lambda: pool.calc_token_amount(amounts, deposit),
+    )
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states(), data=st.data())
+def test_calc_withdraw_one_coin_matches_pool(pool, state, data):
+    state = set_state(pool, state)
+    i = data.draw(st.integers(min_value=0, max_value=len(state.balances) - 1))
+    token_amount = data.draw(st.integers(min_value=1, max_value=state.total_supply // 10))
+
+    assert_same_quote(
+        lambda: cryptoswap_math.calc_withdraw_one_coin(state, token_amount, i),
+        lambda: pool.calc_withdraw_one_coin(token_amount, i),
+    )
+
+
+# ------------------------------------------------------------------
+#                FORK TESTS AT THE PINNED FORK BLOCK
+# ------------------------------------------------------------------
+
+# tricrypto2, USDT / WBTC / WETH pool of the tricrypto math contract
+TRICRYPTO2 = "0xD51a44d3FaE010294C616388b506AcdA1bfAAE46"
+# coins of the fork whose pools are searched for a twocrypto-ng pool
+NG_SEARCH_PAIRS = (("USDC", "ETH"), ("WBTC", "ETH"), ("CRV", "ETH"), ("USDT", "ETH"))
+
+
+def view(name: str, inputs: tuple[str, ...] = (), output: str = "uint256") -> dict:
+    return {
+        "name": name,
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": f"arg{k}", "type": t} for k, t in enumerate(inputs)],
+        "outputs": [{"name": "", "type": output}],
+    }
+
+
+ERC20_ABI = json.dumps([view("decimals"), view("totalSupply")])
+# views of the pools read by the fork tests, tricrypto2 has price_scale(k) and twocrypto-ng price_scale()
+POOL_ABI = json.dumps(
+    [view(name) for name in ("D", "A", "gamma", "mid_fee", "out_fee", "fee_gamma", "future_A_gamma_time")]
+    + [view("balances", ("uint256",)), view("coins", ("uint256",), "address"), view("token", output="address")]
+    + [view("MATH", output="address"), view("totalSupply")]
+    + [view("get_dy", ("uint256", "uint256", "uint256")), view("calc_token_amount", ("uint256[3]", "bool"))]
+    + [view("calc_withdraw_one_coin", ("uint256", "uint256"))]
+)
+PRICE_SCALE_ABI = json.dumps([view("price_scale", ("uint256",))])
+NG_PRICE_SCALE_ABI = json.dumps([view("price_scale")])
+
+
+def math_calls(computation, signature: str) -> list[tuple[tuple, int]]:
+    """
+    Arguments and result of every successful call of signature under a boa computation,
+    e.g. of the math contract called by the views of a pool.
+    """
+    calls = []
+    if bytes(computation.msg.data[:4]) == function_signature_to_4byte_selector(signature) and not computation.is_error:
+        types = signature[signature.index("(") + 1 : -1].split(",")
+        calls.append((decode(types, bytes(computation.msg.data[4:])), decode(["uint256"], computation.output)[0]))
+    for child in computation.children:
+        calls += math_calls(child, signature)
+    return calls
+
+
+def fork_state(pool, n_coins: int, price_scale: tuple[int, ...], total_supply: int, is_ng: bool = False) -> CryptoSwapState:
+    erc20 = boa.loads_abi(ERC20_ABI, name="ERC20")
+    return CryptoSwapState(
+        balances=tuple(pool.balances(i) for i in range(n_coins)),
+        precisions=cryptoswap_math.precisions_from_decimals([erc20.at(pool.coins(i)).decimals() for i in range(n_coins)]),
+        price_scale=price_scale,
+        D=pool.D(),
+        A=pool.A(),
+        gamma=pool.gamma(),
+        mid_fee=pool.mid_fee(),
+        out_fee=pool.out_fee(),
+        fee_gamma=pool.fee_gamma(),
+        total_supply=total_supply,
+        future_A_gamma_time=pool.future_A_gamma_time(),
+        is_ng=is_ng,
+    )
+
+
+def test_quotes_and_math_match_tricrypto2_at_fork_block():
+    pool = boa.loads_abi(POOL_ABI, name="Tricrypto2").at(TRICRYPTO2)
+    prices = boa.loads_abi(PRICE_SCALE_ABI, name="Tricrypto2Prices").at(TRICRYPTO2)
+    total_supply = boa.loads_abi(ERC20_ABI, name="ERC20").at(pool.token()).totalSupply()
+    state = fork_state(pool, 3, (prices.price_scale(0), prices.price_scale(1)), total_supply)
+
+    newton_D_calls, newton_y_calls = [], []
+    # a thousandth and a tenth of the balances and supply
+    for divisor in (1000, 10):
+        for i in range(3):
+            for j in range(3):
+                if i != j:
+                    dx = state.balances[i] // divisor
+                    assert cryptoswap_math.get_dy(state, i, j, dx) == pool.get_dy(i, j, dx)
+                    newton_y_calls += math_calls(pool._computation, "newton_y(uint256,uint256,uint256[3],uint256,uint256)")
+            token_amount = total_supply // divisor
+            assert cryptoswap_math.calc_withdraw_one_coin(state, token_amount, i) == pool.calc_withdraw_one_coin(token_amount, i)
+            newton_D_calls += math_calls(pool._computation, "newton_D(uint256,uint256,uint256[3])")
+        amounts = [balance // divisor for balance in state.balances]
+        for deposit in (True, False):
+            assert cryptoswap_math.calc_token_amount(state, amounts, deposit) == pool.calc_token_amount(amounts, deposit)
+            newton_D_calls += math_calls(pool._computation, "newton_D(uint256,uint256,uint256[3])")
+
+    # the calls the views made to the math contract of the pool
+    assert newton_D_calls and newton_y_calls
+    for (ANN, gamma, x), D in newton_D_calls:
+        assert cryptoswap_math.newton_D(ANN, gamma, list(x)) == D
+    for (ANN, gamma, x, D, i), y in newton_y_calls:
+        assert cryptoswap_math.newton_y(ANN, gamma, list(x), D, i) == y
+
+
+def test_rejects_twocrypto_ng_pool_at_fork_block(meta_registry, active_network):
+    pools = []
+    for a, b in NG_SEARCH_PAIRS:
+        coin_a, coin_b = (active_network.manifest_named(name) for name in (a, b))
+        for address in meta_registry.find_pools_for_coins(coin_a, coin_b):
+            if meta_registry.get_n_coins(address) != 2:
+                continue
+            try:
+                boa.loads_abi(POOL_ABI, name="TwocryptoNG").at(address).MATH()
+            except BoaError:
+                continue
+            pools.append(address)
+    assert pools, "no twocrypto-ng pool of the searched pairs at the fork block"
+
+    pool = boa.loads_abi(POOL_ABI, name="TwocryptoNG").at(pools[0])
+    price_scale = boa.loads_abi(NG_PRICE_SCALE_ABI, name="TwocryptoNGPrices").at(pools[0]).price_scale()
+    state = fork_state(pool, 2, (price_scale,), pool.totalSupply(), is_ng=True)
+
+    # newton_D starts from the previous K0 and y is solved with another method
+    with pytest.raises(ValueError, match="twocrypto-ng"):
+        cryptoswap_math.get_dy(state, 0, 1, state.balances[0] // 1000)
+    with pytest.raises(ValueError, match="twocrypto-ng"):
+        cryptoswap_math.calc_token_amount(state, [balance // 1000 for balance in state.balances])
+    with pytest.raises(ValueError, match="twocrypto-ng"):
+        cryptoswap_math.calc_withdraw_one_coin(state, state.total_supply // 1000, 0)
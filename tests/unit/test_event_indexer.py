@@ -0,0 +1,281 @@
+"""
+Unit tests for the adapter event indexer.
+Logs come from a local chain filled with scripted registrations on adapters over a mock meta registry,
+so they can be run on any network. The trades of an adapter on the 3pool are indexed
+at the pinned block of the forked network.
+"""
+
+import boa
+import pytest
+from eth_abi import encode
+
+from offchain.event_indexer import EventIndexer, IndexerError, events
+from offchain.rpc_stand_in import Chain
+from src import cryptoswap_adapter, stableswap_adapter
+from src.mocks import mock_meta_registry
+
+ZERO = "0x0000000000000000000000000000000000000000"
+COINS = [boa.env.generate_address(f"coin_{i}") for i in range(3)] + [ZERO] * 5
+BLOCKS = 40
+# a few blocks of logs per request, so that ranges shrink
+MAX_LOGS = 6
+
+
+@pytest.fixture(scope="module")
+def adapters():
+    registry = mock_meta_registry.deploy()
+    minter = boa.env.generate_address("minter")
+    return registry, stableswap_adapter.deploy(registry, minter), cryptoswap_adapter.deploy(registry, minter, COINS[2])
+
+
+def transact(chain: Chain, contract, logs: list) -> None:
+    """
+    Record the last transaction of contract in the next block of chain, and its logs as boa decodes them.
+    """
+    chain.record(contract._computation)
+    logs += [{**log._asdict(), "name": type(log).__name__, "block_number": chain.head + 1} for log in contract.get_logs()]
+
+
+def traffic(adapters, chain: Chain, blocks: int, tag: str) -> list[dict]:
+    """
+    Mine blocks of registrations, skipped registrations, deregistrations and coin settings on both adapters,
+    with empty blocks between them. Returns the logs.
+    """
+    registry, stableswap, cryptoswap = adapters
+    logs: list[dict] = []
+    for k in range(blocks):
+        pool = boa.env.generate_address(f"{tag}_{k}")
+        registry.set_pool(pool, False, ZERO, pool, 3, COINS)
+        stableswap.register_pool(pool, ZERO)
+        transact(chain, stableswap, logs)
+        # already registered pools are skipped
+        cryptoswap.register_pools([pool, pool])
+        transact(chain, cryptoswap, logs)
+        if k % 3 == 0:
+            stableswap.deregister_pool(pool)
+            transact(chain, stableswap, logs)
+        if k % 5 == 0:
+            cryptoswap.set_fee_on_transfer_coin(COINS[k % 3], k % 2 == 0)
+            transact(chain, cryptoswap, logs)
+        chain.mine(1 + k % 4)
+    return logs
+
+
+def indexed(indexer: EventIndexer) -> list[dict]:
+    """
+    Rows of every event table in chain order, in the shape of transact logs.
+    """
+    rows = []
+    for name in {event.name for event in indexer.events.values()}:
+        for row in indexer.rows(name):
+            row = {key: value for key, value in row.items() if value is not None and key != "transaction_hash"}
+            rows.append({**row, "name": name})
+    rows.sort(key=lambda row: (row["block_number"], row.pop("log_index")))
+    return rows
+
+
+def new_indexer(adapters, chain: Chain, path, **kwargs) -> EventIndexer:
+    _, stableswap, cryptoswap = adapters
+    contracts = {stableswap.address: stableswap.abi, cryptoswap.address: cryptoswap.abi}
+    return EventIndexer(chain, path, contracts, **kwargs)
+
+
+def test_backfill_matches_logs(adapters, tmp_path):
+    chain = Chain(max_logs=MAX_LOGS)
+    logs = traffic(adapters, chain, BLOCKS, "backfill")
+    indexer = new_indexer(adapters, chain, tmp_path / "events.db", workers=4)
+
+    cursor = indexer.backfill(chunk=16)
+
+    assert cursor == chain.head - indexer.reorg_depth + 1
+    assert indexed(indexer) == [log for log in logs if log["block_number"] < cursor]
+    # both adapters share the PoolRegistered table
+    assert {row["address"] for row in indexer.rows("PoolRegistered")} == {adapter.address for adapter in adapters[1:]}
+    # the second registration of the first pool in the batch is skipped as ALREADY_REGISTERED
+    assert [row["status"] for row in indexer.rows("PoolRegistrationSkipped", pool=logs[1]["pool"])] == [2]
+
+
+def test_parallel_backfill_matches_sequential(adapters, tmp_path):
+    chain = Chain(max_logs=MAX_LOGS)
+    traffic(adapters, chain, BLOCKS, "parallel")
+    sequential = new_indexer(adapters, chain, tmp_path / "sequential.db", workers=1)
+    parallel = new_indexer(adapters, chain, tmp_path / "parallel.db", workers=8)
+
+    assert sequential.backfill(chain.head, chunk=chain.head + 1) == parallel.backfill(chain.head, chunk=7) == chain.head + 1
+    assert indexed(sequential) == indexed(parallel)
+
+
+def test_backfill_resumes_where_it_stopped(adapters, tmp_path):
+    chain = Chain(max_logs=MAX_LOGS)
+    logs = traffic(adapters, chain, BLOCKS, "resume")
+    requests = 0
+
+    def failing_chain(payloads):
+        nonlocal requests
+        requests += len(payloads)
+        if requests > 12:
+            raise ConnectionError("endpoint went away")
+        return chain(payloads)
+
+    interrupted = new_indexer(adapters, failing_chain, tmp_path / "events.db", workers=1)
+    with pytest.raises(ConnectionError):
+        interrupted.backfill(chain.head, chunk=10)
+    cursor = interrupted.cursor
+    interrupted.close()
+    assert 0 < cursor < chain.head
+
+    resumed = new_indexer(adapters, chain, tmp_path / "events.db", workers=4)
+    assert resumed.cursor == cursor
+    assert resumed.backfill(chain.head, chunk=10) == chain.head + 1
+    assert indexed(resumed) == logs
+
+
+def test_ranges_shrink_and_grow(adapters, tmp_path):
+    chain = Chain(max_logs=MAX_LOGS)
+    logs = traffic(adapters, chain, BLOCKS, "ranges")
+    indexer = new_indexer(adapters, chain, tmp_path / "events.db", max_range=64, workers=1)
+
+    indexer.backfill(chain.head, chunk=chain.head + 1)
+
+    assert indexed(indexer) == logs
+    # refused ranges are fetched again in halves, ranges then grow back from a single block
+    assert len(logs) // MAX_LOGS < indexer.requests < 3 * chain.head
+
+
+def test_cannot_index_block_over_endpoint_limit(adapters, tmp_path):
+    chain = Chain(max_logs=1)
+    traffic(adapters, chain, 1, "limit")
+    indexer = new_indexer(adapters, chain, tmp_path / "events.db", workers=1)
+
+    with pytest.raises(IndexerError, match="more than 1 results"):
+        indexer.backfill(chain.head)
+    assert indexer.cursor == 0
+
+
+def test_sync_follows_head_and_rolls_back_reorgs(adapters, tmp_path):
+    chain = Chain(max_logs=MAX_LOGS)
+    logs = traffic(adapters, chain, BLOCKS, "head")
+    indexer = new_indexer(adapters, chain, tmp_path / "events.db", reorg_depth=16)
+
+    assert indexer.sync() == chain.head + 1
+    assert indexed(indexer) == logs
+
+    # one block at a time at the head: the reorg check, the head, its logs and its hashes
+    for k in range(5):
+        logs += traffic(adapters, chain, 1, f"head_{k}")
+        requests = indexer.requests
+        assert indexer.sync() == chain.head + 1
+        assert indexer.requests - requests <= 4
+    assert indexed(indexer) == logs
+
+    # the last 10 blocks are replaced by a longer fork with other traffic
+    chain.reorg(10)
+    logs = [log for log in logs if log["block_number"] <= chain.head]
+    logs += traffic(adapters, chain, 6, "fork")
+
+    assert indexer.sync() == chain.head + 1
+    assert indexed(indexer) == logs
+
+
+def test_sync_resumes_from_persisted_cursor(adapters, tmp_path):
+    chain = Chain(max_logs=MAX_LOGS)
+    logs = traffic(adapters, chain, BLOCKS // 2, "persisted")
+    first = new_indexer(adapters, chain, tmp_path / "events.db", reorg_depth=16)
+    first.sync()
+    first.close()
+
+    logs += traffic(adapters, chain, BLOCKS // 2, "persisted_more")
+    chain.reorg(3)
+    logs = [log for log in logs if log["block_number"] <= chain.head]
+    logs += traffic(adapters, chain, 2, "persisted_fork")
+    second = new_indexer(adapters, chain, tmp_path / "events.db", reorg_depth=16)
+
+    assert second.sync() == chain.head + 1
+    assert indexed(second) == logs
+
+
+
+def test_integers_sort_as_numbers_in_sql(adapters, tmp_path):
+    _, stableswap, _ = adapters
+    event = next(event for event in events(stableswap.abi).values() if event.name == "Exchange")
+    pool = boa.env.generate_address("pool")
+    values = [-(2**127), -2, -1, 0, 1, 9, 10, 2**64, 2**127 - 1]
+    logs = [
+        {
+            "blockNumber": hex(1),
+            "logIndex": hex(k),
+            "transactionHash": "0x" + "00" * 32,
+            "address": stableswap.address,
+            "topics": [event.topic, "0x" + encode(["address"], [pool]).hex()],
+            "data": "0x" + encode(["int128", "int128"] + ["uint256"] * 3, [value, 0, 2**256 - 1 - k, 0, 0]).hex(),
+        }
+        for k, value in enumerate(reversed(values))
+    ]
+
+    def transport(payloads):
+        return [{"jsonrpc": "2.0", "id": payload["id"], "result": logs} for payload in payloads]
+
+    indexer = EventIndexer(transport, tmp_path / "events.db", {stableswap.address: stableswap.abi})
+    indexer.backfill(1)
+    by_index_in = indexer.db.execute("SELECT log_index FROM exchange ORDER BY index_in").fetchall()
+    by_amount_in = indexer.db.execute("SELECT log_index FROM exchange ORDER BY amount_in").fetchall()
+    rows = indexer.rows("Exchange", index_in=-1)
+    indexer.close()
+
+    # logs hold the values in reverse, the stored text sorts like the numbers
+    assert [log_index for (log_index,) in by_index_in] == list(reversed(range(len(values))))
+    assert [log_index for (log_index,) in by_amount_in] == list(reversed(range(len(values))))
+    assert [(row["index_in"], row["amount_in"]) for row in rows] == [(-1, 2**256 - 1 - (len(values) - 3))]
+
+
+DAI_WHALE = "0xf6e72Db5454dd049d0788e411b06CfAF16853042"
+BALANCE = 1000 * 10**18
+BASE_TYPE = 1
+
+
+def test_indexes_adapter_trades_at_fork_block(
+    stableswap_adapter, alice, three_pool_contract, three_pool_lp_token, dai, usdc, tmp_path
+):
+    chain = Chain()
+    indexer = EventIndexer(chain, tmp_path / "events.db", {stableswap_adapter.address: stableswap_adapter.abi})
+
+    with boa.env.prank(alice):
+        stableswap_adapter.register_pool(three_pool_contract, ZERO)
+    chain.record(stableswap_adapter._computation)
+    chain.mine()
+    with boa.env.prank(usdc.owner()):
+        usdc.updateMasterMinter(alice)
+    with boa.env.prank(alice):
+        usdc.configureMinter(alice, BALANCE)
+        usdc.mint(alice, BALANCE)
+    with boa.env.prank(DAI_WHALE):
+        dai.transfer(alice, BALANCE)
+
+    amount_in = 10 * 10**18  # DAI
+    amount_to_add = 200 * 10**6  # USDC
+
+    with boa.env.prank(alice):
+        dai.approve(stableswap_adapter, amount_in)
+        stableswap_adapter.exchange(three_pool_contract, 0, 1, amount_in, 0)
+        chain.record(stableswap_adapter._computation)
+        (exchange,) = [log for log in stableswap_adapter.get_logs(strict=False) if type(log).__name__ == "Exchange"]
+
+        usdc.approve(stableswap_adapter, amount_to_add)
+        mint_amount = stableswap_adapter.add_liquidity(three_pool_contract, [0, amount_to_add, 0], 0)
+        chain.record(stableswap_adapter._computation)
+        chain.mine()
+
+        three_pool_lp_token.approve(stableswap_adapter, mint_amount)
+        stableswap_adapter.remove_liquidity_one_coin(three_pool_contract, 2, mint_amount, 0)
+        chain.record(stableswap_adapter._computation)
+        chain.mine()
+
+    assert indexer.sync() == chain.head + 1
+    assert [row["pool_type"] for row in indexer.rows("PoolRegistered", pool=three_pool_contract.address)] == [BASE_TYPE]
+    (row,) = indexer.rows("Exchange")
+    assert (row["block_number"], row["amount_in"], row["out_amount"]) == (2, amount_in, exchange.out_amount)
+    assert [row["mint_amount"] for row in indexer.rows("LiquidityAdded")] == [mint_amount]
+    assert [row["lp_amount"] for row in indexer.rows("LiquidityRemovedOneCoin", pool=three_pool_contract.address)] == [
+        mint_amount
+    ]
+    indexer.close()
@@ -0,0 +1,244 @@
+"""
+Unit tests for exchanges and liquidity operations on legacy pools, which return nothing from these functions,
+and for views batched through the multicall of the adapters.
+Pools are mocked with real mock coins and a separate lp token, or as their own lp token, so they can be run on any network.
+"""
+
+import boa
+import pytest
+from eth_abi import decode
+
+from src import cryptoswap_adapter, stableswap_adapter
+from src.mocks import mock_erc20, mock_fee_on_transfer_erc20, mock_liquidity_pool, mock_meta_registry
+
+ZERO = "0x0000000000000000000000000000000000000000"
+AMOUNTS = [10**18, 2 * 10**18, 3 * 10**18]
+
+
+@pytest.fixture(autouse=True)
+def deployer():
+    # contracts are deployed from their own account, so that later tests do not reuse their addresses
+    with boa.env.prank(boa.env.generate_address("deployer")):
+        yield
+
+
+@pytest.fixture
+def user():
+    return boa.env.generate_address("user")
+
+
+@pytest.fixture
+def coins(user):
+    coins = [mock_erc20.deploy() for _ in AMOUNTS]
+    for coin, amount in zip(coins, AMOUNTS):
+        coin.mint(user, amount)
+    return coins
+
+
+def deploy_pool(adapter, registry, coins, is_cryptoswap: bool, is_meta: bool = False, is_own_lp_token: bool = False):
+    """
+    Deploy a legacy pool over coins, register it in the adapter and return it with its lp token.
+    Metapools and pools that are their own lp token are expected to return amounts, which the mock does not.
+    """
+    lp_token = None if is_own_lp_token else mock_erc20.deploy()
+    pool = mock_liquidity_pool.deploy([coin.address for coin in coins], lp_token or ZERO, is_cryptoswap)
+    lp_token = lp_token or pool
+    registry.set_pool(pool, is_meta, ZERO, lp_token, len(coins), [coin.address for coin in coins] + [ZERO] * 5)
+    if is_cryptoswap:
+        adapter.register_pools([pool.address])
+    else:
+        # the zapper is only used by the underlying functions
+        adapter.register_pool(pool, boa.env.generate_address("zapper") if is_meta else ZERO)
+    return pool, lp_token
+
+
+@pytest.fixture
+def cryptoswap(coins):
+    registry = mock_meta_registry.deploy()
+    adapter = cryptoswap_adapter.deploy(registry, boa.env.generate_address("minter"), boa.env.generate_address("weth"))
+    pool, lp_token = deploy_pool(adapter, registry, coins, True)
+    return adapter, pool, lp_token
+
+
+@pytest.fixture
+def stableswap(coins):
+    registry = mock_meta_registry.deploy()
+    adapter = stableswap_adapter.deploy(registry, boa.env.generate_address("minter"))
+    pool, lp_token = deploy_pool(adapter, registry, coins, False)
+    return adapter, pool, lp_token
+
+
+def add_liquidity(adapter, coins, user, *args) -> int:
+    for coin in coins:
+        coin.approve(adapter, 2**256 - 1, sender=user)
+    return adapter.add_liquidity(*args, sender=user)
+
+
+def test_cryptoswap_add_and_remove_measure_legacy_pool(cryptoswap, coins, user):
+    adapter, pool, lp_token = cryptoswap
+
+    mint_amount = add_liquidity(adapter, coins, user, pool, AMOUNTS, 0, False)
+
+    assert mint_amount == sum(AMOUNTS)
+    assert lp_token.balanceOf(user) == mint_amount
+
+    lp_token.approve(adapter, mint_amount, sender=user)
+    adapter.remove_liquidity(pool, mint_amount // 2, [0] * 3, False, sender=user)
+
+    assert [coin.balanceOf(user) for coin in coins] == [amount // 2 for amount in AMOUNTS]
+    assert [coin.balanceOf(adapter) for coin in coins] == [0] * 3
+
+    # the rest of the lp supply takes the rest of the coin
+    adapter.remove_liquidity_one_coin(pool, 1, mint_amount - mint_amount // 2, 0, False, sender=user)
+
+    assert coins[1].balanceOf(user) == AMOUNTS[1]
+    assert coins[1].balanceOf(adapter) == 0
+    assert lp_token.balanceOf(user) == 0
+
+
+def test_stableswap_remove_measures_legacy_base_pool(stableswap, coins, user):
+    adapter, pool, lp_token = stableswap
+
+    mint_amount = add_liquidity(adapter, coins, user, pool, AMOUNTS, 0)
+
+    assert mint_amount == sum(AMOUNTS)
+
+    lp_token.approve(adapter, mint_amount, sender=user)
+    adapter.remove_liquidity(pool, mint_amount // 2, [0] * 3, sender=user)
+
+    assert [coin.balanceOf(user) for coin in coins] == [amount // 2 for amount in AMOUNTS]
+
+    # the rest of the lp supply takes the rest of the coin
+    adapter.remove_liquidity_one_coin(pool, 2, mint_amount - mint_amount // 2, 0, sender=user)
+
+    assert coins[2].balanceOf(user) == AMOUNTS[2]
+    assert [coin.balanceOf(adapter) for coin in coins] == [0] * 3
+    assert lp_token.balanceOf(user) == 0
+
+
+def test_cryptoswap_exchange_measures_legacy_pool(cryptoswap, coins, user):
+    adapter, pool, _ = cryptoswap
+    add_liquidity(adapter, coins, user, pool, AMOUNTS, 0, False)
+    coins[0].mint(user, AMOUNTS[0])
+
+    adapter.exchange(pool, 0, 2, AMOUNTS[0], 0, False, sender=user)
+
+    # the mock pool exchanges 1:1
+    assert coins[2].balanceOf(user) == AMOUNTS[0]
+    assert coins[2].balanceOf(adapter) == 0
+
+
+def test_stableswap_measures_metapool_returning_nothing(coins, user):
+    registry = mock_meta_registry.deploy()
+    adapter = stableswap_adapter.deploy(registry, boa.env.generate_address("minter"))
+    pool, lp_token = deploy_pool(adapter, registry, coins, False, is_meta=True)
+
+    mint_amount = add_liquidity(adapter, coins, user, pool, AMOUNTS, 0)
+
+    assert mint_amount == sum(AMOUNTS)
+    assert lp_token.balanceOf(user) == mint_amount
+
+    lp_token.approve(adapter, mint_amount, sender=user)
+    adapter.remove_liquidity(pool, mint_amount // 2, [0] * 3, sender=user)
+
+    assert [coin.balanceOf(user) for coin in coins] == [amount // 2 for amount in AMOUNTS]
+
+    adapter.remove_liquidity_one_coin(pool, 2, mint_amount - mint_amount // 2, 0, sender=user)
+
+    assert coins[2].balanceOf(user) == AMOUNTS[2]
+    assert [coin.balanceOf(adapter) for coin in coins] == [0] * 3
+
+
+def test_cryptoswap_measures_own_lp_token_pool_returning_nothing(coins, user):
+    registry = mock_meta_registry.deploy()
+    adapter = cryptoswap_adapter.deploy(registry, boa.env.generate_address("minter"), boa.env.generate_address("weth"))
+    pool, _ = deploy_pool(adapter, registry, coins, True, is_own_lp_token=True)
+
+    mint_amount = add_liquidity(adapter, coins, user, pool, AMOUNTS, 0, False)
+
+    assert mint_amount == sum(AMOUNTS)
+    assert pool.balanceOf(user) == mint_amount
+
+    pool.approve(adapter, mint_amount, sender=user)
+    adapter.remove_liquidity(pool, mint_amount // 2, [0] * 3, False, sender=user)
+
+    assert [coin.balanceOf(user) for coin in coins] == [amount // 2 for amount in AMOUNTS]
+
+    coins[0].mint(user, AMOUNTS[0])
+    adapter.exchange(pool, 0, 1, AMOUNTS[0], 0, False, sender=user)
+
+    assert coins[1].balanceOf(user) == AMOUNTS[1] // 2 + AMOUNTS[0]
+
+    adapter.remove_liquidity_one_coin(pool, 2, mint_amount - mint_amount // 2, 0, False, sender=user)
+
+    assert coins[2].balanceOf(user) == AMOUNTS[2]
+    assert [coin.balanceOf(adapter) for coin in coins] == [0] * 3
+
+
+@pytest.mark.parametrize("is_cryptoswap", [False, True])
+@pytest.mark.parametrize("is_route", [False, True])
+def test_exchange_fee_on_transfer_coin_exchanges_amount_received(coins, user, is_cryptoswap, is_route):
+    fee_coin = mock_fee_on_transfer_erc20.deploy()
+    fee_coin.mint(user, AMOUNTS[0])
+    pool_coins = [fee_coin, *coins[1:]]
+    registry = mock_meta_registry.deploy()
+    if is_cryptoswap:
+        adapter = cryptoswap_adapter.deploy(registry, boa.env.generate_address("minter"), boa.env.generate_address("weth"))
+    else:
+        adapter = stableswap_adapter.deploy(registry, boa.env.generate_address("minter"))
+    pool, _ = deploy_pool(adapter, registry, pool_coins, is_cryptoswap)
+    coins[2].mint(pool, AMOUNTS[0])
+    adapter.set_fee_on_transfer_coin(fee_coin, True)
+    fee_coin.approve(adapter, AMOUNTS[0], sender=user)
+
+    if is_route:
+        adapter.exchange_route([(pool.address, 0, 2)], AMOUNTS[0], 0, sender=user)
+    elif is_cryptoswap:
+        adapter.exchange(pool, 0, 2, AMOUNTS[0], 0, False, sender=user)
+    else:
+        adapter.exchange(pool, 0, 2, AMOUNTS[0], 0, sender=user)
+
+    # the mock pool exchanges 1:1 the amount left after the fee
+    received = AMOUNTS[0] - AMOUNTS[0] * fee_coin.FEE_BPS() // 10000
+    assert coins[2].balanceOf(user) == AMOUNTS[2] + received
+    assert fee_coin.balanceOf(adapter) == 0
+    assert coins[2].balanceOf(adapter) == 0
+
+
+@pytest.mark.parametrize("is_cryptoswap", [False, True])
+def test_multicall_batches_views(stableswap, cryptoswap, coins, is_cryptoswap):
+    adapter, pool, _ = cryptoswap if is_cryptoswap else stableswap
+
+    results = adapter.multicall([
+        adapter.get_pool_info.prepare_calldata(pool),
+        adapter.pool_coins.prepare_calldata(pool, 2),
+        adapter.get_pools_count.prepare_calldata(),
+    ])
+
+    pool_info = adapter.get_pool_info(pool)
+    assert decode(["address"], results[0][:32])[0] == pool.address.lower()
+    assert len(results[0]) == 32 * len(pool_info)
+    assert decode(["address"], results[1]) == (coins[2].address.lower(),)
+    assert decode(["uint256"], results[2]) == (1,)
+
+
+def register_pools_calldata(adapter, is_cryptoswap: bool, pools: list) -> bytes:
+    if is_cryptoswap:
+        return adapter.register_pools.prepare_calldata(pools)
+    return adapter.register_pools.prepare_calldata(pools, [ZERO] * len(pools))
+
+
+@pytest.mark.parametrize("is_cryptoswap", [False, True])
+def test_multicall_reverts_on_result_that_may_be_truncated(stableswap, cryptoswap, is_cryptoswap):
+    adapter, _, _ = cryptoswap if is_cryptoswap else stableswap
+    adapter_name = "cryptoswap_adapter" if is_cryptoswap else "stableswap_adapter"
+    # statuses of 6 pools take 64 + 6 * 32 bytes, the whole result buffer
+    pools = [boa.env.generate_address(f"pool {i}") for i in range(6)]
+
+    with boa.reverts(f"{adapter_name}: multicall result too large"):
+        adapter.multicall([register_pools_calldata(adapter, is_cryptoswap, pools)])
+
+    # one pool less fits
+    results = adapter.multicall([register_pools_calldata(adapter, is_cryptoswap, pools[:5])])
+
+    assert len(results[0]) == 64 + 5 * 32
@@ -0,0 +1,151 @@
+"""
+Unit tests for the Multicall3 reader.
+Calls go through a mock Multicall3 on the boa env, so they can be run on any network.
+The registry read of the adapter lens goes through the Multicall3 of the forked network, at its pinned block.
+"""
+
+import boa
+import pytest
+from eth_abi import encode
+
+from offchain import multicall
+from offchain.multicall import Call, Function, MulticallError, MulticallReader
+from src.mocks import mock_multicall3, mock_stableswap_pool
+
+BALANCES = [10**24, 2 * 10**12, 3 * 10**12]
+RATES = [10**18, 10**30, 10**30]
+
+
+@pytest.fixture(scope="module")
+def multicall3():
+    return mock_multicall3.deploy()
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = mock_stableswap_pool.deploy()
+    pool.set_state(BALANCES, RATES, 2000, 1, 10**6, 6 * 10**24, True)
+    return pool
+
+
+@pytest.fixture(scope="module")
+def pool_functions(pool):
+    return multicall.functions(pool.abi)
+
+
+def reader(multicall3, **limits) -> MulticallReader:
+    return MulticallReader(multicall.boa_transport, multicall=multicall3.address, **limits)
+
+
+def test_read_matches_direct_calls(multicall3, pool, pool_functions):
+    calls = [Call(pool.address, pool_functions["balances"], (i,)) for i in range(3)]
+    calls += [
+        Call(pool.address, pool_functions["get_dy"], (0, 1, 10**21)),
+        Call(pool.address, pool_functions["get_virtual_price"]),
+        Call(pool.address, pool_functions["fee_after_rates"]),
+    ]
+
+    results = reader(multicall3).read(calls)
+
+    assert all(result.success for result in results)
+    assert [result.value for result in results] == BALANCES + [pool.get_dy(0, 1, 10**21), pool.get_virtual_price(), True]
+
+
+def test_failed_calls_fail_alone(multicall3, pool, pool_functions):
+    calls = [
+        Call(pool.address, pool_functions["balances"], (0,)),
+        # out of bounds coin index reverts
+        Call(pool.address, pool_functions["balances"], (3,)),
+        # no code, no return data to decode
+        Call(boa.env.generate_address("eoa"), pool_functions["balances"], (0,)),
+        Call(pool.address, pool_functions["balances"], (2,)),
+    ]
+
+    results = reader(multicall3).read(calls)
+
+    assert [result.success for result in results] == [True, False, False, True]
+    assert [result.value for result in results] == [BALANCES[0], None, None, BALANCES[2]]
+
+
+def test_batches_are_within_gas_and_calldata_limits(multicall3, pool, pool_functions):
+    # 32 calls, as many as the mock takes in one batch
+    calls = [Call(pool.address, pool_functions["balances"], (k % 3,), gas=30_000) for k in range(27)]
+    calls += [Call(pool.address, pool_functions["get_dy"], (0, 1, 10**21), gas=300_000) for _ in range(5)]
+    bounded = reader(multicall3, max_gas=400_000, max_calldata=2048)
+
+    batches = bounded.batches(calls)
+
+    assert len(batches) > 1
+    assert [call for batch in batches for call, _ in batch] == calls
+    for batch in batches:
+        assert sum(call.gas + multicall.CALL_GAS_OVERHEAD for call, _ in batch) <= bounded.max_gas
+        # calldata padded to words
+        assert sum(multicall.CALL_CALLDATA_OVERHEAD + -(-len(calldata) // 32) * 32 for _, calldata in batch) <= bounded.max_calldata
+
+    # every batch of a read goes in one request
+    assert bounded.read(calls) == reader(multicall3).read(calls)
+    assert bounded.requests == 1
+
+
+def test_decodes_structs_to_namedtuples_and_arrays_to_lists_like_boa():
+    function = Function.from_abi(
+        {
+            "name": "get_pool",
+            "inputs": [{"name": "pool", "type": "address"}],
+            "outputs": [
+                {
+                    "name": "",
+                    "type": "tuple",
+                    "internalType": "struct Pool",
+                    "components": [
+                        {"name": "contract", "type": "address"},
+                        {"name": "n_coins", "type": "uint256"},
+                        {"name": "balances", "type": "uint256[2]"},
+                    ],
+                }
+            ],
+        }
+    )
+    pool_address = "0x00000000000000000000000000000000000000Ad"
+    data = encode(["(address,uint256,uint256[2])"], [(pool_address, 2, [5, 7])])
+
+    pool = function.decode(data)
+
+    assert type(pool).__name__ == "Pool"
+    assert pool.contract == pool_address
+    assert pool.n_coins == 2
+    assert pool.balances == [5, 7]
+
+
+def test_cannot_read_when_endpoint_fails_batch(multicall3, pool, pool_functions):
+    def failing_transport(payloads):
+        return [{"jsonrpc": "2.0", "id": payload["id"], "error": {"code": -32000, "message": "gas cap exceeded"}} for payload in payloads]
+
+    failing = MulticallReader(failing_transport, multicall=multicall3.address)
+
+    with pytest.raises(MulticallError, match="gas cap exceeded"):
+        failing.read([Call(pool.address, pool_functions["balances"], (0,))])
+
+
+ZERO = "0x0000000000000000000000000000000000000000"
+
+
+def test_reads_registry_in_two_requests_at_fork_block(
+    stableswap_adapter, stableswap_lens, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_zapper
+):
+    with boa.env.prank(alice):
+        stableswap_adapter.register_pools([three_pool_contract, musd_three_pool_contract], [ZERO, musd_three_pool_zapper])
+
+    # Multicall3 of the forked network
+    fork_reader = MulticallReader(multicall.boa_transport)
+    block, pools, states = multicall.read_registry(fork_reader, stableswap_lens.address, multicall.functions(stableswap_lens.abi))
+
+    assert fork_reader.requests == 2
+    assert block == boa.env.evm.patch.block_number
+    assert [pool.contract for pool in pools] == [three_pool_contract.address, musd_three_pool_contract.address]
+    for state, expected in zip(states, stableswap_lens.get_pool_states([three_pool_contract, musd_three_pool_contract])):
+        assert state.pool == expected.pool
+        assert state.coins == expected.coins
+        assert state.balances == expected.balances
+        assert state.virtual_price == expected.virtual_price
+        assert state.lp_total_supply == expected.lp_total_supply
@@ -0,0 +1,183 @@
+"""
+Unit tests for the vectorized quote surface.
+Float quotes and decisions are checked against the exact integer engines,
+so they can be run on any network, and against the adapter quotes of the 3pool
+at the pinned block of the forked network.
+"""
+
+import dataclasses
+
+import boa
+import numpy as np
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from offchain import cryptoswap_math, quote_surface
+from offchain.cryptoswap_math import CryptoSwapState
+from offchain.stableswap_math import StableSwapState
+
+PRECISION = 10**18
+A_MULTIPLIER = 10000
+# rate multipliers of 18, 6 and 8 decimals coins
+RATES = [10**18, 10**30, 10**28]
+# decimals of the cryptoswap pool coins, like USDC, WBTC and WETH
+DECIMALS = [6, 8, 18]
+# sizes from dust to the whole balance of the coin in
+SIZES = np.geomspace(1e-9, 1, 16)
+EXAMPLES = 50
+
+
+@st.composite
+def stableswap_states(draw):
+    n_coins = draw(st.integers(min_value=2, max_value=4))
+    rates = [draw(st.sampled_from(RATES)) for _ in range(n_coins)]
+
+    # normalized balances within 100x of each other, from 1 to 10**9 coins
+    scale = draw(st.integers(min_value=0, max_value=9))
+    balances = []
+    for rate in rates:
+        xp = draw(st.integers(min_value=10**18, max_value=100 * 10**18)) * 10**scale
+        balances.append(xp * PRECISION // rate)
+
+    a_precision = draw(st.sampled_from([1, 100]))
+    return StableSwapState(
+        balances=tuple(balances),
+        rates=tuple(rates),
+        amp=draw(st.integers(min_value=1, max_value=5000)) * a_precision,
+        fee=draw(st.integers(min_value=0, max_value=10**8)),
+        total_supply=sum(rate * balance // PRECISION for rate, balance in zip(rates, balances)),
+        a_precision=a_precision,
+        fee_after_rates=a_precision == 1,
+    )
+
+
+@st.composite
+def cryptoswap_states(draw):
+    n_coins = draw(st.integers(min_value=2, max_value=3))
+    precisions = cryptoswap_math.precisions_from_decimals(
+        [draw(st.sampled_from(DECIMALS)) for _ in range(n_coins)]
+    )
+    price_scale = tuple(draw(st.integers(min_value=10**15, max_value=10**23)) for _ in range(n_coins - 1))
+
+    # normalized balances within 10x of each other, from 10 to 10**11 coins
+    scale = draw(st.integers(min_value=0, max_value=9))
+    balances = [draw(st.integers(min_value=10**19, max_value=10**20)) * 10**scale // precisions[0]]
+    for k in range(1, n_coins):
+        xp = draw(st.integers(min_value=10**19, max_value=10**20)) * 10**scale
+        balances.append(xp * PRECISION // (price_scale[k - 1] * precisions[k]))
+
+    mid_fee = draw(st.integers(min_value=5 * 10**5, max_value=10**8))
+    state = CryptoSwapState(
+        balances=tuple(balances),
+        precisions=precisions,
+        price_scale=price_scale,
+        D=0,
+        A=draw(st.integers(min_value=n_coins**n_coins * A_MULTIPLIER // 10, max_value=n_coins**n_coins * A_MULTIPLIER * 1000)),
+        gamma=draw(st.integers(min_value=10**10, max_value=2 * 10**16)),
+        mid_fee=mid_fee,
+        out_fee=draw(st.integers(min_value=mid_fee, max_value=10**9)),
+        fee_gamma=draw(st.integers(min_value=10**10, max_value=10**18)),
+        total_supply=draw(st.integers(min_value=10**18, max_value=10**30)),
+    )
+    return dataclasses.replace(state, D=cryptoswap_math.newton_D(state.A, state.gamma, cryptoswap_math._xp(state, state.balances)))
+
+
+pool_states = st.one_of(stableswap_states(), cryptoswap_states())
+
+
+@st.composite
+def pairs(draw, state):
+    n_coins = len(state.balances)
+    i = draw(st.integers(min_value=0, max_value=n_coins - 1))
+    j = draw(st.integers(min_value=0, max_value=n_coins - 1).filter(lambda j: j != i))
+    return i, j
+
+
+def sizes(state, i) -> np.ndarray:
+    return np.array([float(int(state.balances[i] * size)) for size in SIZES])
+
+
+def exact_quotes(states, i, j, dx) -> np.ndarray:
+    """
+    Exact quotes as Python ints, which float64 would round above 2**53.
+    """
+    return np.array(
+        [[quote_surface.exact_get_dy(state, i, j, int(amount)) for amount in row] for state, row in zip(states, dx)],
+        dtype=object,
+    )
+
+
+@settings(max_examples=EXAMPLES, deadline=None)
+@given(state=pool_states, data=st.data())
+def test_get_dy_within_error_bound_of_exact_quotes(state, data):
+    i, j = data.draw(pairs(state))
+    dx = sizes(state, i)
+
+    dy = quote_surface.get_dy([state], i, j, dx)
+
+    assert dy.shape == (1, len(SIZES))
+    error = np.abs(dy - exact_quotes([state], i, j, [dx])).astype(np.float64)
+    assert np.all(error <= quote_surface.error_bound([state], j))
+
+
+@settings(max_examples=EXAMPLES, deadline=None)
+@given(stableswap=stableswap_states(), cryptoswap=cryptoswap_states())
+def test_get_dy_of_mixed_pools_matches_each_pool(stableswap, cryptoswap):
+    states = [cryptoswap, stableswap, cryptoswap]
+    dx = np.array([sizes(state, 0) for state in states])
+
+    dy = quote_surface.get_dy(states, 0, 1, dx)
+
+    for k, state in enumerate(states):
+        assert np.array_equal(dy[k], quote_surface.get_dy([state], 0, 1, dx[k])[0])
+
+
+@settings(max_examples=EXAMPLES, deadline=None)
+@given(state=pool_states, other=pool_states)
+def test_best_pool_matches_exact_quotes(state, other):
+    # the same pool twice ties exactly, the first one wins
+    states = [state, other, state]
+    dx = np.array([float(int(min(s.balances[0] for s in states) * size)) for size in SIZES])
+
+    best = quote_surface.best_pool(states, 0, 1, dx)
+
+    exact = exact_quotes(states, 0, 1, [dx] * len(states))
+    assert np.array_equal(best, np.argmax(exact, axis=0))
+
+
+@settings(max_examples=EXAMPLES, deadline=None)
+@given(state=pool_states, data=st.data())
+def test_meets_min_dy_matches_exact_quotes(state, data):
+    i, j = data.draw(pairs(state))
+    dx = sizes(state, i)
+    exact = exact_quotes([state], i, j, [dx])
+
+    # min_dy right at the exact quotes is the hardest decision for float quotes
+    for offset in (-1, 0, 1):
+        min_dy = exact + offset
+        meets = quote_surface.meets_min_dy([state], i, j, dx, min_dy)
+        assert np.array_equal(meets, exact >= min_dy)
+
+
+ZERO = "0x0000000000000000000000000000000000000000"
+
+
+def test_within_error_of_get_exchange_amount_out_at_fork_block(
+    stableswap_adapter, alice, three_pool_contract, three_pool_lp_token
+):
+    with boa.env.prank(alice):
+        stableswap_adapter.register_pool(three_pool_contract, ZERO)
+
+    amounts_in = [10 * 10**18 * 4**k for k in range(12)]  # DAI
+    state = StableSwapState(
+        balances=tuple(three_pool_contract.balances(i) for i in range(3)),
+        rates=(10**18, 10**30, 10**30),
+        amp=three_pool_contract.A(),
+        fee=three_pool_contract.fee(),
+        total_supply=three_pool_lp_token.totalSupply(),
+        fee_after_rates=True,
+    )
+
+    error = quote_surface.max_error(stableswap_adapter, [three_pool_contract.address], [state], 0, 1, amounts_in)
+
+    assert error <= 1
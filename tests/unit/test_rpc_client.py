@@ -0,0 +1,238 @@
+"""
+Unit tests for the asyncio JSON-RPC client.
+Requests go to a local JSON-RPC stand-in serving the boa env, with a stableswap adapter over a mock pool
+served by a mock meta registry, so they can be run on any network.
+"""
+
+import asyncio
+import json
+
+import boa
+import pytest
+
+from offchain.rpc_client import (
+    WS_TEXT,
+    AdapterClient,
+    HttpTransport,
+    RpcClient,
+    RpcError,
+    WebSocketTransport,
+    read_head,
+    websocket_accept,
+    write_frame,
+)
+from offchain.rpc_stand_in import StandIn
+from src import stableswap_adapter
+from src.mocks import mock_meta_registry, mock_stableswap_pool
+
+ZERO = "0x0000000000000000000000000000000000000000"
+BALANCES = [10**24, 2 * 10**12, 3 * 10**12]
+RATES = [10**18, 10**30, 10**30]
+# short latency, the tests check behavior and not speed
+LATENCY = 0.005
+
+
+@pytest.fixture(scope="module")
+def adapter():
+    registry = mock_meta_registry.deploy()
+    adapter = stableswap_adapter.deploy(registry, boa.env.generate_address("minter"))
+
+    pool = mock_stableswap_pool.deploy()
+    pool.set_state(BALANCES, RATES, 2000, 1, 10**6, 6 * 10**24, True)
+    coins = [boa.env.generate_address(f"coin_{i}") for i in range(3)] + [ZERO] * 5
+    registry.set_pool(pool, False, ZERO, pool, 3, coins)
+    adapter.register_pool(pool, ZERO)
+    return adapter
+
+
+@pytest.fixture(scope="module")
+def pool(adapter):
+    return adapter.pool_registry_set(0)
+
+
+def run(test, websocket: bool = False, concurrency: int = 32):
+    """
+    Run an async test against a fresh stand-in, with a client over HTTP or WebSocket.
+    """
+
+    async def main():
+        stand_in = StandIn(latency=LATENCY)
+        await stand_in.start()
+        transport = WebSocketTransport(stand_in.ws_url) if websocket else HttpTransport(stand_in.http_url)
+        rpc = RpcClient(transport, concurrency=concurrency)
+        try:
+            return await test(rpc, stand_in)
+        finally:
+            await rpc.close()
+            await stand_in.close()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("websocket", [False, True])
+def test_adapter_views_match_direct_calls(adapter, pool, websocket):
+    async def test(rpc, stand_in):
+        client = AdapterClient(rpc, adapter.address, adapter.abi, mock_stableswap_pool.deploy().abi)
+        return await asyncio.gather(
+            client.get_exchange_amount_out(pool, 0, 1, 10**21),
+            client.get_pool_info(pool),
+            client.view("get_pools_count"),
+            client.pool_view(pool, "balances", 2),
+        )
+
+    amount_out, pool_info, pools_count, balance = run(test, websocket)
+
+    assert amount_out == adapter.get_exchange_amount_out(pool, 0, 1, 10**21)
+    assert tuple(pool_info) == tuple(adapter.get_pool_info(pool))
+    assert pools_count == 1
+    assert balance == BALANCES[2]
+
+
+def test_coalesces_identical_requests_in_flight(adapter, pool):
+    async def test(rpc, stand_in):
+        client = AdapterClient(rpc, adapter.address, adapter.abi)
+        amounts = await asyncio.gather(*(client.get_exchange_amount_out(pool, 0, 1, 10**21) for _ in range(10)))
+        # the same call at another block tag is another request
+        await asyncio.gather(
+            client.get_exchange_amount_out(pool, 0, 1, 10**21),
+            client.get_exchange_amount_out(pool, 0, 1, 10**21, block=boa.env.evm.patch.block_number),
+        )
+        return amounts, rpc.requests, rpc.coalesced, stand_in.requests
+
+    amounts, requests, coalesced, served = run(test)
+
+    assert len(set(amounts)) == 1
+    assert (requests, coalesced, served) == (3, 9, 3)
+
+
+def test_does_not_coalesce_requests_done(adapter, pool):
+    async def test(rpc, stand_in):
+        client = AdapterClient(rpc, adapter.address, adapter.abi)
+        for _ in range(3):
+            await client.get_pool_info(pool)
+        return rpc.requests
+
+    assert run(test) == 3
+
+
+def test_caps_requests_in_flight(adapter, pool):
+    async def test(rpc, stand_in):
+        client = AdapterClient(rpc, adapter.address, adapter.abi)
+        in_flight = peak = 0
+        send = rpc.transport.send
+
+        async def counting_send(payload):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                return await send(payload)
+            finally:
+                in_flight -= 1
+
+        rpc.transport.send = counting_send
+        await asyncio.gather(*(client.get_exchange_amount_out(pool, 0, 1, 10**18 * k) for k in range(1, 21)))
+        return peak, rpc.transport.connections
+
+    peak, connections = run(test, concurrency=3)
+
+    assert peak == 3
+    # connections are kept alive and reused
+    assert connections == 3
+
+
+@pytest.mark.parametrize("websocket", [False, True])
+def test_sends_views_as_one_batch(adapter, pool, websocket):
+    calls = [("get_exchange_amount_out", (pool, 0, j, 10**21)) for j in (1, 2)]
+    calls += [("get_pool_info", (pool,)), ("get_pool_info", (boa.env.generate_address("unregistered"),))]
+
+    async def test(rpc, stand_in):
+        client = AdapterClient(rpc, adapter.address, adapter.abi)
+        return await client.views(calls), rpc.requests, stand_in.requests
+
+    results, requests, served = run(test, websocket)
+
+    assert results[:2] == [adapter.get_exchange_amount_out(pool, 0, j, 10**21) for j in (1, 2)]
+    assert tuple(results[2]) == tuple(adapter.get_pool_info(pool))
+    # unregistered pools have an empty pool info
+    assert results[3].contract == ZERO
+    assert (requests, served) == (1, 1)
+
+
+def test_reverted_view_raises_and_fails_alone(adapter, pool):
+    unregistered = boa.env.generate_address("unregistered")
+
+    async def test(rpc, stand_in):
+        client = AdapterClient(rpc, adapter.address, adapter.abi)
+        with pytest.raises(RpcError, match="execution reverted"):
+            await client.get_exchange_amount_out(unregistered, 0, 1, 10**21)
+        return await client.views([("get_exchange_amount_out", (p, 0, 1, 10**21)) for p in (unregistered, pool)])
+
+    failed, amount_out = run(test)
+
+    assert isinstance(failed, RpcError)
+    assert amount_out == adapter.get_exchange_amount_out(pool, 0, 1, 10**21)
+
+
+def run_raw(handle, test):
+    """
+    Run an async test against a raw server answering each connection with handle(reader, writer).
+    """
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        try:
+            return await test(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+
+    return asyncio.run(main())
+
+
+def test_reads_body_until_the_server_closes_without_content_length():
+    async def handle(reader, writer):
+        _, headers = await read_head(reader)
+        request = json.loads(await reader.readexactly(int(headers["content-length"])))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n")
+        writer.write(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": "0x1"}).encode())
+        await writer.drain()
+        writer.close()
+
+    async def test(port):
+        rpc = RpcClient(HttpTransport(f"http://127.0.0.1:{port}"))
+        results = [await rpc.request("eth_blockNumber", []) for _ in range(2)]
+        await rpc.close()
+        return results, rpc.transport.connections
+
+    results, connections = run_raw(handle, test)
+
+    assert results == ["0x1", "0x1"]
+    # connections closed by the server are not reused
+    assert connections == 2
+
+
+def test_malformed_websocket_message_fails_pending_requests_and_closes_connection():
+    async def handle(reader, writer):
+        _, headers = await read_head(reader)
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(headers['sec-websocket-key'].encode())}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        # answer the first request with a message that is not JSON
+        await reader.readexactly(2)
+        write_frame(writer, WS_TEXT, b"not json", mask=False)
+        await writer.drain()
+        await reader.read()
+
+    async def test(port):
+        transport = WebSocketTransport(f"ws://127.0.0.1:{port}", timeout=5)
+        rpc = RpcClient(transport)
+        _, writer = await transport._connect()
+        with pytest.raises(RpcError, match="WebSocket connection lost"):
+            await rpc.request("eth_blockNumber", [])
+        closed = writer.is_closing(), transport._connection is None
+        await rpc.close()
+        return closed
+
+    assert run_raw(handle, test) == (True, True)
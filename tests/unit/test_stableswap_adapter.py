@@ -4,16 +4,28 @@ Should be run with eth-forked network only
 """
 
 import boa
-from eth_utils import from_wei, to_wei
+from eth_abi import encode
+from eth_account import Account
+from eth_utils import from_wei, keccak, to_wei
 
 BASE_TYPE = 1
 META_TYPE = 2
+REGISTERED = 1
+ALREADY_REGISTERED = 2
+NOT_IN_META_REGISTRY = 4
+ZAPPER_REQUIRED = 8
 ZERO = "0x0000000000000000000000000000000000000000"
 RANDOM_ADDRESS = boa.env.generate_address("random")
 BALANCE = to_wei(1000, "ether")
 DAI_WHALE = "0xf6e72Db5454dd049d0788e411b06CfAF16853042"
 MUSD_WHALE = "0x30647a72Dc82d7Fbb1123EA74716aB8A317Eac19"
 THREE_CRV_WHALE = "0xe74b28c2eAe8679e3cCc3a94d5d0dE83CCB84705"
+PERMIT2 = "0x000000000022D473030F116dDEE9F6B43aC78BA3"
+PERMIT2_ABI = '[{"name": "DOMAIN_SEPARATOR", "type": "function", "stateMutability": "view", "inputs": [], "outputs": [{"name": "", "type": "bytes32"}]}]'
+PERMIT_TYPEHASH = keccak(text="Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)")
+PERMIT_DETAILS_TYPEHASH = keccak(text="PermitDetails(address token,uint160 amount,uint48 expiration,uint48 nonce)")
+PERMIT_SINGLE_TYPEHASH = keccak(text="PermitSingle(PermitDetails details,address spender,uint256 sigDeadline)PermitDetails(address token,uint160 amount,uint48 expiration,uint48 nonce)")
+DEADLINE = 2**48 - 1
 
 
 # ------------------------------------------------------------------
@@ -71,6 +83,19 @@ def test_cannot_set_zero_zap_address_for_meta_pool(stableswap_adapter, alice, mu
         with boa.reverts("stableswap_adapter: zapper address is required for metapools"):
             stableswap_adapter.register_pool(musd_three_pool_contract, ZERO)
 
+def test_stores_pool_coins_on_register(stableswap_adapter, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_gauge, dai, usdc, usdt, musd, three_crv):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+
+    assert stableswap_adapter.pool_coins(three_pool_contract, 0) == dai.address
+    assert stableswap_adapter.pool_coins(three_pool_contract, 1) == usdc.address
+    assert stableswap_adapter.pool_coins(three_pool_contract, 2) == usdt.address
+    assert stableswap_adapter.pool_coins(three_pool_contract, 3) == ZERO
+
+    assert stableswap_adapter.pool_coins(musd_three_pool_contract, 0) == musd.address
+    assert stableswap_adapter.pool_coins(musd_three_pool_contract, 1) == three_crv.address
+    assert stableswap_adapter.pool_coins(musd_three_pool_contract, 2) == ZERO
+
 def test_emits_register_log(stableswap_adapter, alice, three_pool_contract, three_pool_gauge, three_pool_lp_token):
     register_three_pool(stableswap_adapter, alice, three_pool_contract)
     logs = stableswap_adapter.get_logs()
@@ -82,6 +107,156 @@ def test_emits_register_log(stableswap_adapter, alice, three_pool_contract, thre
     assert logs[0].n_coins == 3
 
 
+# ------------------------------------------------------------------
+#                     REGISTER_POOLS FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_register_pools_not_owner(stableswap_adapter, three_pool_contract):
+    with boa.reverts("ownable: caller is not the owner"):
+        stableswap_adapter.register_pools([three_pool_contract], [ZERO])
+
+def test_cannot_register_pools_with_wrong_zappers_amount(stableswap_adapter, alice, three_pool_contract):
+    with boa.env.prank(alice):
+        with boa.reverts("stableswap_adapter: invalid number of zappers"):
+            stableswap_adapter.register_pools([three_pool_contract], [])
+
+def test_register_pools_successfully(stableswap_adapter, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_zapper):
+    with boa.env.prank(alice):
+        statuses = stableswap_adapter.register_pools(
+            [three_pool_contract, musd_three_pool_contract],
+            [ZERO, musd_three_pool_zapper.address],
+        )
+
+    assert list(statuses) == [REGISTERED, REGISTERED]
+    assert stableswap_adapter.get_pools_count() == 2
+    assert stableswap_adapter.pool_registry_set(0) == three_pool_contract.address
+    assert stableswap_adapter.pool_registry_set(1) == musd_three_pool_contract.address
+    assert stableswap_adapter.get_pool_info(musd_three_pool_contract).zapper == musd_three_pool_zapper.address
+
+def test_register_pools_skips_invalid_pools(stableswap_adapter, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_zapper):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    with boa.env.prank(alice):
+        statuses = stableswap_adapter.register_pools(
+            [three_pool_contract, RANDOM_ADDRESS, musd_three_pool_contract, musd_three_pool_contract],
+            [ZERO, ZERO, ZERO, musd_three_pool_zapper.address],
+        )
+
+    assert list(statuses) == [ALREADY_REGISTERED, NOT_IN_META_REGISTRY, ZAPPER_REQUIRED, REGISTERED]
+    assert stableswap_adapter.get_pools_count() == 2
+
+    logs = stableswap_adapter.get_logs()
+    assert logs[0].pool == three_pool_contract.address
+    assert logs[0].status == ALREADY_REGISTERED
+    assert logs[1].pool == RANDOM_ADDRESS
+    assert logs[1].status == NOT_IN_META_REGISTRY
+    assert logs[2].pool == musd_three_pool_contract.address
+    assert logs[2].status == ZAPPER_REQUIRED
+    assert logs[3].pool == musd_three_pool_contract.address
+    assert logs[3].zapper == musd_three_pool_zapper.address
+
+
+# ------------------------------------------------------------------
+#                    DEREGISTER_POOL FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_deregister_pool_not_owner(stableswap_adapter, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    with boa.reverts("ownable: caller is not the owner"):
+        stableswap_adapter.deregister_pool(three_pool_contract)
+
+def test_cannot_deregister_pool_not_registered(stableswap_adapter, alice):
+    with boa.env.prank(alice):
+        with boa.reverts("stableswap_adapter: pool not registered"):
+            stableswap_adapter.deregister_pool(RANDOM_ADDRESS)
+
+def test_deregister_pool_successfully(stableswap_adapter, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_gauge):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+
+    with boa.env.prank(alice):
+        stableswap_adapter.deregister_pool(three_pool_contract)
+
+    logs = stableswap_adapter.get_logs()
+    assert logs[len(logs) - 1].pool == three_pool_contract.address
+
+    # last pool is moved into the freed id
+    assert stableswap_adapter.get_pools_count() == 1
+    assert stableswap_adapter.pool_registry_set(0) == musd_three_pool_contract.address
+    assert stableswap_adapter.pool_registry_set(1) == ZERO
+
+    assert stableswap_adapter.get_pool_info(three_pool_contract).contract == ZERO
+    assert stableswap_adapter.pool_coins(three_pool_contract, 0) == ZERO
+
+    with boa.reverts("stableswap_adapter: pool address mismatch"):
+        stableswap_adapter.get_exchange_amount_out(three_pool_contract, 0, 1, int(1e18))
+
+    # pool can be registered again
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    assert stableswap_adapter.get_pools_count() == 2
+    assert stableswap_adapter.pool_registry_set(1) == three_pool_contract.address
+
+
+# ------------------------------------------------------------------
+#               SET_FEE_ON_TRANSFER_COIN FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_set_fee_on_transfer_coin_not_owner(stableswap_adapter, usdt):
+    with boa.reverts("ownable: caller is not the owner"):
+        stableswap_adapter.set_fee_on_transfer_coin(usdt, True)
+
+def test_set_fee_on_transfer_coin_successfully(stableswap_adapter, alice, usdt):
+    assert not stableswap_adapter.fee_on_transfer_coins(usdt)
+
+    with boa.env.prank(alice):
+        stableswap_adapter.set_fee_on_transfer_coin(usdt, True)
+
+    assert stableswap_adapter.fee_on_transfer_coins(usdt)
+
+    logs = stableswap_adapter.get_logs()
+    assert logs[len(logs) - 1].coin == usdt.address
+    assert logs[len(logs) - 1].is_fee_on_transfer
+
+    with boa.env.prank(alice):
+        stableswap_adapter.set_fee_on_transfer_coin(usdt, False)
+
+    assert not stableswap_adapter.fee_on_transfer_coins(usdt)
+
+# ------------------------------------------------------------------
+#                  FIND_POOLS_FOR_PAIR FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_find_pools_for_pair_successfully(stableswap_adapter, stableswap_lens, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_gauge, dai, usdc, usdt, musd, three_crv):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+
+    pools = stableswap_lens.find_pools_for_pair(usdt, dai)
+    assert len(pools) == 1
+    assert pools[0].pool == three_pool_contract.address
+    assert pools[0].index_in == 2
+    assert pools[0].index_out == 0
+
+    pools = stableswap_lens.find_pools_for_pair(three_crv, musd)
+    assert len(pools) == 1
+    assert pools[0].pool == musd_three_pool_contract.address
+    assert pools[0].index_in == 1
+    assert pools[0].index_out == 0
+
+    assert stableswap_adapter.get_pair_pools_count(dai, usdc) == 1
+    assert stableswap_adapter.get_pair_pools_count(usdc, dai) == 1
+    assert stableswap_lens.find_pools_for_pair(dai, musd) == []
+    assert stableswap_lens.find_pools_for_pair(dai, dai) == []
+
+def test_find_pools_for_pair_after_deregister(stableswap_adapter, stableswap_lens, alice, three_pool_contract, dai, usdc):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    with boa.env.prank(alice):
+        stableswap_adapter.deregister_pool(three_pool_contract)
+
+    assert stableswap_lens.find_pools_for_pair(dai, usdc) == []
+    assert stableswap_adapter.get_pair_pools_count(dai, usdc) == 0
+
 # ------------------------------------------------------------------
 #                      ADD_LIQUIDITY FUNCTION TESTS
 # ------------------------------------------------------------------
@@ -306,6 +481,36 @@ def test_can_remove_liquidity_balanced_successfully_meta_pool(stableswap_adapter
     assert log.min_amounts == [0, 0]
     assert log.amount == mint_amount
 
+def test_remove_liquidity_balanced_forwards_returned_amounts_meta_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge, musd_three_pool_lp_token, musd, three_crv):
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+    mint_musd_three_pool_tokens(alice, musd, three_crv)
+
+    AMOUNT_TO_ADD: int = int(100e18) # MUSD
+    AMOUNT_TO_ADD_2: int = int(200e18) # THREE_CRV
+
+    with boa.env.prank(alice):
+        musd.approve(stableswap_adapter, AMOUNT_TO_ADD)
+        three_crv.approve(stableswap_adapter, AMOUNT_TO_ADD_2)
+
+        mint_amount: int = stableswap_adapter.add_liquidity(musd_three_pool_contract, [AMOUNT_TO_ADD, AMOUNT_TO_ADD_2], 0)
+
+        musd_three_pool_lp_token.approve(stableswap_adapter, mint_amount)
+
+        # the pool sends its balances pro rata to the lp tokens burnt
+        total_supply: int = musd_three_pool_lp_token.totalSupply()
+        expected: list[int] = [musd_three_pool_contract.balances(i) * mint_amount // total_supply for i in range(2)]
+
+        musd_balance_before: int = musd.balanceOf(alice)
+        three_crv_balance_before: int = three_crv.balanceOf(alice)
+
+        stableswap_adapter.remove_liquidity(musd_three_pool_contract, mint_amount, [0, 0])
+
+    # amounts returned by the pool are forwarded as is
+    assert musd.balanceOf(alice) - musd_balance_before == expected[0]
+    assert three_crv.balanceOf(alice) - three_crv_balance_before == expected[1]
+    assert musd.balanceOf(stableswap_adapter) == 0
+    assert three_crv.balanceOf(stableswap_adapter) == 0
+
 # ------------------------------------------------------------------
 #                 REMOVE_LIQUIDITY_IMBALANCE FUNCTION TESTS
 # ------------------------------------------------------------------
@@ -667,6 +872,145 @@ def test_can_successfully_exchange_meta_pool(stableswap_adapter, alice, musd_thr
     assert log.min_amount_out == 0
     assert log.out_amount == three_crv_out_amount
 
+def test_exchange_keeps_standing_allowance_for_pool(stableswap_adapter, alice, three_pool_contract, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    mint_three_pool_tokens(alice, dai, usdc, usdt)
+
+    AMOUNT_IN: int = int(10e6) # USDT
+
+    with boa.env.prank(alice):
+        usdt.approve(stableswap_adapter, AMOUNT_IN * 2)
+        stableswap_adapter.exchange(three_pool_contract, 2, 1, AMOUNT_IN, 0)
+
+        allowance: int = usdt.allowance(stableswap_adapter, three_pool_contract)
+        assert allowance >= 2**255
+
+        # USDT reverts on a non-zero to non-zero approve, so the second exchange must not approve again
+        stableswap_adapter.exchange(three_pool_contract, 2, 1, AMOUNT_IN, 0)
+
+    assert usdt.allowance(stableswap_adapter, three_pool_contract) <= allowance
+    assert usdt.balanceOf(stableswap_adapter) == 0
+
+# ------------------------------------------------------------------
+#                   EXCHANGE_ROUTE FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_exchange_route_with_empty_route(stableswap_adapter, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    with boa.env.prank(alice):
+        with boa.reverts("stableswap_adapter: empty route"):
+            stableswap_adapter.exchange_route([], int(10e18), 0)
+
+def test_cannot_exchange_route_with_not_continuous_route(stableswap_adapter, alice, three_pool_contract, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    mint_three_pool_tokens(alice, dai, usdc, usdt)
+
+    AMOUNT_IN: int = int(10e18) # DAI
+
+    # DAI -> USDC, then USDT -> DAI
+    route = [(three_pool_contract.address, 0, 1), (three_pool_contract.address, 2, 0)]
+
+    with boa.env.prank(alice):
+        dai.approve(stableswap_adapter, AMOUNT_IN)
+        with boa.reverts("stableswap_adapter: route is not continuous"):
+            stableswap_adapter.exchange_route(route, AMOUNT_IN, 0)
+
+def test_cannot_exchange_route_with_insufficient_output_amount(stableswap_adapter, alice, three_pool_contract, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    mint_three_pool_tokens(alice, dai, usdc, usdt)
+
+    AMOUNT_IN: int = int(10e18) # DAI
+
+    # DAI -> USDC -> USDT
+    route = [(three_pool_contract.address, 0, 1), (three_pool_contract.address, 1, 2)]
+
+    with boa.env.prank(alice):
+        dai.approve(stableswap_adapter, AMOUNT_IN)
+        with boa.reverts():
+            stableswap_adapter.exchange_route(route, AMOUNT_IN, int(11e6))
+
+def test_can_successfully_exchange_route(stableswap_adapter, alice, three_pool_contract, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    mint_three_pool_tokens(alice, dai, usdc, usdt)
+
+    AMOUNT_IN: int = int(10e18) # DAI
+
+    # DAI -> USDC -> USDT
+    route = [(three_pool_contract.address, 0, 1), (three_pool_contract.address, 1, 2)]
+
+    dai_balance_before: int = dai.balanceOf(alice)
+    usdc_balance_before: int = usdc.balanceOf(alice)
+    usdt_balance_before: int = usdt.balanceOf(alice)
+
+    with boa.env.prank(alice):
+        dai.approve(stableswap_adapter, AMOUNT_IN)
+        out_amount: int = stableswap_adapter.exchange_route(route, AMOUNT_IN, 0)
+
+    usdt_out_amount: int = usdt.balanceOf(alice) - usdt_balance_before
+
+    print(f"usdt_out_amount: {usdt_out_amount}")
+    assert usdt_out_amount > 0
+    assert out_amount == usdt_out_amount
+
+    assert dai.balanceOf(alice) == dai_balance_before - AMOUNT_IN
+    assert usdc.balanceOf(alice) == usdc_balance_before
+
+    assert dai.balanceOf(stableswap_adapter) == 0
+    assert usdc.balanceOf(stableswap_adapter) == 0
+    assert usdt.balanceOf(stableswap_adapter) == 0
+
+    logs = stableswap_adapter.get_logs()
+
+    assert len(logs) == 2
+    assert logs[0].pool == three_pool_contract.address
+    assert logs[0].index_in == 0
+    assert logs[0].index_out == 1
+    assert logs[0].amount_in == AMOUNT_IN
+    assert logs[1].index_in == 1
+    assert logs[1].index_out == 2
+    assert logs[1].amount_in == logs[0].out_amount
+    assert logs[1].out_amount == usdt_out_amount
+
+# ------------------------------------------------------------------
+#                   EXCHANGE_BEST FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_exchange_best_without_pool_for_pair(stableswap_adapter, alice, three_pool_contract, dai, musd):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    with boa.env.prank(alice):
+        with boa.reverts("stableswap_adapter: no pool for pair"):
+            stableswap_adapter.exchange_best(dai, musd, int(10e18), 0)
+
+def test_can_successfully_exchange_best(stableswap_adapter, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_gauge, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+    mint_three_pool_tokens(alice, dai, usdc, usdt)
+
+    AMOUNT_IN: int = int(10e18) # DAI
+
+    expected_out_amount: int = stableswap_adapter.get_exchange_amount_out(three_pool_contract, 0, 1, AMOUNT_IN)
+
+    dai_balance_before: int = dai.balanceOf(alice)
+    usdc_balance_before: int = usdc.balanceOf(alice)
+
+    with boa.env.prank(alice):
+        dai.approve(stableswap_adapter, AMOUNT_IN)
+        out_amount: int = stableswap_adapter.exchange_best(dai, usdc, AMOUNT_IN, 0)
+
+    assert out_amount == expected_out_amount
+    assert usdc.balanceOf(alice) - usdc_balance_before == out_amount
+    assert dai_balance_before - dai.balanceOf(alice) == AMOUNT_IN
+
+    logs = stableswap_adapter.get_logs()
+    log = logs[len(logs) - 1]
+
+    assert log.pool == three_pool_contract.address
+    assert log.index_in == 0
+    assert log.index_out == 1
+    assert log.out_amount == out_amount
+
 # ------------------------------------------------------------------
 #              GET_EXCHANGE_AMOUNT_OUT FUNCTION TESTS
 # ------------------------------------------------------------------
@@ -690,6 +1034,65 @@ def test_get_exchange_amount_out_successfully_meta_pool(stableswap_adapter, alic
 
     assert out_amount > 0
 
+def test_get_exchange_ladder_successfully(stableswap_adapter, stableswap_lens, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    AMOUNTS_IN: list = [int(10e18) * 2**i for i in range(20)]
+
+    amounts_out, prices = stableswap_lens.get_exchange_ladder(three_pool_contract, 0, 1, AMOUNTS_IN)
+
+    assert len(amounts_out) == len(AMOUNTS_IN)
+    assert len(prices) == len(AMOUNTS_IN)
+    for amount_in, amount_out, price in zip(AMOUNTS_IN, amounts_out, prices):
+        assert amount_out == stableswap_adapter.get_exchange_amount_out(three_pool_contract, 0, 1, amount_in)
+        assert price == amount_out * 10**18 // amount_in
+
+    # price impact grows with trade size
+    assert prices[-1] < prices[0]
+
+def test_cannot_get_exchange_ladder_with_wrong_index_out(stableswap_adapter, stableswap_lens, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    with boa.reverts("stableswap_adapter: index out out of bounds"):
+        stableswap_lens.get_exchange_ladder(three_pool_contract, 0, 3, [int(10e18)])
+
+def test_get_exchange_amounts_out_successfully(stableswap_adapter, stableswap_lens, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_gauge):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+
+    AMOUNT_IN: int = int(10e18)
+
+    requests = [
+        (three_pool_contract.address, 0, 1, AMOUNT_IN),
+        (musd_three_pool_contract.address, 0, 1, AMOUNT_IN),
+        (three_pool_contract.address, 2, 0, int(10e6)),
+    ]
+
+    amounts_out: list = stableswap_lens.get_exchange_amounts_out(requests)
+
+    assert len(amounts_out) == len(requests)
+    for (pool, index_in, index_out, amount_in), amount_out in zip(requests, amounts_out):
+        assert amount_out == stableswap_adapter.get_exchange_amount_out(pool, index_in, index_out, amount_in)
+
+def test_get_exchange_amounts_out_returns_failed_for_invalid_requests(stableswap_adapter, stableswap_lens, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    AMOUNT_IN: int = int(10e18)
+    QUOTE_FAILED: int = stableswap_adapter.QUOTE_FAILED()
+
+    requests = [
+        (RANDOM_ADDRESS, 0, 1, AMOUNT_IN),
+        (three_pool_contract.address, 0, 3, AMOUNT_IN),
+        (three_pool_contract.address, -1, 1, AMOUNT_IN),
+        (three_pool_contract.address, 1, 1, AMOUNT_IN),
+        (three_pool_contract.address, 0, 1, AMOUNT_IN),
+    ]
+
+    amounts_out: list = stableswap_lens.get_exchange_amounts_out(requests)
+
+    assert QUOTE_FAILED == 2**256 - 1
+    assert amounts_out[:4] == [QUOTE_FAILED] * 4
+    assert amounts_out[4] == stableswap_adapter.get_exchange_amount_out(three_pool_contract, 0, 1, AMOUNT_IN)
 
 # ------------------------------------------------------------------
 #                DEPOSIT_LP_FOR_CRV FUNCTION TESTS
@@ -758,6 +1161,57 @@ def test_can_successfully_deposit_lp_for_crv_meta_pool(stableswap_adapter, alice
     assert log.pool == musd_three_pool_contract.address
     assert log.lp_amount == mint_amount
 
+
+def test_can_add_liquidity_and_stake_base_pool(stableswap_adapter, alice, three_pool_contract, three_pool_lp_token, three_pool_gauge, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    mint_three_pool_tokens(alice, dai, usdc, usdt)
+
+    AMOUNT_TO_ADD: int = int(100e18) # DAI
+    AMOUNT_TO_ADD_2: int = int(200e6) # USDC
+    AMOUNT_TO_ADD_3: int = int(300e6) # USDT
+
+    with boa.env.prank(alice):
+        dai.approve(stableswap_adapter, AMOUNT_TO_ADD)
+        usdc.approve(stableswap_adapter, AMOUNT_TO_ADD_2)
+        usdt.approve(stableswap_adapter, AMOUNT_TO_ADD_3)
+        three_pool_gauge.set_approve_deposit(stableswap_adapter, True)
+
+        mint_amount: int = stableswap_adapter.add_liquidity_and_stake(three_pool_contract, [AMOUNT_TO_ADD, AMOUNT_TO_ADD_2, AMOUNT_TO_ADD_3], 0)
+
+    assert mint_amount > 0
+    assert dai.balanceOf(alice) == BALANCE - AMOUNT_TO_ADD
+    assert usdc.balanceOf(alice) == BALANCE - AMOUNT_TO_ADD_2
+    assert usdt.balanceOf(alice) == BALANCE - AMOUNT_TO_ADD_3
+    assert three_pool_lp_token.balanceOf(alice) == 0
+    assert three_pool_lp_token.balanceOf(stableswap_adapter) == 0
+    assert three_pool_gauge.balanceOf(alice) == mint_amount
+
+    logs = stableswap_adapter.get_logs()
+    log = logs[len(logs) - 1]
+
+    assert log.pool == three_pool_contract.address
+    assert log.lp_amount == mint_amount
+
+
+def test_can_add_liquidity_and_stake_meta_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge, musd_three_pool_lp_token, musd, three_crv):
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+    mint_musd_three_pool_tokens(alice, musd, three_crv)
+
+    AMOUNT_TO_ADD: int = int(100e18) # MUSD
+    AMOUNT_TO_ADD_2: int = int(200e18) # THREE_CRV
+
+    with boa.env.prank(alice):
+        musd.approve(stableswap_adapter, AMOUNT_TO_ADD)
+        three_crv.approve(stableswap_adapter, AMOUNT_TO_ADD_2)
+        musd_three_pool_gauge.set_approve_deposit(stableswap_adapter, True)
+
+        mint_amount: int = stableswap_adapter.add_liquidity_and_stake(musd_three_pool_contract, [AMOUNT_TO_ADD, AMOUNT_TO_ADD_2], 0)
+
+    assert mint_amount > 0
+    assert musd_three_pool_lp_token.balanceOf(alice) == 0
+    assert musd_three_pool_lp_token.balanceOf(stableswap_adapter) == 0
+    assert musd_three_pool_gauge.balanceOf(alice) == mint_amount
+
 # ------------------------------------------------------------------
 #                 CLAIM_CRV_REWARDS FUNCTION TESTS
 # ------------------------------------------------------------------
@@ -805,6 +1259,247 @@ def test_can_successfully_claim_crv_rewards_base_pool(stableswap_adapter, alice,
     assert log.pool == three_pool_contract.address
 
 
+def test_can_successfully_claim_crv_rewards_many(stableswap_adapter, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_gauge, minter):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+
+    with boa.env.prank(alice):
+        minter.toggle_approve_mint(stableswap_adapter)
+
+        stableswap_adapter.claim_crv_rewards_many([three_pool_contract, musd_three_pool_contract])
+
+    logs = stableswap_adapter.get_logs()
+
+    assert len(logs) == 2
+    assert logs[0].pool == three_pool_contract.address
+    assert logs[1].pool == musd_three_pool_contract.address
+
+
+def test_cannot_claim_crv_rewards_many_with_pool_not_registered(stableswap_adapter, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    with boa.env.prank(alice):
+        with boa.reverts("stableswap_adapter: pool address mismatch"):
+            stableswap_adapter.claim_crv_rewards_many([three_pool_contract, RANDOM_ADDRESS])
+
+# ------------------------------------------------------------------
+#                 UNDERLYING COINS FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_exchange_underlying_in_base_pool(stableswap_adapter, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    with boa.env.prank(alice):
+        with boa.reverts("stableswap_adapter: pool is not a metapool"):
+            stableswap_adapter.exchange_underlying(three_pool_contract, 0, 1, int(1e18), 0)
+
+
+def test_can_exchange_underlying_meta_coin_to_base_coin(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_zapper, musd, three_crv, usdc):
+    with boa.env.prank(alice):
+        stableswap_adapter.register_pool(musd_three_pool_contract, musd_three_pool_zapper)
+    mint_musd_three_pool_tokens(alice, musd, three_crv)
+
+    AMOUNT_TO_EXCHANGE: int = int(100e18) # MUSD
+
+    expected_amount: int = stableswap_adapter.get_exchange_amount_out_underlying(musd_three_pool_contract, 0, 2, AMOUNT_TO_EXCHANGE)
+
+    with boa.env.prank(alice):
+        musd.approve(stableswap_adapter, AMOUNT_TO_EXCHANGE)
+
+        out_amount: int = stableswap_adapter.exchange_underlying(musd_three_pool_contract, 0, 2, AMOUNT_TO_EXCHANGE, 0)
+
+    assert out_amount == expected_amount
+    assert usdc.balanceOf(alice) == out_amount
+    assert musd.balanceOf(alice) == BALANCE - AMOUNT_TO_EXCHANGE
+    assert usdc.balanceOf(stableswap_adapter) == 0
+
+    logs = stableswap_adapter.get_logs()
+    log = logs[len(logs) - 1]
+
+    assert log.pool == musd_three_pool_contract.address
+    assert log.index_in == 0
+    assert log.index_out == 2
+    assert log.out_amount == out_amount
+
+
+def test_can_add_and_remove_liquidity_underlying(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_zapper, musd_three_pool_lp_token, dai, usdc, usdt):
+    with boa.env.prank(alice):
+        stableswap_adapter.register_pool(musd_three_pool_contract, musd_three_pool_zapper)
+    mint_three_pool_tokens(alice, dai, usdc, usdt)
+
+    AMOUNT_TO_ADD: int = int(100e18) # DAI
+
+    with boa.env.prank(alice):
+        dai.approve(stableswap_adapter, AMOUNT_TO_ADD)
+
+        mint_amount: int = stableswap_adapter.add_liquidity_underlying(musd_three_pool_contract, [0, AMOUNT_TO_ADD, 0, 0], 0)
+
+        assert mint_amount > 0
+        assert musd_three_pool_lp_token.balanceOf(alice) == mint_amount
+        assert dai.balanceOf(alice) == BALANCE - AMOUNT_TO_ADD
+
+        musd_three_pool_lp_token.approve(stableswap_adapter, mint_amount)
+
+        usdt_balance_before: int = usdt.balanceOf(alice)
+
+        out_amount: int = stableswap_adapter.remove_liquidity_one_coin_underlying(musd_three_pool_contract, 3, mint_amount, 0)
+
+    assert out_amount > 0
+    assert usdt.balanceOf(alice) == usdt_balance_before + out_amount
+    assert musd_three_pool_lp_token.balanceOf(alice) == 0
+    assert musd_three_pool_lp_token.balanceOf(stableswap_adapter) == 0
+
+
+# ------------------------------------------------------------------
+#                   GET_POOL_STATE FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_get_pool_state_of_unregistered_pool(stableswap_adapter, stableswap_lens, three_pool_contract):
+    with boa.reverts("stableswap_lens: pool address mismatch"):
+        stableswap_lens.get_pool_state(three_pool_contract)
+
+def test_can_get_pool_state_base_pool(stableswap_adapter, stableswap_lens, alice, three_pool_contract, three_pool_lp_token, three_pool_gauge, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    state = stableswap_lens.get_pool_state(three_pool_contract)
+
+    assert state.pool == three_pool_contract.address
+    assert state.pool_type == 1
+    assert state.gauge == three_pool_gauge.address
+    assert state.zapper == ZERO
+    assert state.lp_token == three_pool_lp_token.address
+    assert state.n_coins == 3
+    assert state.coins == [dai.address, usdc.address, usdt.address] + [ZERO] * 5
+    assert state.balances == [three_pool_contract.balances(i) for i in range(3)] + [0] * 5
+    assert state.A == three_pool_contract.A()
+    assert state.fee == three_pool_contract.fee()
+    assert state.virtual_price == three_pool_contract.get_virtual_price()
+    assert state.lp_total_supply == three_pool_lp_token.totalSupply()
+    assert state.gauge_total_supply == three_pool_gauge.totalSupply()
+    assert state.gauge_inflation_rate == three_pool_gauge.inflation_rate()
+    assert state.block_number == boa.env.evm.patch.block_number
+
+def test_can_get_pool_states_of_several_pools(stableswap_adapter, stableswap_lens, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_gauge, musd_three_pool_lp_token):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+
+    states = stableswap_lens.get_pool_states([three_pool_contract, musd_three_pool_contract])
+
+    assert len(states) == 2
+    assert states[0] == stableswap_lens.get_pool_state(three_pool_contract)
+    assert states[1].pool == musd_three_pool_contract.address
+    assert states[1].pool_type == 2
+    assert states[1].n_coins == 2
+    assert states[1].lp_total_supply == musd_three_pool_lp_token.totalSupply()
+    assert states[1].gauge_total_supply == musd_three_pool_gauge.totalSupply()
+
+def test_cannot_get_pool_states_with_unregistered_pool(stableswap_adapter, stableswap_lens, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    with boa.reverts("stableswap_lens: pool address mismatch"):
+        stableswap_lens.get_pool_states([three_pool_contract, RANDOM_ADDRESS])
+
+# ------------------------------------------------------------------
+#                      GET_POOLS FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_get_pools_returns_empty_page_for_empty_registry(stableswap_adapter, stableswap_lens):
+    pools, coins = stableswap_lens.get_pools(0, 10)
+    assert pools == []
+    assert coins == []
+
+def test_can_get_pools_page(stableswap_adapter, stableswap_lens, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_gauge, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    register_musd_three_pool(stableswap_adapter, alice, musd_three_pool_contract, musd_three_pool_gauge)
+
+    pools, coins = stableswap_lens.get_pools(0, 10)
+
+    assert len(pools) == 2
+    assert pools[0] == stableswap_adapter.get_pool_info(three_pool_contract)
+    assert pools[1] == stableswap_adapter.get_pool_info(musd_three_pool_contract)
+    assert coins[0] == [dai.address, usdc.address, usdt.address] + [ZERO] * 5
+
+    pools, coins = stableswap_lens.get_pools(1, 1)
+
+    assert len(pools) == 1
+    assert pools[0].contract == musd_three_pool_contract.address
+    assert coins[0][:2] == [stableswap_adapter.pool_coins(musd_three_pool_contract, i) for i in range(2)]
+
+def test_get_pools_stops_at_end_of_registry(stableswap_adapter, stableswap_lens, alice, three_pool_contract):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+
+    assert len(stableswap_lens.get_pools(0, 2**256 - 1)[0]) == 1
+    assert len(stableswap_lens.get_pools(1, 10)[0]) == 0
+    assert len(stableswap_lens.get_pools(2**256 - 1, 2**256 - 1)[0]) == 0
+
+# ------------------------------------------------------------------
+#                 PERMIT / MULTICALL FUNCTION TESTS
+# ------------------------------------------------------------------
+
+def test_cannot_permit_with_invalid_signature(stableswap_adapter, alice, usdc):
+    with boa.env.prank(alice):
+        with boa.reverts("stableswap_adapter: permit failed"):
+            stableswap_adapter.permit(usdc, 1, DEADLINE, 27, b"\x01" * 32, b"\x02" * 32)
+
+
+def test_cannot_call_owner_functions_through_multicall_not_owner(stableswap_adapter, usdc):
+    with boa.reverts("ownable: caller is not the owner"):
+        stableswap_adapter.multicall([stableswap_adapter.set_fee_on_transfer_coin.prepare_calldata(usdc.address, True)])
+
+
+def test_can_exchange_with_permit_in_one_multicall(stableswap_adapter, alice, three_pool_contract, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    signer = Account.create()
+    mint_three_pool_tokens(signer.address, dai, usdc, usdt)
+
+    AMOUNT_TO_EXCHANGE: int = int(100e6) # USDC
+
+    v, r, s = sign_permit(signer, usdc, stableswap_adapter.address, AMOUNT_TO_EXCHANGE, DEADLINE)
+
+    with boa.env.prank(signer.address):
+        stableswap_adapter.multicall([
+            stableswap_adapter.permit.prepare_calldata(usdc.address, AMOUNT_TO_EXCHANGE, DEADLINE, v, r, s),
+            stableswap_adapter.exchange.prepare_calldata(three_pool_contract.address, 1, 0, AMOUNT_TO_EXCHANGE, 0),
+        ])
+
+    assert usdc.balanceOf(signer.address) == BALANCE - AMOUNT_TO_EXCHANGE
+    assert dai.balanceOf(signer.address) > BALANCE
+
+
+def test_can_exchange_with_permit2_in_one_multicall(stableswap_adapter, alice, three_pool_contract, dai, usdc, usdt):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    signer = Account.create()
+    mint_three_pool_tokens(signer.address, dai, usdc, usdt)
+
+    AMOUNT_TO_EXCHANGE: int = int(100e18) # DAI
+
+    with boa.env.prank(signer.address):
+        dai.approve(PERMIT2, 2**256 - 1)
+
+    permit_single, signature = sign_permit2(signer, dai, stableswap_adapter.address, AMOUNT_TO_EXCHANGE, DEADLINE)
+
+    with boa.env.prank(signer.address):
+        stableswap_adapter.multicall([
+            stableswap_adapter.permit2.prepare_calldata(permit_single, signature),
+            stableswap_adapter.exchange.prepare_calldata(three_pool_contract.address, 0, 1, AMOUNT_TO_EXCHANGE, 0),
+        ])
+
+    assert dai.balanceOf(signer.address) == BALANCE - AMOUNT_TO_EXCHANGE
+    assert usdc.balanceOf(signer.address) > BALANCE
+    assert dai.allowance(signer.address, stableswap_adapter) == 0
+
+
+def test_failed_transfer_of_approved_coins_does_not_fall_back_to_permit2(stableswap_adapter, alice, three_pool_contract, dai):
+    register_three_pool(stableswap_adapter, alice, three_pool_contract)
+    signer = Account.create()
+
+    AMOUNT_TO_EXCHANGE: int = int(100e18) # DAI
+
+    # approved to the adapter without holding the coins, the coin error is kept
+    with boa.env.prank(signer.address):
+        dai.approve(stableswap_adapter, AMOUNT_TO_EXCHANGE)
+
+        with boa.reverts("Dai/insufficient-balance"):
+            stableswap_adapter.exchange(three_pool_contract, 0, 1, AMOUNT_TO_EXCHANGE, 0)
 
 
 # ------------------------------------------------------------------
@@ -846,4 +1541,26 @@ def mint_musd_three_pool_tokens(alice, musd, three_crv):
 
     # three_crv
     with boa.env.prank(THREE_CRV_WHALE):
-        three_crv.transfer(alice, BALANCE)
\ No newline at end of file
+        three_crv.transfer(alice, BALANCE)
+
+def sign_permit(signer, token, spender, amount, deadline):
+    struct_hash = keccak(encode(
+        ["bytes32", "address", "address", "uint256", "uint256", "uint256"],
+        [PERMIT_TYPEHASH, signer.address, spender, amount, token.nonces(signer.address), deadline],
+    ))
+    signed = signer.unsafe_sign_hash(keccak(b"\x19\x01" + token.DOMAIN_SEPARATOR() + struct_hash))
+    return signed.v, signed.r.to_bytes(32, "big"), signed.s.to_bytes(32, "big")
+
+def sign_permit2(signer, token, spender, amount, deadline):
+    permit2 = boa.loads_abi(PERMIT2_ABI, name="Permit2").at(PERMIT2)
+    details_hash = keccak(encode(
+        ["bytes32", "address", "uint160", "uint48", "uint48"],
+        [PERMIT_DETAILS_TYPEHASH, token.address, amount, deadline, 0],
+    ))
+    struct_hash = keccak(encode(
+        ["bytes32", "bytes32", "address", "uint256"],
+        [PERMIT_SINGLE_TYPEHASH, details_hash, spender, deadline],
+    ))
+    signed = signer.unsafe_sign_hash(keccak(b"\x19\x01" + permit2.DOMAIN_SEPARATOR() + struct_hash))
+    permit_single = ((token.address, amount, deadline, 0), spender, deadline)
+    return permit_single, signed.signature
@@ -0,0 +1,99 @@
+"""
+Unit tests for the stableswap adapter lens.
+The adapter serves mock pools from a mock meta registry, so they can be run on any network.
+"""
+
+import boa
+import pytest
+
+from src import stableswap_adapter, stableswap_lens
+from src.mocks import mock_meta_registry, mock_stableswap_pool
+
+ZERO = "0x0000000000000000000000000000000000000000"
+BALANCES = [10**24, 2 * 10**12, 3 * 10**12]
+RATES = [10**18, 10**30, 10**30]
+AMOUNT_IN = 10**21
+COINS = [boa.env.generate_address(f"lens_coin_{i}") for i in range(4)]
+
+
+@pytest.fixture(autouse=True)
+def deployer():
+    # contracts are deployed from their own account, so that later tests do not reuse their addresses
+    with boa.env.prank(boa.env.generate_address("deployer")):
+        yield
+
+
+@pytest.fixture
+def adapter():
+    registry = mock_meta_registry.deploy()
+    adapter = stableswap_adapter.deploy(registry, boa.env.generate_address("minter"))
+
+    # the second pool swaps its first two coins
+    for coins in (COINS[:3], [COINS[1], COINS[0], COINS[3]]):
+        pool = mock_stableswap_pool.deploy()
+        pool.set_state(BALANCES, RATES, 2000, 1, 10**6, 6 * 10**24, True)
+        registry.set_pool(pool, False, ZERO, pool, 3, coins + [ZERO] * 5)
+        adapter.register_pool(pool, ZERO)
+    return adapter
+
+
+@pytest.fixture
+def lens(adapter):
+    return stableswap_lens.deploy(adapter)
+
+
+@pytest.fixture
+def pools(adapter):
+    return [adapter.pool_registry_set(i) for i in range(2)]
+
+
+def test_get_pools_pages_registry(adapter, lens, pools):
+    page, coins = lens.get_pools(0, 10)
+
+    assert lens.get_pools_count() == 2
+    assert page == [adapter.get_pool_info(pool) for pool in pools]
+    assert coins == [COINS[:3] + [ZERO] * 5, [COINS[1], COINS[0], COINS[3]] + [ZERO] * 5]
+
+    page, coins = lens.get_pools(1, 1)
+
+    assert [pool.contract for pool in page] == pools[1:]
+    assert lens.get_pools(2, 10) == ([], [])
+
+
+def test_find_pools_for_pair(lens, pools):
+    hops = lens.find_pools_for_pair(COINS[0], COINS[1])
+
+    assert [(hop.pool, hop.index_in, hop.index_out) for hop in hops] == [(pools[0], 0, 1), (pools[1], 1, 0)]
+    assert lens.find_pools_for_pair(COINS[2], COINS[3]) == []
+
+
+def test_get_exchange_amounts_out_fails_alone(adapter, lens, pools):
+    requests = [
+        (pools[0], 0, 1, AMOUNT_IN),
+        (boa.env.generate_address("unregistered"), 0, 1, AMOUNT_IN),
+        (pools[1], 0, 3, AMOUNT_IN),
+        (pools[1], 2, 1, AMOUNT_IN),
+    ]
+
+    amounts_out = lens.get_exchange_amounts_out(requests)
+
+    assert amounts_out[1:3] == [lens.QUOTE_FAILED()] * 2
+    assert amounts_out[0] == adapter.get_exchange_amount_out(pools[0], 0, 1, AMOUNT_IN)
+    assert amounts_out[3] == adapter.get_exchange_amount_out(pools[1], 2, 1, AMOUNT_IN)
+
+
+def test_get_exchange_ladder_matches_adapter(adapter, lens, pools):
+    amounts_in = [AMOUNT_IN * 4**i for i in range(6)]
+
+    amounts_out, prices = lens.get_exchange_ladder(pools[0], 0, 2, amounts_in)
+
+    assert amounts_out == [adapter.get_exchange_amount_out(pools[0], 0, 2, amount) for amount in amounts_in]
+    assert prices == [out * 10**18 // amount for out, amount in zip(amounts_out, amounts_in)]
+
+    with boa.reverts("stableswap_adapter: index out out of bounds"):
+        lens.get_exchange_ladder(pools[0], 0, 3, amounts_in)
+
+
+def test_cannot_get_pool_state_of_unregistered_pool(lens):
+    with boa.reverts("stableswap_lens: pool address mismatch"):
+        lens.get_pool_state(boa.env.generate_address("unregistered"))
@@ -0,0 +1,305 @@
+"""
+Unit tests for the off-chain StableSwap math engine.
+Quotes are checked to the wei against the on-chain arithmetic of a mock stableswap pool,
+so they can be run on any network, and against the 3pool, the mUSD metapool and a stableswap-ng pool
+at the pinned block of the forked network.
+"""
+
+import dataclasses
+import json
+
+import boa
+import pytest
+from boa import BoaError
+from hypothesis import HealthCheck, assume, given, settings
+from hypothesis import strategies as st
+
+from offchain import stableswap_math
+from offchain.stableswap_math import StableSwapState
+from src.mocks import mock_stableswap_pool
+
+PRECISION = 10**18
+# rate multipliers of 18, 6 and 8 decimals coins
+RATES = [10**18, 10**30, 10**28]
+EXAMPLES = 100
+
+
+@pytest.fixture(scope="module")
+def pool():
+    return mock_stableswap_pool.deploy()
+
+
+@st.composite
+def pool_states(draw):
+    n_coins = draw(st.integers(min_value=2, max_value=4))
+    is_meta = n_coins == 2 and draw(st.booleans())
+    rates = [draw(st.sampled_from(RATES)) for _ in range(n_coins)]
+    if is_meta:
+        # base pool virtual price as the rate of the base lp coin
+        rates[1] = draw(st.integers(min_value=PRECISION, max_value=2 * PRECISION))
+
+    # normalized balances within 100x of each other, from 1 to 10**9 coins
+    scale = draw(st.integers(min_value=0, max_value=9))
+    balances = []
+    for rate in rates:
+        xp = draw(st.integers(min_value=10**18, max_value=100 * 10**18)) * 10**scale
+        balances.append(xp * PRECISION // rate)
+
+    a_precision = draw(st.sampled_from([1, 100]))
+    amp = draw(st.integers(min_value=1, max_value=5000)) * a_precision
+    fee = draw(st.integers(min_value=0, max_value=10**8))
+    total_supply = sum(rate * balance // PRECISION for rate, balance in zip(rates, balances))
+
+    return StableSwapState(
+        balances=tuple(balances),
+        rates=tuple(rates),
+        amp=amp,
+        fee=fee,
+        total_supply=total_supply,
+        a_precision=a_precision,
+        fee_after_rates=not is_meta and a_precision == 1,
+    )
+
+
+def set_state(pool, state: StableSwapState):
+    pool.set_state(
+        list(state.balances),
+        list(state.rates),
+        state.amp,
+        state.a_precision,
+        state.fee,
+        state.total_supply,
+        state.fee_after_rates,
+    )
+
+
+def solvable(state: StableSwapState) -> bool:
+    """
+    Whether D of the state converges, the pools revert on the few states where it does not.
+    """
+    try:
+        stableswap_math.get_virtual_price(state)
+    except ArithmeticError:
+        return False
+    return True
+
+
+def test_get_D_of_balanced_pool_is_sum_of_balances():
+    assert stableswap_math.get_D([10**24] * 3, 2000) == 3 * 10**24
+    assert stableswap_math.get_D([0, 0], 2000) == 0
+
+
+def test_metapool_vp_rate_uses_cache_until_it_expires():
+    assert stableswap_math.metapool_vp_rate(100, 1000, 200, 1000 + 600) == 100
+    assert stableswap_math.metapool_vp_rate(100, 1000, 200, 1000 + 601) == 200
+
+
+def test_calc_token_amount_fails_where_pool_reverts():
+    state = StableSwapState(balances=(10**18, 10**18), rates=(10**18, 10**18), amp=100, fee=0, total_supply=2 * 10**18)
+    with pytest.raises(ArithmeticError):
+        stableswap_math.calc_token_amount(state, [2 * 10**18, 0], False)
+
+
+def test_rejects_stableswap_ng_states():
+    state = StableSwapState(
+        balances=(10**18, 10**18),
+        rates=(10**18, 10**18),
+        amp=100,
+        fee=10**6,
+        total_supply=2 * 10**18,
+        offpeg_fee_multiplier=2 * 10**10,
+    )
+    with pytest.raises(ValueError, match="stableswap-ng"):
+        stableswap_math.get_dy(state, 0, 1, 10**17)
+    # the virtual price has no fee
+    assert stableswap_math.get_virtual_price(state) == 10**18
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states(), data=st.data())
+def test_get_dy_matches_pool(pool, state, data):
+    set_state(pool, state)
+    n_coins = len(state.balances)
+    i = data.draw(st.integers(min_value=0, max_value=n_coins - 1))
+    j = data.draw(st.integers(min_value=0, max_value=n_coins - 1).filter(lambda j: j != i))
+    dx = data.draw(st.integers(min_value=1, max_value=state.balances[i]))
+
+    assert stableswap_math.get_dy(state, i, j, dx) == pool.get_dy(i, j, dx)
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states(), data=st.data())
+def test_calc_token_amount_matches_pool(pool, state, data):
+    set_state(pool, state)
+    deposit = data.draw(st.booleans())
+    # withdrawals of up to half of each balance keep the pool solvent
+    amounts = [data.draw(st.integers(min_value=0, max_value=balance if deposit else balance // 2)) for balance in state.balances]
+
+    assert stableswap_math.calc_token_amount(state, amounts, deposit) == pool.calc_token_amount(amounts, deposit)
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states(), data=st.data())
+def test_calc_withdraw_one_coin_matches_pool(pool, state, data):
+    set_state(pool, state)
+    i = data.draw(st.integers(min_value=0, max_value=len(state.balances) - 1))
+    # up to a tenth of the supply can be withdrawn in any coin of a pool within 100x balance ratios
+    token_amount = data.draw(st.integers(min_value=10**6, max_value=state.total_supply // 10))
+
+    assert stableswap_math.calc_withdraw_one_coin(state, token_amount, i) == pool.calc_withdraw_one_coin(token_amount, i)
+
+
+@settings(max_examples=EXAMPLES, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(state=pool_states())
+def test_get_virtual_price_matches_pool(pool, state):
+    set_state(pool, state)
+
+    assert stableswap_math.get_virtual_price(state) == pool.get_virtual_price()
+
+
+@settings(max_examples=EXAMPLES, deadline=None)
+@given(state=pool_states(), data=st.data())
+def test_exchange_pays_get_dy_of_pools_charging_fee_before_rates(state, data):
+    assume(solvable(state))
+    state = dataclasses.replace(state, fee_after_rates=False)
+    n_coins = len(state.balances)
+    i = data.draw(st.integers(min_value=0, max_value=n_coins - 1))
+    j = data.draw(st.integers(min_value=0, max_value=n_coins - 1).filter(lambda j: j != i))
+    dx = data.draw(st.integers(min_value=1, max_value=state.balances[i]))
+
+    dy, balances = stableswap_math.exchange(state, i, j, dx, 0)
+
+    assert dy == stableswap_math.get_dy(state, i, j, dx)
+    assert balances[i] == state.balances[i] + dx
+    assert balances[j] == state.balances[j] - dy
+
+
+@settings(max_examples=EXAMPLES, deadline=None)
+@given(state=pool_states(), data=st.data())
+def test_remove_liquidity_one_coin_pays_calc_withdraw_one_coin(state, data):
+    assume(solvable(state))
+    i = data.draw(st.integers(min_value=0, max_value=len(state.balances) - 1))
+    token_amount = data.draw(st.integers(min_value=10**6, max_value=state.total_supply // 10))
+    admin_fee = data.draw(st.integers(min_value=0, max_value=10**10))
+
+    dy, balances = stableswap_math.remove_liquidity_one_coin(state, token_amount, i, admin_fee)
+
+    assert dy == stableswap_math.calc_withdraw_one_coin(state, token_amount, i)
+    # the admin share of the fee leaves the pool too
+    assert balances[i] <= state.balances[i] - dy
+
+
+# ------------------------------------------------------------------
+#                FORK TESTS AT THE PINNED FORK BLOCK
+# ------------------------------------------------------------------
+
+# views of stableswap-ng pools read by the fork tests
+NG_POOL_ABI = json.dumps(
+    [
+        {
+            "name": name,
+            "type": "function",
+            "stateMutability": "view",
+            "inputs": [{"name": "arg0", "type": "uint256"}] if name == "balances" else [],
+            "outputs": [{"name": "", "type": "uint256[]" if name == "stored_rates" else "uint256"}],
+        }
+        for name in ("N_COINS", "balances", "stored_rates", "A_precise", "fee", "offpeg_fee_multiplier", "totalSupply")
+    ]
+)
+# coins of the fork whose pools are searched for a stableswap-ng pool
+NG_SEARCH_PAIRS = (("USDC", "USDT"), ("DAI", "USDC"), ("DAI", "USDT"))
+
+
+def coin_rates(coins) -> tuple[int, ...]:
+    return tuple(10 ** (36 - coin.decimals()) for coin in coins)
+
+
+def assert_quotes_match_pool(state: StableSwapState, pool):
+    """
+    Check get_dy, calc_token_amount and calc_withdraw_one_coin against the views of a real pool,
+    for a thousandth and a tenth of its balances and supply.
+    """
+    n_coins = len(state.balances)
+    for divisor in (1000, 10):
+        for i in range(n_coins):
+            for j in range(n_coins):
+                if i != j:
+                    dx = state.balances[i] // divisor
+                    assert stableswap_math.get_dy(state, i, j, dx) == pool.get_dy(i, j, dx)
+            token_amount = state.total_supply // divisor
+            assert stableswap_math.calc_withdraw_one_coin(state, token_amount, i) == pool.calc_withdraw_one_coin(
+                token_amount, i
+            )
+        amounts = [balance // divisor for balance in state.balances]
+        for deposit in (True, False):
+            assert stableswap_math.calc_token_amount(state, amounts, deposit) == pool.calc_token_amount(amounts, deposit)
+
+
+def test_quotes_match_3pool_at_fork_block(three_pool_contract, three_pool_lp_token, dai, usdc, usdt):
+    coins = [dai, usdc, usdt]
+    state = StableSwapState(
+        balances=tuple(three_pool_contract.balances(i) for i in range(3)),
+        rates=coin_rates(coins),
+        amp=three_pool_contract.A(),
+        fee=three_pool_contract.fee(),
+        total_supply=three_pool_lp_token.totalSupply(),
+        fee_after_rates=True,
+    )
+
+    assert_quotes_match_pool(state, three_pool_contract)
+    assert stableswap_math.get_virtual_price(state) == three_pool_contract.get_virtual_price()
+
+
+def test_quotes_match_metapool_at_fork_block(musd_three_pool_contract, musd_three_pool_lp_token, three_pool_contract, musd):
+    pool = musd_three_pool_contract
+    vp_rate = stableswap_math.metapool_vp_rate(
+        pool.base_virtual_price(),
+        pool.base_cache_updated(),
+        three_pool_contract.get_virtual_price(),
+        boa.env.evm.patch.timestamp,
+    )
+    state = StableSwapState(
+        balances=(pool.balances(0), pool.balances(1)),
+        rates=(coin_rates([musd])[0], vp_rate),
+        amp=pool.A_precise(),
+        fee=pool.fee(),
+        total_supply=musd_three_pool_lp_token.totalSupply(),
+        a_precision=100,
+    )
+
+    assert_quotes_match_pool(state, pool)
+    assert stableswap_math.get_virtual_price(state) == pool.get_virtual_price()
+
+
+def test_rejects_stableswap_ng_pool_at_fork_block(meta_registry, active_network):
+    ng_pool = boa.loads_abi(NG_POOL_ABI, name="StableSwapNG")
+    pools = []
+    for a, b in NG_SEARCH_PAIRS:
+        coin_a, coin_b = (active_network.manifest_named(name) for name in (a, b))
+        for address in meta_registry.find_pools_for_coins(coin_a, coin_b):
+            try:
+                ng_pool.at(address).offpeg_fee_multiplier()
+            except BoaError:
+                continue
+            pools.append(ng_pool.at(address))
+    assert pools, "no stableswap-ng pool of the searched pairs at the fork block"
+
+    pool = pools[0]
+    n_coins = pool.N_COINS()
+    state = StableSwapState(
+        balances=tuple(pool.balances(i) for i in range(n_coins)),
+        rates=tuple(pool.stored_rates()),
+        amp=pool.A_precise(),
+        fee=pool.fee(),
+        total_supply=pool.totalSupply(),
+        a_precision=100,
+        offpeg_fee_multiplier=pool.offpeg_fee_multiplier(),
+    )
+
+    # the fee of ng pools grows off peg and calc_token_amount charges it
+    with pytest.raises(ValueError, match="stableswap-ng"):
+        stableswap_math.get_dy(state, 0, 1, PRECISION)
+    with pytest.raises(ValueError, match="stableswap-ng"):
+        stableswap_math.calc_token_amount(state, [PRECISION] * n_coins, True)
+    with pytest.raises(ValueError, match="stableswap-ng"):
+        stableswap_math.calc_withdraw_one_coin(state, PRECISION, 0)
@@ -0,0 +1,287 @@
+"""
+Unit tests for the event-driven pool state mirror.
+Pools are fetched from fixed states and events are built by hand, so they can be run on any network.
+The pool reader and the mirror of adapter trades are checked on the 3pool and the mUSD metapool
+at the pinned block of the forked network.
+"""
+
+import dataclasses
+
+import boa
+import pytest
+
+from offchain import stableswap_math
+from offchain.pool_reader import PoolReader
+from offchain.state_mirror import Block, MirroredPool, PoolEvent, ReorgError, StateMirror
+from offchain.stableswap_math import StableSwapState
+
+ADAPTER = "0x00000000000000000000000000000000000000Ad"
+THREE_POOL = "0x0000000000000000000000000000000000000001"
+META_POOL = "0x0000000000000000000000000000000000000002"
+OTHER_POOL = "0x0000000000000000000000000000000000000003"
+ADMIN_FEE = 5 * 10**9
+THREE_POOL_STATE = StableSwapState(
+    balances=(60_000_000 * 10**18, 70_000_000 * 10**6, 40_000_000 * 10**6),
+    rates=(10**18, 10**30, 10**30),
+    amp=2000,
+    fee=1_000_000,
+    total_supply=165_000_000 * 10**18,
+    fee_after_rates=True,
+)
+META_POOL_STATE = StableSwapState(
+    balances=(5_000_000 * 10**18, 4_000_000 * 10**18),
+    rates=(10**18, 1_030_000_000_000_000_000),
+    amp=20000,
+    fee=4_000_000,
+    total_supply=9_000_000 * 10**18,
+    a_precision=100,
+)
+
+
+class Chain:
+    """
+    Pool states by address as the chain has them, with the blocks of the fetches.
+    """
+
+    def __init__(self):
+        self.pools = {
+            THREE_POOL: MirroredPool(THREE_POOL_STATE, admin_fee=ADMIN_FEE, exact=True),
+            META_POOL: MirroredPool(META_POOL_STATE, admin_fee=ADMIN_FEE, base_pool=THREE_POOL),
+            OTHER_POOL: MirroredPool(THREE_POOL_STATE, admin_fee=ADMIN_FEE, exact=True),
+        }
+        self.fetches: list[tuple[list[str], int]] = []
+
+    def fetch(self, pools, block):
+        self.fetches.append((list(pools), block.number))
+        return {pool: self.pools[pool] for pool in pools}
+
+
+def block(number: int, fork: str = "") -> Block:
+    parent = f"{number - 1}{fork}" if number > 1 else "0"
+    return Block(number=number, hash=f"{number}{fork}", parent_hash=parent, timestamp=1000 + 12 * number)
+
+
+@pytest.fixture
+def chain():
+    return Chain()
+
+
+@pytest.fixture
+def mirror(chain):
+    mirror = StateMirror(chain.fetch, adapters=[ADAPTER])
+    mirror.bootstrap([THREE_POOL], block(0))
+    chain.fetches.clear()
+    return mirror
+
+
+def exchange_events(i: int, j: int, dx: int) -> list[PoolEvent]:
+    dy, _ = stableswap_math.exchange(THREE_POOL_STATE, i, j, dx, ADMIN_FEE)
+    return [
+        PoolEvent(THREE_POOL, "TokenExchange", {"buyer": ADAPTER, "sold_id": i, "tokens_sold": dx, "bought_id": j, "tokens_bought": dy}),
+        PoolEvent(ADAPTER, "Exchange", {"pool": THREE_POOL, "index_in": i, "index_out": j, "amount_in": dx, "out_amount": dy}),
+    ]
+
+
+def test_applies_exchange_without_fetching(mirror, chain):
+    fetched = mirror.apply_block(block(1), exchange_events(0, 1, 10**24))
+
+    _, balances = stableswap_math.exchange(THREE_POOL_STATE, 0, 1, 10**24, ADMIN_FEE)
+    assert fetched == set()
+    assert chain.fetches == []
+    assert mirror.pools[THREE_POOL].state.balances == balances
+    assert mirror.head == block(1)
+
+
+def test_applies_liquidity_events_without_fetching(mirror):
+    amounts = [10**24, 10**12, 0]
+    fees = [10**20, 10**8, 10**8]
+    events = [
+        PoolEvent(THREE_POOL, "AddLiquidity", {"token_amounts": amounts, "fees": fees, "token_supply": 166 * 10**24}),
+        PoolEvent(THREE_POOL, "RemoveLiquidity", {"token_amounts": amounts, "fees": [0, 0, 0], "token_supply": 165 * 10**24}),
+    ]
+
+    assert mirror.apply_block(block(1), events) == set()
+    state = mirror.pools[THREE_POOL].state
+    assert state.balances == tuple(b - fee * ADMIN_FEE // 10**10 for b, fee in zip(THREE_POOL_STATE.balances, fees))
+    assert state.total_supply == 165 * 10**24
+
+
+def test_applies_remove_liquidity_one_without_coin_index(mirror):
+    token_amount = 10**24
+    dy, balances = stableswap_math.remove_liquidity_one_coin(THREE_POOL_STATE, token_amount, 2, ADMIN_FEE)
+    event = PoolEvent(THREE_POOL, "RemoveLiquidityOne", {"token_amount": token_amount, "coin_amount": dy})
+
+    assert mirror.apply_block(block(1), [event]) == set()
+    assert mirror.pools[THREE_POOL].state.balances == balances
+    assert mirror.pools[THREE_POOL].state.total_supply == THREE_POOL_STATE.total_supply - token_amount
+
+
+def test_fetches_pool_when_event_does_not_match_state(mirror, chain):
+    events = exchange_events(0, 1, 10**24)
+    events[0] = dataclasses.replace(events[0], args={**events[0].args, "tokens_bought": 1})
+
+    assert mirror.apply_block(block(1), events) == {THREE_POOL}
+    assert mirror.pools[THREE_POOL] == chain.pools[THREE_POOL]
+
+
+def test_fetches_pool_on_parameter_event(mirror, chain):
+    event = PoolEvent(THREE_POOL, "NewFee", {"fee": 2_000_000, "admin_fee": ADMIN_FEE})
+
+    assert mirror.apply_block(block(1), [event]) == {THREE_POOL}
+    assert chain.fetches == [([THREE_POOL], 1)]
+
+
+def test_fetches_pool_when_adapter_trade_has_no_pool_event(mirror):
+    events = exchange_events(0, 1, 10**24)
+
+    # the pool log is missing, e.g. dropped by the node
+    assert mirror.apply_block(block(1), events[1:]) == {THREE_POOL}
+
+
+def test_fetches_metapool_on_its_events_and_base_pool_events(chain):
+    mirror = StateMirror(chain.fetch, adapters=[ADAPTER])
+    mirror.bootstrap([THREE_POOL, META_POOL], block(0))
+
+    # the base pool virtual price moves the metapool rates
+    assert mirror.apply_block(block(1), exchange_events(0, 1, 10**24)) == {META_POOL}
+
+    event = PoolEvent(META_POOL, "TokenExchange", {"sold_id": 0, "tokens_sold": 10**18, "bought_id": 1, "tokens_bought": 10**18})
+    assert mirror.apply_block(block(2), [event]) == {META_POOL}
+    assert mirror.apply_block(block(3), []) == set()
+
+
+def test_fetches_ramping_pool_every_block(mirror, chain):
+    chain.pools[THREE_POOL] = dataclasses.replace(chain.pools[THREE_POOL], ramp_end=block(2).timestamp)
+    mirror.apply_block(block(1), [PoolEvent(THREE_POOL, "RampA", {})])
+
+    # the ramp ends at block 2, whose state is final
+    assert mirror.apply_block(block(2), []) == {THREE_POOL}
+    assert mirror.apply_block(block(3), []) == set()
+
+
+def test_fetches_pool_with_dynamic_rates_every_block(mirror, chain):
+    chain.pools[THREE_POOL] = dataclasses.replace(chain.pools[THREE_POOL], exact=False, dynamic_rates=True)
+    mirror.apply_block(block(1), [PoolEvent(THREE_POOL, "RampA", {})])
+
+    assert mirror.apply_block(block(2), []) == {THREE_POOL}
+    assert mirror.apply_block(block(3), exchange_events(0, 1, 10**24)) == {THREE_POOL}
+
+
+def test_registers_and_deregisters_pools(mirror, chain):
+    registered = PoolEvent(ADAPTER, "PoolRegistered", {"pool": OTHER_POOL})
+    assert mirror.apply_block(block(1), [registered]) == {OTHER_POOL}
+    assert mirror.pools[OTHER_POOL] == chain.pools[OTHER_POOL]
+
+    deregistered = PoolEvent(ADAPTER, "PoolDeregistered", {"pool": OTHER_POOL})
+    assert mirror.apply_block(block(2), [deregistered]) == set()
+    assert OTHER_POOL not in mirror.pools
+
+
+def test_ignores_events_of_other_contracts(mirror, chain):
+    event = PoolEvent(OTHER_POOL, "TokenExchange", {})
+
+    assert mirror.apply_block(block(1), [event]) == set()
+    assert chain.fetches == []
+
+
+def test_cannot_apply_block_not_extending_head(mirror):
+    mirror.apply_block(block(1), [])
+
+    with pytest.raises(ReorgError):
+        mirror.apply_block(block(2, fork="b"), [])
+
+
+def test_rolls_back_to_last_canonical_block(mirror):
+    for number in range(1, 4):
+        mirror.apply_block(block(number), exchange_events(0, 1, 10**24 * number))
+    state = mirror.pools[THREE_POOL]
+
+    # blocks 2 and 3 were reorged out for 2b
+    canonical = {block(0).hash, block(1).hash, "2b"}
+    assert mirror.rollback(lambda b: b.hash in canonical) == block(1)
+    assert mirror.pools[THREE_POOL] != state
+
+    mirror.apply_block(Block(2, "2b", block(1).hash, block(2).timestamp), [])
+    assert mirror.head.hash == "2b"
+
+
+def test_cannot_roll_back_deeper_than_checkpoints(chain):
+    mirror = StateMirror(chain.fetch, checkpoints=2)
+    mirror.bootstrap([THREE_POOL], block(0))
+    for number in range(1, 4):
+        mirror.apply_block(block(number), [])
+
+    with pytest.raises(ReorgError):
+        mirror.rollback(lambda b: b.number == 0)
+
+
+ZERO = "0x0000000000000000000000000000000000000000"
+DAI_WHALE = "0xf6e72Db5454dd049d0788e411b06CfAF16853042"
+BALANCE = 1000 * 10**18
+
+
+def fork_mirror_block(number: int) -> Block:
+    # mirrored blocks only need to chain, boa reads the current state
+    return Block(number=number, hash=str(number), parent_hash=str(number - 1), timestamp=boa.env.evm.patch.timestamp)
+
+
+def adapter_events(adapter) -> list[PoolEvent]:
+    # logs of the last call, with the logs of the pools and tokens it called
+    return [PoolEvent.from_log(log) for log in adapter.get_logs(strict=False) if hasattr(log, "_asdict")]
+
+
+def test_reads_3pool_exact_and_metapool_not_exact_at_fork_block(
+    stableswap_adapter, stableswap_lens, alice, three_pool_contract, musd_three_pool_contract, musd_three_pool_zapper
+):
+    with boa.env.prank(alice):
+        stableswap_adapter.register_pools([three_pool_contract, musd_three_pool_contract], [ZERO, musd_three_pool_zapper])
+
+    reader = PoolReader(stableswap_lens)
+    pools = reader(reader.registered_pools(), fork_mirror_block(0))
+    three_pool = pools[three_pool_contract.address]
+    metapool = pools[musd_three_pool_contract.address]
+
+    assert (three_pool.exact, three_pool.dynamic_rates, three_pool.base_pool) == (True, False, None)
+    assert three_pool.state.rates == (10**18, 10**30, 10**30)
+    assert three_pool.state.offpeg_fee_multiplier == 0
+    # the metapool rates follow the 3pool, but not every block
+    assert (metapool.exact, metapool.dynamic_rates, metapool.base_pool) == (False, False, three_pool_contract.address)
+
+
+def test_applies_adapter_trades_without_fetching_at_fork_block(
+    stableswap_adapter, stableswap_lens, alice, three_pool_contract, three_pool_lp_token, dai, usdc
+):
+    with boa.env.prank(alice):
+        stableswap_adapter.register_pool(three_pool_contract, ZERO)
+    with boa.env.prank(usdc.owner()):
+        usdc.updateMasterMinter(alice)
+    with boa.env.prank(alice):
+        usdc.configureMinter(alice, BALANCE)
+        usdc.mint(alice, BALANCE)
+    with boa.env.prank(DAI_WHALE):
+        dai.transfer(alice, BALANCE)
+
+    reader = PoolReader(stableswap_lens)
+    mirror = StateMirror(reader, adapters=[stableswap_adapter.address])
+    mirror.bootstrap(reader.registered_pools(), fork_mirror_block(0))
+    assert list(mirror.pools) == [three_pool_contract.address]
+
+    amount_in = 10 * 10**18  # DAI
+    amount_to_add = 200 * 10**6  # USDC
+
+    events: list[PoolEvent] = []
+    with boa.env.prank(alice):
+        dai.approve(stableswap_adapter, amount_in)
+        stableswap_adapter.exchange(three_pool_contract, 0, 1, amount_in, 0)
+        events += adapter_events(stableswap_adapter)
+
+        usdc.approve(stableswap_adapter, amount_to_add)
+        mint_amount = stableswap_adapter.add_liquidity(three_pool_contract, [0, amount_to_add, 0], 0)
+        events += adapter_events(stableswap_adapter)
+
+        three_pool_lp_token.approve(stableswap_adapter, mint_amount)
+        stableswap_adapter.remove_liquidity_one_coin(three_pool_contract, 2, mint_amount, 0)
+        events += adapter_events(stableswap_adapter)
+
+    assert mirror.apply_block(fork_mirror_block(1), events) == set()
+    assert mirror.pools == reader([three_pool_contract.address], fork_mirror_block(1))